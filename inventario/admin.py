@@ -6,10 +6,8 @@ from django.http import HttpResponse
 from django.template.loader import get_template
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from io import BytesIO
-from xhtml2pdf import pisa
 from import_export.admin import ImportExportModelAdmin
-from .models import CajaDiaria, MovimientoCaja
+from .models import CajaDiaria, MovimientoCaja, ConsultaLenta
 
 # --- IMPORTACIONES LOCALES ORGANIZADAS ---
 from .models import (
@@ -18,19 +16,23 @@ from .models import (
 from .resources import (
     ProductoResource, ClienteResource, ProveedorResource, CompraResource, VentaResource, ComprobanteResource
 )
-from .views import descargar_plantilla_view
+from .consultas_lentas import volcar_buffer
+from .costeo import editar_compra, eliminar_compra, registrar_compra
+from . import metricas
 
 
 # === ACCIÓN PERSONALIZADA PARA GENERAR PDF MASIVO ===
 def generar_pdf_seleccionados(modeladmin, request, queryset):
+    # xhtml2pdf se carga recién aquí, no al arrancar el admin (ver pdf.py)
+    from .pdf import html_a_pdf
     template = get_template('inventario/reporte_comprobantes_pdf.html')
     context = {'comprobantes': queryset}
     html = template.render(context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
+    with metricas.pdf_segundos.medir(documento='comprobantes_admin'):
+        contenido, errores = html_a_pdf(html)
     
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
+    if not errores:
+        response = HttpResponse(contenido, content_type='application/pdf')
         response['Content-Disposition'] = 'attachment; filename="comprobantes_seleccionados.pdf"'
         return response
         
@@ -45,6 +47,8 @@ class CustomImportExportAdmin(ImportExportModelAdmin):
     change_list_template = "admin/inventario/change_list.html"
     
     def get_urls(self):
+        # Sin importar views.py al cargar admin.py (autodiscover corre en cada arranque)
+        from .views import descargar_plantilla_view
         urls = super().get_urls()
         custom_urls = [
             path(
@@ -82,6 +86,20 @@ class CompraAdmin(CustomImportExportAdmin):
     list_filter = ('fecha_de_compra', 'proveedor')
     search_fields = ('producto__nombre', 'proveedor__razon_social')
 
+    # Stock, costo promedio y Kardex por costeo.py, igual que el formulario y la importación
+    def save_model(self, request, obj, form, change):
+        if change:
+            editar_compra(obj, request.user)
+        else:
+            registrar_compra(obj)
+
+    def delete_model(self, request, obj):
+        eliminar_compra(obj, request.user)
+
+    def delete_queryset(self, request, queryset):
+        for compra in queryset.select_related('producto'):
+            eliminar_compra(compra, request.user)
+
 @admin.register(Venta)
 class VentaAdmin(CustomImportExportAdmin):
     resource_class = VentaResource
@@ -132,3 +150,27 @@ class MovimientoCajaAdmin(admin.ModelAdmin):
     list_display = ('tipo', 'monto', 'concepto', 'caja', 'fecha')
     list_filter = ('tipo', 'caja__tienda')
 
+@admin.register(ConsultaLenta)
+class ConsultaLentaAdmin(admin.ModelAdmin):
+    """Ranking de consultas lentas: por defecto, las que más tiempo total consumen."""
+    list_display = ('vista', 'tienda', 'ejecuciones', 'tiempo_total_ms', 'promedio_ms', 'tiempo_max_ms', 'sql_resumido', 'ultima_vez')
+    list_filter = ('vista', 'tienda')
+    search_fields = ('sql_normalizado', 'vista')
+    ordering = ('-tiempo_total_ms', '-ejecuciones')
+    readonly_fields = [f.name for f in ConsultaLenta._meta.fields]
+
+    def changelist_view(self, request, extra_context=None):
+        # Mostramos también lo que aún está en el buffer en memoria
+        volcar_buffer(forzar=True)
+        return super().changelist_view(request, extra_context)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Promedio (ms)")
+    def promedio_ms(self, obj):
+        return round(obj.tiempo_promedio_ms, 1)
+
+    @admin.display(description="SQL")
+    def sql_resumido(self, obj):
+        return obj.sql_normalizado[:120]
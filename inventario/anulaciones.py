@@ -0,0 +1,100 @@
+# inventario/anulaciones.py
+"""
+Anulación de comprobantes, de uno o de muchos a la vez.
+
+El comprobante no se borra: pasa a ANULADO (los reportes y la caja ya solo
+cuentan los EMITIDO) y todo lo que generó se compensa en bloque:
+
+- Stock: UNA actualización por producto con la suma de lo vendido en todos los
+  comprobantes, devuelto al costo con que salió (promedio ponderado).
+- Kardex: una ENTRADA por comprobante y producto, insertadas juntas.
+- Deuda: a cada cliente se le descuenta lo que faltaba pagar de sus créditos.
+- Caja: el dinero ya cobrado que no está dentro de la caja abierta (ventas de
+  turnos anteriores y abonos a créditos) sale como un EGRESO por comprobante.
+
+La cantidad de consultas no depende de cuántos comprobantes ni productos se anulen.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+from .costeo import PRECISION, promedio_con_entrada
+from .models import CajaDiaria, Cliente, Comprobante, DetalleComprobante, MovimientoCaja, MovimientoStock, Producto
+from .stock_en_vivo import fila_producto, publicar_filas
+
+CERO = Decimal('0')
+
+
+def _devolucion(comprobante, caja):
+    """Dinero a devolver por caja al anular `comprobante` con `caja` abierta (o None)."""
+    if comprobante.metodo_pago == 'CREDITO':
+        return comprobante.monto_abonado
+    if caja is not None and comprobante.fecha_emision >= caja.fecha_apertura:
+        return CERO  # Sigue dentro de las ventas de la caja: al anularlo deja de sumar
+    return comprobante.total_final
+
+
+def anular_comprobantes(tienda, ids, usuario=None):
+    """
+    Anula los comprobantes EMITIDOS de `tienda` cuyos ids estén en `ids` (los
+    demás se ignoran) y devuelve cuántos se anularon. Si hay que devolver
+    dinero y no hay caja abierta, no anula nada y lanza ValueError.
+    """
+    with transaction.atomic():
+        comprobantes = list(Comprobante.objects.select_for_update().filter(
+            tienda=tienda, id__in=ids, estado='EMITIDO',
+        ).order_by('fecha_emision', 'id'))
+        if not comprobantes:
+            return 0
+        caja = CajaDiaria.objects.filter(tienda=tienda, estado='ABIERTA').first()
+        devoluciones = [(c, _devolucion(c, caja)) for c in comprobantes]
+        if caja is None and any(monto > 0 for _, monto in devoluciones):
+            raise ValueError("Debe abrir caja para devolver el dinero de los comprobantes ya cobrados.")
+
+        # Lo vendido, sumado en la BD por comprobante y producto
+        lineas = DetalleComprobante.objects.filter(comprobante__in=comprobantes).values(
+            'comprobante_id', 'producto_id',
+        ).annotate(
+            cantidad_total=Sum('cantidad'),
+            valor=Sum(ExpressionWrapper(F('cantidad') * F('costo_unitario'),
+                                        output_field=DecimalField(max_digits=14, decimal_places=4))),
+        ).order_by('comprobante_id', 'producto_id')
+        lineas = [l for l in lineas if l['cantidad_total']]
+        productos = Producto.objects.select_for_update().in_bulk({l['producto_id'] for l in lineas})
+
+        por_id = {c.id: c for c in comprobantes}
+        movimientos = []
+        for l in lineas:
+            producto, comprobante = productos[l['producto_id']], por_id[l['comprobante_id']]
+            cantidad = l['cantidad_total']
+            costo = (l['valor'] / cantidad).quantize(PRECISION)
+            antes = producto.stock
+            producto.costo = promedio_con_entrada(antes, producto.costo, cantidad, costo)
+            producto.stock += cantidad
+            movimientos.append(MovimientoStock(
+                producto=producto, tipo='ENTRADA', cantidad=cantidad, stock_antes=antes, stock_despues=producto.stock,
+                costo_unitario=costo, costo_promedio=producto.costo, usuario=usuario,
+                motivo=f"Anulación {comprobante.serie}-{comprobante.numero}",
+            ))
+
+        deudas = {}
+        for c in comprobantes:
+            if c.metodo_pago == 'CREDITO' and c.cliente_id:
+                deudas[c.cliente_id] = deudas.get(c.cliente_id, CERO) + c.total_final - c.monto_abonado
+        clientes = Cliente.objects.select_for_update().in_bulk(list(deudas)) if deudas else {}
+        for cliente_id, pendiente in deudas.items():
+            clientes[cliente_id].saldo_deudora -= pendiente
+
+        Comprobante.objects.filter(id__in=por_id).update(estado='ANULADO')
+        Producto.objects.bulk_update(productos.values(), ['stock', 'costo'])
+        MovimientoStock.objects.bulk_create(movimientos)
+        Cliente.objects.bulk_update(clientes.values(), ['saldo_deudora'])
+        MovimientoCaja.objects.bulk_create([
+            MovimientoCaja(caja=caja, tipo='EGRESO', monto=monto, usuario=usuario,
+                           concepto=f"Devolución por anulación {c.serie}-{c.numero}")
+            for c, monto in devoluciones if monto > 0
+        ])
+        # bulk_update no dispara señales: los POS se enteran del stock devuelto por aquí
+        publicar_filas(tienda.id, [fila_producto(p) for p in productos.values()])
+    return len(comprobantes)
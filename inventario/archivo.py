@@ -0,0 +1,351 @@
+# inventario/archivo.py
+"""
+Archivo de periodos cerrados: las tablas calientes solo guardan lo reciente.
+
+`archivar_mes` saca de la BD los comprobantes (con sus detalles), el Kardex y
+los movimientos de caja de un mes de una tienda y los guarda en un archivo
+NumPy comprimido por columnas (ARCHIVE_DIR/tienda_<id>/<AAAA-MM>.npz):
+cada campo es un arreglo (decimales como enteros escalados, fechas en
+microsegundos UTC), así que sumar una columna no obliga a reconstruir filas.
+PeriodoArchivado registra el mes, las filas y los totales de venta.
+
+Los reportes solo miran el archivo si el rango pedido lo necesita:
+- Meses completos dentro del rango: los totales de PeriodoArchivado (sin abrir archivos).
+- Meses a medias: se lee la columna del archivo y se filtra por fecha.
+- Stock a una fecha (fotos_stock.stock_al): antes de archivar se toma la foto
+  de fin de mes, así que el archivo solo se lee para momentos dentro de un
+  mes archivado.
+
+Se quedan en la BD: los créditos (sus abonos los referencian), el último
+comprobante de cada serie (de él sale el correlativo) y los movimientos de
+cajas que sigan abiertas. `restaurar_mes` devuelve un mes a la BD.
+"""
+import calendar
+import os
+from datetime import date, datetime, timedelta, timezone as tz
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, Q, Sum
+from django.utils import timezone
+
+from .fotos_stock import fin_del_dia, tomar_fotos
+from .integridad import verificar_kardex
+from .models import (
+    Comprobante, DetalleComprobante, MovimientoCaja, MovimientoStock, PeriodoArchivado,
+)
+
+# Orden de las tablas dentro del archivo (y de restauración: padres primero)
+TABLAS = (
+    ('comprobante', Comprobante),
+    ('detalle', DetalleComprobante),
+    ('kardex', MovimientoStock),
+    ('caja', MovimientoCaja),
+)
+EPOCA = datetime(1970, 1, 1, tzinfo=tz.utc)
+CERO = Decimal('0')
+
+
+def directorio_archivo():
+    return getattr(settings, 'ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archivo'))
+
+
+def ruta_archivo(tienda_id, mes):
+    return os.path.join(directorio_archivo(), f'tienda_{tienda_id}', f'{mes:%Y-%m}.npz')
+
+
+def ultimo_dia(mes):
+    return mes.replace(day=calendar.monthrange(mes.year, mes.month)[1])
+
+
+def limites_mes(mes):
+    """(inicio, fin) del mes como momentos: [00:00 del día 1, 00:00 del mes siguiente)."""
+    return fin_del_dia(mes - timedelta(days=1)), fin_del_dia(ultimo_dia(mes))
+
+
+def _decimal(suma, modelo, campo):
+    """Suma de una columna decimal del archivo (enteros escalados) como Decimal."""
+    return Decimal(int(suma)).scaleb(-modelo._meta.get_field(campo).decimal_places)
+
+
+# ==============================================================================
+# CODIFICACIÓN POR COLUMNAS
+# ==============================================================================
+
+def _codificar(campo, valores):
+    tipo = campo.get_internal_type()
+    if tipo == 'DecimalField':
+        escala = 10 ** campo.decimal_places
+        return np.array([int(v * escala) for v in valores], dtype=np.int64)
+    if tipo == 'DateTimeField':
+        return np.array([(v - EPOCA) // timedelta(microseconds=1) for v in valores], dtype=np.int64)
+    if tipo == 'DateField':
+        return np.array([v.toordinal() for v in valores], dtype=np.int64)
+    if tipo == 'BooleanField':
+        return np.array(valores, dtype=bool)
+    if tipo == 'FloatField':
+        return np.array(valores, dtype=np.float64)
+    if tipo.endswith(('IntegerField', 'AutoField')) or campo.is_relation:
+        return np.array(valores, dtype=np.int64)
+    return np.array(valores, dtype=str)
+
+
+def _vacio(campo):
+    tipo = campo.get_internal_type()
+    if tipo == 'DecimalField':
+        return CERO
+    if tipo == 'DateTimeField':
+        return EPOCA
+    if tipo == 'DateField':
+        return date(1970, 1, 1)
+    if tipo in ('BooleanField', 'FloatField') or tipo.endswith(('IntegerField', 'AutoField')) or campo.is_relation:
+        return 0
+    return ''
+
+
+def _decodificar(campo, columna):
+    tipo = campo.get_internal_type()
+    if tipo == 'DecimalField':
+        return [Decimal(int(v)).scaleb(-campo.decimal_places) for v in columna]
+    if tipo == 'DateTimeField':
+        return [EPOCA + timedelta(microseconds=int(v)) for v in columna]
+    if tipo == 'DateField':
+        return [date.fromordinal(int(v)) for v in columna]
+    if tipo == 'BooleanField':
+        return [bool(v) for v in columna]
+    if tipo == 'FloatField':
+        return [float(v) for v in columna]
+    if tipo.endswith(('IntegerField', 'AutoField')) or campo.is_relation:
+        return [int(v) for v in columna]
+    return [str(v) for v in columna]
+
+
+def columnas(prefijo, modelo, queryset):
+    """{'<prefijo>__<campo>': arreglo} con todas las filas de `queryset`; los NULL van en '<...>__nulo'."""
+    campos = modelo._meta.concrete_fields
+    filas = list(queryset.values_list(*[c.attname for c in campos]))
+    arreglos = {}
+    for i, campo in enumerate(campos):
+        valores = [f[i] for f in filas]
+        nulos = [v is None for v in valores]
+        if any(nulos):
+            arreglos[f'{prefijo}__{campo.attname}__nulo'] = np.array(nulos, dtype=bool)
+            valores = [_vacio(campo) if v is None else v for v in valores]
+        arreglos[f'{prefijo}__{campo.attname}'] = _codificar(campo, valores)
+    return arreglos, len(filas)
+
+
+def instancias(prefijo, modelo, datos):
+    """Reconstruye las filas de un modelo desde el archivo abierto (para restaurar)."""
+    campos = modelo._meta.concrete_fields
+    valores = {}
+    for campo in campos:
+        columna = _decodificar(campo, datos[f'{prefijo}__{campo.attname}'])
+        nulos = datos.get(f'{prefijo}__{campo.attname}__nulo')
+        if nulos is not None:
+            columna = [None if n else v for v, n in zip(columna, nulos)]
+        valores[campo.attname] = columna
+    total = len(valores[modelo._meta.pk.attname])
+    return [modelo(**{nombre: columna[i] for nombre, columna in valores.items()}) for i in range(total)]
+
+
+def _abrir(periodo):
+    with np.load(periodo.archivo) as datos:
+        return {nombre: datos[nombre] for nombre in datos.files}
+
+
+# ==============================================================================
+# ARCHIVAR Y RESTAURAR
+# ==============================================================================
+
+def _consultas_del_mes(tienda, mes):
+    inicio, fin = limites_mes(mes)
+    # El último de cada serie se queda: Comprobante.save() numera a partir de él
+    ultimos = Comprobante.objects.filter(tienda=tienda).values('tipo_comprobante', 'serie').annotate(ultimo=Max('numero'))
+    conservar = Q(pk__in=[])
+    for u in ultimos:
+        conservar |= Q(tipo_comprobante=u['tipo_comprobante'], serie=u['serie'], numero=u['ultimo'])
+    comprobantes = Comprobante.objects.filter(
+        tienda=tienda, fecha_emision__gte=inicio, fecha_emision__lt=fin,
+    ).exclude(metodo_pago='CREDITO').exclude(conservar).order_by('id')
+    return {
+        'comprobante': comprobantes,
+        'detalle': DetalleComprobante.objects.filter(comprobante__in=comprobantes.values('id')).order_by('id'),
+        'kardex': MovimientoStock.objects.filter(producto__tienda=tienda, fecha__gte=inicio, fecha__lt=fin).order_by('id'),
+        'caja': MovimientoCaja.objects.filter(caja__tienda=tienda, caja__estado='CERRADA',
+                                              fecha__gte=inicio, fecha__lt=fin).order_by('id'),
+    }
+
+
+def archivar_mes(tienda, mes, lote=1000):
+    """
+    Mueve un mes cerrado de `tienda` al archivo. Antes toma la foto de stock de
+    fin de mes y consolida los puntos de control del Kardex, para que el stock a
+    cualquier fecha y la verificación del Kardex sigan cuadrando sin esas filas.
+    Devuelve el PeriodoArchivado (o None si no había nada que archivar).
+    """
+    mes = mes.replace(day=1)
+    tomar_fotos(tienda, [ultimo_dia(mes)])
+    verificar_kardex(tienda)
+
+    consultas = _consultas_del_mes(tienda, mes)
+    arreglos, filas = {}, {}
+    for prefijo, modelo in TABLAS:
+        datos, filas[prefijo] = columnas(prefijo, modelo, consultas[prefijo])
+        arreglos.update(datos)
+    if not any(filas.values()):
+        return None
+
+    emitidos = consultas['comprobante'].filter(estado='EMITIDO')
+    ventas = emitidos.aggregate(t=Sum('total_final'))['t'] or CERO
+    netos = DetalleComprobante.objects.filter(comprobante__in=emitidos.values('id')).aggregate(
+        venta_neta=Sum('subtotal', default=CERO),
+        costo_ventas=Sum(ExpressionWrapper(F('cantidad') * F('costo_unitario'),
+                                           output_field=DecimalField(max_digits=16, decimal_places=4)), default=CERO),
+    )
+
+    ruta = ruta_archivo(tienda.id, mes)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = ruta + '.tmp.npz'
+    np.savez_compressed(temporal, **arreglos)
+    os.replace(temporal, ruta)
+
+    with transaction.atomic():
+        periodo, _ = PeriodoArchivado.objects.update_or_create(tienda=tienda, mes=mes, defaults=dict(
+            archivo=ruta, comprobantes=filas['comprobante'], detalles=filas['detalle'],
+            movimientos_stock=filas['kardex'], movimientos_caja=filas['caja'],
+            ventas=ventas, venta_neta=netos['venta_neta'], costo_ventas=netos['costo_ventas'],
+            comprobantes_emitidos=emitidos.count(),
+        ))
+        # Hijos primero y de a `lote` ids: DELETEs cortos
+        for prefijo in ('detalle', 'kardex', 'caja', 'comprobante'):
+            modelo = dict(TABLAS)[prefijo]
+            ids = arreglos[f'{prefijo}__id']
+            for i in range(0, len(ids), lote):
+                modelo.objects.filter(id__in=ids[i:i + lote].tolist()).delete()
+    return periodo
+
+
+def restaurar_mes(periodo, lote=1000):
+    """Devuelve a la BD las filas de un mes archivado (con sus ids originales) y borra el archivo."""
+    datos = _abrir(periodo)
+    with transaction.atomic():
+        for prefijo, modelo in TABLAS:
+            if f'{prefijo}__id' not in datos:
+                continue
+            filas = instancias(prefijo, modelo, datos)
+            # bulk_create pisa los auto_now_add con la hora actual: se reponen después
+            fechas = [c.attname for c in modelo._meta.concrete_fields if getattr(c, 'auto_now_add', False)]
+            originales = [[getattr(f, c) for c in fechas] for f in filas]
+            modelo.objects.bulk_create(filas, batch_size=lote)
+            if fechas:
+                for fila, valores in zip(filas, originales):
+                    for campo, valor in zip(fechas, valores):
+                        setattr(fila, campo, valor)
+                modelo.objects.bulk_update(filas, fechas, batch_size=lote)
+        periodo.delete()
+    os.remove(periodo.archivo)
+
+
+def meses_a_archivar(tienda, horizonte_meses=None, hoy=None):
+    """Meses con datos en la BD anteriores al horizonte (los últimos N meses no se tocan)."""
+    horizonte_meses = getattr(settings, 'ARCHIVE_HORIZON_MONTHS', 12) if horizonte_meses is None else horizonte_meses
+    hoy = hoy or timezone.localdate()
+    indice = hoy.year * 12 + hoy.month - 1 - horizonte_meses
+    limite = date(indice // 12, indice % 12 + 1, 1)
+    primero = Comprobante.objects.filter(tienda=tienda).order_by('fecha_emision').values_list('fecha_emision', flat=True).first()
+    primer_mov = MovimientoStock.objects.filter(producto__tienda=tienda).order_by('fecha').values_list('fecha', flat=True).first()
+    inicios = [d for d in (primero, primer_mov) if d is not None]
+    if not inicios:
+        return []
+    mes = timezone.localdate(min(inicios)).replace(day=1)
+    meses = []
+    while mes < limite:
+        meses.append(mes)
+        mes = (mes + timedelta(days=32)).replace(day=1)
+    return meses
+
+
+# ==============================================================================
+# LECTURA DESDE LOS REPORTES
+# ==============================================================================
+
+def periodos_en_rango(desde, hasta, tiendas=None):
+    """PeriodoArchivado cuyos meses se cruzan con [desde, hasta) (momentos)."""
+    periodos = PeriodoArchivado.objects.filter(mes__lte=hasta.date(), mes__gt=(desde - timedelta(days=32)).date())
+    if tiendas is not None:
+        periodos = periodos.filter(tienda__in=tiendas)
+    return [p for p in periodos if limites_mes(p.mes)[1] > desde and limites_mes(p.mes)[0] < hasta]
+
+
+def _microsegundos(momento):
+    return (momento - EPOCA) // timedelta(microseconds=1)
+
+
+def ventas_archivadas(desde, hasta, tiendas=None):
+    """
+    {tienda_id: {ventas, comprobantes, venta_neta, costo_ventas}} de los
+    comprobantes EMITIDOS archivados con fecha en [desde, hasta). Los meses
+    completos salen de los totales guardados; solo los parciales abren su archivo.
+    """
+    resultado = {}
+    for periodo in periodos_en_rango(desde, hasta, tiendas):
+        fila = resultado.setdefault(periodo.tienda_id, {
+            'ventas': CERO, 'comprobantes': 0, 'venta_neta': CERO, 'costo_ventas': CERO,
+        })
+        inicio, fin = limites_mes(periodo.mes)
+        if desde <= inicio and fin <= hasta:
+            fila['ventas'] += periodo.ventas
+            fila['comprobantes'] += periodo.comprobantes_emitidos
+            fila['venta_neta'] += periodo.venta_neta
+            fila['costo_ventas'] += periodo.costo_ventas
+            continue
+        datos = _abrir(periodo)
+        if 'comprobante__id' not in datos:
+            continue
+        fechas = datos['comprobante__fecha_emision']
+        elegidos = (fechas >= _microsegundos(desde)) & (fechas < _microsegundos(hasta)) & \
+                   (datos['comprobante__estado'] == 'EMITIDO')
+        fila['ventas'] += _decimal(datos['comprobante__total_final'][elegidos].sum(), Comprobante, 'total_final')
+        fila['comprobantes'] += int(elegidos.sum())
+        if 'detalle__id' in datos:
+            de_elegidos = np.isin(datos['detalle__comprobante_id'], datos['comprobante__id'][elegidos])
+            fila['venta_neta'] += _decimal(datos['detalle__subtotal'][de_elegidos].sum(), DetalleComprobante, 'subtotal')
+            costo = datos['detalle__cantidad'][de_elegidos] * datos['detalle__costo_unitario'][de_elegidos]
+            fila['costo_ventas'] += _decimal(costo.sum(), DetalleComprobante, 'cantidad').scaleb(
+                -DetalleComprobante._meta.get_field('costo_unitario').decimal_places)
+    return resultado
+
+
+def movimientos_archivados(tienda, desde, hasta, productos=None):
+    """
+    {producto_id: (delta de stock, último costo_promedio, fecha de ese costo)}
+    del Kardex archivado en [desde, hasta). Costo y fecha son None si ningún
+    movimiento archivado lo fijó.
+    """
+    resultado = {}
+    for periodo in periodos_en_rango(desde or EPOCA, hasta, [tienda]):
+        datos = _abrir(periodo)
+        if 'kardex__id' not in datos:
+            continue
+        fechas = datos['kardex__fecha']
+        elegidos = (fechas >= _microsegundos(desde or EPOCA)) & (fechas < _microsegundos(hasta))
+        if productos is not None:
+            elegidos &= np.isin(datos['kardex__producto_id'], list(productos))
+        orden = np.lexsort((datos['kardex__id'][elegidos], fechas[elegidos]))
+        pids = datos['kardex__producto_id'][elegidos][orden]
+        signo = np.where(datos['kardex__tipo'][elegidos][orden] == 'ENTRADA', 1, -1)
+        cantidades = datos['kardex__cantidad'][elegidos][orden] * signo
+        costos = datos['kardex__costo_promedio'][elegidos][orden]
+        sin_costo = datos.get('kardex__costo_promedio__nulo')
+        sin_costo = sin_costo[elegidos][orden] if sin_costo is not None else np.zeros(len(pids), dtype=bool)
+        filas = zip(pids.tolist(), cantidades.tolist(), costos.tolist(), sin_costo.tolist(), fechas[elegidos][orden].tolist())
+        for pid, cantidad, costo, nulo, fecha in filas:
+            delta, ultimo, fecha_ultimo = resultado.get(pid, (CERO, None, None))
+            if not nulo:
+                ultimo = _decimal(costo, MovimientoStock, 'costo_promedio')
+                fecha_ultimo = EPOCA + timedelta(microseconds=fecha)
+            resultado[pid] = (delta + _decimal(cantidad, MovimientoStock, 'cantidad'), ultimo, fecha_ultimo)
+    return resultado
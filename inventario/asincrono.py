@@ -0,0 +1,47 @@
+# inventario/asincrono.py
+"""
+Utilidades para las vistas async del POS (servidas por mi_erp/asgi.py).
+
+- `login_requerido_async`: equivalente a @login_required para vistas async
+  (Django 5.0 todavía no lo soporta; llega en 5.1).
+- `en_hilo`: corre trabajo bloqueante que NO toca la BD (xhtml2pdf, openpyxl)
+  en un pool de hilos propio, para no frenar el event loop ni acaparar el
+  hilo de la petición. El tamaño del pool (BLOCKING_POOL_WORKERS) limita
+  cuántos PDFs/Excel se generan a la vez.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+
+_pool = None
+_lock = threading.Lock()
+
+
+def login_requerido_async(vista):
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await vista(request, *args, **kwargs)
+    return envoltura
+
+
+def _obtener_pool():
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BLOCKING_POOL_WORKERS', 4),
+                    thread_name_prefix='bloqueante',
+                )
+    return _pool
+
+
+async def en_hilo(funcion, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(_obtener_pool(), partial(funcion, *args, **kwargs))
@@ -0,0 +1,187 @@
+# inventario/bitacoras.py
+"""
+Tablas de bitácora (solo se insertan, nunca se editan) en su propia base.
+
+Con DATABASE_LOGS_URL definida, settings.py agrega el alias 'logs' y
+`RouterBitacoras` manda ahí lecturas, escrituras y migraciones de los modelos
+de LOG_DATABASE_MODELS, para que su crecimiento no pese en el vacuum ni en los
+backups de las ventas. Sin la variable todo queda en 'default'.
+
+Escritura: `registrar` no inserta en la petición; junta las filas en memoria y
+un hilo las inserta en lote (bulk_create) cada LOG_FLUSH_SECONDS o al juntar
+LOG_BATCH_SIZE. Solo con la base aparte: sobre 'default' cada fila se inserta
+al momento, como antes. Si el lote falla vuelve al frente de la cola para el
+siguiente intento, hasta LOG_MAX_PENDING filas (luego se pierden las más viejas).
+
+Poda: `podar` borra lo anterior a LOG_RETENTION_DAYS en lotes chicos, cada uno
+en su propia transacción, así nunca retiene bloqueos largos.
+
+El Kardex (MovimientoStock) no se mueve: se escribe en la misma transacción
+que el stock y los reportes lo cruzan con Producto; su crecimiento lo maneja
+el archivo de periodos cerrados.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+ALIAS = 'logs'
+
+logger = logging.getLogger(__name__)
+
+_pendientes = []
+_lock = threading.Lock()
+_hay_lote = threading.Event()
+_hilo = None
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def modelos_bitacora():
+    return {etiqueta.lower() for etiqueta in _config('LOG_DATABASE_MODELS', ['inventario.LoginLog'])}
+
+
+def alias_bitacoras():
+    return ALIAS if ALIAS in settings.DATABASES else DEFAULT_DB_ALIAS
+
+
+# ==============================================================================
+# ROUTER
+# ==============================================================================
+
+class RouterBitacoras:
+    """DATABASE_ROUTERS (antes que el de réplicas): bitácoras a 'logs', el resto ni se toca."""
+
+    def _es_bitacora(self, model):
+        return model._meta.label_lower in modelos_bitacora()
+
+    def db_for_read(self, model, **hints):
+        return ALIAS if ALIAS in settings.DATABASES and self._es_bitacora(model) else None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Ej. LoginLog.user: la FK no tiene constraint y se resuelve con una consulta a cada base
+        if ALIAS in settings.DATABASES and (self._es_bitacora(type(obj1)) or self._es_bitacora(type(obj2))):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if ALIAS not in settings.DATABASES:
+            return None
+        if model_name is None:
+            return False if db == ALIAS else None
+        es_bitacora = f'{app_label}.{model_name}'.lower() in modelos_bitacora()
+        if db == ALIAS:
+            return es_bitacora
+        return False if es_bitacora else None
+
+
+# ==============================================================================
+# ESCRITURA EN LOTES
+# ==============================================================================
+
+def registrar(instancia):
+    """Inserta una fila de bitácora: en lote y en segundo plano si hay base aparte."""
+    if alias_bitacoras() == DEFAULT_DB_ALIAS:
+        instancia.save()
+        return
+    with _lock:
+        _pendientes.append(instancia)
+        lleno = len(_pendientes) >= _config('LOG_BATCH_SIZE', 50)
+    _asegurar_hilo()
+    if lleno:
+        _hay_lote.set()
+
+
+def volcar():
+    """
+    Inserta lo pendiente (un bulk_create por modelo). Devuelve las filas insertadas.
+    Si un modelo falla, sus filas y las de los modelos que faltaban vuelven a la cola.
+    """
+    global _pendientes
+    with _lock:
+        lote, _pendientes = _pendientes, []
+    por_modelo = {}
+    for instancia in lote:
+        por_modelo.setdefault(type(instancia), []).append(instancia)
+    hechos = set()
+    for modelo, filas in por_modelo.items():
+        try:
+            modelo.objects.bulk_create(filas, batch_size=500)
+        except Exception:
+            _devolver([i for i in lote if type(i) not in hechos])
+            raise
+        hechos.add(modelo)
+    return len(lote)
+
+
+def _devolver(filas):
+    """Pone `filas` al frente de la cola, respetando el tope LOG_MAX_PENDING."""
+    with _lock:
+        _pendientes[:0] = filas
+        sobran = len(_pendientes) - _config('LOG_MAX_PENDING', 10000)
+        if sobran > 0:
+            del _pendientes[:sobran]
+    if sobran > 0:
+        logger.warning("Cola de bitácoras llena: se descartan las %d filas más viejas.", sobran)
+
+
+def _bucle():
+    while True:
+        _hay_lote.wait(_config('LOG_FLUSH_SECONDS', 5))
+        _hay_lote.clear()
+        try:
+            volcar()
+        except Exception:
+            # La bitácora nunca tumba la aplicación; el lote queda en la cola para el próximo intento
+            logger.exception("No se pudieron volcar las bitácoras; se reintenta en el próximo ciclo.")
+        finally:
+            connections.close_all()
+
+
+def _asegurar_hilo():
+    global _hilo
+    if _hilo is None:
+        with _lock:
+            if _hilo is None:
+                _hilo = threading.Thread(target=_bucle, name='bitacoras', daemon=True)
+                _hilo.start()
+                atexit.register(volcar)
+
+
+# ==============================================================================
+# PODA POR ANTIGÜEDAD
+# ==============================================================================
+
+def podar(dias=None, lote=5000, pausa=0.0, modelos=None):
+    """
+    Borra las filas más viejas que `dias` (LOG_RETENTION_DAYS) de cada modelo de
+    bitácora con campo de fecha, de a `lote` ids por DELETE. Devuelve {modelo: borradas}.
+    """
+    dias = _config('LOG_RETENTION_DAYS', 180) if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    borradas = {}
+    for etiqueta in modelos or sorted(modelos_bitacora()):
+        modelo = apps.get_model(etiqueta)
+        campo = next(f.name for f in modelo._meta.concrete_fields if f.get_internal_type() == 'DateTimeField')
+        viejas = modelo.objects.filter(**{f'{campo}__lt': limite}).order_by('pk')
+        total = 0
+        while True:
+            # Autocommit: cada DELETE es su propia transacción corta
+            ids = list(viejas.values_list('pk', flat=True)[:lote])
+            if not ids:
+                break
+            total += modelo.objects.filter(pk__in=ids).delete()[0]
+            if pausa:
+                time.sleep(pausa)
+        borradas[modelo._meta.label] = total
+    return borradas
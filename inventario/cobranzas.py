@@ -0,0 +1,132 @@
+# inventario/cobranzas.py
+"""
+Cuentas por cobrar: asignación FIFO de abonos y antigüedad de la deuda.
+
+Cada abono (PagoCredito) se reparte entre los comprobantes al crédito con
+saldo del cliente, del más antiguo al más nuevo. Cada comprobante lleva lo
+pagado en `monto_abonado` y pasa a `estado_pago=True` cuando se cubre. El
+detalle queda en AplicacionAbono. `Cliente.saldo_deudora` se mantiene como
+total rápido. Un sobrante (deuda sin comprobante, de antes de este módulo)
+solo descuenta el saldo.
+
+La antigüedad por cliente (0-30 / 31-60 / 61-90 / 90+ días desde la emisión)
+sale de UNA consulta agrupada sobre los comprobantes con saldo.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Min, Q, Sum
+from django.utils import timezone
+
+from .models import AplicacionAbono, Cliente, Comprobante, MovimientoCaja, PagoCredito
+
+TRAMOS = (('d0_30', 0, 30), ('d31_60', 31, 60), ('d61_90', 61, 90), ('d90_mas', 91, None))
+
+
+def repartir_fifo(comprobantes, monto):
+    """
+    Aplica `monto` a `comprobantes` (ya ordenados del más antiguo) en memoria.
+    Devuelve [(comprobante, monto aplicado)] y el sobrante.
+    """
+    aplicaciones = []
+    for comprobante in comprobantes:
+        if monto <= 0:
+            break
+        pendiente = comprobante.total_final - comprobante.monto_abonado
+        if pendiente <= 0:
+            continue
+        aplicado = min(pendiente, monto)
+        comprobante.monto_abonado += aplicado
+        comprobante.estado_pago = comprobante.monto_abonado >= comprobante.total_final
+        monto -= aplicado
+        aplicaciones.append((comprobante, aplicado))
+    return aplicaciones, monto
+
+
+def _creditos_abiertos():
+    return Comprobante.objects.filter(metodo_pago='CREDITO', estado_pago=False).exclude(estado='ANULADO')
+
+
+def registrar_abono(cliente, monto, usuario, caja, metodo='EFECTIVO'):
+    """Registra el abono, lo asigna FIFO y lo ingresa a la caja, todo en una transacción."""
+    with transaction.atomic():
+        cliente = Cliente.objects.select_for_update().get(id=cliente.id)
+        abiertos = list(_creditos_abiertos().select_for_update().filter(cliente=cliente).order_by('fecha_emision', 'id'))
+        aplicaciones, _ = repartir_fifo(abiertos, monto)
+
+        pago = PagoCredito.objects.create(cliente=cliente, monto=monto, metodo=metodo, usuario=usuario)
+        Comprobante.objects.bulk_update([c for c, _ in aplicaciones], ['monto_abonado', 'estado_pago'])
+        AplicacionAbono.objects.bulk_create(
+            [AplicacionAbono(pago=pago, comprobante=c, monto=aplicado) for c, aplicado in aplicaciones]
+        )
+        cliente.saldo_deudora -= monto
+        cliente.save(update_fields=['saldo_deudora'])
+        # El dinero entra a caja automáticamente
+        MovimientoCaja.objects.create(
+            caja=caja, tipo='INGRESO', monto=monto, concepto=f"Abono de deuda: {cliente}", usuario=usuario
+        )
+    return pago
+
+
+def reconstruir_asignaciones(tienda_id=None, apps=None):
+    """
+    Rehace desde cero la asignación FIFO de todos los abonos, en orden de
+    fecha. La usan la migración 0007 (con `apps`) y el sembrador de datos.
+    """
+    if apps is not None:
+        ComprobanteM, PagoM, AplicacionM = (apps.get_model('inventario', n)
+                                            for n in ('Comprobante', 'PagoCredito', 'AplicacionAbono'))
+    else:
+        ComprobanteM, PagoM, AplicacionM = Comprobante, PagoCredito, AplicacionAbono
+
+    # Los mismos créditos que _creditos_abiertos: un anulado no recibe abonos
+    creditos = ComprobanteM.objects.filter(metodo_pago='CREDITO', cliente__isnull=False).exclude(estado='ANULADO')
+    pagos = PagoM.objects.all()
+    if tienda_id is not None:
+        creditos = creditos.filter(tienda_id=tienda_id)
+        pagos = pagos.filter(cliente__tienda_id=tienda_id)
+
+    por_cliente = {}
+    for comprobante in creditos.order_by('fecha_emision', 'id').only('id', 'cliente_id', 'total_final'):
+        comprobante.monto_abonado = Decimal('0')
+        comprobante.estado_pago = False
+        por_cliente.setdefault(comprobante.cliente_id, []).append(comprobante)
+
+    nuevas = []
+    for pago in pagos.order_by('fecha', 'id').only('id', 'cliente_id', 'monto'):
+        aplicaciones, _ = repartir_fifo(por_cliente.get(pago.cliente_id, []), pago.monto)
+        nuevas.extend(AplicacionM(pago_id=pago.id, comprobante_id=c.id, monto=aplicado) for c, aplicado in aplicaciones)
+
+    with transaction.atomic():
+        AplicacionM.objects.filter(pago__in=pagos).delete()
+        ComprobanteM.objects.bulk_update(
+            [c for lista in por_cliente.values() for c in lista], ['monto_abonado', 'estado_pago'], batch_size=1000
+        )
+        AplicacionM.objects.bulk_create(nuevas, batch_size=1000)
+
+
+def antiguedad_por_cliente(tienda, ahora=None):
+    """
+    Una fila por cliente con deuda: tramos d0_30, d31_60, d61_90 y d90_mas,
+    `total` y la emisión más antigua. Ordenada de mayor a menor deuda;
+    es un queryset, así que se puede paginar sin traer todo.
+    """
+    ahora = ahora or timezone.now()
+    pendiente = ExpressionWrapper(F('total_final') - F('monto_abonado'),
+                                  output_field=DecimalField(max_digits=12, decimal_places=2))
+    tramos = {}
+    for nombre, desde, hasta in TRAMOS:
+        condicion = Q(fecha_emision__lte=ahora - timedelta(days=desde))
+        if hasta is not None:
+            condicion &= Q(fecha_emision__gt=ahora - timedelta(days=hasta + 1))
+        tramos[nombre] = Sum(pendiente, filter=condicion, default=Decimal('0'))
+
+    abiertos = _creditos_abiertos().filter(tienda=tienda, cliente__isnull=False)
+    filas = abiertos.values(
+        'cliente_id', 'cliente__nombre_completo', 'cliente__razon_social', 'cliente__dni_ruc', 'cliente__telefono',
+    ).annotate(
+        **tramos, total=Sum(pendiente), mas_antiguo=Min('fecha_emision'),
+    ).order_by('-total', 'cliente_id')
+    totales = abiertos.aggregate(**tramos, total=Sum(pendiente, default=Decimal('0')))
+    return filas, totales
@@ -0,0 +1,146 @@
+# inventario/consolidado.py
+"""
+Reporte consolidado de la cadena: todas las tiendas en una sola tabla.
+
+Cada métrica es UNA consulta agrupada por tienda (no un bucle por tienda),
+así que el costo depende de cuántas métricas hay, no de cuántas tiendas:
+
+- ventas:   comprobantes EMITIDOS del periodo (monto y cantidad)
+- margen:   venta sin IGV menos el costo con que salió la mercadería
+- stock:    inventario valorizado al costo promedio actual
+- cobranza: saldo pendiente de los créditos abiertos
+- caja:     suma de las diferencias de las cajas cerradas en el periodo
+- archivo:  ventas y margen de los meses ya archivados (archivo.py); una
+            consulta a PeriodoArchivado, sin abrir archivos si el mes es completo
+
+Las secciones pesadas (margen y stock recorren detalles y productos) pueden
+correr en paralelo, cada una con su conexión, con CONSOLIDATED_REPORT_WORKERS > 0.
+El resultado se guarda en la caché CONSOLIDATED_REPORT_CACHE_SECONDS segundos.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+from . import metricas
+from .archivo import ventas_archivadas
+from .cobranzas import _creditos_abiertos
+from .fotos_stock import fin_del_dia
+from .models import CajaDiaria, Comprobante, DetalleComprobante, Producto, Tienda
+
+
+def _dinero(expresion):
+    return ExpressionWrapper(expresion, output_field=DecimalField(max_digits=16, decimal_places=4))
+
+
+def _ventas(desde, hasta):
+    return Comprobante.objects.filter(
+        estado='EMITIDO', fecha_emision__gte=desde, fecha_emision__lt=hasta,
+    ).values('tienda_id').annotate(ventas=Sum('total_final'), comprobantes=Count('id'))
+
+
+def _margen(desde, hasta):
+    return DetalleComprobante.objects.filter(
+        comprobante__estado='EMITIDO', comprobante__fecha_emision__gte=desde, comprobante__fecha_emision__lt=hasta,
+    ).values(tienda_id=F('comprobante__tienda_id')).annotate(
+        venta_neta=Sum('subtotal'), costo_ventas=Sum(_dinero(F('cantidad') * F('costo_unitario'))),
+    )
+
+
+def _stock(desde, hasta):
+    return Producto.objects.values('tienda_id').annotate(
+        valor_stock=Sum(_dinero(F('stock') * F('costo'))), productos=Count('id'),
+    )
+
+
+def _cobranza(desde, hasta):
+    return _creditos_abiertos().values('tienda_id').annotate(
+        por_cobrar=Sum(_dinero(F('total_final') - F('monto_abonado'))), creditos=Count('id'),
+    )
+
+
+def _caja(desde, hasta):
+    return CajaDiaria.objects.filter(
+        estado='CERRADA', fecha_cierre__gte=desde, fecha_cierre__lt=hasta,
+    ).values('tienda_id').annotate(diferencia_caja=Sum('diferencia'), cajas_cerradas=Count('id'))
+
+
+def _archivo(desde, hasta):
+    return [dict(valores, tienda_id=tienda_id) for tienda_id, valores in ventas_archivadas(desde, hasta).items()]
+
+
+# (nombre, consulta, pesada)
+SECCIONES = (
+    ('ventas', _ventas, False),
+    ('margen', _margen, True),
+    ('stock', _stock, True),
+    ('cobranza', _cobranza, False),
+    ('caja', _caja, False),
+    ('archivo', _archivo, False),
+)
+CAMPOS = ('ventas', 'comprobantes', 'venta_neta', 'costo_ventas', 'valor_stock', 'productos',
+          'por_cobrar', 'creditos', 'diferencia_caja', 'cajas_cerradas')
+
+
+def _en_hilo(seccion, desde, hasta):
+    """Corre la consulta en un hilo del pool y cierra la conexión que abrió."""
+    try:
+        return list(seccion(desde, hasta))
+    finally:
+        connections.close_all()
+
+
+def _calcular(desde, hasta):
+    momento_desde, momento_hasta = fin_del_dia(desde - timedelta(days=1)), fin_del_dia(hasta)
+    hilos = getattr(settings, 'CONSOLIDATED_REPORT_WORKERS', 0)
+    resultados = {}
+    if hilos:
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='consolidado') as pool:
+            # copy_context: los hilos heredan la elección de réplica de la petición (replicas.py)
+            futuros = {nombre: pool.submit(contextvars.copy_context().run, _en_hilo, seccion, momento_desde, momento_hasta)
+                       for nombre, seccion, pesada in SECCIONES if pesada}
+            for nombre, seccion, pesada in SECCIONES:
+                if not pesada:
+                    resultados[nombre] = list(seccion(momento_desde, momento_hasta))
+            for nombre, futuro in futuros.items():
+                resultados[nombre] = futuro.result()
+    else:
+        for nombre, seccion, _ in SECCIONES:
+            resultados[nombre] = list(seccion(momento_desde, momento_hasta))
+
+    filas = {t['id']: dict(t, **{c: 0 for c in CAMPOS}) for t in Tienda.objects.values('id', 'nombre', 'ruc')}
+    for nombre, grupos in resultados.items():
+        for grupo in grupos:
+            fila = filas.get(grupo.pop('tienda_id'))
+            if fila is not None:
+                # Se suma: el archivo aporta a las mismas columnas que ventas y margen
+                fila.update({c: fila[c] + (v or 0) for c, v in grupo.items()})
+    for fila in filas.values():
+        fila['margen'] = fila['venta_neta'] - fila['costo_ventas']
+        fila['margen_pct'] = (fila['margen'] * 100 / fila['venta_neta']) if fila['venta_neta'] else None
+    filas = sorted(filas.values(), key=lambda f: (-f['ventas'], f['nombre']))
+
+    totales = {c: sum((f[c] for f in filas), 0) for c in CAMPOS + ('margen',)}
+    totales['margen_pct'] = (totales['margen'] * 100 / totales['venta_neta']) if totales['venta_neta'] else None
+    return filas, totales
+
+
+def reporte_consolidado(desde, hasta):
+    """
+    ([fila por tienda], totales) de `desde` a `hasta` (días, incluidos), de la
+    caché si se calculó hace menos de CONSOLIDATED_REPORT_CACHE_SECONDS.
+    """
+    segundos = getattr(settings, 'CONSOLIDATED_REPORT_CACHE_SECONDS', 120)
+    clave = f'consolidado:{desde.isoformat()}:{hasta.isoformat()}'
+    guardado = cache.get(clave) if segundos else None
+    metricas.registrar_cache('consolidado', guardado is not None)
+    if guardado is not None:
+        return guardado
+    resultado = _calcular(desde, hasta)
+    if segundos:
+        cache.set(clave, resultado, segundos)
+    return resultado
@@ -0,0 +1,249 @@
+# inventario/consultas_lentas.py
+"""
+Captura de consultas SQL lentas.
+
+Un "execute wrapper" de Django mide cada sentencia. Las que superan
+SLOW_QUERY_THRESHOLD_MS se guardan en un buffer circular en memoria (acotado,
+nunca crece sin límite) y un hilo en segundo plano las vuelca agrupadas cada
+SLOW_QUERY_FLUSH_SECONDS al modelo ConsultaLenta, que el admin ordena por tiempo
+total y ejecuciones. Ninguna petición espera ese volcado.
+"""
+import atexit
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+_buffer = deque(maxlen=_config('SLOW_QUERY_BUFFER_SIZE', 500))
+_lock_volcado = threading.Lock()
+_estado = threading.local()
+_ultimo_volcado = time.monotonic()
+_volcador_iniciado = False
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# NORMALIZACIÓN DE SQL
+# ==============================================================================
+
+_RE_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_sql(sql):
+    """Quita literales y colapsa listas IN (...) para agrupar consultas iguales."""
+    sql = _RE_CADENAS.sub('?', sql)
+    sql = _RE_NUMEROS.sub('?', sql)
+    sql = _RE_LISTAS.sub('(...)', sql)
+    return _RE_ESPACIOS.sub(' ', sql).strip()
+
+
+def forma_parametros(params, many=False):
+    """Describe los tipos de los parámetros sin guardar sus valores (ej. '(int, str)')."""
+    if params is None:
+        return ''
+    if many:
+        params = list(params)
+        return f"many x{len(params)}: {forma_parametros(params[0]) if params else '()'}"
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{k}: {type(v).__name__}' for k, v in params.items()) + '}'
+    return '(' + ', '.join(type(p).__name__ for p in params) + ')'
+
+
+def huella_sql(sql_normalizado):
+    return hashlib.sha1(sql_normalizado.encode('utf-8')).hexdigest()
+
+
+def nombre_vista(request):
+    """Nombre de la vista que atendió la petición (disponible una vez resuelta la URL)."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return ''
+    vista = getattr(match.func, 'view_class', match.func)
+    return getattr(vista, '__name__', '')[:150]
+
+
+# ==============================================================================
+# CAPTURA (EXECUTE WRAPPER)
+# ==============================================================================
+
+class CapturadorConsultas:
+    """
+    Execute wrapper que mide cada consulta de una petición. Las que superan el
+    umbral se juntan en `self.lentas` y pasan al buffer global al terminar la
+    petición (ver `entregar`); el resto no genera ningún costo extra.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.umbral_ms = _config('SLOW_QUERY_THRESHOLD_MS', 200)
+        self.lentas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            if duracion_ms >= self.umbral_ms and not getattr(_estado, 'volcando', False):
+                self.lentas.append({
+                    'sql': sql,
+                    'forma': forma_parametros(params, many),
+                    'ms': duracion_ms,
+                    'momento': timezone.now(),
+                })
+
+    def entregar(self):
+        """Pasa lo capturado al buffer global con la vista y el usuario de la petición."""
+        if not self.lentas:
+            return
+        # Fuera del wrapper ya podemos resolver request.user sin medirnos a nosotros mismos
+        user = getattr(self.request, 'user', None)
+        user_id = user.pk if user is not None and user.is_authenticated else None
+        vista = nombre_vista(self.request) or self.request.path[:150]
+        for consulta in self.lentas:
+            consulta.update(vista=vista, user_id=user_id)
+            _buffer.append(consulta)
+        self.lentas = []
+
+
+class capturar_consultas:
+    """Context manager que instala el capturador en todas las conexiones configuradas."""
+
+    def __init__(self, request):
+        self.capturador = CapturadorConsultas(request)
+        self.pila = ExitStack()
+
+    def __enter__(self):
+        for conexion in connections.all():
+            self.pila.enter_context(conexion.execute_wrapper(self.capturador))
+        return self.capturador
+
+    def __exit__(self, *exc):
+        self.pila.close()
+        self.capturador.entregar()
+        return False
+
+
+# ==============================================================================
+# VOLCADO PERIÓDICO AL MODELO
+# ==============================================================================
+
+def _tiendas_por_usuario(user_ids):
+    from .models import Tienda, Perfil
+
+    user_ids = {u for u in user_ids if u is not None}
+    if not user_ids:
+        return {}
+    tiendas = dict(Perfil.objects.filter(user_id__in=user_ids).values_list('user_id', 'tienda_id'))
+    tiendas.update(Tienda.objects.filter(propietario_id__in=user_ids).values_list('propietario_id', 'id'))
+    return tiendas
+
+
+def _acumular(huella, vista, tienda_id, g):
+    """Suma el grupo `g` a su fila de ConsultaLenta con un UPDATE. Devuelve si la fila existía."""
+    from .models import ConsultaLenta
+
+    return ConsultaLenta.objects.filter(huella=huella, vista=vista, tienda_id=tienda_id).update(
+        ejecuciones=F('ejecuciones') + g['n'],
+        tiempo_total_ms=F('tiempo_total_ms') + g['total'],
+        tiempo_max_ms=Greatest(F('tiempo_max_ms'), g['max']),
+        forma_parametros=g['forma'],
+        ultima_vez=g['momento'],
+    ) > 0
+
+
+def volcar_buffer(forzar=False):
+    """
+    Agrupa lo capturado por (consulta, vista, tienda) y lo acumula en ConsultaLenta.
+    Sin `forzar`, solo vuelca si ya pasó SLOW_QUERY_FLUSH_SECONDS desde el último volcado.
+    """
+    global _ultimo_volcado
+    from .models import ConsultaLenta
+
+    if not forzar and time.monotonic() - _ultimo_volcado < _config('SLOW_QUERY_FLUSH_SECONDS', 60):
+        return 0
+    if not _lock_volcado.acquire(blocking=False):
+        return 0
+
+    _estado.volcando = True
+    try:
+        _ultimo_volcado = time.monotonic()
+        pendientes = []
+        while _buffer:
+            pendientes.append(_buffer.popleft())
+        if not pendientes:
+            return 0
+
+        tiendas = _tiendas_por_usuario(p['user_id'] for p in pendientes)
+        grupos = {}
+        for p in pendientes:
+            sql_normalizado = normalizar_sql(p['sql'])
+            clave = (huella_sql(sql_normalizado), p['vista'], tiendas.get(p['user_id']))
+            g = grupos.setdefault(clave, {
+                'sql': sql_normalizado, 'forma': p['forma'],
+                'n': 0, 'total': 0.0, 'max': 0.0, 'momento': p['momento'],
+            })
+            g['n'] += 1
+            g['total'] += p['ms']
+            g['max'] = max(g['max'], p['ms'])
+            g['momento'] = max(g['momento'], p['momento'])
+
+        for (huella, vista, tienda_id), g in grupos.items():
+            if _acumular(huella, vista, tienda_id, g):
+                continue
+            try:
+                with transaction.atomic():
+                    ConsultaLenta.objects.create(
+                        huella=huella, vista=vista, tienda_id=tienda_id,
+                        sql_normalizado=g['sql'], forma_parametros=g['forma'],
+                        ejecuciones=g['n'], tiempo_total_ms=g['total'], tiempo_max_ms=g['max'],
+                        ultima_vez=g['momento'],
+                    )
+            except IntegrityError:
+                # Otro worker creó la fila entre nuestro UPDATE y este INSERT: sumamos sobre la suya
+                _acumular(huella, vista, tienda_id, g)
+        return len(pendientes)
+    finally:
+        _estado.volcando = False
+        _lock_volcado.release()
+
+
+def _bucle_volcado():
+    while True:
+        time.sleep(_config('SLOW_QUERY_FLUSH_SECONDS', 60))
+        try:
+            volcar_buffer()
+        except Exception:
+            # El monitoreo nunca tumba la aplicación; lo capturado en este ciclo se pierde
+            logger.exception("No se pudieron volcar las consultas lentas.")
+        finally:
+            connections.close_all()
+
+
+def iniciar_volcado():
+    """Arranca (una sola vez por proceso) el hilo que vuelca el buffer a ConsultaLenta."""
+    global _volcador_iniciado
+    with _lock_volcado:
+        if _volcador_iniciado:
+            return
+        _volcador_iniciado = True
+    threading.Thread(target=_bucle_volcado, name='consultas-lentas', daemon=True).start()
+    atexit.register(volcar_buffer, forzar=True)
@@ -0,0 +1,159 @@
+# inventario/costeo.py
+"""
+Costo promedio ponderado de cada producto.
+
+Cada compra actualiza `Producto.costo` en O(1), dentro de la misma
+transacción que suma el stock:
+
+    nuevo = (stock * promedio + cantidad * costo_unitario) / (stock + cantidad)
+
+Las ventas salen al promedio vigente (queda en DetalleComprobante.costo_unitario),
+así que no lo cambian. Eliminar una compra lo revierte con la fórmula inversa y
+anular una venta (anulaciones.py) devuelve la mercadería al costo con que salió.
+
+Cada movimiento del Kardex guarda el costo unitario de la entrada (si lo tiene)
+y el promedio resultante, con lo que `recalcular_costo_promedio` rehace toda la
+historia desde el Kardex en una sola pasada.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import Compra, MovimientoStock, Producto
+
+PRECISION = Decimal('0.0001')
+
+
+def promedio_con_entrada(stock, promedio, cantidad, costo_unitario):
+    """Promedio tras ingresar `cantidad` a `costo_unitario`. Sin stock previo manda el costo nuevo."""
+    if stock <= 0 or promedio is None:
+        return Decimal(costo_unitario).quantize(PRECISION)
+    return ((stock * promedio + cantidad * costo_unitario) / (stock + cantidad)).quantize(PRECISION)
+
+
+def promedio_sin_entrada(stock, promedio, cantidad, costo_unitario):
+    """Inversa de la anterior: quita `cantidad` valorizada a `costo_unitario`."""
+    restante = stock - cantidad
+    if restante <= 0:
+        return promedio  # No queda nada que valorizar: se conserva el último promedio
+    return max((stock * promedio - cantidad * costo_unitario) / restante, Decimal('0')).quantize(PRECISION)
+
+
+def costo_unitario_compra(compra):
+    return (compra.costo_total / compra.cantidad).quantize(PRECISION) if compra.cantidad else Decimal('0')
+
+
+def _bloquear(producto):
+    return Producto.objects.select_for_update().get(id=producto.id)
+
+
+def registrar_compra(compra):
+    """Guarda la compra nueva sumando stock y recalculando el promedio (el Kardex lo escribe signals.py)."""
+    with transaction.atomic():
+        producto = _bloquear(compra.producto)
+        producto.costo = promedio_con_entrada(producto.stock, producto.costo, compra.cantidad,
+                                              costo_unitario_compra(compra))
+        producto.stock += compra.cantidad
+        producto.save(update_fields=['stock', 'costo'])
+        compra.producto = producto
+        compra.save()
+    return compra
+
+
+def _revertir_compra(compra, producto, usuario, motivo):
+    costo = costo_unitario_compra(compra)
+    antes = producto.stock
+    producto.costo = promedio_sin_entrada(antes, producto.costo, compra.cantidad, costo)
+    producto.stock -= compra.cantidad
+    producto.save(update_fields=['stock', 'costo'])
+    MovimientoStock.objects.create(
+        producto=producto, tipo='SALIDA', cantidad=compra.cantidad, stock_antes=antes,
+        stock_despues=producto.stock, costo_unitario=costo, costo_promedio=producto.costo,
+        motivo=motivo, usuario=usuario,
+    )
+
+
+def eliminar_compra(compra, usuario=None):
+    """Quita del stock lo comprado y deshace su efecto en el promedio, dejando la salida en el Kardex."""
+    with transaction.atomic():
+        producto = _bloquear(compra.producto)
+        _revertir_compra(compra, producto, usuario, f"Compra eliminada #{compra.id}")
+        compra.delete()
+
+
+def editar_compra(compra, usuario=None):
+    """
+    `compra` trae los valores editados (sin guardar). Se revierte la versión
+    guardada y se aplica la nueva como una entrada más.
+    """
+    with transaction.atomic():
+        original = Compra.objects.select_for_update().get(id=compra.id)
+        producto = _bloquear(original.producto)
+        _revertir_compra(original, producto, usuario, f"Compra corregida #{compra.id} (se revierte)")
+        if compra.producto_id != producto.id:
+            producto = _bloquear(compra.producto)
+        costo = costo_unitario_compra(compra)
+        antes = producto.stock
+        producto.costo = promedio_con_entrada(antes, producto.costo, compra.cantidad, costo)
+        producto.stock += compra.cantidad
+        producto.save(update_fields=['stock', 'costo'])
+        MovimientoStock.objects.create(
+            producto=producto, tipo='ENTRADA', cantidad=compra.cantidad, stock_antes=antes,
+            stock_despues=producto.stock, costo_unitario=costo, costo_promedio=producto.costo,
+            motivo=f"Compra corregida #{compra.id}", usuario=usuario,
+        )
+        compra.save()
+    return compra
+
+
+# ==============================================================================
+# RECONSTRUCCIÓN DESDE EL KARDEX
+# ==============================================================================
+
+def recalcular_desde_kardex(tienda_id=None, lote=2000):
+    """
+    Recorre el Kardex una sola vez, por producto y en orden cronológico, y
+    rehace el promedio de cada movimiento y el costo actual de cada producto:
+    - ENTRADA con costo: pondera (compra, devolución de venta).
+    - SALIDA con costo: revierte esa entrada (compra eliminada o corregida).
+    - Sin costo: no cambia el promedio (ventas, ajustes).
+    El Kardex anterior a la migración 0009 no tiene costos; ahí el primer
+    promedio registrado sirve de punto de partida. Los productos sin ningún
+    dato de costo conservan el que tenían.
+    Devuelve (movimientos, productos) actualizados.
+    """
+    movimientos = MovimientoStock.objects.order_by('producto_id', 'fecha', 'id').only(
+        'id', 'producto_id', 'tipo', 'cantidad', 'stock_antes', 'costo_unitario', 'costo_promedio',
+    )
+    if tienda_id is not None:
+        movimientos = movimientos.filter(producto__tienda_id=tienda_id)
+
+    pendientes, costos, total = [], {}, 0
+    actual, promedio = None, None
+    with transaction.atomic():
+        for m in movimientos.iterator(chunk_size=lote):
+            if m.producto_id != actual:
+                if actual is not None and promedio is not None:
+                    costos[actual] = promedio
+                actual, promedio = m.producto_id, None
+            if m.costo_unitario is not None and m.tipo == 'ENTRADA':
+                promedio = promedio_con_entrada(m.stock_antes, promedio, m.cantidad, m.costo_unitario)
+            elif m.costo_unitario is not None and promedio is not None:
+                promedio = promedio_sin_entrada(m.stock_antes, promedio, m.cantidad, m.costo_unitario)
+            elif promedio is None and m.costo_promedio is not None:
+                promedio = m.costo_promedio  # Punto de partida que dejó la migración 0009
+            if m.costo_promedio != promedio:
+                m.costo_promedio = promedio
+                pendientes.append(m)
+            if len(pendientes) >= lote:
+                MovimientoStock.objects.bulk_update(pendientes, ['costo_promedio'])
+                total += len(pendientes)
+                pendientes = []
+        if actual is not None and promedio is not None:
+            costos[actual] = promedio
+        MovimientoStock.objects.bulk_update(pendientes, ['costo_promedio'])
+        total += len(pendientes)
+
+        productos = [Producto(id=pid, costo=costo) for pid, costo in costos.items()]
+        Producto.objects.bulk_update(productos, ['costo'], batch_size=lote)
+    return total, len(productos)
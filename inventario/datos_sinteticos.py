@@ -0,0 +1,278 @@
+# inventario/datos_sinteticos.py
+"""
+Generador de datos sintéticos para pruebas de volumen.
+
+Crea tiendas completas (dueño, productos, clientes, proveedores, compras,
+comprobantes con sus detalles, Kardex, cajas, movimientos y abonos) usando
+bulk_create. Como bulk_create no dispara las señales de Kardex ni los save()
+personalizados, aquí se calcula todo explícitamente: la numeración de series,
+los subtotales, el stock final y cada movimiento de stock en orden cronológico.
+Lo usan los comandos `sembrar_datos`, `benchmark` y `prueba_carga`.
+"""
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Tienda, Producto, Cliente, Proveedor, Compra, Comprobante, DetalleComprobante,
+    MovimientoStock, CajaDiaria, MovimientoCaja, PagoCredito,
+)
+from .cobranzas import reconstruir_asignaciones
+from .costeo import costo_unitario_compra, promedio_con_entrada
+from .pronosticos import actualizar_pronosticos
+
+LOTE = 1000
+TASA_IGV = Decimal('1.18')
+CENTIMO = Decimal('0.01')
+
+_ARTICULOS = ['Clavo', 'Tornillo', 'Perno', 'Cable', 'Tubo PVC', 'Cemento', 'Pintura', 'Brocha',
+              'Martillo', 'Alicate', 'Taladro', 'Cinta', 'Llave', 'Codo', 'Lija', 'Guante', 'Casco', 'Yeso']
+_VARIANTES = ['1/2"', '3/4"', '1"', '2"', '10mm', '12mm', '2.5mm', 'x 25kg', 'Gris', 'Blanco', 'Pro', 'Std']
+_NOMBRES = ['Juan', 'María', 'Luis', 'Rosa', 'Carlos', 'Ana', 'Pedro', 'Lucía', 'Jorge', 'Elena']
+_APELLIDOS = ['Quispe', 'Flores', 'Huamán', 'Rojas', 'Mamani', 'Torres', 'Vargas', 'Ramos', 'Castillo']
+
+
+@contextmanager
+def _sin_auto_now(*campos):
+    """Permite fijar fechas históricas en campos auto_now_add durante el sembrado."""
+    originales = [(c, c.auto_now_add) for c in campos]
+    for c in campos:
+        c.auto_now_add = False
+    try:
+        yield
+    finally:
+        for c, valor in originales:
+            c.auto_now_add = valor
+
+
+def _campos_fecha():
+    return [
+        Compra._meta.get_field('fecha_de_compra'),
+        Comprobante._meta.get_field('fecha_emision'),
+        MovimientoStock._meta.get_field('fecha'),
+        CajaDiaria._meta.get_field('fecha_apertura'),
+        MovimientoCaja._meta.get_field('fecha'),
+        PagoCredito._meta.get_field('fecha'),
+    ]
+
+
+def _dinero(valor):
+    return Decimal(valor).quantize(CENTIMO)
+
+
+def sembrar(tiendas=1, productos=200, clientes=100, proveedores=10, compras=300,
+            comprobantes=1000, lineas_max=5, dias=90, abonos=50, prefijo='bench', semilla=None):
+    """
+    Crea `tiendas` tiendas con el volumen indicado (por tienda) y devuelve la
+    lista de objetos Tienda. La última caja de cada tienda queda ABIERTA para
+    que el POS pueda vender.
+    """
+    rnd = random.Random(semilla)
+    creadas = []
+    with _sin_auto_now(*_campos_fecha()):
+        for _ in range(tiendas):
+            with transaction.atomic():
+                creadas.append(_sembrar_tienda(
+                    rnd, productos, clientes, proveedores, compras, comprobantes,
+                    lineas_max, dias, abonos, prefijo,
+                ))
+    return creadas
+
+
+def _sembrar_tienda(rnd, n_productos, n_clientes, n_proveedores, n_compras, n_comprobantes,
+                    lineas_max, dias, n_abonos, prefijo):
+    ahora = timezone.now()
+    inicio = ahora - timedelta(days=dias)
+    sufijo = uuid.uuid4().hex[:8]
+
+    dueno = User.objects.create(username=f'{prefijo}_{sufijo}', password=make_password('bench1234'))
+    tienda = Tienda.objects.create(propietario=dueno, nombre=f'Ferretería {prefijo.title()} {sufijo}',
+                                   ruc=f'20{rnd.randrange(10**9):09d}')
+
+    # --- Maestros ---
+    productos = []
+    for i in range(n_productos):
+        costo = _dinero(rnd.uniform(0.5, 300))
+        productos.append(Producto(
+            tienda=tienda,
+            nombre=f'{rnd.choice(_ARTICULOS)} {rnd.choice(_VARIANTES)} #{i}',
+            categoria=rnd.choice(Producto.CATEGORIAS)[0],
+            unidad_medida=rnd.choice(Producto.UNIDADES_CHOICES)[0],
+            codigo_barras=f'77{i:011d}',
+            costo=costo,
+            precio=_dinero(costo * Decimal('1.35')),
+            stock=0,
+        ))
+    productos = Producto.objects.bulk_create(productos, batch_size=LOTE)
+
+    lista_clientes = []
+    for i in range(n_clientes):
+        if i % 2:
+            doc = f'20{i:09d}'
+            lista_clientes.append(Cliente(tienda=tienda, razon_social=f'Constructora {rnd.choice(_APELLIDOS)} {i} SAC',
+                                          ruc=doc, dni_ruc=doc))
+        else:
+            doc = f'{i:08d}'
+            lista_clientes.append(Cliente(tienda=tienda, nombre_completo=f'{rnd.choice(_NOMBRES)} {rnd.choice(_APELLIDOS)} {i}',
+                                          dni=doc, dni_ruc=doc))
+    for cliente in lista_clientes:
+        cliente.preparar_busqueda()
+    lista_clientes = Cliente.objects.bulk_create(lista_clientes, batch_size=LOTE)
+
+    lista_proveedores = Proveedor.objects.bulk_create([
+        Proveedor(tienda=tienda, razon_social=f'Distribuidora {rnd.choice(_APELLIDOS)} {i} SAC', ruc=f'10{i:09d}')
+        for i in range(n_proveedores)
+    ], batch_size=LOTE)
+
+    # --- Línea de tiempo: compras y ventas ordenadas por fecha ---
+    segundos = int((ahora - inicio).total_seconds())
+    eventos = [(inicio + timedelta(seconds=rnd.randrange(segundos)), 'compra') for _ in range(n_compras)]
+    eventos += [(inicio + timedelta(seconds=rnd.randrange(segundos)), 'venta') for _ in range(n_comprobantes)]
+    eventos.sort(key=lambda e: e[0])
+
+    stock = {}
+    promedio = {}
+    kardex = []
+    for p in productos:
+        inicial = Decimal(rnd.randint(20, 200))
+        stock[p.id] = inicial
+        promedio[p.id] = p.costo
+        kardex.append(MovimientoStock(producto=p, tipo='ENTRADA', cantidad=inicial, stock_antes=0,
+                                      stock_despues=inicial, costo_unitario=p.costo, costo_promedio=p.costo,
+                                      motivo='Inventario inicial', fecha=inicio, usuario=dueno))
+
+    compras, cabeceras, lineas_por_comprobante = [], [], []
+    correlativo = {'BOLETA': 0, 'FACTURA': 0}
+    creditos = {}  # {cliente_id: [(fecha, total), ...]} en orden de emisión
+    for fecha, tipo in eventos:
+        if tipo == 'compra':
+            p = rnd.choice(productos)
+            prov = rnd.choice(lista_proveedores) if lista_proveedores else None
+            cantidad = Decimal(rnd.randint(10, 100))
+            # El proveedor cobra hasta ±10% del costo de lista: el promedio se mueve
+            compra = Compra(tienda=tienda, proveedor=prov, producto=p, cantidad=cantidad, fecha_de_compra=fecha,
+                            costo_total=_dinero(cantidad * p.costo * Decimal(rnd.uniform(0.9, 1.1))))
+            compras.append(compra)
+            antes = stock[p.id]
+            unitario = costo_unitario_compra(compra)
+            promedio[p.id] = promedio_con_entrada(antes, promedio[p.id], cantidad, unitario)
+            stock[p.id] = antes + cantidad
+            nombre_prov = prov.razon_social if prov else 'N/A'
+            kardex.append(MovimientoStock(producto=p, tipo='ENTRADA', cantidad=cantidad, stock_antes=antes,
+                                          stock_despues=stock[p.id], costo_unitario=unitario,
+                                          costo_promedio=promedio[p.id], fecha=fecha, usuario=dueno,
+                                          motivo=f'Compra: Ingreso de mercadería (Proveedor: {nombre_prov})'))
+            continue
+
+        lineas = []
+        for p in rnd.sample(productos, min(len(productos), rnd.randint(1, lineas_max))):
+            cantidad = min(Decimal(rnd.randint(1, 5)), stock[p.id])
+            if cantidad > 0:
+                lineas.append((p, cantidad, promedio[p.id]))
+        if not lineas:
+            continue
+
+        tipo_comp = 'FACTURA' if rnd.random() < 0.25 else 'BOLETA'
+        serie = 'F001' if tipo_comp == 'FACTURA' else 'B001'
+        correlativo[tipo_comp] += 1
+        metodo = rnd.choices(['EFECTIVO', 'TRANSFERENCIA', 'CREDITO'], weights=[70, 15, 15])[0]
+        cliente = rnd.choice(lista_clientes) if lista_clientes and (metodo == 'CREDITO' or rnd.random() < 0.4) else None
+        if cliente is None and metodo == 'CREDITO':
+            metodo = 'EFECTIVO'
+
+        total = sum((p.precio * c for p, c, _ in lineas), Decimal('0'))
+        subtotal = (total / TASA_IGV).quantize(CENTIMO)
+        cabeceras.append(Comprobante(
+            tienda=tienda, tipo_comprobante=tipo_comp, serie=serie, numero=correlativo[tipo_comp],
+            fecha_emision=fecha, cliente=cliente, subtotal=subtotal, igv=total - subtotal, total_final=total,
+            metodo_pago=metodo, estado_pago=metodo != 'CREDITO', hash_sunat=uuid.uuid4().hex[:30].upper(),
+        ))
+        if metodo == 'CREDITO':
+            creditos.setdefault(cliente.id, []).append((fecha, total))
+
+        motivo = f"Venta: {'Factura' if tipo_comp == 'FACTURA' else 'Boleta de Venta'} {serie}-{correlativo[tipo_comp]}"
+        for p, cantidad, costo in lineas:
+            antes = stock[p.id]
+            stock[p.id] = antes - cantidad
+            kardex.append(MovimientoStock(producto=p, tipo='SALIDA', cantidad=cantidad, stock_antes=antes,
+                                          stock_despues=stock[p.id], costo_promedio=costo, motivo=motivo,
+                                          fecha=fecha, usuario=dueno))
+        lineas_por_comprobante.append(lineas)
+
+    Compra.objects.bulk_create(compras, batch_size=LOTE)
+    cabeceras = Comprobante.objects.bulk_create(cabeceras, batch_size=LOTE)
+    detalles = []
+    for comp, lineas in zip(cabeceras, lineas_por_comprobante):
+        for p, cantidad, costo in lineas:
+            precio_sin_igv = (p.precio / TASA_IGV).quantize(CENTIMO)
+            detalles.append(DetalleComprobante(
+                comprobante=comp, producto=p, cantidad=cantidad, precio_unitario=precio_sin_igv,
+                precio_unitario_con_igv=p.precio, subtotal=cantidad * precio_sin_igv, costo_unitario=costo,
+            ))
+    DetalleComprobante.objects.bulk_create(detalles, batch_size=LOTE)
+    MovimientoStock.objects.bulk_create(kardex, batch_size=LOTE)
+
+    for p in productos:
+        p.stock = stock[p.id]
+        p.costo = promedio[p.id]
+    Producto.objects.bulk_update(productos, ['stock', 'costo'], batch_size=LOTE)
+
+    # --- Cajas diarias (una por día; la de hoy queda abierta) ---
+    cajas = []
+    for d in range(dias, -1, -1):
+        apertura = (ahora - timedelta(days=d)).replace(hour=8, minute=0, second=0, microsecond=0)
+        abierta = d == 0
+        cajas.append(CajaDiaria(
+            tienda=tienda, usuario_apertura=dueno, fecha_apertura=apertura, monto_inicial=Decimal('100.00'),
+            estado='ABIERTA' if abierta else 'CERRADA',
+            fecha_cierre=None if abierta else apertura + timedelta(hours=12),
+            usuario_cierre=None if abierta else dueno,
+        ))
+    cajas = CajaDiaria.objects.bulk_create(cajas, batch_size=LOTE)
+    movimientos = [
+        MovimientoCaja(caja=c, tipo='EGRESO', monto=_dinero(rnd.uniform(5, 50)), concepto='Gastos varios',
+                       fecha=c.fecha_apertura + timedelta(hours=4), usuario=dueno)
+        for c in cajas
+    ]
+
+    # --- Abonos sobre la deuda generada ---
+    # Cada abono cae en una caja posterior al primer crédito del cliente y, en orden de
+    # fecha, no supera lo que el cliente debía ese día
+    deudores = [c for c in lista_clientes if c.id in creditos]
+    sorteados = []
+    for _ in range(n_abonos if deudores else 0):
+        cliente = rnd.choice(deudores)
+        primero = creditos[cliente.id][0][0]
+        posibles = [c for c in cajas if c.fecha_apertura + timedelta(hours=2) > primero]
+        if posibles:
+            sorteados.append((cliente, rnd.choice(posibles), _dinero(rnd.uniform(10, 200))))
+    sorteados.sort(key=lambda s: s[1].fecha_apertura)
+
+    pagos, pagado = [], {}
+    for cliente, caja, monto in sorteados:
+        fecha = caja.fecha_apertura + timedelta(hours=2)
+        debe = sum(t for f, t in creditos[cliente.id] if f < fecha) - pagado.get(cliente.id, Decimal('0'))
+        monto = min(debe, monto)
+        if monto <= 0:
+            continue
+        pagado[cliente.id] = pagado.get(cliente.id, Decimal('0')) + monto
+        pagos.append(PagoCredito(cliente=cliente, monto=monto, usuario=dueno, fecha=fecha))
+        movimientos.append(MovimientoCaja(caja=caja, tipo='INGRESO', monto=monto, fecha=fecha, usuario=dueno,
+                                          concepto=f'Abono de deuda: {cliente.razon_social or cliente.nombre_completo}'))
+    PagoCredito.objects.bulk_create(pagos, batch_size=LOTE)
+    MovimientoCaja.objects.bulk_create(movimientos, batch_size=LOTE)
+
+    for c in deudores:
+        c.saldo_deudora = sum(t for _, t in creditos[c.id]) - pagado.get(c.id, Decimal('0'))
+    Cliente.objects.bulk_update(deudores, ['saldo_deudora'], batch_size=LOTE)
+    reconstruir_asignaciones(tienda.id)
+    actualizar_pronosticos(tienda)
+
+    return tienda
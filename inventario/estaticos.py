@@ -0,0 +1,70 @@
+# inventario/estaticos.py
+"""
+Paquetes de estáticos por página y lo que el service worker del POS precarga.
+
+Las librerías van copiadas en static/inventario/vendor (con su licencia y la
+versión en el nombre) en vez de pedirse a un CDN en cada carga. Cada página
+pesada tiene un paquete en static/inventario/dist: las librerías, que ya
+vienen minificadas, más el código propio sin comentarios ni sangría.
+
+Los paquetes se generan con `manage.py empaquetar_estaticos` y se versionan
+en git (vercel-build.sh los regenera antes de collectstatic). Después
+CompressedManifestStaticFilesStorage les pone el hash en el nombre y los
+comprime; WhiteNoise sirve los archivos con hash como `immutable`.
+"""
+import re
+from pathlib import Path
+
+ORIGEN = Path(__file__).resolve().parent / 'static'
+
+PAQUETES = {
+    'inventario/dist/pos.js': (
+        'inventario/vendor/jquery/jquery-3.7.1.min.js',
+        'inventario/vendor/select2/select2-4.0.13.min.js',
+        'inventario/pos/pos.js',
+    ),
+    'inventario/dist/pos.css': (
+        'inventario/vendor/select2/select2-4.0.13.min.css',
+        'inventario/pos/pos.css',
+    ),
+}
+
+# Lo que el service worker del POS guarda al instalarse (rutas de static)
+PRECARGA_POS = ('inventario/dist/pos.js', 'inventario/dist/pos.css', 'inventario/images/logo.jpeg')
+
+
+def _minificar(ruta, texto):
+    if '.min.' in ruta:
+        return texto.strip()
+    if ruta.endswith('.css'):
+        texto = re.sub(r'/\*.*?\*/', '', texto, flags=re.S)
+        texto = re.sub(r'\s*([{};:,>])\s*', r'\1', texto)
+        return re.sub(r'\s+', ' ', texto).strip()
+    # JS: solo lo que no puede cambiar el significado (comentarios de línea entera y sangría)
+    lineas = (linea.strip() for linea in texto.splitlines())
+    return '\n'.join(linea for linea in lineas if linea and not linea.startswith('//'))
+
+
+def armar_paquete(nombre):
+    """Contenido del paquete `nombre` a partir de sus fuentes."""
+    separador = '\n;\n' if nombre.endswith('.js') else '\n'
+    partes = [_minificar(ruta, (ORIGEN / ruta).read_text(encoding='utf-8')) for ruta in PAQUETES[nombre]]
+    return separador.join(partes) + '\n'
+
+
+def empaquetar(verificar=False):
+    """
+    Escribe los paquetes que cambiaron; con `verificar` solo los compara.
+    Devuelve los nombres escritos (o desactualizados).
+    """
+    cambiados = []
+    for nombre in PAQUETES:
+        destino = ORIGEN / nombre
+        contenido = armar_paquete(nombre)
+        if destino.exists() and destino.read_text(encoding='utf-8') == contenido:
+            continue
+        cambiados.append(nombre)
+        if not verificar:
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            destino.write_text(contenido, encoding='utf-8')
+    return cambiados
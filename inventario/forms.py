@@ -2,7 +2,8 @@
 
 from django import forms
 # Actualizamos importaciones para incluir PagoCredito
-from .models import Producto, Cliente, Proveedor, Compra, CajaDiaria, MovimientoCaja, PagoCredito 
+from .models import Producto, Cliente, Proveedor, Compra, CajaDiaria, MovimientoCaja, PagoCredito, CambioPrecioMasivo
+from .precios import REDONDEOS
 from django.contrib.auth.models import User
 
 # --- FORMULARIO PARA EL REGISTRO DE NUEVAS TIENDAS ---
@@ -55,8 +56,9 @@ class CompraForm(forms.ModelForm):
         tienda = kwargs.pop('tienda', None)
         super(CompraForm, self).__init__(*args, **kwargs)
         if tienda:
-            self.fields['proveedor'].queryset = Proveedor.objects.filter(tienda=tienda)
-            self.fields['producto'].queryset = Producto.objects.filter(tienda=tienda)
+            # select_related: el __str__ de cada opción muestra el nombre de la tienda
+            self.fields['proveedor'].queryset = Proveedor.objects.filter(tienda=tienda).select_related('tienda')
+            self.fields['producto'].queryset = Producto.objects.filter(tienda=tienda).select_related('tienda')
 
 class EmpleadoForm(forms.Form):
     username = forms.CharField(max_length=150, label="Nombre de Usuario")
@@ -122,3 +124,29 @@ class AbonoForm(forms.ModelForm):
             'monto': '¿Cuánto va a pagar el cliente? (S/)',
             'metodo': 'Medio de Pago'
         }
+
+# === CAMBIO MASIVO DE PRECIOS (ver precios.py) ===
+class CambioPreciosForm(forms.Form):
+    categoria = forms.ChoiceField(choices=[('', 'Todas')] + Producto.CATEGORIAS, required=False, label="Categoría")
+    proveedor = forms.ModelChoiceField(queryset=Proveedor.objects.none(), required=False, empty_label="Todos",
+                                       label="Proveedor (según compras)")
+    nombre = forms.CharField(max_length=100, required=False, label="Nombre contiene")
+    campo = forms.ChoiceField(choices=CambioPrecioMasivo.CAMPOS, label="Cambiar")
+    modo = forms.ChoiceField(choices=CambioPrecioMasivo.MODOS, label="Tipo de cambio")
+    valor = forms.DecimalField(max_digits=12, decimal_places=4, label="Valor",
+                               help_text="Ej: 8 = +8 %, -2.5 = S/ 2.50 menos")
+    redondeo = forms.ChoiceField(choices=REDONDEOS, initial='0.10', label="Redondeo")
+
+    def __init__(self, *args, **kwargs):
+        tienda = kwargs.pop('tienda', None)
+        super().__init__(*args, **kwargs)
+        if tienda:
+            self.fields['proveedor'].queryset = Proveedor.objects.filter(tienda=tienda).select_related('tienda').order_by('razon_social')
+        for campo in self.fields.values():
+            campo.widget.attrs['class'] = 'form-select' if isinstance(campo.widget, forms.Select) else 'form-control'
+
+    def filtros(self):
+        return {k: self.cleaned_data.get(k) for k in ('categoria', 'proveedor', 'nombre')}
+
+    def regla(self):
+        return {k: self.cleaned_data[k] for k in ('campo', 'modo', 'valor', 'redondeo')}
@@ -0,0 +1,164 @@
+# inventario/fotos_stock.py
+"""
+Stock a una fecha sin recorrer todo el Kardex.
+
+`tomar_fotos` guarda en FotoStock el stock y el costo promedio de cada
+producto al cierre de ciertos días (todos, o solo fin de mes). Después, el
+stock a cualquier momento es:
+
+    foto más reciente antes de ese momento + movimientos desde la foto
+
+que son tres consultas fijas por tienda (fecha de la foto, sus filas, y los
+movimientos posteriores sumados por producto en la BD). El costo de un
+reporte de inventario a fin de mes depende de la cantidad de productos, no
+de cuántos meses de historia haya. Si entre la foto y el momento hay un mes
+archivado (archivo.py), sus movimientos se leen del archivo.
+
+Un movimiento cuenta para el stock "al momento T" si su fecha es anterior a
+T; la foto del día D equivale a T = 00:00 del día siguiente (hora local).
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, When
+from django.utils import timezone
+
+from .models import FotoStock, MovimientoStock, PeriodoArchivado, Producto, Tienda
+
+CERO = Decimal('0')
+
+
+def fin_del_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+
+
+def cantidad_con_signo():
+    """ENTRADA suma, SALIDA resta: para agregar movimientos del Kardex en la BD."""
+    return Case(When(tipo='ENTRADA', then=F('cantidad')), default=-F('cantidad'),
+                output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def stock_al(tienda, momento, productos=None):
+    """
+    {producto_id: (stock, costo_promedio)} justo antes de `momento`. Los
+    productos sin foto ni movimientos hasta entonces no aparecen (stock 0).
+    `productos` (ids) restringe el cálculo, ej. a un solo SKU.
+    """
+    fotos = FotoStock.objects.filter(tienda=tienda, fecha__lt=timezone.localdate(momento))
+    movimientos = MovimientoStock.objects.filter(producto__tienda=tienda, fecha__lt=momento)
+    if productos is not None:
+        fotos = fotos.filter(producto_id__in=productos)
+        movimientos = movimientos.filter(producto_id__in=productos)
+
+    estado = {}
+    # Una consulta: fecha de la última foto y último mes archivado hasta el momento
+    ultima, archivado = Tienda.objects.filter(pk=getattr(tienda, 'pk', tienda)).values_list(
+        Subquery(fotos.order_by('-fecha').values('fecha')[:1]),
+        Subquery(PeriodoArchivado.objects.filter(tienda=tienda, mes__lte=timezone.localdate(momento))
+                 .order_by('-mes').values('mes')[:1]),
+    ).first() or (None, None)
+    desde = None
+    if ultima is not None:
+        for producto_id, stock, costo in fotos.filter(fecha=ultima).values_list('producto_id', 'stock', 'costo_promedio'):
+            estado[producto_id] = (stock, costo)
+        desde = fin_del_dia(ultima)
+        movimientos = movimientos.filter(fecha__gte=desde)
+
+    # Meses archivados dentro de la ventana: sus movimientos salen del archivo
+    fechas_costo = {}
+    if archivado is not None:
+        # Import diferido: archivo.py importa este módulo (y numpy)
+        from .archivo import limites_mes, movimientos_archivados
+        if desde is None or limites_mes(archivado)[1] > desde:
+            for producto_id, (delta, costo_archivo, fecha) in movimientos_archivados(tienda, desde, momento, productos).items():
+                stock, costo = estado.get(producto_id, (CERO, None))
+                estado[producto_id] = (stock + delta, costo_archivo if costo_archivo is not None else costo)
+                fechas_costo[producto_id] = fecha
+
+    ultimo_costo = movimientos.filter(
+        producto_id=OuterRef('producto_id'), costo_promedio__isnull=False,
+    ).order_by('-fecha', '-id')
+    deltas = movimientos.order_by().values('producto_id').annotate(
+        delta=Sum(cantidad_con_signo()), costo=Subquery(ultimo_costo.values('costo_promedio')[:1]),
+        fecha_costo=Subquery(ultimo_costo.values('fecha')[:1]),
+    )
+    for fila in deltas:
+        stock, costo = estado.get(fila['producto_id'], (CERO, None))
+        # El costo vigente es el del último movimiento, esté en la BD o en el archivo
+        fecha_archivo = fechas_costo.get(fila['producto_id'])
+        if fila['costo'] is not None and not (fecha_archivo and fecha_archivo > fila['fecha_costo']):
+            costo = fila['costo']
+        estado[fila['producto_id']] = (stock + fila['delta'], costo)
+    return estado
+
+
+def inventario_al(tienda, momento):
+    """Productos de la tienda con stock, costo y valor_stock a `momento`, y el valor total."""
+    productos = list(Producto.objects.filter(tienda=tienda).order_by('nombre'))
+    estado = stock_al(tienda, momento)
+    total = CERO
+    for p in productos:
+        stock, costo = estado.get(p.id, (CERO, None))
+        p.stock = stock
+        p.costo = costo if costo is not None else p.costo
+        p.valor_stock = p.stock * p.costo
+        total += p.valor_stock
+    return productos, total
+
+
+def tomar_fotos(tienda, fechas, lote=2000):
+    """
+    Guarda (o reemplaza) la foto de todos los productos al cierre de cada una
+    de `fechas`. Parte de `stock_al` en la primera y avanza con UNA lectura en
+    orden del Kardex hasta la última, escribiendo en lotes. Los productos sin
+    costo conocido a esa fecha usan el actual. Devuelve las filas escritas.
+    """
+    fechas = sorted(set(fechas))
+    if not fechas:
+        return 0
+    costos_actuales = dict(Producto.objects.filter(tienda=tienda).values_list('id', 'costo'))
+    estado = stock_al(tienda, fin_del_dia(fechas[0]))
+
+    pendientes, escritas = [], 0
+
+    def fotografiar(fecha):
+        nonlocal pendientes, escritas
+        for producto_id, costo_actual in costos_actuales.items():
+            stock, costo = estado.get(producto_id, (CERO, None))
+            pendientes.append(FotoStock(tienda=tienda, producto_id=producto_id, fecha=fecha, stock=stock,
+                                        costo_promedio=costo if costo is not None else costo_actual))
+        if len(pendientes) >= lote:
+            escritas += _guardar(pendientes)
+            pendientes = []
+
+    fotografiar(fechas[0])
+    siguientes = iter(fechas[1:])
+    proxima = next(siguientes, None)
+    movimientos = MovimientoStock.objects.filter(
+        producto__tienda=tienda, fecha__gte=fin_del_dia(fechas[0]), fecha__lt=fin_del_dia(fechas[-1]),
+    ).order_by('fecha', 'id').values_list('producto_id', 'tipo', 'cantidad', 'costo_promedio', 'fecha')
+    for producto_id, tipo, cantidad, costo_promedio, fecha in movimientos.iterator(chunk_size=lote):
+        while proxima is not None and fecha >= fin_del_dia(proxima):
+            fotografiar(proxima)
+            proxima = next(siguientes, None)
+        stock, costo = estado.get(producto_id, (CERO, None))
+        stock += cantidad if tipo == 'ENTRADA' else -cantidad
+        estado[producto_id] = (stock, costo_promedio if costo_promedio is not None else costo)
+    while proxima is not None:
+        fotografiar(proxima)
+        proxima = next(siguientes, None)
+    return escritas + _guardar(pendientes)
+
+
+def _guardar(fotos):
+    FotoStock.objects.bulk_create(fotos, update_conflicts=True, unique_fields=['producto', 'fecha'],
+                                  update_fields=['stock', 'costo_promedio'])
+    return len(fotos)
+
+
+def fechas_a_fotografiar(desde, hasta, periodo='diario'):
+    """Días de `desde` a `hasta` (incluidos); con periodo 'mensual', solo los fines de mes."""
+    dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    if periodo == 'mensual':
+        return [d for d in dias if (d + timedelta(days=1)).day == 1]
+    return dias
@@ -0,0 +1,30 @@
+# inventario/hojas.py
+"""
+Lectura y escritura de hojas de cálculo (openpyxl, tablib) aparte de views.py.
+
+Igual que pdf.py: se importa dentro de las vistas que suben o bajan un Excel,
+para que el arranque en frío no pague por openpyxl.
+"""
+from io import BytesIO
+
+import openpyxl
+from tablib import Dataset
+
+
+def plantilla_xlsx(encabezados):
+    """Un .xlsx vacío con solo la fila de encabezados."""
+    wb = openpyxl.Workbook()
+    wb.active.append(encabezados)
+    salida = BytesIO()
+    wb.save(salida)
+    return salida.getvalue()
+
+
+def leer_hoja(archivo):
+    """Dataset de un archivo subido: .xlsx, o CSV en UTF-8 (con o sin BOM)."""
+    dataset = Dataset()
+    if archivo.name.endswith('.xlsx'):
+        dataset.load(archivo.read(), format='xlsx')
+    else:
+        dataset.load(archivo.read().decode('utf-8-sig'), format='csv')
+    return dataset
@@ -0,0 +1,89 @@
+# inventario/integridad.py
+"""
+Verificación del Kardex contra Producto.stock.
+
+El stock se modifica en varios lugares (POS, compras, anulaciones, edición
+manual del producto), así que puede desviarse de lo que dice el Kardex. La
+verificación compara, para todos los productos de una tienda a la vez:
+
+    stock esperado = suma del Kardex hasta el punto de control
+                     + movimientos posteriores (UNA consulta agrupada)
+
+y luego adelanta el punto de control, con lo que la siguiente corrida solo
+lee lo nuevo. Los movimientos de los últimos KARDEX_CHECK_MARGIN_SECONDS no
+se consolidan todavía: una venta en curso pudo tomar un id menor y confirmar
+después.
+
+Con `corregir=True` las diferencias se compensan con movimientos de ajuste
+en el Kardex (el stock del producto se toma como el real).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum
+from django.utils import timezone
+
+from .fotos_stock import cantidad_con_signo
+from .models import MovimientoStock, Producto, PuntoControlKardex
+
+MOTIVO_AJUSTE = "Ajuste por verificación del Kardex"
+
+
+def verificar_kardex(tienda, corregir=False, usuario=None):
+    """
+    Devuelve la lista de diferencias [{producto_id, nombre, stock, esperado,
+    diferencia}] y actualiza los puntos de control. Con `corregir` además
+    escribe los ajustes de una vez (bulk_create).
+    """
+    corte = timezone.now() - timedelta(seconds=getattr(settings, 'KARDEX_CHECK_MARGIN_SECONDS', 300))
+    movimientos = MovimientoStock.objects.filter(producto__tienda=tienda)
+    hasta_id = movimientos.filter(fecha__lt=corte).aggregate(ultimo=Max('id'))['ultimo'] or 0
+
+    desde_control = (Q(producto__punto_control_kardex__isnull=True)
+                     | Q(id__gt=F('producto__punto_control_kardex__ultimo_movimiento_id')))
+    deltas = {
+        f['producto_id']: f for f in movimientos.filter(desde_control).order_by().values('producto_id').annotate(
+            delta=Sum(cantidad_con_signo()),
+            consolidado=Sum(cantidad_con_signo(), filter=Q(id__lte=hasta_id)),
+            ultimo=Max('id', filter=Q(id__lte=hasta_id)),
+        )
+    }
+    productos = Producto.objects.filter(tienda=tienda).values_list(
+        'id', 'nombre', 'stock', 'punto_control_kardex__ultimo_movimiento_id', 'punto_control_kardex__stock_kardex',
+    )
+
+    diferencias, controles = [], []
+    for producto_id, nombre, stock, ultimo_control, stock_control in productos:
+        fila = deltas.get(producto_id, {})
+        base = stock_control or Decimal('0')
+        esperado = base + (fila.get('delta') or 0)
+        if esperado != stock:
+            diferencias.append({'producto_id': producto_id, 'nombre': nombre, 'stock': stock,
+                                'esperado': esperado, 'diferencia': stock - esperado})
+        if fila.get('ultimo') or ultimo_control is None:
+            controles.append(PuntoControlKardex(
+                producto_id=producto_id, ultimo_movimiento_id=fila.get('ultimo') or ultimo_control or 0,
+                stock_kardex=base + (fila.get('consolidado') or 0),
+            ))
+
+    with transaction.atomic():
+        PuntoControlKardex.objects.bulk_create(
+            controles, batch_size=1000, update_conflicts=True, unique_fields=['producto'],
+            update_fields=['ultimo_movimiento_id', 'stock_kardex', 'verificado_en'],
+        )
+        if corregir and diferencias:
+            MovimientoStock.objects.bulk_create([
+                MovimientoStock(
+                    producto_id=d['producto_id'], tipo='ENTRADA' if d['diferencia'] > 0 else 'SALIDA',
+                    cantidad=abs(d['diferencia']), stock_antes=d['esperado'], stock_despues=d['stock'],
+                    motivo=MOTIVO_AJUSTE, usuario=usuario,
+                ) for d in diferencias
+            ], batch_size=1000)
+    return diferencias
+
+
+def reiniciar_puntos_control(tienda):
+    """Para verificar desde el primer movimiento (ej. después de corregir datos a mano)."""
+    PuntoControlKardex.objects.filter(producto__tienda=tienda).delete()
@@ -0,0 +1,58 @@
+# inventario/management/commands/archivar_periodos.py
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.archivo import archivar_mes, meses_a_archivar, restaurar_mes
+from inventario.models import PeriodoArchivado, Tienda
+
+
+def _mes(valor):
+    return date.fromisoformat(f'{valor}-01')
+
+
+class Command(BaseCommand):
+    help = ("Cierra los meses anteriores a los últimos ARCHIVE_HORIZON_MONTHS: pasa sus comprobantes, "
+            "Kardex y movimientos de caja a archivos comprimidos en ARCHIVE_DIR. "
+            "Con --restaurar AAAA-MM devuelve un mes a la base.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tienda', type=int, help="ID de la tienda (por defecto, todas)")
+        parser.add_argument('--horizonte-meses', type=int, help="Meses recientes que se quedan en la BD "
+                                                                "(por defecto, ARCHIVE_HORIZON_MONTHS)")
+        parser.add_argument('--lote', type=int, default=1000, help="Filas por DELETE / INSERT")
+        parser.add_argument('--restaurar', type=_mes, metavar='AAAA-MM', help="Mes a devolver a la BD")
+
+    def handle(self, *args, **opts):
+        tiendas = Tienda.objects.all()
+        if opts['tienda']:
+            tiendas = tiendas.filter(id=opts['tienda'])
+
+        if opts['restaurar']:
+            periodos = PeriodoArchivado.objects.filter(tienda__in=tiendas, mes=opts['restaurar'])
+            if not periodos:
+                raise CommandError(f"No hay periodos archivados de {opts['restaurar']:%Y-%m}.")
+            for periodo in periodos:
+                restaurar_mes(periodo, lote=opts['lote'])
+                self.stdout.write(f"  Tienda {periodo.tienda_id}: {periodo.mes:%Y-%m} restaurado")
+            self.stdout.write(self.style.SUCCESS("Periodos restaurados."))
+            return
+
+        horizonte = opts['horizonte_meses']
+        horizonte = settings.ARCHIVE_HORIZON_MONTHS if horizonte is None else horizonte
+        # El pronóstico de demanda lee el Kardex de los últimos FORECAST_HISTORY_DAYS
+        if horizonte * 28 < settings.FORECAST_HISTORY_DAYS:
+            raise CommandError(f"Un horizonte de {horizonte} mes(es) archivaría parte de los "
+                               f"{settings.FORECAST_HISTORY_DAYS} días que usa el pronóstico de demanda.")
+        for tienda in tiendas:
+            for mes in meses_a_archivar(tienda, horizonte):
+                inicio = time.perf_counter()
+                periodo = archivar_mes(tienda, mes, lote=opts['lote'])
+                if periodo is None:
+                    continue
+                self.stdout.write(f"  {tienda.nombre} {mes:%Y-%m}: {periodo.comprobantes} comprobante(s), "
+                                  f"{periodo.movimientos_stock} movimiento(s) de Kardex, "
+                                  f"{periodo.movimientos_caja} de caja en {time.perf_counter() - inicio:.2f} s")
+        self.stdout.write(self.style.SUCCESS("Periodos archivados."))
@@ -0,0 +1,137 @@
+# inventario/management/commands/benchmark.py
+import json
+import platform
+import time
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+
+from inventario.datos_sinteticos import sembrar
+from inventario.models import Producto, Comprobante, MovimientoStock
+from inventario.rendimiento import commit_actual, medir, storages_sin_manifest
+
+
+def _volumen(productos):
+    """El resto de entidades crece proporcionalmente a la cantidad de productos."""
+    return {
+        'productos': productos,
+        'clientes': max(10, productos // 2),
+        'proveedores': max(5, productos // 50),
+        'compras': int(productos * 1.5),
+        'comprobantes': productos * 5,
+        'abonos': max(5, productos // 4),
+    }
+
+
+def _xlsx_importacion(n, desde):
+    """Mismo formato que la plantilla de productos que descargan los usuarios."""
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    wb.active.append(['id', 'nombre', 'codigo_barras', 'stock', 'precio', 'costo'])
+    for i in range(desde, desde + n):
+        wb.active.append([None, f'Importado {i}', f'99{i:011d}', 10, 12.5, 8])
+    salida = BytesIO()
+    wb.save(salida)
+    return salida.getvalue()
+
+
+class Command(BaseCommand):
+    help = ("Mide latencia (p50/p95/p99) y cantidad de consultas de las vistas principales a distintas "
+            "escalas de datos. Usa una base de datos de prueba desechable y escribe los resultados en JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escalas', default='100,1000',
+                            help="Cantidades de productos por tienda, separadas por coma (ej. 100,1000,10000)")
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--salida', default='benchmark_resultados.json')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--bd-actual', action='store_true',
+                            help="Sembrar y medir sobre la base configurada en vez de una BD de prueba")
+
+    def handle(self, *args, **opts):
+        escalas = [int(e) for e in opts['escalas'].split(',') if e.strip()]
+        config_bd = None if opts['bd_actual'] else setup_databases(verbosity=0, interactive=False)
+        try:
+            resultados = []
+            for escala in escalas:
+                self.stdout.write(f"--- Escala: {escala} productos ---")
+                with override_settings(STORAGES=storages_sin_manifest()):
+                    resultados.append(self._medir_escala(escala, opts))
+                if not opts['bd_actual']:
+                    call_command('flush', interactive=False, verbosity=0)
+        finally:
+            if config_bd is not None:
+                teardown_databases(config_bd, verbosity=0)
+
+        informe = {
+            'fecha': timezone.now().isoformat(),
+            'commit': commit_actual(),
+            'python': platform.python_version(),
+            'repeticiones': opts['repeticiones'],
+            'escalas': resultados,
+        }
+        with open(opts['salida'], 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {opts['salida']}"))
+
+    def _medir_escala(self, escala, opts):
+        volumen = _volumen(escala)
+        inicio = time.perf_counter()
+        tienda = sembrar(tiendas=1, prefijo='bench', semilla=opts['semilla'], **volumen)[0]
+        segundos_sembrado = round(time.perf_counter() - inicio, 2)
+
+        cliente_http = Client()
+        cliente_http.force_login(tienda.propietario)
+        productos = list(Producto.objects.filter(tienda=tienda).order_by('-stock')[:3])
+        comprobante = Comprobante.objects.filter(tienda=tienda).first()
+        carrito = json.dumps({
+            'tipo_comprobante': 'BOLETA', 'metodo_pago': 'EFECTIVO',
+            'cart': [{'id': p.id, 'price': str(p.precio), 'quantity': 1} for p in productos],
+        })
+        contador_import = {'n': 0}
+
+        def importar():
+            contador_import['n'] += 1
+            archivo = SimpleUploadedFile('productos.xlsx', _xlsx_importacion(20, contador_import['n'] * 100))
+            return cliente_http.post('/importar/productos/', {'excel_file': archivo})
+
+        endpoints = {
+            'pos_view': lambda: cliente_http.get('/pos/'),
+            'checkout': lambda: cliente_http.post('/pos/emitir_comprobante_ajax/', carrito,
+                                                  content_type='application/json'),
+            'dashboard_view': lambda: cliente_http.get('/dashboard/'),
+            'gestion_lista_productos': lambda: cliente_http.get('/gestion/productos/'),
+            'gestion_lista_clientes': lambda: cliente_http.get('/gestion/clientes/'),
+            'gestion_lista_compras': lambda: cliente_http.get('/gestion/compras/'),
+            'gestion_lista_comprobantes': lambda: cliente_http.get('/gestion/comprobantes/'),
+            'kardex_general_view': lambda: cliente_http.get('/kardex/'),
+            'kardex_producto_view': lambda: cliente_http.get(f'/kardex/producto/{productos[0].id}/'),
+            'reporte_stock_bajo': lambda: cliente_http.get('/reportes/stock-bajo/'),
+            'reporte_ventas': lambda: cliente_http.get('/reportes/ventas/'),
+            'reporte_stock_actual': lambda: cliente_http.get('/reportes/stock-actual/'),
+            'ticket_comprobante': lambda: cliente_http.get(f'/comprobante/{comprobante.id}/ticket/'),
+            'exportar_productos': lambda: cliente_http.get('/exportar/productos/'),
+            'exportar_comprobantes': lambda: cliente_http.get('/exportar-global/comprobantes/'),
+            'importar_productos': importar,
+        }
+
+        medidas = {}
+        for nombre, funcion in endpoints.items():
+            medidas[nombre] = medir(funcion, opts['repeticiones'])
+            m = medidas[nombre]
+            self.stdout.write(f"  {nombre:<28} p50={m['p50_ms']:>8} ms  p95={m['p95_ms']:>8} ms  "
+                              f"consultas={m['consultas']:<5} status={m['status']}")
+
+        return {
+            'escala_productos': escala,
+            'volumen': volumen,
+            'filas_kardex': MovimientoStock.objects.filter(producto__tienda=tienda).count(),
+            'segundos_sembrado': segundos_sembrado,
+            'endpoints': medidas,
+        }
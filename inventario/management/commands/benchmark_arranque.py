@@ -0,0 +1,51 @@
+# inventario/management/commands/benchmark_arranque.py
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventario.rendimiento import commit_actual, medir_arranque, resumen_latencias
+
+# No deben cargarse al arrancar: solo las vistas de PDF/Excel los importan (ver pdf.py y hojas.py)
+MODULOS_PESADOS = ('xhtml2pdf', 'reportlab', 'pyhanko')
+
+
+class Command(BaseCommand):
+    help = ("Mide el arranque en frío (importar la app WSGI y las URLs) en intérpretes nuevos, con el "
+            "desglose de `python -X importtime`. Falla si se cargan módulos pesados o si supera --maximo-ms.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15, help="Importaciones más lentas a listar")
+        parser.add_argument('--maximo-ms', type=float, help="Falla si la mediana del arranque supera este valor")
+        parser.add_argument('--salida', default='benchmark_arranque.json')
+
+    def handle(self, *args, **opts):
+        # Las repeticiones van sin -X importtime: el reporte mismo agrega tiempo
+        tiempos = [medir_arranque()['ms'] for _ in range(opts['repeticiones'])]
+        detalle = medir_arranque(importtime=True)
+        resumen = resumen_latencias(tiempos)
+        principales = sorted((i for i in detalle['importaciones'] if i[3] == 0), key=lambda i: -i[2])[:opts['top']]
+        pesados = sorted(m for m in detalle['modulos'] if m.split('.')[0] in MODULOS_PESADOS)
+
+        self.stdout.write(f"Arranque: p50={resumen['p50_ms']} ms  max={resumen['max_ms']} ms  "
+                          f"({resumen['n']} repeticiones, {len(detalle['modulos'])} módulos)")
+        for modulo, _, acumulado, _ in principales:
+            self.stdout.write(f"  {acumulado / 1000:>9.1f} ms  {modulo}")
+
+        with open(opts['salida'], 'w', encoding='utf-8') as f:
+            json.dump({
+                'fecha': timezone.now().isoformat(),
+                'commit': commit_actual(),
+                'python': platform.python_version(),
+                'arranque': resumen,
+                'modulos_cargados': len(detalle['modulos']),
+                'importaciones_principales': [{'modulo': m, 'ms': round(a / 1000, 1)} for m, _, a, _ in principales],
+            }, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {opts['salida']}"))
+
+        if pesados:
+            raise CommandError(f"El arranque carga módulos pesados: {', '.join(pesados[:10])}")
+        if opts['maximo_ms'] is not None and resumen['p50_ms'] > opts['maximo_ms']:
+            raise CommandError(f"El arranque tarda {resumen['p50_ms']} ms (máximo {opts['maximo_ms']} ms).")
@@ -0,0 +1,187 @@
+# inventario/management/commands/benchmark_servidores.py
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from inventario.datos_sinteticos import sembrar
+from inventario.models import Producto, Comprobante
+from inventario.rendimiento import commit_actual, resumen_latencias
+
+SERVIDORES = {
+    'wsgi': lambda workers, puerto: [sys.executable, '-m', 'gunicorn', 'mi_erp.wsgi:application',
+                                     '-w', str(workers), '-b', f'127.0.0.1:{puerto}', '--log-level', 'warning'],
+    'asgi': lambda workers, puerto: [sys.executable, '-m', 'uvicorn', 'mi_erp.asgi:application',
+                                     '--workers', str(workers), '--port', str(puerto), '--log-level', 'warning'],
+}
+
+# Mezcla de un POS real: mucha búsqueda y checkout, algún PDF (lento) de vez en cuando
+MEZCLA = (('busqueda', 40), ('codigo', 10), ('stock', 15), ('checkout', 25), ('pdf', 10))
+
+
+class _Carga(threading.Thread):
+    def __init__(self, url_base, cookie, productos, comprobante_id, hasta, semilla):
+        super().__init__(daemon=True)
+        self.url_base = url_base.rstrip('/')
+        self.cookie = cookie
+        self.productos = productos
+        self.comprobante_id = comprobante_id
+        self.hasta = hasta
+        self.rnd = random.Random(semilla)
+        self.latencias = defaultdict(list)
+        self.errores = Counter()
+
+    def _pedir(self, ruta, cuerpo=None):
+        peticion = urllib.request.Request(
+            self.url_base + ruta, data=cuerpo, method='POST' if cuerpo else 'GET',
+            headers={'Content-Type': 'application/json', 'Cookie': f'sessionid={self.cookie}'},
+        )
+        try:
+            with urllib.request.urlopen(peticion, timeout=60) as r:
+                r.read()
+                return r.status, b''
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()[:120]
+        except (urllib.error.URLError, OSError) as e:
+            return 0, str(e).encode()
+
+    def _accion(self, nombre):
+        p = self.rnd.choice(self.productos)
+        if nombre == 'busqueda':
+            return self._pedir(f"/pos/api/productos/?q={p['nombre'][:3]}")
+        if nombre == 'codigo':
+            return self._pedir(f"/pos/api/codigo/{p['codigo_barras']}/")
+        if nombre == 'stock':
+            return self._pedir(f"/pos/api/stock/?ids={p['id']}")
+        if nombre == 'pdf':
+            return self._pedir(f"/comprobante/{self.comprobante_id}/descargar-pdf/")
+        carrito = {'tipo_comprobante': 'BOLETA', 'metodo_pago': 'EFECTIVO',
+                   'cart': [{'id': p['id'], 'price': str(p['precio']), 'quantity': 1}]}
+        return self._pedir('/pos/emitir_comprobante_ajax/', json.dumps(carrito).encode())
+
+    def run(self):
+        nombres, pesos = zip(*MEZCLA)
+        while time.monotonic() < self.hasta:
+            nombre = self.rnd.choices(nombres, pesos)[0]
+            inicio = time.perf_counter()
+            status, detalle = self._accion(nombre)
+            self.latencias[nombre].append((time.perf_counter() - inicio) * 1000)
+            if status != 200:
+                self.errores[f'{nombre} {status}: {detalle!r}'] += 1
+
+
+class Command(BaseCommand):
+    help = ("Compara throughput y latencia de los endpoints del POS servidos por gunicorn (WSGI) y por "
+            "uvicorn (ASGI). Levanta cada servidor como subproceso sobre la BD configurada (usar una BD "
+            "de prueba, idealmente PostgreSQL vía DATABASE_URL) y le aplica la misma carga mixta.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servidores', default='wsgi,asgi')
+        parser.add_argument('--workers', type=int, default=2, help="Procesos por servidor")
+        parser.add_argument('--concurrencia', type=int, default=16, help="Clientes simultáneos")
+        parser.add_argument('--segundos', type=int, default=15, help="Duración de la carga por servidor")
+        parser.add_argument('--productos', type=int, default=200)
+        parser.add_argument('--puerto', type=int, default=8765)
+        parser.add_argument('--semilla', type=int, default=11)
+        parser.add_argument('--salida', default='benchmark_servidores.json')
+
+    def handle(self, *args, **opts):
+        servidores = [s.strip() for s in opts['servidores'].split(',') if s.strip()]
+        desconocidos = set(servidores) - set(SERVIDORES)
+        if desconocidos:
+            raise CommandError(f"Servidores desconocidos: {', '.join(sorted(desconocidos))}")
+
+        tienda = sembrar(tiendas=1, productos=opts['productos'], clientes=20, proveedores=3,
+                         compras=opts['productos'], comprobantes=50, prefijo='srv', semilla=opts['semilla'])[0]
+        cliente_http = Client()
+        cliente_http.force_login(tienda.propietario)
+        cookie = cliente_http.cookies['sessionid'].value
+        productos = list(Producto.objects.filter(tienda=tienda).values('id', 'nombre', 'codigo_barras', 'precio'))
+        comprobante_id = Comprobante.objects.filter(tienda=tienda).values_list('id', flat=True).first()
+
+        resultados = {}
+        for nombre in servidores:
+            self.stdout.write(f"--- {nombre.upper()} ({opts['workers']} workers, {opts['concurrencia']} clientes) ---")
+            resultados[nombre] = self._medir_servidor(nombre, opts, cookie, productos, comprobante_id)
+
+        informe = {
+            'fecha': timezone.now().isoformat(),
+            'commit': commit_actual(),
+            'python': platform.python_version(),
+            'bd': settings.DATABASES['default']['ENGINE'],
+            'workers': opts['workers'],
+            'concurrencia': opts['concurrencia'],
+            'segundos': opts['segundos'],
+            'servidores': resultados,
+        }
+        with open(opts['salida'], 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {opts['salida']}"))
+
+    def _medir_servidor(self, nombre, opts, cookie, productos, comprobante_id):
+        url = f"http://127.0.0.1:{opts['puerto']}"
+        entorno = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        proceso = subprocess.Popen(SERVIDORES[nombre](opts['workers'], opts['puerto']),
+                                   cwd=settings.BASE_DIR, env=entorno)
+        try:
+            self._esperar(url, proceso)
+            hasta = time.monotonic() + opts['segundos']
+            hilos = [_Carga(url, cookie, productos, comprobante_id, hasta, opts['semilla'] * 100 + i)
+                     for i in range(opts['concurrencia'])]
+            inicio = time.perf_counter()
+            for h in hilos:
+                h.start()
+            for h in hilos:
+                h.join()
+            duracion = time.perf_counter() - inicio
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+        por_accion = defaultdict(list)
+        for h in hilos:
+            for accion, valores in h.latencias.items():
+                por_accion[accion].extend(valores)
+        errores = sum((h.errores for h in hilos), Counter())
+        total = sum(len(v) for v in por_accion.values())
+        exitosas = total - sum(errores.values())
+
+        self.stdout.write(f"  Peticiones: {total}  OK: {exitosas}  Throughput: {exitosas / duracion:.1f} req/s")
+        resumen = {}
+        for accion, _ in MEZCLA:
+            resumen[accion] = resumen_latencias(por_accion.get(accion, []))
+            r = resumen[accion]
+            self.stdout.write(f"  {accion:<10} n={r['n']:<6} p50={r['p50_ms']} ms  p95={r['p95_ms']} ms  p99={r['p99_ms']} ms")
+        for mensaje, n in errores.most_common(5):
+            self.stdout.write(f"  x{n}  {mensaje}")
+        return {
+            'peticiones': total,
+            'exitosas': exitosas,
+            'throughput_rps': round(exitosas / duracion, 2),
+            'errores': dict(errores),
+            'endpoints': resumen,
+        }
+
+    def _esperar(self, url, proceso, limite=30):
+        fin = time.monotonic() + limite
+        while time.monotonic() < fin:
+            if proceso.poll() is not None:
+                raise CommandError(f"El servidor terminó al arrancar (código {proceso.returncode}).")
+            try:
+                urllib.request.urlopen(url + '/login/', timeout=2).read()
+                return
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.3)
+        raise CommandError(f"El servidor no respondió en {limite} s.")
@@ -0,0 +1,21 @@
+# inventario/management/commands/empaquetar_estaticos.py
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.estaticos import empaquetar
+
+
+class Command(BaseCommand):
+    help = ("Arma los paquetes de estáticos por página (static/inventario/dist) a partir de las librerías "
+            "de static/inventario/vendor y del código propio. Correr antes de collectstatic.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help="No escribe nada: falla si algún paquete no coincide con sus fuentes")
+
+    def handle(self, *args, **opts):
+        cambiados = empaquetar(verificar=opts['verificar'])
+        if opts['verificar'] and cambiados:
+            raise CommandError(f"Paquetes desactualizados: {', '.join(cambiados)}. Corre empaquetar_estaticos.")
+        for nombre in cambiados:
+            self.stdout.write(f"  {nombre}")
+        self.stdout.write(self.style.SUCCESS(f"{len(cambiados)} paquete(s) actualizado(s)."))
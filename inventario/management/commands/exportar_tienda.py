@@ -0,0 +1,23 @@
+# inventario/management/commands/exportar_tienda.py
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.models import Tienda
+from inventario.paquetes import exportar_paquete
+
+
+class Command(BaseCommand):
+    help = ("Guarda el respaldo completo de una tienda (todos sus modelos en JSONL, con manifiesto "
+            "y SHA-256) en un ZIP, leyendo la BD por lotes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('tienda', type=int, help="ID de la tienda")
+        parser.add_argument('salida', help="Ruta del ZIP a crear")
+        parser.add_argument('--lote', type=int, default=2000, help="Filas por lectura")
+
+    def handle(self, *args, **opts):
+        tienda = Tienda.objects.filter(id=opts['tienda']).first()
+        if tienda is None:
+            raise CommandError(f"No existe la tienda {opts['tienda']}.")
+        with open(opts['salida'], 'wb') as destino:
+            escritos = exportar_paquete(tienda, destino, lote=opts['lote'])
+        self.stdout.write(self.style.SUCCESS(f"{tienda.nombre}: {escritos / 1024:.1f} KB en {opts['salida']}"))
@@ -0,0 +1,18 @@
+# inventario/management/commands/podar_bitacoras.py
+from django.core.management.base import BaseCommand
+
+from inventario.bitacoras import podar
+
+
+class Command(BaseCommand):
+    help = ("Borra las filas de bitácora (LOG_DATABASE_MODELS) más antiguas que LOG_RETENTION_DAYS, "
+            "en lotes chicos para no bloquear la tabla.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help="Días a conservar (por defecto, LOG_RETENTION_DAYS)")
+        parser.add_argument('--lote', type=int, default=5000, help="Filas por DELETE")
+        parser.add_argument('--pausa', type=float, default=0.0, help="Segundos de espera entre lotes")
+
+    def handle(self, *args, **opts):
+        for modelo, borradas in podar(dias=opts['dias'], lote=opts['lote'], pausa=opts['pausa']).items():
+            self.stdout.write(self.style.SUCCESS(f"{modelo}: {borradas} fila(s) borradas."))
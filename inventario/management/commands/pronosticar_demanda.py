@@ -0,0 +1,26 @@
+# inventario/management/commands/pronosticar_demanda.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventario.models import Tienda
+from inventario.pronosticos import actualizar_pronosticos
+
+
+class Command(BaseCommand):
+    help = "Actualiza el pronóstico de demanda y el punto de reorden de cada producto (incremental)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tienda', type=int, help="ID de la tienda (por defecto, todas)")
+        parser.add_argument('--completo', action='store_true',
+                            help="Recalcula desde cero con FORECAST_HISTORY_DAYS días de historia")
+
+    def handle(self, *args, **opts):
+        tiendas = Tienda.objects.all()
+        if opts['tienda']:
+            tiendas = tiendas.filter(id=opts['tienda'])
+        for tienda in tiendas:
+            inicio = time.perf_counter()
+            actualizados = actualizar_pronosticos(tienda, completo=opts['completo'])
+            self.stdout.write(f"  {tienda.nombre}: {actualizados} producto(s) en {time.perf_counter() - inicio:.2f} s")
+        self.stdout.write(self.style.SUCCESS("Pronósticos actualizados."))
@@ -0,0 +1,243 @@
+# inventario/management/commands/prueba_carga.py
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+
+from inventario.datos_sinteticos import sembrar
+from inventario.models import Producto, Cliente, Comprobante, DetalleComprobante, MovimientoStock, PagoCredito
+from inventario.rendimiento import resumen_latencias, storages_sin_manifest
+
+URL_CHECKOUT = '/pos/emitir_comprobante_ajax/'
+# 409 es la regla de stock rechazando un carrito (ventas.StockInsuficiente): respuesta esperada, no error
+RECHAZO_STOCK = 409
+
+
+class _Terminal(threading.Thread):
+    """Un POS simulado: manda `ventas` carritos seguidos a su tienda."""
+
+    def __init__(self, tienda, productos, clientes, ventas, url_base, semilla, turno=None):
+        super().__init__(daemon=True)
+        self.tienda = tienda
+        self.productos = productos
+        self.clientes = clientes
+        self.ventas = ventas
+        self.url_base = url_base
+        self.rnd = random.Random(semilla)
+        self.turno = turno
+        self.latencias_ms = []
+        self.errores = Counter()
+        self.rechazos = 0
+        # El login se hace antes de lanzar los hilos para no competir por la tabla de sesiones
+        self.cliente_http = Client()
+        self.cliente_http.force_login(tienda.propietario)
+        self.cookie = self.cliente_http.cookies['sessionid'].value
+
+    def _carrito(self):
+        items = self.rnd.sample(self.productos, min(len(self.productos), self.rnd.randint(1, 5)))
+        credito = self.clientes and self.rnd.random() < 0.3
+        return {
+            'tipo_comprobante': 'FACTURA' if self.rnd.random() < 0.25 else 'BOLETA',
+            'metodo_pago': 'CREDITO' if credito else 'EFECTIVO',
+            'cliente_id': self.rnd.choice(self.clientes) if credito else '',
+            'cart': [{'id': p.id, 'price': str(p.precio), 'quantity': self.rnd.randint(1, 3)} for p in items],
+        }
+
+    def run(self):
+        try:
+            for _ in range(self.ventas):
+                cuerpo = json.dumps(self._carrito())
+                with self.turno or nullcontext():
+                    # La latencia no cuenta la espera del turno
+                    inicio = time.perf_counter()
+                    if self.url_base:
+                        status, detalle = self._post_http(cuerpo, self.cookie)
+                    else:
+                        r = self.cliente_http.post(URL_CHECKOUT, cuerpo, content_type='application/json')
+                        status, detalle = r.status_code, r.content[:120]
+                    self.latencias_ms.append((time.perf_counter() - inicio) * 1000)
+                if status == RECHAZO_STOCK:
+                    self.rechazos += 1
+                elif status != 200:
+                    self.errores[(status, detalle)] += 1
+        finally:
+            connection.close()
+
+    def _post_http(self, cuerpo, cookie):
+        peticion = urllib.request.Request(
+            self.url_base.rstrip('/') + URL_CHECKOUT, data=cuerpo.encode('utf-8'), method='POST',
+            headers={'Content-Type': 'application/json', 'Cookie': f'sessionid={cookie}'},
+        )
+        try:
+            with urllib.request.urlopen(peticion, timeout=60) as r:
+                return r.status, b''
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()[:120]
+        except urllib.error.URLError as e:
+            return 0, str(e.reason).encode()
+
+
+class Command(BaseCommand):
+    help = ("Prueba de carga del checkout del POS: varias terminales concurrentes por tienda emiten "
+            "comprobantes y al final se verifican los invariantes de stock, Kardex, series y deudas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tiendas', type=int, default=3)
+        parser.add_argument('--terminales', type=int, default=4, help="Terminales POS simultáneas por tienda")
+        parser.add_argument('--ventas', type=int, default=25, help="Carritos que envía cada terminal")
+        parser.add_argument('--productos', type=int, default=100, help="Productos por tienda")
+        parser.add_argument('--semilla', type=int, default=7)
+        parser.add_argument('--max-errores', type=int, default=0,
+                            help="Respuestas con error (5xx, sin conexión, 4xx distinto de 409) que se toleran "
+                                 "antes de dar la prueba por fallida")
+        parser.add_argument('--url', default='',
+                            help="Servidor ya levantado (ej. http://127.0.0.1:8000) que comparte la misma BD. "
+                                 "Sin esto, las peticiones van al WSGI handler dentro del proceso.")
+        parser.add_argument('--bd-actual', action='store_true',
+                            help="Usar la BD configurada (recomendado: PostgreSQL local vía DATABASE_URL) "
+                                 "en vez de una BD de prueba desechable")
+
+    def handle(self, *args, **opts):
+        if opts['url'] and not opts['bd_actual']:
+            raise CommandError("Con --url el servidor usa su propia BD: agrega --bd-actual.")
+        if not opts['bd_actual'] and connection.vendor == 'sqlite':
+            # La BD de prueba en memoria no espera bloqueos ("table is locked"); con un archivo
+            # SQLite serializa las escrituras como lo haría un servidor real de una sola máquina.
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.gettempdir(), 'prueba_carga.sqlite3')
+        config_bd = None if opts['bd_actual'] else setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(STORAGES=storages_sin_manifest()):
+                fallas = self._ejecutar(opts)
+        finally:
+            if config_bd is not None:
+                teardown_databases(config_bd, verbosity=0)
+        if fallas:
+            raise CommandError(f"{fallas} invariante(s) no se cumplen.")
+        if self.errores > opts['max_errores']:
+            raise CommandError(f"{self.errores} petición(es) con error (máximo permitido: {opts['max_errores']}).")
+        self.stdout.write(self.style.SUCCESS("Todos los invariantes se cumplen."))
+
+    def _ejecutar(self, opts):
+        tiendas = sembrar(tiendas=opts['tiendas'], productos=opts['productos'], clientes=20, proveedores=3,
+                          compras=opts['productos'], comprobantes=opts['productos'], prefijo='carga',
+                          semilla=opts['semilla'])
+        ids_tiendas = [t.id for t in tiendas]
+        stock_inicial = dict(Producto.objects.filter(tienda_id__in=ids_tiendas).values_list('id', 'stock'))
+        ultimo_comprobante = Comprobante.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        ultimo_kardex = MovimientoStock.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        # SQLite abre las transacciones en modo DEFERRED: dos cajas que leen y luego quieren escribir
+        # se bloquean entre sí y una falla al instante con "database is locked" (un busy timeout no
+        # lo evita). En proceso, las terminales se turnan; PostgreSQL sí prueba la concurrencia real.
+        turno = threading.Lock() if connection.vendor == 'sqlite' and not opts['url'] else None
+        terminales = []
+        for t in tiendas:
+            productos = list(Producto.objects.filter(tienda=t))
+            clientes = list(Cliente.objects.filter(tienda=t).values_list('id', flat=True))
+            for n in range(opts['terminales']):
+                terminales.append(_Terminal(t, productos, clientes, opts['ventas'], opts['url'],
+                                            semilla=opts['semilla'] * 1000 + t.id * 100 + n, turno=turno))
+
+        self.stdout.write(f"Lanzando {len(terminales)} terminales x {opts['ventas']} ventas "
+                          f"({'HTTP ' + opts['url'] if opts['url'] else 'en proceso'})...")
+        inicio = time.perf_counter()
+        for terminal in terminales:
+            terminal.start()
+        for terminal in terminales:
+            terminal.join()
+        duracion = time.perf_counter() - inicio
+
+        latencias = [l for t in terminales for l in t.latencias_ms]
+        errores = sum((t.errores for t in terminales), Counter())
+        rechazos = sum(t.rechazos for t in terminales)
+        self.errores = sum(errores.values())
+        exitosas = len(latencias) - self.errores - rechazos
+        resumen = resumen_latencias(latencias)
+        self.stdout.write(f"Peticiones: {len(latencias)}  OK: {exitosas}  Sin stock (409): {rechazos}  "
+                          f"Errores: {self.errores}")
+        self.stdout.write(f"Duración: {duracion:.2f} s  Throughput: {exitosas / duracion:.1f} ventas/s")
+        self.stdout.write(f"Latencia p50={resumen['p50_ms']} ms  p95={resumen['p95_ms']} ms  "
+                          f"p99={resumen['p99_ms']} ms  max={resumen['max_ms']} ms")
+        for (status, detalle), n in errores.most_common(5):
+            self.stdout.write(self.style.ERROR(f"  x{n}  {status}: {detalle!r}"))
+
+        return self._verificar(ids_tiendas, stock_inicial, ultimo_comprobante, ultimo_kardex)
+
+    def _verificar(self, ids_tiendas, stock_inicial, ultimo_comprobante, ultimo_kardex):
+        fallas = 0
+
+        def reportar(nombre, problemas):
+            nonlocal fallas
+            if problemas:
+                fallas += 1
+                self.stdout.write(self.style.ERROR(f"[FALLA] {nombre}: {len(problemas)} problema(s)"))
+                for p in problemas[:10]:
+                    self.stdout.write(f"    {p}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"[OK] {nombre}"))
+
+        # 1. Stock final = inicial - vendido durante la prueba
+        vendido = dict(
+            DetalleComprobante.objects.filter(comprobante_id__gt=ultimo_comprobante,
+                                              comprobante__tienda_id__in=ids_tiendas)
+            .values('producto_id').annotate(total=Sum('cantidad')).values_list('producto_id', 'total')
+        )
+        stock_final = dict(Producto.objects.filter(id__in=stock_inicial).values_list('id', 'stock'))
+        reportar("Stock final = inicial - vendido", [
+            f"producto {pid}: inicial {stock_inicial[pid]} - vendido {vendido.get(pid, 0)} != final {stock_final[pid]}"
+            for pid in stock_inicial if stock_inicial[pid] - vendido.get(pid, Decimal('0')) != stock_final[pid]
+        ])
+
+        # 2. Kardex: una SALIDA por línea de detalle, con la misma cantidad por producto
+        salidas = defaultdict(lambda: [0, Decimal('0')])
+        for pid, cantidad in MovimientoStock.objects.filter(
+                id__gt=ultimo_kardex, tipo='SALIDA', producto_id__in=stock_inicial).values_list('producto_id', 'cantidad'):
+            salidas[pid][0] += 1
+            salidas[pid][1] += cantidad
+        lineas = defaultdict(lambda: [0, Decimal('0')])
+        for pid, cantidad in DetalleComprobante.objects.filter(
+                comprobante_id__gt=ultimo_comprobante, comprobante__tienda_id__in=ids_tiendas).values_list('producto_id', 'cantidad'):
+            lineas[pid][0] += 1
+            lineas[pid][1] += cantidad
+        reportar("Kardex coincide con las líneas de detalle", [
+            f"producto {pid}: detalle {lineas[pid]} vs kardex {salidas[pid]}"
+            for pid in set(lineas) | set(salidas) if lineas[pid] != salidas[pid]
+        ])
+
+        # 3. Series sin duplicados ni huecos
+        numeros = defaultdict(list)
+        for tienda_id, tipo, serie, numero in Comprobante.objects.filter(tienda_id__in=ids_tiendas).values_list(
+                'tienda_id', 'tipo_comprobante', 'serie', 'numero'):
+            numeros[(tienda_id, tipo, serie)].append(numero)
+        problemas = []
+        for clave, lista in numeros.items():
+            repetidos = [n for n, c in Counter(lista).items() if c > 1]
+            faltantes = sorted(set(range(1, max(lista) + 1)) - set(lista))
+            if repetidos or faltantes:
+                problemas.append(f"{clave}: duplicados {repetidos[:5]} huecos {faltantes[:5]}")
+        reportar("Numeración de series correlativa", problemas)
+
+        # 4. Deuda del cliente = ventas al crédito - abonos
+        credito = dict(Comprobante.objects.filter(tienda_id__in=ids_tiendas, metodo_pago='CREDITO')
+                       .values('cliente_id').annotate(t=Sum('total_final')).values_list('cliente_id', 't'))
+        abonado = dict(PagoCredito.objects.filter(cliente__tienda_id__in=ids_tiendas)
+                       .values('cliente_id').annotate(t=Sum('monto')).values_list('cliente_id', 't'))
+        reportar("Deuda de clientes = crédito - abonos", [
+            f"cliente {cid}: saldo {saldo} != crédito {credito.get(cid, 0)} - abonos {abonado.get(cid, 0)}"
+            for cid, saldo in Cliente.objects.filter(tienda_id__in=ids_tiendas).values_list('id', 'saldo_deudora')
+            if saldo != credito.get(cid, Decimal('0')) - abonado.get(cid, Decimal('0'))
+        ])
+        return fallas
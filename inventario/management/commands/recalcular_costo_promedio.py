@@ -0,0 +1,21 @@
+# inventario/management/commands/recalcular_costo_promedio.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventario.costeo import recalcular_desde_kardex
+
+
+class Command(BaseCommand):
+    help = "Rehace el costo promedio ponderado de cada movimiento y producto recorriendo el Kardex una sola vez."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tienda', type=int, help="ID de la tienda (por defecto, todas)")
+        parser.add_argument('--lote', type=int, default=2000, help="Filas leídas y actualizadas por lote")
+
+    def handle(self, *args, **opts):
+        inicio = time.perf_counter()
+        movimientos, productos = recalcular_desde_kardex(opts['tienda'], lote=opts['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{movimientos} movimiento(s) y {productos} producto(s) actualizados en {time.perf_counter() - inicio:.2f} s."
+        ))
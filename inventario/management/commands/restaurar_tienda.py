@@ -0,0 +1,30 @@
+# inventario/management/commands/restaurar_tienda.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.models import Tienda
+from inventario.paquetes import restaurar_paquete
+
+
+class Command(BaseCommand):
+    help = ("Carga un respaldo de `exportar_tienda` en una tienda vacía (bulk_create, ids nuevos). "
+            "Las referencias a usuarios pasan al propietario de la tienda destino.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('paquete', help="Ruta del ZIP")
+        parser.add_argument('tienda', type=int, help="ID de la tienda destino (vacía)")
+        parser.add_argument('--usuario', help="Usuario al que pasan las referencias (por defecto, el propietario)")
+        parser.add_argument('--lote', type=int, default=1000, help="Filas por INSERT")
+
+    def handle(self, *args, **opts):
+        tienda = Tienda.objects.select_related('propietario').filter(id=opts['tienda']).first()
+        if tienda is None:
+            raise CommandError(f"No existe la tienda {opts['tienda']}.")
+        usuario = User.objects.filter(username=opts['usuario']).first() if opts['usuario'] else tienda.propietario
+        try:
+            insertadas = restaurar_paquete(opts['paquete'], tienda, usuario=usuario, lote=opts['lote'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        for nombre, filas in insertadas.items():
+            self.stdout.write(f"  {nombre}: {filas}")
+        self.stdout.write(self.style.SUCCESS(f"Paquete cargado en {tienda.nombre}."))
@@ -0,0 +1,32 @@
+# inventario/management/commands/sembrar_datos.py
+from django.core.management.base import BaseCommand
+
+from inventario.datos_sinteticos import sembrar
+
+
+class Command(BaseCommand):
+    help = "Crea tiendas con datos sintéticos realistas (productos, ventas, Kardex, cajas, abonos) usando bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tiendas', type=int, default=1)
+        parser.add_argument('--productos', type=int, default=200, help="Productos por tienda")
+        parser.add_argument('--clientes', type=int, default=100)
+        parser.add_argument('--proveedores', type=int, default=10)
+        parser.add_argument('--compras', type=int, default=300)
+        parser.add_argument('--comprobantes', type=int, default=1000)
+        parser.add_argument('--lineas-max', type=int, default=5, help="Máximo de líneas por comprobante")
+        parser.add_argument('--dias', type=int, default=90, help="Días de historia hacia atrás")
+        parser.add_argument('--abonos', type=int, default=50)
+        parser.add_argument('--prefijo', default='demo', help="Prefijo del usuario dueño de cada tienda")
+        parser.add_argument('--semilla', type=int, default=None, help="Semilla para resultados reproducibles")
+
+    def handle(self, *args, **opts):
+        tiendas = sembrar(
+            tiendas=opts['tiendas'], productos=opts['productos'], clientes=opts['clientes'],
+            proveedores=opts['proveedores'], compras=opts['compras'], comprobantes=opts['comprobantes'],
+            lineas_max=opts['lineas_max'], dias=opts['dias'], abonos=opts['abonos'],
+            prefijo=opts['prefijo'], semilla=opts['semilla'],
+        )
+        for t in tiendas:
+            self.stdout.write(f"  {t.nombre} (id={t.id}) -> usuario '{t.propietario.username}' / clave 'bench1234'")
+        self.stdout.write(self.style.SUCCESS(f"{len(tiendas)} tienda(s) sembradas."))
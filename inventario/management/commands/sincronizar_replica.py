@@ -0,0 +1,32 @@
+# inventario/management/commands/sincronizar_replica.py
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.replicas import ALIAS
+
+
+class Command(BaseCommand):
+    help = ("Copia la base SQLite principal sobre la réplica SQLite local (DATABASE_REPLICA_URL), "
+            "para probar en desarrollo las lecturas de reportes desde la réplica.")
+
+    def handle(self, *args, **opts):
+        if ALIAS not in settings.DATABASES:
+            raise CommandError("No hay réplica configurada: defina DATABASE_REPLICA_URL.")
+        primaria, replica = settings.DATABASES['default'], settings.DATABASES[ALIAS]
+        if not (primaria['ENGINE'].endswith('sqlite3') and replica['ENGINE'].endswith('sqlite3')):
+            raise CommandError("Solo aplica a SQLite; con Postgres la réplica la mantiene el servidor.")
+        if str(primaria['NAME']) == str(replica['NAME']):
+            raise CommandError("La réplica apunta al mismo archivo que la base principal.")
+
+        # API de backup de SQLite: copia consistente aunque la app esté escribiendo
+        origen = sqlite3.connect(str(primaria['NAME']))
+        destino = sqlite3.connect(str(replica['NAME']))
+        try:
+            with destino:
+                origen.backup(destino)
+        finally:
+            destino.close()
+            origen.close()
+        self.stdout.write(self.style.SUCCESS(f"Réplica actualizada: {replica['NAME']}"))
@@ -0,0 +1,44 @@
+# inventario/management/commands/tomar_fotos_stock.py
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from inventario.fotos_stock import fechas_a_fotografiar, tomar_fotos
+from inventario.models import FotoStock, MovimientoStock, Tienda
+
+
+class Command(BaseCommand):
+    help = ("Guarda fotos de stock y costo por producto al cierre de cada día (o de cada mes). "
+            "Sin --desde continúa desde la última foto de cada tienda; pensado para correr cada noche.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tienda', type=int, help="ID de la tienda (por defecto, todas)")
+        parser.add_argument('--periodo', choices=['diario', 'mensual'], default='diario')
+        parser.add_argument('--desde', type=date.fromisoformat, help="Primer día (AAAA-MM-DD)")
+        parser.add_argument('--hasta', type=date.fromisoformat, help="Último día (por defecto, ayer)")
+
+    def handle(self, *args, **opts):
+        hasta = opts['hasta'] or timezone.localdate() - timedelta(days=1)
+        tiendas = Tienda.objects.all()
+        if opts['tienda']:
+            tiendas = tiendas.filter(id=opts['tienda'])
+        for tienda in tiendas:
+            desde = opts['desde'] or self._continuar_desde(tienda)
+            if desde is None or desde > hasta:
+                self.stdout.write(f"  {tienda.nombre}: al día")
+                continue
+            inicio = time.perf_counter()
+            filas = tomar_fotos(tienda, fechas_a_fotografiar(desde, hasta, opts['periodo']))
+            self.stdout.write(f"  {tienda.nombre}: {filas} foto(s) del {desde} al {hasta} "
+                              f"en {time.perf_counter() - inicio:.2f} s")
+        self.stdout.write(self.style.SUCCESS("Fotos de stock actualizadas."))
+
+    def _continuar_desde(self, tienda):
+        ultima = FotoStock.objects.filter(tienda=tienda).aggregate(ultima=Max('fecha'))['ultima']
+        if ultima:
+            return ultima + timedelta(days=1)
+        primero = MovimientoStock.objects.filter(producto__tienda=tienda).aggregate(primero=Min('fecha'))['primero']
+        return timezone.localdate(primero) if primero else None
@@ -0,0 +1,39 @@
+# inventario/management/commands/verificar_kardex.py
+from django.core.management.base import BaseCommand
+
+from inventario.integridad import reiniciar_puntos_control, verificar_kardex
+from inventario.models import Tienda
+
+
+class Command(BaseCommand):
+    help = ("Compara el stock de cada producto con la suma de su Kardex (solo los movimientos nuevos "
+            "desde la última verificación) y reporta las diferencias.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tienda', type=int, help="ID de la tienda (por defecto, todas)")
+        parser.add_argument('--corregir', action='store_true',
+                            help="Escribe movimientos de ajuste para que el Kardex cuadre con el stock")
+        parser.add_argument('--desde-cero', action='store_true',
+                            help="Descarta los puntos de control y verifica toda la historia")
+
+    def handle(self, *args, **opts):
+        tiendas = Tienda.objects.all()
+        if opts['tienda']:
+            tiendas = tiendas.filter(id=opts['tienda'])
+        total = 0
+        for tienda in tiendas:
+            if opts['desde_cero']:
+                reiniciar_puntos_control(tienda)
+            diferencias = verificar_kardex(tienda, corregir=opts['corregir'])
+            total += len(diferencias)
+            for d in diferencias:
+                self.stdout.write(self.style.WARNING(
+                    f"  [{tienda.nombre}] {d['nombre']} (id={d['producto_id']}): stock {d['stock']}, "
+                    f"Kardex {d['esperado']}, diferencia {d['diferencia']:+}"
+                ))
+        if not total:
+            self.stdout.write(self.style.SUCCESS("El Kardex cuadra con el stock de todos los productos."))
+        elif opts['corregir']:
+            self.stdout.write(self.style.SUCCESS(f"{total} diferencia(s) compensadas con ajustes en el Kardex."))
+        else:
+            self.stdout.write(self.style.ERROR(f"{total} diferencia(s). Use --corregir para registrar los ajustes."))
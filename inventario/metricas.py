@@ -0,0 +1,299 @@
+# inventario/metricas.py
+"""
+Métricas en formato de texto de Prometheus (sin dependencias externas).
+
+Los contadores e histogramas viven en memoria del proceso: registrar un valor
+es solo sumar en un diccionario, así que el checkout no paga nada extra.
+
+Con varios workers de gunicorn se define METRICS_MULTIPROC_DIR: cada proceso
+escribe su foto en `<dir>/metricas_<pid>_<inicio>.json` desde un hilo en
+segundo plano cada METRICS_FLUSH_SECONDS, y el endpoint /metrics suma las fotos
+de todos. El inicio evita que un worker nuevo que hereda el PID de uno muerto
+pise su archivo; en cada scrape se borran las fotos de PIDs que ya no existen o
+que no se reescriben hace METRICS_STALE_SECONDS (sus contadores bajan y
+Prometheus lo trata como un reinicio del contador).
+Los "gauges" (ej. cajas abiertas) se calculan recién al momento del scrape.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_REGISTRO = {}
+_GAUGES = {}
+_lock = threading.Lock()
+_escritor_iniciado = False
+_proceso = (None, 0)  # (pid, inicio): se recalcula si el proceso es un fork
+
+ARCHIVO_FOTO = re.compile(r'^metricas_(\d+)(?:_\d+)?\.json$')
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+# ==============================================================================
+# TIPOS DE MÉTRICA
+# ==============================================================================
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        _REGISTRO[nombre] = self
+
+    def _clave(self, etiquetas):
+        return tuple(str(etiquetas.get(e, '')) for e in self.etiquetas)
+
+    def foto(self):
+        with _lock:
+            return {json.dumps(list(k)): v if not isinstance(v, list) else list(v) for k, v in self._valores.items()}
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def inc(self, cantidad=1, **etiquetas):
+        _asegurar_escritor()
+        clave = self._clave(etiquetas)
+        with _lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+
+class Histograma(_Metrica):
+    """Guarda por cada combinación de etiquetas: [conteo por bucket..., suma, total]."""
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **etiquetas):
+        _asegurar_escritor()
+        clave = self._clave(etiquetas)
+        with _lock:
+            datos = self._valores.get(clave)
+            if datos is None:
+                datos = self._valores[clave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    datos[i] += 1
+                    break
+            datos[-2] += valor
+            datos[-1] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+
+def gauge(nombre, ayuda):
+    """Decorador: la función se evalúa solo al hacer scrape y devuelve {(etiqueta=valor,...): número}."""
+    def decorador(funcion):
+        _GAUGES[nombre] = (ayuda, funcion)
+        return funcion
+    return decorador
+
+
+# ==============================================================================
+# MÉTRICAS DE NEGOCIO Y DE RUNTIME
+# ==============================================================================
+
+comprobantes_emitidos = Contador(
+    'ferreteria_comprobantes_emitidos_total', 'Comprobantes emitidos', ('tienda', 'tipo'))
+checkout_segundos = Histograma(
+    'ferreteria_checkout_segundos', 'Latencia de emisión de comprobantes en el POS', ('tienda',))
+tamano_carrito = Histograma(
+    'ferreteria_carrito_items', 'Cantidad de líneas por venta', ('tienda',),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100))
+rechazos_sin_stock = Contador(
+    'ferreteria_rechazos_sin_stock_total', 'Ventas rechazadas por stock insuficiente', ('tienda',))
+
+importacion_segundos = Histograma(
+    'ferreteria_importacion_segundos', 'Duración de importaciones de Excel/CSV', ('modelo',))
+exportacion_segundos = Histograma(
+    'ferreteria_exportacion_segundos', 'Duración de exportaciones a Excel', ('modelo',))
+pdf_segundos = Histograma(
+    'ferreteria_pdf_segundos', 'Tiempo de render de PDFs', ('documento',))
+cache_consultas = Contador(
+    'ferreteria_cache_consultas_total', 'Lecturas de caché (resultado=hit|miss)', ('cache', 'resultado'))
+
+
+def registrar_cache(nombre, hit):
+    cache_consultas.inc(cache=nombre, resultado='hit' if hit else 'miss')
+
+
+@gauge('ferreteria_cajas_abiertas', 'Cajas abiertas por tienda')
+def _cajas_abiertas():
+    from django.db.models import Count
+    from .models import CajaDiaria
+
+    filas = CajaDiaria.objects.filter(estado='ABIERTA').values('tienda_id').annotate(n=Count('id'))
+    return {(('tienda', str(f['tienda_id'])),): f['n'] for f in filas}
+
+
+# ==============================================================================
+# MODO MULTIPROCESO (DIRECTORIO COMPARTIDO)
+# ==============================================================================
+
+def _directorio():
+    return getattr(settings, 'METRICS_MULTIPROC_DIR', '') or ''
+
+
+def _ruta_propia(directorio):
+    global _proceso
+    if _proceso[0] != os.getpid():
+        _proceso = (os.getpid(), time.time_ns())
+    pid, inicio = _proceso
+    return os.path.join(directorio, f'metricas_{pid}_{inicio}.json')
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, pero es de otro usuario
+    return True
+
+
+def _vencida(ruta, pid, limite):
+    """La foto de un worker que murió o que dejó de escribir (ej. se colgó)."""
+    try:
+        return not _proceso_vivo(pid) or os.path.getmtime(ruta) < limite
+    except OSError:
+        return True
+
+
+def escribir_foto():
+    """Guarda los valores de este proceso de forma atómica (tmp + rename)."""
+    directorio = _directorio()
+    if not directorio:
+        return
+    os.makedirs(directorio, exist_ok=True)
+    ruta = _ruta_propia(directorio)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w') as f:
+        json.dump({m.nombre: m.foto() for m in _REGISTRO.values()}, f)
+    os.replace(temporal, ruta)
+
+
+def _bucle_escritor():
+    intervalo = getattr(settings, 'METRICS_FLUSH_SECONDS', 10)
+    while True:
+        time.sleep(intervalo)
+        try:
+            escribir_foto()
+        except Exception:
+            # Cualquier error se registra y el hilo sigue: si muriera, /metrics dejaría de ver este worker
+            logger.exception("No se pudo escribir la foto de métricas.")
+
+
+def _asegurar_escritor():
+    global _escritor_iniciado
+    if _escritor_iniciado or not _directorio():
+        return
+    with _lock:
+        if _escritor_iniciado:
+            return
+        _escritor_iniciado = True
+    threading.Thread(target=_bucle_escritor, name='metricas-escritor', daemon=True).start()
+
+
+def _fotos_combinadas():
+    """Suma las fotos de todos los procesos; la de este proceso se toma en vivo."""
+    total = {m.nombre: {} for m in _REGISTRO.values()}
+    fotos = [{m.nombre: m.foto() for m in _REGISTRO.values()}]
+
+    directorio = _directorio()
+    if directorio and os.path.isdir(directorio):
+        propia = os.path.basename(_ruta_propia(directorio))
+        limite = time.time() - getattr(settings, 'METRICS_STALE_SECONDS', 60)
+        for archivo in os.listdir(directorio):
+            coincide = ARCHIVO_FOTO.match(archivo)
+            if not coincide or archivo == propia:
+                continue
+            ruta = os.path.join(directorio, archivo)
+            if _vencida(ruta, int(coincide.group(1)), limite):
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(ruta) as f:
+                    fotos.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    for foto in fotos:
+        for nombre, valores in foto.items():
+            if nombre not in total:
+                continue
+            for clave, valor in valores.items():
+                actual = total[nombre].get(clave)
+                if actual is None:
+                    total[nombre][clave] = valor
+                elif isinstance(valor, list):
+                    total[nombre][clave] = [a + b for a, b in zip(actual, valor)]
+                else:
+                    total[nombre][clave] = actual + valor
+    return total
+
+
+# ==============================================================================
+# EXPOSICIÓN EN FORMATO TEXTO
+# ==============================================================================
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatear_etiquetas(pares):
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+
+def exponer():
+    """Devuelve todas las métricas en el formato de exposición de Prometheus 0.0.4."""
+    lineas = []
+    combinadas = _fotos_combinadas()
+
+    for metrica in _REGISTRO.values():
+        lineas.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+        for clave, valor in sorted(combinadas[metrica.nombre].items()):
+            pares = list(zip(metrica.etiquetas, json.loads(clave)))
+            if metrica.tipo == 'counter':
+                lineas.append(f'{metrica.nombre}{_formatear_etiquetas(pares)} {valor}')
+                continue
+            acumulado = 0
+            for limite, cantidad in zip(metrica.buckets, valor):
+                acumulado += cantidad
+                lineas.append(f'{metrica.nombre}_bucket{_formatear_etiquetas(pares + [("le", limite)])} {acumulado}')
+            lineas.append(f'{metrica.nombre}_bucket{_formatear_etiquetas(pares + [("le", "+Inf")])} {valor[-1]}')
+            lineas.append(f'{metrica.nombre}_sum{_formatear_etiquetas(pares)} {valor[-2]}')
+            lineas.append(f'{metrica.nombre}_count{_formatear_etiquetas(pares)} {valor[-1]}')
+
+    for nombre, (ayuda, funcion) in _GAUGES.items():
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} gauge')
+        for pares, valor in funcion().items():
+            lineas.append(f'{nombre}{_formatear_etiquetas(pares)} {valor}')
+
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,138 @@
+# inventario/middleware.py
+#
+# Todos los middlewares de este módulo soportan modo sync (WSGI/gunicorn) y
+# async (ASGI/uvicorn). Si uno solo fuera sync, Django pasaría cada petición
+# ASGI por un hilo aunque la vista sea async.
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import perfilador
+from .replicas import marcar_escritura
+from .consultas_lentas import capturar_consultas, iniciar_volcado
+
+
+class _SyncYAsync:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.procesar(request)
+
+
+# ==============================================================================
+# ESTÁTICOS (WHITENOISE)
+# ==============================================================================
+
+class EstaticosMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware (6.6 es solo sync) con un camino async para ASGI."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+# ==============================================================================
+# RÉPLICA DE LECTURA: LECTURA PROPIA (ver replicas.py)
+# ==============================================================================
+
+class LecturaPropiaMiddleware(_SyncYAsync):
+    """Marca con una cookie a quien acaba de escribir, para que sus reportes lean del primario."""
+
+    def procesar(self, request):
+        return marcar_escritura(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return marcar_escritura(request, await self.get_response(request))
+
+
+# ==============================================================================
+# MONITOREO: CONSULTAS SQL LENTAS
+# ==============================================================================
+
+class ConsultasLentasMiddleware(_SyncYAsync):
+    """
+    Mide todas las consultas de la petición y guarda las lentas junto con la
+    vista que las originó. El volcado a la base de datos lo hace un hilo en
+    segundo plano (ver consultas_lentas.iniciar_volcado), fuera de la petición.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.activo = getattr(settings, 'SLOW_QUERY_CAPTURE', False)
+        if self.activo:
+            iniciar_volcado()
+
+    def procesar(self, request):
+        if not self.activo:
+            return self.get_response(request)
+
+        with capturar_consultas(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self.activo:
+            return await self.get_response(request)
+
+        # Las conexiones son por hilo: el capturador se instala en el hilo donde
+        # sync_to_async corre el ORM de esta petición, no en el del event loop.
+        captura = capturar_consultas(request)
+        await sync_to_async(captura.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(captura.__exit__)(None, None, None)
+        return response
+
+
+# ==============================================================================
+# PERFILADOR BAJO DEMANDA (?__profile=1)
+# ==============================================================================
+
+class PerfiladorMiddleware(_SyncYAsync):
+    """
+    Con `?__profile=1` y un superusuario logueado, devuelve el reporte de
+    cProfile + SQL + plantillas de esa misma petición. Sin el parámetro solo
+    se revisa el query string, así que puede quedar activo en producción.
+    """
+
+    def procesar(self, request):
+        if not perfilador.solicitado(request):
+            return self.get_response(request)
+        _, texto = perfilador.perfilar(request, self.get_response)
+        return HttpResponse(texto, content_type='text/plain; charset=utf-8')
+
+    async def __acall__(self, request):
+        if perfilador.PARAMETRO not in request.META.get('QUERY_STRING', ''):
+            return await self.get_response(request)
+        if not await sync_to_async(perfilador.solicitado)(request):
+            return await self.get_response(request)
+        # Bajo ASGI cProfile solo ve el hilo sync de la petición (ORM, plantillas),
+        # no el código que corre en el event loop.
+        _, texto = await sync_to_async(perfilador.perfilar)(request, async_to_sync(self.get_response))
+        return HttpResponse(texto, content_type='text/plain; charset=utf-8')
@@ -0,0 +1,95 @@
+# Generated by Django 5.0.2 on 2026-10-19 16:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0002_agregar_caja'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='saldo_deudora',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=10, verbose_name='Deuda Pendiente'),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='estado_pago',
+            field=models.BooleanField(default=True, help_text='True=Pagado, False=Deuda pendiente'),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='hash_sunat',
+            field=models.CharField(blank=True, help_text='Hash digital simulado (SUNAT Mock)', max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='metodo_pago',
+            field=models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('CREDITO', 'Crédito (Fiao)'), ('TRANSFERENCIA', 'Transferencia / Yape / Plin')], default='EFECTIVO', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='monto_abonado',
+            field=models.DecimalField(decimal_places=2, default=0.0, help_text='Monto pagado al momento de la venta', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='categoria',
+            field=models.CharField(choices=[('MATERIALES', 'Materiales de Construcción'), ('HERRAMIENTAS', 'Herramientas'), ('PINTURAS', 'Pinturas y Acabados'), ('SEGURIDAD', 'Seguridad Industrial'), ('OTROS', 'Otros')], default='OTROS', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='detallecomprobante',
+            name='precio_unitario_con_igv',
+            field=models.DecimalField(decimal_places=2, help_text='Precio unitario CON IGV (el precio de venta final)', max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='unidad_medida',
+            field=models.CharField(choices=[('UND', 'Unidad'), ('MTS', 'Metros'), ('KG', 'Kilogramos'), ('LTS', 'Litros'), ('CJ', 'Caja'), ('BOL', 'Bolsa')], default='UND', help_text='Ej: UND, MTS, KG, LTS, CAJA', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='tienda',
+            name='logo',
+            field=models.ImageField(blank=True, help_text='Logo de la tienda (se mostrará en la interfaz)', null=True, upload_to='logos_tiendas/'),
+        ),
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ENTRADA', 'Entrada (+)'), ('SALIDA', 'Salida (-)')], max_length=10)),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stock_antes', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stock_despues', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('motivo', models.CharField(help_text='Ej: Venta B001, Compra, Ajuste Manual', max_length=255)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_kardex', to='inventario.producto')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Stock (Kardex)',
+                'verbose_name_plural': 'Movimientos de Stock (Kardex)',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PagoCredito',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('metodo', models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('TRANSFERENCIA', 'Transferencia')], default='EFECTIVO', max_length=20)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='abonos', to='inventario.cliente')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Abono / Pago de Crédito',
+                'verbose_name_plural': 'Abonos / Pagos de Créditos',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.2 on 2026-10-19 16:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0003_cliente_saldo_deudora_comprobante_estado_pago_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaLenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('huella', models.CharField(db_index=True, help_text='SHA1 del SQL normalizado', max_length=40)),
+                ('sql_normalizado', models.TextField()),
+                ('forma_parametros', models.CharField(blank=True, help_text='Tipos de los parámetros, sin valores', max_length=255)),
+                ('vista', models.CharField(blank=True, max_length=150)),
+                ('ejecuciones', models.PositiveIntegerField(default=0)),
+                ('tiempo_total_ms', models.FloatField(default=0)),
+                ('tiempo_max_ms', models.FloatField(default=0)),
+                ('primera_vez', models.DateTimeField(auto_now_add=True)),
+                ('ultima_vez', models.DateTimeField()),
+                ('tienda', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='consultas_lentas', to='inventario.tienda')),
+            ],
+            options={
+                'verbose_name': 'Consulta Lenta',
+                'verbose_name_plural': 'Consultas Lentas',
+                'ordering': ['-tiempo_total_ms'],
+                'unique_together': {('huella', 'vista', 'tienda')},
+            },
+        ),
+    ]
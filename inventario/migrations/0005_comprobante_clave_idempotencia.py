@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0004_consulta_lenta'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='comprobante',
+            unique_together={('tienda', 'tipo_comprobante', 'serie', 'numero')},
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='comprobante',
+            unique_together={('tienda', 'clave_idempotencia'), ('tienda', 'tipo_comprobante', 'serie', 'numero')},
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+from inventario.models import normalizar_busqueda
+
+
+def llenar_nombre_busqueda(apps, schema_editor):
+    Cliente = apps.get_model('inventario', 'Cliente')
+    lote = []
+    for cliente in Cliente.objects.only('id', 'razon_social', 'nombre_completo').iterator(chunk_size=2000):
+        cliente.nombre_busqueda = normalizar_busqueda(cliente.razon_social or cliente.nombre_completo)[:200]
+        lote.append(cliente)
+        if len(lote) == 2000:
+            Cliente.objects.bulk_update(lote, ['nombre_busqueda'])
+            lote = []
+    Cliente.objects.bulk_update(lote, ['nombre_busqueda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0005_comprobante_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='nombre_busqueda',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(llenar_nombre_busqueda, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nombre_busqueda'], name='cliente_nombre_prefijo_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['dni'], name='cliente_dni_prefijo_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['ruc'], name='cliente_ruc_prefijo_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['dni_ruc'], name='cliente_dniruc_prefijo_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from inventario.cobranzas import reconstruir_asignaciones
+
+
+def asignar_abonos_existentes(apps, schema_editor):
+    # Reparte los abonos ya registrados (FIFO por fecha) sobre los créditos existentes
+    reconstruir_asignaciones(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_cliente_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AplicacionAbono',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+            options={
+                'verbose_name': 'Aplicación de Abono',
+                'verbose_name_plural': 'Aplicaciones de Abonos',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='comprobante',
+            index=models.Index(condition=models.Q(('estado_pago', False), ('metodo_pago', 'CREDITO')), fields=['tienda', 'cliente', 'fecha_emision'], name='comprobante_credito_idx'),
+        ),
+        migrations.AddField(
+            model_name='aplicacionabono',
+            name='comprobante',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aplicaciones_abono', to='inventario.comprobante'),
+        ),
+        migrations.AddField(
+            model_name='aplicacionabono',
+            name='pago',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aplicaciones', to='inventario.pagocredito'),
+        ),
+        migrations.RunPython(asignar_abonos_existentes, migrations.RunPython.noop),
+    ]
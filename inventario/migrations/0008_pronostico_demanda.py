@@ -0,0 +1,34 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0007_cuentas_por_cobrar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoDemanda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nivel', models.FloatField(default=0, help_text='Media móvil exponencial de la venta diaria')),
+                ('nivel_cuadrado', models.FloatField(default=0, help_text='Media móvil exponencial del cuadrado (para la desviación)')),
+                ('demanda_diaria', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('desviacion', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('punto_reorden', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('stock_objetivo', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('hasta_fecha', models.DateField()),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pronostico', to='inventario.producto')),
+                ('tienda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pronosticos', to='inventario.tienda')),
+            ],
+            options={
+                'verbose_name': 'Pronóstico de Demanda',
+                'verbose_name_plural': 'Pronósticos de Demanda',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:32
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def marcar_costo_inicial(apps, schema_editor):
+    # El Kardex anterior no tiene costos: el último movimiento de cada producto queda
+    # con su costo actual como punto de partida del promedio (ver costeo.recalcular_desde_kardex)
+    Producto = apps.get_model('inventario', 'Producto')
+    MovimientoStock = apps.get_model('inventario', 'MovimientoStock')
+    ultimos = MovimientoStock.objects.values('producto_id').annotate(ultimo=Max('id')).values_list('ultimo', flat=True)
+    costos = dict(Producto.objects.values_list('id', 'costo'))
+    movimientos = list(MovimientoStock.objects.filter(id__in=list(ultimos)).only('id', 'producto_id'))
+    for m in movimientos:
+        m.costo_promedio = costos[m.producto_id]
+    MovimientoStock.objects.bulk_update(movimientos, ['costo_promedio'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0008_pronostico_demanda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientostock',
+            name='costo_promedio',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Costo promedio del producto después del movimiento', max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='movimientostock',
+            name='costo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Costo de la entrada (compra o devolución); vacío si no mueve el promedio', max_digits=12, null=True),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='costo',
+            field=models.DecimalField(decimal_places=4, default=0.0, max_digits=12),
+        ),
+        migrations.RunPython(marcar_costo_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_costo_promedio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FotoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('stock', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('costo_promedio', models.DecimalField(decimal_places=4, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Foto de Stock',
+                'verbose_name_plural': 'Fotos de Stock',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['producto', 'fecha'], name='kardex_producto_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='fotostock',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fotos_stock', to='inventario.producto'),
+        ),
+        migrations.AddField(
+            model_name='fotostock',
+            name='tienda',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fotos_stock', to='inventario.tienda'),
+        ),
+        migrations.AddIndex(
+            model_name='fotostock',
+            index=models.Index(fields=['tienda', 'fecha'], name='fotostock_tienda_fecha_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='fotostock',
+            unique_together={('producto', 'fecha')},
+        ),
+    ]
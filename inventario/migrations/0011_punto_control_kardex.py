@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0010_fotos_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoControlKardex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_movimiento_id', models.BigIntegerField(default=0)),
+                ('stock_kardex', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('verificado_en', models.DateTimeField(auto_now=True)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='punto_control_kardex', to='inventario.producto')),
+            ],
+            options={
+                'verbose_name': 'Punto de Control del Kardex',
+                'verbose_name_plural': 'Puntos de Control del Kardex',
+            },
+        ),
+    ]
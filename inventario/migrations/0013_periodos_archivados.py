@@ -0,0 +1,38 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_bitacoras_sin_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodoArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes archivado')),
+                ('archivo', models.CharField(max_length=500)),
+                ('comprobantes', models.PositiveIntegerField(default=0)),
+                ('comprobantes_emitidos', models.PositiveIntegerField(default=0)),
+                ('detalles', models.PositiveIntegerField(default=0)),
+                ('movimientos_stock', models.PositiveIntegerField(default=0)),
+                ('movimientos_caja', models.PositiveIntegerField(default=0)),
+                ('ventas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('venta_neta', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo_ventas', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('archivado_en', models.DateTimeField(auto_now_add=True)),
+                ('tienda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='periodos_archivados', to='inventario.tienda')),
+            ],
+            options={
+                'verbose_name': 'Periodo Archivado',
+                'verbose_name_plural': 'Periodos Archivados',
+                'ordering': ['tienda', 'mes'],
+                'unique_together': {('tienda', 'mes')},
+            },
+        ),
+    ]
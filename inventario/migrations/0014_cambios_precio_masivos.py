@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0013_periodos_archivados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioPrecioMasivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('campo', models.CharField(choices=[('precio', 'Precio de venta'), ('costo', 'Costo')], max_length=10)),
+                ('modo', models.CharField(choices=[('PORCENTAJE', 'Porcentaje (%)'), ('MONTO', 'Monto fijo (S/)')], max_length=10)),
+                ('valor', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('redondeo', models.DecimalField(decimal_places=2, help_text='Múltiplo al que se redondea el resultado', max_digits=6)),
+                ('filtros', models.JSONField(blank=True, default=dict)),
+                ('productos', models.PositiveIntegerField(default=0)),
+                ('detalle', models.JSONField(blank=True, default=list, help_text='[[producto_id, antes, después], ...]')),
+                ('tienda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios_precio', to='inventario.tienda')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cambio Masivo de Precios',
+                'verbose_name_plural': 'Cambios Masivos de Precios',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
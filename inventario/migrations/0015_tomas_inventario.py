@@ -0,0 +1,48 @@
+# Generated by Django 5.0.2 on 2026-10-19 18:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0014_cambios_precio_masivos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TomaInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creada_en', models.DateTimeField(auto_now_add=True)),
+                ('aplicada_en', models.DateTimeField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('ABIERTA', 'En conteo'), ('APLICADA', 'Aplicada'), ('CANCELADA', 'Cancelada')], default='ABIERTA', max_length=10)),
+                ('observaciones', models.CharField(blank=True, max_length=255)),
+                ('tienda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tomas_inventario', to='inventario.tienda')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Toma de Inventario',
+                'verbose_name_plural': 'Tomas de Inventario',
+                'ordering': ['-creada_en'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ConteoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stock_sistema', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conteos_inventario', to='inventario.producto')),
+                ('toma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conteos', to='inventario.tomainventario')),
+            ],
+            options={
+                'verbose_name': 'Conteo de Inventario',
+                'verbose_name_plural': 'Conteos de Inventario',
+                'unique_together': {('toma', 'producto')},
+            },
+        ),
+    ]
@@ -1,11 +1,16 @@
 # inventario/models.py
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from decimal import Decimal
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+import unicodedata
 import uuid # Necesario para el Hash SUNAT simulado
 
+def normalizar_busqueda(texto):
+    """Mayúsculas y sin tildes: 'José Muñoz' -> 'JOSE MUNOZ'. Para búsquedas por prefijo indexadas."""
+    sin_tildes = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(sin_tildes.upper().split())
+
 # === MODELO MULTI-TENANT (Tienda) ===
 class Tienda(models.Model):
     propietario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='tienda')
@@ -49,7 +54,8 @@ class Producto(models.Model):
     codigo_barras = models.CharField(max_length=100, blank=True, null=True)
     # CAMBIO FERRETERÍA: DecimalField para permitir 1.5 metros, etc.
     stock = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    costo = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    # Costo promedio ponderado: lo actualiza cada compra (ver costeo.py)
+    costo = models.DecimalField(max_digits=12, decimal_places=4, default=0.00)
     precio = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     # UNIDADES: Mejorado con opciones predefinidas para evitar errores de escritura
     unidad_medida = models.CharField(max_length=10, choices=UNIDADES_CHOICES, default='UND', help_text="Ej: UND, MTS, KG, LTS, CAJA")
@@ -71,6 +77,10 @@ class MovimientoStock(models.Model):
     stock_antes = models.DecimalField(max_digits=10, decimal_places=2)
     stock_despues = models.DecimalField(max_digits=10, decimal_places=2)
     motivo = models.CharField(max_length=255, help_text="Ej: Venta B001, Compra, Ajuste Manual")
+    costo_unitario = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True,
+                                         help_text="Costo de la entrada (compra o devolución); vacío si no mueve el promedio")
+    costo_promedio = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True,
+                                         help_text="Costo promedio del producto después del movimiento")
     fecha = models.DateTimeField(auto_now_add=True)
     usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
@@ -78,6 +88,8 @@ class MovimientoStock(models.Model):
         verbose_name = "Movimiento de Stock (Kardex)"
         verbose_name_plural = "Movimientos de Stock (Kardex)"
         ordering = ['-fecha']
+        # Stock a una fecha (fotos_stock.py) y Kardex por producto
+        indexes = [models.Index(fields=['producto', 'fecha'], name='kardex_producto_fecha_idx')]
 
 class Proveedor(models.Model):
     tienda = models.ForeignKey(Tienda, on_delete=models.CASCADE, related_name='proveedores')
@@ -117,15 +129,33 @@ class Cliente(models.Model):
     # CRÉDITOS: Seguimiento de deuda por cliente
     saldo_deudora = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name="Deuda Pendiente")
 
+    # BÚSQUEDA DEL POS: nombre mostrado (razón social o nombre) normalizado con normalizar_busqueda
+    nombre_busqueda = models.CharField(max_length=200, blank=True, default='', editable=False)
+
     class Meta:
         unique_together = ('tienda', 'dni_ruc')
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
+        # varchar_pattern_ops: en PostgreSQL permite usar el índice con LIKE 'prefijo%'
+        # (los demás motores ignoran opclasses y crean un índice normal)
+        indexes = [
+            models.Index(fields=['nombre_busqueda'], name='cliente_nombre_prefijo_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['dni'], name='cliente_dni_prefijo_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['ruc'], name='cliente_ruc_prefijo_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['dni_ruc'], name='cliente_dniruc_prefijo_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         nombre_a_mostrar = self.razon_social if self.razon_social else self.nombre_completo
         return f"{nombre_a_mostrar} ({self.tienda.nombre})"
 
+    def preparar_busqueda(self):
+        self.nombre_busqueda = normalizar_busqueda(self.razon_social or self.nombre_completo)[:200]
+
+    def save(self, *args, **kwargs):
+        self.preparar_busqueda()
+        super().save(*args, **kwargs)
+
 class Venta(models.Model):
     tienda = models.ForeignKey(Tienda, on_delete=models.CASCADE, related_name='ventas')
     cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name='ventas_realizadas')
@@ -203,11 +233,19 @@ class Comprobante(models.Model):
     
     observaciones = models.TextField(blank=True, null=True)
 
+    # VENTAS OFFLINE: clave que genera el POS para que un reintento no duplique la venta
+    clave_idempotencia = models.CharField(max_length=64, blank=True, null=True, editable=False)
+
     class Meta:
-        unique_together = ('tienda', 'tipo_comprobante', 'serie', 'numero')
+        unique_together = [('tienda', 'tipo_comprobante', 'serie', 'numero'), ('tienda', 'clave_idempotencia')]
         verbose_name = "Comprobante"
         verbose_name_plural = "Comprobantes"
         ordering = ['-fecha_emision']
+        # CUENTAS POR COBRAR: solo los créditos con saldo (FIFO de abonos y antigüedad de deuda)
+        indexes = [
+            models.Index(fields=['tienda', 'cliente', 'fecha_emision'], name='comprobante_credito_idx',
+                         condition=models.Q(metodo_pago='CREDITO', estado_pago=False)),
+        ]
 
     def __str__(self):
         return f"{self.tienda.nombre} - {self.tipo_comprobante} {self.serie}-{self.numero}"
@@ -267,21 +305,23 @@ class PagoCredito(models.Model):
         verbose_name = "Abono / Pago de Crédito"
         verbose_name_plural = "Abonos / Pagos de Créditos"
 
-@receiver(post_save, sender=Compra)
-def actualizar_stock_post_compra(sender, instance, created, **kwargs):
-    if created:
-        producto = instance.producto
-        if producto.tienda == instance.tienda:
-            producto.stock += instance.cantidad
-            producto.save()
-            print(f"SEÑAL RECIBIDA: Stock de '{producto.nombre}' actualizado.")
-        else:
-            print(f"ERROR: Tiendas no coinciden.")
+class AplicacionAbono(models.Model):
+    """Qué parte de un abono pagó qué comprobante al crédito (asignación FIFO, ver cobranzas.py)"""
+    pago = models.ForeignKey(PagoCredito, on_delete=models.CASCADE, related_name='aplicaciones')
+    comprobante = models.ForeignKey(Comprobante, on_delete=models.CASCADE, related_name='aplicaciones_abono')
+    monto = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Aplicación de Abono"
+        verbose_name_plural = "Aplicaciones de Abonos"
 
 class LoginLog(models.Model):
-    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='login_logs')
+    # Sin constraint ni SET_NULL: la tabla puede vivir en otra base (ver bitacoras.py);
+    # si el usuario se borra, queda username_tried
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+                             related_name='login_logs')
     username_tried = models.CharField(max_length=150, help_text="Nombre de usuario que se intentó usar")
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # Al ocurrir, no al volcarse el lote
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     is_successful = models.BooleanField(default=False)
 
@@ -334,3 +374,184 @@ class MovimientoCaja(models.Model):
 
     def __str__(self):
         return f"{self.tipo}: {self.monto} - {self.concepto}"
+
+# === MONITOREO: CONSULTAS SQL LENTAS (ver consultas_lentas.py) ===
+class ConsultaLenta(models.Model):
+    """Consultas que superaron SLOW_QUERY_THRESHOLD_MS, acumuladas por consulta, vista y tienda."""
+    huella = models.CharField(max_length=40, db_index=True, help_text="SHA1 del SQL normalizado")
+    sql_normalizado = models.TextField()
+    forma_parametros = models.CharField(max_length=255, blank=True, help_text="Tipos de los parámetros, sin valores")
+    vista = models.CharField(max_length=150, blank=True)
+    tienda = models.ForeignKey(Tienda, on_delete=models.SET_NULL, null=True, blank=True, related_name='consultas_lentas')
+    ejecuciones = models.PositiveIntegerField(default=0)
+    tiempo_total_ms = models.FloatField(default=0)
+    tiempo_max_ms = models.FloatField(default=0)
+    primera_vez = models.DateTimeField(auto_now_add=True)
+    ultima_vez = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('huella', 'vista', 'tienda')
+        ordering = ['-tiempo_total_ms']
+        verbose_name = "Consulta Lenta"
+        verbose_name_plural = "Consultas Lentas"
+
+    def __str__(self):
+        return f"{self.vista}: {self.sql_normalizado[:80]}"
+
+    @property
+    def tiempo_promedio_ms(self):
+        return self.tiempo_total_ms / self.ejecuciones if self.ejecuciones else 0
+
+# === PRONÓSTICO DE DEMANDA Y PUNTO DE REORDEN (ver pronosticos.py) ===
+class PronosticoDemanda(models.Model):
+    """
+    Estado del suavizado exponencial de la demanda diaria de un producto y lo
+    que se deriva de él. Se actualiza de forma incremental: `hasta_fecha` es
+    el último día completo ya incorporado.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name='pronostico')
+    tienda = models.ForeignKey(Tienda, on_delete=models.CASCADE, related_name='pronosticos')
+    nivel = models.FloatField(default=0, help_text="Media móvil exponencial de la venta diaria")
+    nivel_cuadrado = models.FloatField(default=0, help_text="Media móvil exponencial del cuadrado (para la desviación)")
+    demanda_diaria = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    desviacion = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    punto_reorden = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    stock_objetivo = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    hasta_fecha = models.DateField()
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Pronóstico de Demanda"
+        verbose_name_plural = "Pronósticos de Demanda"
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.demanda_diaria}/día, reorden en {self.punto_reorden}"
+
+# === FOTOS DE STOCK (ver fotos_stock.py) ===
+class FotoStock(models.Model):
+    """
+    Stock y valorización de un producto al cierre del día `fecha`. Con estas
+    fotos el stock a cualquier fecha es la foto anterior más los movimientos
+    del Kardex desde entonces, sin recorrer toda la historia.
+    """
+    tienda = models.ForeignKey(Tienda, on_delete=models.CASCADE, related_name='fotos_stock')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='fotos_stock')
+    fecha = models.DateField()
+    stock = models.DecimalField(max_digits=12, decimal_places=2)
+    costo_promedio = models.DecimalField(max_digits=12, decimal_places=4)
+
+    class Meta:
+        verbose_name = "Foto de Stock"
+        verbose_name_plural = "Fotos de Stock"
+        unique_together = ('producto', 'fecha')
+        indexes = [models.Index(fields=['tienda', 'fecha'], name='fotostock_tienda_fecha_idx')]
+
+    def __str__(self):
+        return f"{self.producto_id} al {self.fecha}: {self.stock}"
+
+# === VERIFICACIÓN DEL KARDEX (ver integridad.py) ===
+class PuntoControlKardex(models.Model):
+    """
+    Hasta qué movimiento ya se verificó el Kardex de un producto y cuánto suma
+    hasta ahí. La siguiente verificación solo lee los movimientos posteriores.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name='punto_control_kardex')
+    ultimo_movimiento_id = models.BigIntegerField(default=0)
+    stock_kardex = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    verificado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Punto de Control del Kardex"
+        verbose_name_plural = "Puntos de Control del Kardex"
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.stock_kardex} hasta #{self.ultimo_movimiento_id}"
+
+# === ARCHIVO DE PERIODOS CERRADOS (ver archivo.py) ===
+class PeriodoArchivado(models.Model):
+    """
+    Un mes de una tienda cuyos comprobantes, Kardex y movimientos de caja ya no
+    están en la BD sino en `archivo`. Guarda los totales de venta para que los
+    reportes de meses completos no tengan que abrir el archivo.
+    """
+    tienda = models.ForeignKey(Tienda, on_delete=models.CASCADE, related_name='periodos_archivados')
+    mes = models.DateField(help_text="Primer día del mes archivado")
+    archivo = models.CharField(max_length=500)
+    comprobantes = models.PositiveIntegerField(default=0)
+    comprobantes_emitidos = models.PositiveIntegerField(default=0)
+    detalles = models.PositiveIntegerField(default=0)
+    movimientos_stock = models.PositiveIntegerField(default=0)
+    movimientos_caja = models.PositiveIntegerField(default=0)
+    ventas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    venta_neta = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo_ventas = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    archivado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Periodo Archivado"
+        verbose_name_plural = "Periodos Archivados"
+        unique_together = ('tienda', 'mes')
+        ordering = ['tienda', 'mes']
+
+    def __str__(self):
+        return f"{self.tienda_id} {self.mes:%Y-%m}"
+
+# === CAMBIO MASIVO DE PRECIOS (ver precios.py) ===
+class CambioPrecioMasivo(models.Model):
+    """Auditoría de cada cambio masivo de precio o costo: quién, qué filtro, qué regla y cada valor antes/después."""
+    CAMPOS = [('precio', 'Precio de venta'), ('costo', 'Costo')]
+    MODOS = [('PORCENTAJE', 'Porcentaje (%)'), ('MONTO', 'Monto fijo (S/)')]
+
+    tienda = models.ForeignKey(Tienda, on_delete=models.CASCADE, related_name='cambios_precio')
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+    campo = models.CharField(max_length=10, choices=CAMPOS)
+    modo = models.CharField(max_length=10, choices=MODOS)
+    valor = models.DecimalField(max_digits=12, decimal_places=4)
+    redondeo = models.DecimalField(max_digits=6, decimal_places=2, help_text="Múltiplo al que se redondea el resultado")
+    filtros = models.JSONField(default=dict, blank=True)
+    productos = models.PositiveIntegerField(default=0)
+    detalle = models.JSONField(default=list, blank=True, help_text="[[producto_id, antes, después], ...]")
+
+    class Meta:
+        verbose_name = "Cambio Masivo de Precios"
+        verbose_name_plural = "Cambios Masivos de Precios"
+        ordering = ['-fecha']
+
+    def __str__(self):
+        return f"{self.get_campo_display()} {self.valor} ({self.productos} productos)"
+
+# === TOMA DE INVENTARIO FÍSICO (ver tomas.py) ===
+class TomaInventario(models.Model):
+    """Una sesión de conteo físico. Al aplicarla, el stock de lo contado pasa a ser lo contado."""
+    ESTADOS = [('ABIERTA', 'En conteo'), ('APLICADA', 'Aplicada'), ('CANCELADA', 'Cancelada')]
+
+    tienda = models.ForeignKey(Tienda, on_delete=models.CASCADE, related_name='tomas_inventario')
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    creada_en = models.DateTimeField(auto_now_add=True)
+    aplicada_en = models.DateTimeField(null=True, blank=True)
+    estado = models.CharField(max_length=10, choices=ESTADOS, default='ABIERTA')
+    observaciones = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = "Toma de Inventario"
+        verbose_name_plural = "Tomas de Inventario"
+        ordering = ['-creada_en']
+
+    def __str__(self):
+        return f"Toma #{self.id} ({self.get_estado_display()})"
+
+class ConteoInventario(models.Model):
+    """Lo contado de un producto en una toma; `stock_sistema` se guarda al aplicar."""
+    toma = models.ForeignKey(TomaInventario, on_delete=models.CASCADE, related_name='conteos')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='conteos_inventario')
+    cantidad = models.DecimalField(max_digits=10, decimal_places=2)
+    stock_sistema = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Conteo de Inventario"
+        verbose_name_plural = "Conteos de Inventario"
+        unique_together = ('toma', 'producto')
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.cantidad}"
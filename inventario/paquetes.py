@@ -0,0 +1,218 @@
+# inventario/paquetes.py
+"""
+Respaldo completo de una tienda en un solo ZIP, y su restauración.
+
+`generar_paquete` produce el ZIP por partes (para StreamingHttpResponse o
+para escribir a un archivo): una entrada JSONL por modelo, una fila por
+línea, leída de la BD con `iterator()` de a `lote` filas. Nada se arma
+entero en memoria: cada parte se entrega apenas zipfile la comprime.
+Al final va `manifest.json` con las filas y el SHA-256 de cada entrada.
+
+`restaurar_paquete` carga un paquete en una tienda VACÍA (otra instalación,
+o la misma con otra tienda): verifica las sumas, inserta con bulk_create en
+el orden de MODELOS y traduce cada id viejo al nuevo. Como bulk_create no
+dispara señales ni save(), el Kardex y los correlativos quedan tal cual el
+paquete los trae. Los usuarios no viajan: sus referencias pasan al usuario
+que restaura.
+
+Lo que se recalcula solo (pronósticos, puntos de control del Kardex) y los
+meses archivados (archivo.py) no van en el paquete.
+"""
+import hashlib
+import io
+import json
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .datos_sinteticos import _sin_auto_now
+from .models import (
+    AplicacionAbono, CajaDiaria, Cliente, Compra, Comprobante, DetalleComprobante, FotoStock,
+    MovimientoCaja, MovimientoStock, PagoCredito, Producto, Proveedor, Tienda, Venta,
+)
+
+VERSION = 1
+MANIFIESTO = 'manifest.json'
+
+# (entrada, modelo, camino hasta la tienda). Padres antes que hijos: es el orden de restauración.
+MODELOS = (
+    ('productos', Producto, 'tienda'),
+    ('proveedores', Proveedor, 'tienda'),
+    ('clientes', Cliente, 'tienda'),
+    ('compras', Compra, 'tienda'),
+    ('ventas', Venta, 'tienda'),
+    ('cajas', CajaDiaria, 'tienda'),
+    ('movimientos_caja', MovimientoCaja, 'caja__tienda'),
+    ('comprobantes', Comprobante, 'tienda'),
+    ('detalles', DetalleComprobante, 'comprobante__tienda'),
+    ('abonos', PagoCredito, 'cliente__tienda'),
+    ('aplicaciones_abono', AplicacionAbono, 'pago__cliente__tienda'),
+    ('kardex', MovimientoStock, 'producto__tienda'),
+    ('fotos_stock', FotoStock, 'tienda'),
+)
+
+
+def _a_json(valor):
+    # Sin DjangoJSONEncoder: recorta los microsegundos y el orden del Kardex los necesita
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"{type(valor).__name__} no se puede serializar")
+
+
+class _Tubo(io.RawIOBase):
+    """Destino sin seek para zipfile: junta lo escrito hasta que se retira con `vaciar`."""
+
+    def __init__(self):
+        self.partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos, self.partes = b''.join(self.partes), []
+        return datos
+
+
+# ==============================================================================
+# EXPORTACIÓN
+# ==============================================================================
+
+def generar_paquete(tienda, lote=2000):
+    """Genera (bytes, ...) del ZIP con todos los modelos de `tienda`; una consulta por modelo."""
+    tubo = _Tubo()
+    entradas = []
+    with zipfile.ZipFile(tubo, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for nombre, modelo, camino in MODELOS:
+            campos = [c.attname for c in modelo._meta.concrete_fields]
+            filas = modelo.objects.filter(**{camino: tienda}).order_by('pk').values_list(*campos)
+            suma, total = hashlib.sha256(), 0
+            info = zipfile.ZipInfo(f'{nombre}.jsonl', date_time=timezone.localtime().timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with zf.open(info, 'w', force_zip64=True) as entrada:
+                for fila in filas.iterator(chunk_size=lote):
+                    linea = json.dumps(dict(zip(campos, fila)), default=_a_json, ensure_ascii=False).encode() + b'\n'
+                    entrada.write(linea)
+                    suma.update(linea)
+                    total += 1
+                    if total % lote == 0:
+                        yield tubo.vaciar()
+            entradas.append({'archivo': f'{nombre}.jsonl', 'modelo': modelo._meta.label,
+                             'filas': total, 'sha256': suma.hexdigest()})
+            yield tubo.vaciar()
+        zf.writestr(MANIFIESTO, json.dumps({
+            'version': VERSION,
+            'tienda': {'id': tienda.id, 'nombre': tienda.nombre, 'ruc': tienda.ruc},
+            'generado_en': timezone.now().isoformat(),
+            'entradas': entradas,
+        }, ensure_ascii=False, indent=2))
+    yield tubo.vaciar()
+
+
+def exportar_paquete(tienda, destino, lote=2000):
+    """Escribe el paquete de `tienda` en el archivo abierto `destino`. Devuelve los bytes escritos."""
+    escritos = 0
+    for parte in generar_paquete(tienda, lote):
+        destino.write(parte)
+        escritos += len(parte)
+    return escritos
+
+
+# ==============================================================================
+# RESTAURACIÓN
+# ==============================================================================
+
+def leer_manifiesto(zf):
+    manifiesto = json.loads(zf.read(MANIFIESTO))
+    if manifiesto.get('version') != VERSION:
+        raise ValueError(f"Versión de paquete no soportada: {manifiesto.get('version')}")
+    return manifiesto
+
+
+def verificar_paquete(zf):
+    """Compara filas y SHA-256 de cada entrada con el manifiesto; ValueError si algo no cuadra."""
+    manifiesto = leer_manifiesto(zf)
+    for entrada in manifiesto['entradas']:
+        suma, total = hashlib.sha256(), 0
+        with zf.open(entrada['archivo']) as f:
+            for linea in f:
+                suma.update(linea)
+                total += 1
+        if suma.hexdigest() != entrada['sha256'] or total != entrada['filas']:
+            raise ValueError(f"La entrada {entrada['archivo']} está dañada o incompleta.")
+    return manifiesto
+
+
+def _tienda_vacia(tienda):
+    return not any(modelo.objects.filter(**{camino: tienda}).exists()
+                   for _, modelo, camino in MODELOS if camino == 'tienda')
+
+
+def restaurar_paquete(archivo, tienda, usuario=None, lote=1000):
+    """
+    Carga el paquete `archivo` (ruta o archivo abierto) en `tienda`, que debe
+    estar vacía. Devuelve {entrada: filas insertadas}.
+    """
+    if not connection.features.can_return_rows_from_bulk_insert:
+        raise ValueError("La base de datos no devuelve los ids de bulk_create; no se pueden enlazar las filas.")
+    if not _tienda_vacia(tienda):
+        raise ValueError(f"La tienda {tienda.nombre} ya tiene datos; el paquete solo se carga en una tienda vacía.")
+
+    with zipfile.ZipFile(archivo) as zf:
+        manifiesto = verificar_paquete(zf)
+        presentes = {e['archivo'] for e in manifiesto['entradas']}
+        ids = {}  # {modelo: {id viejo: id nuevo}}
+        insertadas = {}
+        fechas = [c for _, modelo, _ in MODELOS for c in modelo._meta.concrete_fields if getattr(c, 'auto_now_add', False)]
+        with transaction.atomic(), _sin_auto_now(*fechas):
+            for nombre, modelo, _ in MODELOS:
+                if f'{nombre}.jsonl' not in presentes:
+                    continue
+                ids[modelo] = {}
+                with zf.open(f'{nombre}.jsonl') as f:
+                    pendientes = []
+                    for linea in f:
+                        pendientes.append(json.loads(linea))
+                        if len(pendientes) >= lote:
+                            _insertar(modelo, pendientes, tienda, usuario, ids)
+                            pendientes = []
+                    _insertar(modelo, pendientes, tienda, usuario, ids)
+                insertadas[nombre] = len(ids[modelo])
+    return insertadas
+
+
+def _insertar(modelo, filas, tienda, usuario, ids):
+    if not filas:
+        return
+    pk = modelo._meta.pk.attname
+    objetos = []
+    for fila in filas:
+        valores = {}
+        for campo in modelo._meta.concrete_fields:
+            valor = fila.get(campo.attname)
+            if campo.primary_key:
+                continue
+            if campo.is_relation:
+                destino = campo.related_model
+                if destino is Tienda:
+                    valor = tienda.id
+                elif destino is User:
+                    valor = usuario.id if usuario is not None and valor is not None else None
+                elif valor is not None:
+                    valor = ids[destino][valor]
+            elif valor is not None:
+                valor = campo.to_python(valor)
+            valores[campo.attname] = valor
+        objetos.append(modelo(**valores))
+    modelo.objects.bulk_create(objetos, batch_size=len(objetos))
+    for fila, objeto in zip(filas, objetos):
+        ids[modelo][fila[pk]] = objeto.pk
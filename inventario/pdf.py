@@ -0,0 +1,19 @@
+# inventario/pdf.py
+"""
+Generación de PDF (xhtml2pdf) aparte de views.py y admin.py.
+
+xhtml2pdf arrastra reportlab, pyHanko y aiohttp: importarlo cuesta más que
+todo Django junto. Quien lo necesita importa este módulo dentro de la
+función que genera el PDF, así un arranque en frío que solo atiende el POS
+no lo carga (ver el comando benchmark_arranque).
+"""
+from io import BytesIO
+
+from xhtml2pdf import pisa
+
+
+def html_a_pdf(html):
+    """Devuelve (bytes del PDF, cantidad de errores de xhtml2pdf)."""
+    resultado = BytesIO()
+    documento = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), resultado)
+    return resultado.getvalue(), documento.err
@@ -0,0 +1,137 @@
+# inventario/perfilador.py
+"""
+Perfilado bajo demanda de una petición (`?__profile=1`, solo superusuarios).
+
+Corre la vista dentro de cProfile, mide aparte el tiempo de SQL y de render de
+plantillas, y devuelve un reporte de texto en lugar de la respuesta normal.
+Si PROFILES_DIR está configurado, también guarda el .prof (abrible con
+snakeviz / `python -m pstats`) y el .txt para verlos luego desde el admin.
+"""
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .consultas_lentas import nombre_vista, normalizar_sql
+
+PARAMETRO = '__profile'
+
+
+def solicitado(request):
+    """Chequeo barato: solo mira el query string crudo antes de tocar request.user."""
+    if PARAMETRO not in request.META.get('QUERY_STRING', ''):
+        return False
+    return request.GET.get(PARAMETRO) == '1' and request.user.is_superuser
+
+
+class _MedidorSQL:
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, time.perf_counter() - inicio))
+
+
+def _tiempo_plantillas(estadisticas):
+    """Tiempo acumulado del render de plantillas Django (backend django.Template.render)."""
+    ruta = os.path.join('template', 'backends', 'django.py')
+    return sum(
+        datos[3] for (archivo, _, funcion), datos in estadisticas.stats.items()
+        if funcion == 'render' and archivo.endswith(ruta)
+    )
+
+
+def _reporte(request, response, perfil, medidor, total):
+    estadisticas = pstats.Stats(perfil)
+    tiempo_sql = sum(t for _, t in medidor.consultas)
+
+    agrupadas = {}
+    for sql, t in medidor.consultas:
+        clave = normalizar_sql(sql)
+        n, acumulado = agrupadas.get(clave, (0, 0.0))
+        agrupadas[clave] = (n + 1, acumulado + t)
+
+    salida = io.StringIO()
+    salida.write(f"PERFIL DE {request.method} {request.path}\n")
+    salida.write(f"Vista: {nombre_vista(request)}  |  Status: {response.status_code}\n")
+    salida.write(f"Tiempo total:      {total * 1000:9.1f} ms\n")
+    salida.write(f"SQL:               {tiempo_sql * 1000:9.1f} ms en {len(medidor.consultas)} consultas\n")
+    salida.write(f"Plantillas:        {_tiempo_plantillas(estadisticas) * 1000:9.1f} ms (incluye SQL perezoso del template)\n")
+
+    salida.write("\n=== SQL AGRUPADO (por tiempo) ===\n")
+    for sql, (n, t) in sorted(agrupadas.items(), key=lambda i: -i[1][1])[:20]:
+        salida.write(f"{t * 1000:8.1f} ms  x{n:<4} {sql[:200]}\n")
+
+    salida.write("\n=== cPROFILE (acumulado) ===\n")
+    estadisticas.stream = salida
+    estadisticas.sort_stats('cumulative').print_stats(60)
+    return salida.getvalue()
+
+
+def _guardar(request, perfil, texto):
+    directorio = getattr(settings, 'PROFILES_DIR', '')
+    if not directorio:
+        return None
+    os.makedirs(directorio, exist_ok=True)
+    vista = nombre_vista(request) or 'vista'
+    base = os.path.join(directorio, f"{timezone.now():%Y%m%d_%H%M%S}_{vista}_{request.user.username}")
+    perfil.dump_stats(base + '.prof')
+    with open(base + '.txt', 'w', encoding='utf-8') as f:
+        f.write(texto)
+    return base
+
+
+def perfilar(request, get_response):
+    """Ejecuta la petición perfilada y devuelve (response_original, texto_del_reporte)."""
+    perfil = cProfile.Profile()
+    medidor = _MedidorSQL()
+    with ExitStack() as pila:
+        for conexion in connections.all():
+            pila.enter_context(conexion.execute_wrapper(medidor))
+        inicio = time.perf_counter()
+        perfil.enable()
+        try:
+            response = get_response(request)
+            # Las respuestas con plantilla se renderizan aquí adentro para medirlas
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+        finally:
+            perfil.disable()
+        total = time.perf_counter() - inicio
+
+    texto = _reporte(request, response, perfil, medidor, total)
+    base = _guardar(request, perfil, texto)
+    if base:
+        texto = f"Guardado en: {base}.prof / .txt\n\n" + texto
+    return response, texto
+
+
+def listar_perfiles():
+    directorio = getattr(settings, 'PROFILES_DIR', '')
+    if not directorio or not os.path.isdir(directorio):
+        return []
+    archivos = []
+    for nombre in sorted(os.listdir(directorio), reverse=True):
+        ruta = os.path.join(directorio, nombre)
+        if os.path.isfile(ruta) and nombre.endswith(('.prof', '.txt')):
+            archivos.append({'nombre': nombre, 'tamano_kb': round(os.path.getsize(ruta) / 1024, 1)})
+    return archivos
+
+
+def ruta_perfil(nombre):
+    """Ruta segura dentro de PROFILES_DIR (o None si el nombre no es válido)."""
+    directorio = getattr(settings, 'PROFILES_DIR', '')
+    if not directorio or nombre != os.path.basename(nombre) or not nombre.endswith(('.prof', '.txt')):
+        return None
+    ruta = os.path.join(directorio, nombre)
+    return ruta if os.path.isfile(ruta) else None
@@ -0,0 +1,82 @@
+# inventario/precios.py
+"""
+Cambio masivo de precio o costo (ej. cuando un proveedor sube su lista).
+
+Se elige un grupo de productos (categoría, proveedor según el historial de
+compras, parte del nombre) y una regla: porcentaje o monto fijo sobre
+`precio` o `costo`, redondeado al múltiplo `redondeo` (0.10 = a diez
+céntimos) y nunca negativo.
+
+La regla es UNA expresión de la BD: la vista previa la calcula con
+annotate() y `aplicar_cambio` la usa en un solo UPDATE, así lo que se ve es
+exactamente lo que se guarda. Cada aplicación deja un CambioPrecioMasivo
+con los valores de antes y después, y los POS reciben todos los precios
+nuevos en una sola publicación (no un aviso por producto: update() no
+dispara las señales de Producto).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Greatest, Round
+
+from .models import CambioPrecioMasivo, Compra, Producto
+from .stock_en_vivo import fila_producto, publicar_filas
+
+REDONDEOS = [
+    ('0.01', 'Al céntimo'),
+    ('0.10', 'A 10 céntimos'),
+    ('0.50', 'A 50 céntimos'),
+    ('1.00', 'Al sol'),
+]
+
+
+def productos_filtrados(tienda, categoria=None, proveedor=None, nombre=None):
+    productos = Producto.objects.filter(tienda=tienda)
+    if categoria:
+        productos = productos.filter(categoria=categoria)
+    if proveedor:
+        comprados = Compra.objects.filter(tienda=tienda, proveedor=proveedor).values('producto_id')
+        productos = productos.filter(id__in=comprados)
+    if nombre:
+        productos = productos.filter(nombre__icontains=nombre)
+    return productos
+
+
+def expresion_nueva(campo, modo, valor, redondeo):
+    """Valor nuevo de `campo` como expresión SQL (la misma para la vista previa y el UPDATE)."""
+    decimal = DecimalField(max_digits=14, decimal_places=Producto._meta.get_field(campo).decimal_places)
+    paso = Value(Decimal(redondeo), output_field=decimal)
+    if modo == 'PORCENTAJE':
+        bruto = F(campo) * Value(1 + Decimal(valor) / 100, output_field=decimal)
+    else:
+        bruto = F(campo) + Value(Decimal(valor), output_field=decimal)
+    redondeado = ExpressionWrapper(Round(ExpressionWrapper(bruto / paso, output_field=decimal)) * paso, output_field=decimal)
+    return Greatest(redondeado, Value(Decimal('0'), output_field=decimal), output_field=decimal)
+
+
+def vista_previa(productos, campo, modo, valor, redondeo):
+    """Los productos con `actual` y `nuevo` anotados, ordenados por nombre."""
+    return productos.annotate(actual=F(campo), nuevo=expresion_nueva(campo, modo, valor, redondeo)).order_by('nombre')
+
+
+def aplicar_cambio(tienda, usuario, campo, modo, valor, redondeo, filtros):
+    """
+    Aplica la regla a los productos de `filtros` (kwargs de productos_filtrados)
+    en una transacción: una lectura con bloqueo, un UPDATE, la auditoría y un
+    aviso a los POS. Devuelve el CambioPrecioMasivo.
+    """
+    nueva = expresion_nueva(campo, modo, valor, redondeo)
+    with transaction.atomic():
+        productos = productos_filtrados(tienda, **filtros).select_for_update()
+        filas = list(productos.annotate(nuevo=nueva).values_list('id', campo, 'nuevo', 'stock'))
+        productos.update(**{campo: nueva})
+        cambio = CambioPrecioMasivo.objects.create(
+            tienda=tienda, usuario=usuario, campo=campo, modo=modo, valor=valor, redondeo=redondeo,
+            filtros={k: getattr(v, 'pk', v) for k, v in filtros.items() if v}, productos=len(filas),
+            detalle=[[pid, str(antes), str(nuevo)] for pid, antes, nuevo, _ in filas],
+        )
+        if campo == 'precio':
+            publicar_filas(tienda.id, [fila_producto(Producto(id=pid, stock=stock, precio=nuevo))
+                                       for pid, _, nuevo, stock in filas])
+    return cambio
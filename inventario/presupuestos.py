@@ -0,0 +1,20 @@
+# inventario/presupuestos.py
+"""
+Presupuesto de consultas SQL por vista.
+
+Se declara junto a la vista con `@presupuesto_consultas(n)` (debajo de
+@login_required: functools.wraps copia el atributo al wrapper). Los tests de
+inventario/tests.py recorren todas las URLs y fallan si una vista supera su
+presupuesto o si su cantidad de consultas crece con el volumen de datos (N+1).
+"""
+
+
+def presupuesto_consultas(maximo):
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo
+        return vista
+    return decorador
+
+
+def obtener_presupuesto(vista):
+    return getattr(vista, 'presupuesto_consultas', None)
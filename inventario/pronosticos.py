@@ -0,0 +1,205 @@
+# inventario/pronosticos.py
+"""
+Pronóstico de demanda y punto de reorden por producto, para todos los SKUs a la vez.
+
+1. Una sola consulta trae las ventas agrupadas por (producto, día) y se vuelcan
+   en una matriz NumPy productos x días (los días sin venta quedan en 0).
+2. Suavizado exponencial de la venta diaria y de su cuadrado, vectorizado:
+   incorporar k días nuevos es `nivel * (1-a)^k + X @ pesos`, así que la
+   actualización es incremental (solo se leen los días que faltan).
+3. Con la demanda d y la desviación s, y el plazo de entrega L:
+       punto de reorden = d * L + Z * s * raíz(L)
+       stock objetivo   = d * (L + revisión) + Z * s * raíz(L)
+   Como se comparan con el stock en la unidad del producto, sirven igual para
+   metros, kilos o bolsas (a diferencia del antiguo `stock <= 5`).
+
+Los reportes leen lo guardado en PronosticoDemanda y lo comparan con el stock
+actual en la misma consulta.
+"""
+import math
+from datetime import timedelta
+from decimal import ROUND_CEILING, Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Compra, DetalleComprobante, Producto, PronosticoDemanda
+
+# Unidades que se compran enteras: la sugerencia se redondea hacia arriba
+UNIDADES_ENTERAS = {'UND', 'CJ', 'BOL'}
+
+
+def _parametros():
+    return {
+        'alfa': 2 / (getattr(settings, 'FORECAST_SPAN_DAYS', 28) + 1),
+        'historia': getattr(settings, 'FORECAST_HISTORY_DAYS', 120),
+        'plazo': getattr(settings, 'FORECAST_LEAD_TIME_DAYS', 7),
+        'revision': getattr(settings, 'FORECAST_REVIEW_DAYS', 14),
+        'z': getattr(settings, 'FORECAST_SERVICE_Z', 1.65),
+    }
+
+
+def matriz_ventas(tienda, ids_productos, desde, hasta):
+    """Ventas por producto (filas, en el orden de `ids_productos`) y día (columnas) en una consulta."""
+    dias = (hasta - desde).days + 1
+    matriz = np.zeros((len(ids_productos), max(dias, 0)))
+    if not ids_productos or dias <= 0:
+        return matriz
+    fila_de = {pid: i for i, pid in enumerate(ids_productos)}
+    ventas = DetalleComprobante.objects.filter(
+        comprobante__tienda=tienda,
+        comprobante__fecha_emision__date__gte=desde,
+        comprobante__fecha_emision__date__lte=hasta,
+    ).exclude(comprobante__estado='ANULADO').annotate(
+        dia=TruncDate('comprobante__fecha_emision'),
+    ).values('producto_id', 'dia').annotate(cantidad=Sum('cantidad')).values_list('producto_id', 'dia', 'cantidad')
+
+    filas, columnas, cantidades = [], [], []
+    for producto_id, dia, cantidad in ventas:
+        if producto_id in fila_de:
+            filas.append(fila_de[producto_id])
+            columnas.append((dia - desde).days)
+            cantidades.append(float(cantidad))
+    matriz[filas, columnas] = cantidades
+    return matriz
+
+
+def suavizar(nivel, nivel_cuadrado, ventas, alfa):
+    """Incorpora las columnas de `ventas` (días en orden) al suavizado de todas las filas a la vez."""
+    k = ventas.shape[1]
+    if k == 0:
+        return nivel, nivel_cuadrado
+    pesos = alfa * (1 - alfa) ** np.arange(k - 1, -1, -1)
+    decaimiento = (1 - alfa) ** k
+    return decaimiento * nivel + ventas @ pesos, decaimiento * nivel_cuadrado + (ventas ** 2) @ pesos
+
+
+def actualizar_pronosticos(tienda, completo=False, hoy=None):
+    """
+    Actualiza los pronósticos de la tienda hasta ayer (último día completo).
+    Los productos ya pronosticados solo incorporan los días que les faltan; los
+    nuevos (o todos con `completo=True`) parten de FORECAST_HISTORY_DAYS días.
+    Devuelve cuántos productos se actualizaron.
+    """
+    p = _parametros()
+    ayer = (hoy or timezone.localdate()) - timedelta(days=1)
+    inicio_historia = ayer - timedelta(days=p['historia'] - 1)
+
+    ids = list(Producto.objects.filter(tienda=tienda).order_by('id').values_list('id', flat=True))
+    existentes = {} if completo else PronosticoDemanda.objects.filter(tienda=tienda).in_bulk(field_name='producto_id')
+    # Primer día que le falta a cada producto
+    desde_por_producto = np.array([
+        (existentes[pid].hasta_fecha + timedelta(days=1) - inicio_historia).days if pid in existentes else 0
+        for pid in ids
+    ], dtype=int)
+    if not ids or desde_por_producto.min() > p['historia'] - 1:
+        return 0
+    pendientes = desde_por_producto <= p['historia'] - 1
+
+    # Basta leer desde el primer día que le falte a alguien
+    desde = max(int(desde_por_producto[pendientes].min()), 0)
+    ventas = matriz_ventas(tienda, ids, inicio_historia + timedelta(days=desde), ayer)
+
+    nivel = np.array([existentes[pid].nivel if pid in existentes else 0.0 for pid in ids])
+    nivel_cuadrado = np.array([existentes[pid].nivel_cuadrado if pid in existentes else 0.0 for pid in ids])
+    # Los productos se agrupan por día de inicio (normalmente dos grupos: al día y nuevos)
+    for inicio in np.unique(desde_por_producto[pendientes]):
+        filas = np.flatnonzero(desde_por_producto == inicio)
+        columnas = ventas[filas, max(int(inicio), 0) - desde:]
+        nivel[filas], nivel_cuadrado[filas] = suavizar(nivel[filas], nivel_cuadrado[filas], columnas, p['alfa'])
+
+    desviacion = np.sqrt(np.maximum(nivel_cuadrado - nivel ** 2, 0))
+    seguridad = p['z'] * desviacion * math.sqrt(p['plazo'])
+    punto_reorden = nivel * p['plazo'] + seguridad
+    stock_objetivo = nivel * (p['plazo'] + p['revision']) + seguridad
+
+    nuevos, actualizados = [], []
+    for i in np.flatnonzero(pendientes):
+        pid = ids[i]
+        pronostico = existentes.get(pid) or PronosticoDemanda(producto_id=pid, tienda=tienda)
+        pronostico.nivel = float(nivel[i])
+        pronostico.nivel_cuadrado = float(nivel_cuadrado[i])
+        pronostico.demanda_diaria = Decimal(f'{nivel[i]:.3f}')
+        pronostico.desviacion = Decimal(f'{desviacion[i]:.3f}')
+        pronostico.punto_reorden = Decimal(f'{punto_reorden[i]:.2f}')
+        pronostico.stock_objetivo = Decimal(f'{stock_objetivo[i]:.2f}')
+        pronostico.hasta_fecha = ayer
+        (actualizados if pronostico.pk else nuevos).append(pronostico)
+
+    with transaction.atomic():
+        if completo:
+            PronosticoDemanda.objects.filter(tienda=tienda).delete()
+        PronosticoDemanda.objects.bulk_create(nuevos, batch_size=1000)
+        PronosticoDemanda.objects.bulk_update(actualizados, [
+            'nivel', 'nivel_cuadrado', 'demanda_diaria', 'desviacion', 'punto_reorden', 'stock_objetivo',
+            'hasta_fecha', 'actualizado_en',
+        ], batch_size=1000)
+    return len(nuevos) + len(actualizados)
+
+
+def asegurar_vigentes(tienda):
+    """Para los reportes: si hoy todavía no se recalculó, se pone al día (una consulta si ya lo está)."""
+    ultimo = PronosticoDemanda.objects.filter(tienda=tienda).aggregate(ultimo=Max('hasta_fecha'))['ultimo']
+    if ultimo is None or ultimo < timezone.localdate() - timedelta(days=1):
+        actualizar_pronosticos(tienda)
+
+
+# ==============================================================================
+# LECTURA PARA REPORTES
+# ==============================================================================
+
+def productos_bajo_stock(tienda):
+    """
+    Productos con demanda y stock actual en o por debajo de su punto de
+    reorden, los de menos días de cobertura primero. Lo que no se vende no se
+    repone, aunque tenga stock 0.
+    """
+    return Producto.objects.filter(
+        tienda=tienda, pronostico__demanda_diaria__gt=0, stock__lte=F('pronostico__punto_reorden'),
+    ).annotate(
+        demanda_diaria=F('pronostico__demanda_diaria'),
+        punto_reorden=F('pronostico__punto_reorden'),
+        stock_objetivo=F('pronostico__stock_objetivo'),
+        dias_cobertura=ExpressionWrapper(F('stock') / F('pronostico__demanda_diaria'),
+                                         output_field=DecimalField(max_digits=12, decimal_places=1)),
+    ).order_by('dias_cobertura', 'nombre')
+
+
+def cantidad_sugerida(producto):
+    """Lo que falta para llegar al stock objetivo, en la unidad del producto."""
+    falta = max(producto.stock_objetivo - producto.stock, Decimal('0'))
+    if producto.unidad_medida in UNIDADES_ENTERAS:
+        return falta.quantize(Decimal('1'), rounding=ROUND_CEILING)
+    return falta.quantize(Decimal('0.01'), rounding=ROUND_CEILING)
+
+
+def sugerencias_de_compra(tienda):
+    """
+    Productos a reponer agrupados por el proveedor al que se compró la última
+    vez, con el costo unitario de esa compra. [(proveedor, [productos], total)]
+    """
+    ultima = Compra.objects.filter(producto=OuterRef('pk')).order_by('-fecha_de_compra', '-id')
+    productos = productos_bajo_stock(tienda).annotate(
+        ultimo_proveedor=Subquery(ultima.values('proveedor__razon_social')[:1]),
+        ultimo_costo_total=Subquery(ultima.values('costo_total')[:1]),
+        ultima_cantidad=Subquery(ultima.values('cantidad')[:1]),
+    )
+    grupos = {}
+    for producto in productos:
+        producto.cantidad_sugerida = cantidad_sugerida(producto)
+        if not producto.cantidad_sugerida:
+            continue
+        if producto.ultima_cantidad:
+            producto.costo_unitario = (producto.ultimo_costo_total / producto.ultima_cantidad).quantize(Decimal('0.01'))
+        else:
+            producto.costo_unitario = producto.costo
+        producto.costo_estimado = (producto.costo_unitario * producto.cantidad_sugerida).quantize(Decimal('0.01'))
+        grupos.setdefault(producto.ultimo_proveedor or 'Sin compras registradas', []).append(producto)
+    return sorted(
+        ((proveedor, lista, sum(p.costo_estimado for p in lista)) for proveedor, lista in grupos.items()),
+        key=lambda g: -g[2],
+    )
@@ -0,0 +1,104 @@
+# inventario/rendimiento.py
+"""Utilidades compartidas por los comandos de benchmark y prueba de carga."""
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def storages_sin_manifest():
+    """
+    STORAGES con estáticos simples: CompressedManifestStaticFilesStorage exige
+    haber corrido collectstatic, lo que no aplica al medir en local.
+    """
+    return dict(settings.STORAGES, staticfiles={'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'})
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (p entre 0 y 100)."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    rango = max(1, math.ceil(p / 100 * len(ordenados)))
+    return ordenados[rango - 1]
+
+
+def resumen_latencias(latencias_ms):
+    return {
+        'n': len(latencias_ms),
+        'p50_ms': round(percentil(latencias_ms, 50), 2) if latencias_ms else None,
+        'p95_ms': round(percentil(latencias_ms, 95), 2) if latencias_ms else None,
+        'p99_ms': round(percentil(latencias_ms, 99), 2) if latencias_ms else None,
+        'max_ms': round(max(latencias_ms), 2) if latencias_ms else None,
+    }
+
+
+def medir(funcion, repeticiones):
+    """
+    Llama `funcion()` (que devuelve una respuesta HTTP) varias veces y devuelve
+    latencias, consultas por llamada (máximo observado) y el último status.
+    """
+    latencias, consultas, status = [], 0, None
+    for _ in range(repeticiones):
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            respuesta = funcion()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        consultas = max(consultas, len(ctx.captured_queries))
+        status = respuesta.status_code
+    return dict(resumen_latencias(latencias), consultas=consultas, status=status)
+
+
+def commit_actual():
+    """Commit corto de git del código medido (o None fuera de un repositorio)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ==============================================================================
+# ARRANQUE EN FRÍO
+# ==============================================================================
+
+# Lo que hace un arranque en frío (ej. Vercel) antes de atender la primera petición
+_ARRANQUE = """
+import json, sys, time
+inicio = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({'ms': (time.perf_counter() - inicio) * 1000, 'modulos': sorted(sys.modules)}))
+"""
+
+
+def medir_arranque(importtime=False):
+    """
+    Arranca la aplicación en un intérprete nuevo. Devuelve {'ms', 'modulos'} y,
+    con `importtime`, 'importaciones': [(módulo, µs propios, µs acumulados, nivel)]
+    tal como los reporta `python -X importtime`.
+    """
+    entorno = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE,
+                   PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    comando = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', _ARRANQUE]
+    proceso = subprocess.run(comando, capture_output=True, text=True, cwd=settings.BASE_DIR, env=entorno, timeout=120)
+    if proceso.returncode:
+        raise RuntimeError(f"La aplicación no arrancó:\n{proceso.stderr[-2000:]}")
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    if importtime:
+        resultado['importaciones'] = []
+        for linea in proceso.stderr.splitlines():
+            if not linea.startswith('import time:') or 'self [us]' in linea:
+                continue
+            propio, acumulado, modulo = linea[len('import time:'):].split('|')
+            nivel = (len(modulo) - len(modulo.lstrip())) // 2
+            resultado['importaciones'].append((modulo.strip(), int(propio), int(acumulado), nivel))
+    return resultado
@@ -0,0 +1,115 @@
+# inventario/replicas.py
+"""
+Lecturas de reportes y exportaciones en una réplica de solo lectura.
+
+Con DATABASE_REPLICA_URL definida, settings.py agrega el alias 'replica' y
+`RouterReplica` manda ahí las lecturas de las vistas marcadas con
+`@lee_de_replica` (reportes, Kardex, exportaciones). Todo lo demás, y toda
+escritura, va a 'default': el POS y los movimientos de stock nunca leen de
+la réplica. Sin la variable, el router no hace nada.
+
+Lectura propia: quien acaba de escribir (cualquier POST/PUT/DELETE) recibe la
+cookie COOKIE durante REPLICA_STICKY_SECONDS y mientras tanto sus reportes
+leen del primario, para que siempre vea su última venta aunque la réplica
+vaya atrasada.
+
+En local, una segunda base SQLite puede hacer de réplica
+(DATABASE_REPLICA_URL=sqlite:///db_replica.sqlite3); `python manage.py
+sincronizar_replica` la copia del primario.
+"""
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ALIAS = 'replica'
+COOKIE = 'leer_primario'
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+# Contextvar y no threading.local: sync_to_async la copia al hilo del ORM
+_en_replica = contextvars.ContextVar('lectura_en_replica', default=False)
+
+
+def replica_configurada():
+    return ALIAS in settings.DATABASES
+
+
+@contextmanager
+def lectura_en_replica(activa=True):
+    token = _en_replica.set(activa)
+    try:
+        yield
+    finally:
+        _en_replica.reset(token)
+
+
+def en_primario():
+    """Para escrituras dentro de una vista de reportes que dependen de lo que acaban de leer."""
+    return lectura_en_replica(False)
+
+
+def _debe_usar_replica(request):
+    return replica_configurada() and COOKIE not in request.COOKIES
+
+
+def lee_de_replica(vista):
+    """Las consultas de la vista (sync o async) se leen de la réplica, salvo lectura propia."""
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            with lectura_en_replica(_debe_usar_replica(request)):
+                return await vista(request, *args, **kwargs)
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        with lectura_en_replica(_debe_usar_replica(request)):
+            return vista(request, *args, **kwargs)
+    return envoltura
+
+
+def iterar_en_contexto(iterable):
+    """
+    Para StreamingHttpResponse: el contenido se genera después de que la vista
+    retornó (fuera de `lee_de_replica`); así sus consultas siguen yendo a la
+    base que eligió la vista.
+    """
+    contexto = contextvars.copy_context()
+    iterador = iter(iterable)
+    while True:
+        try:
+            yield contexto.run(next, iterador)
+        except StopIteration:
+            return
+
+
+class RouterReplica:
+    """DATABASE_ROUTERS: lecturas marcadas a la réplica, el resto al primario."""
+
+    def db_for_read(self, model, **hints):
+        if not _en_replica.get() or not replica_configurada():
+            return None
+        # Dentro de una transacción del primario se lee lo que ella misma escribió
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Es la misma base de datos, copiada
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != ALIAS  # La réplica recibe el esquema del primario
+
+
+def marcar_escritura(request, response):
+    """Tras una petición que puede escribir, lee del primario por REPLICA_STICKY_SECONDS."""
+    if request.method not in METODOS_SEGUROS and replica_configurada():
+        response.set_cookie(COOKIE, '1', max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 30),
+                            httponly=True, samesite='Lax')
+    return response
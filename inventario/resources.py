@@ -2,6 +2,7 @@ from import_export import resources, fields
 from import_export.widgets import ForeignKeyWidget
 from .models import Producto, Venta, Proveedor, Compra, Cliente, Comprobante, DetalleComprobante, CajaDiaria, MovimientoCaja
 from decimal import Decimal
+from .costeo import registrar_compra
 
 class CleanForeignKeyWidget(ForeignKeyWidget):
     def clean(self, value, row=None, **kwargs):
@@ -83,6 +84,14 @@ class CompraResource(resources.ModelResource):
             instance.tienda = tienda
         super().before_save_instance(instance, row, *args, **kwargs)
 
+    def save_instance(self, instance, is_create, *args, **kwargs):
+        if not is_create:
+            return super().save_instance(instance, is_create, *args, **kwargs)
+        # Compra nueva: suma stock y recalcula el costo promedio igual que el formulario
+        self.before_save_instance(instance, *args, **kwargs)
+        registrar_compra(instance)
+        self.after_save_instance(instance, *args, **kwargs)
+
 class VentaResource(resources.ModelResource):
     producto = fields.Field(attribute='producto', widget=ForeignKeyWidget(Producto, 'nombre'))
     cliente = fields.Field(attribute='cliente', widget=ForeignKeyWidget(Cliente, 'nombre_completo'))
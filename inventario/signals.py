@@ -1,8 +1,11 @@
 # inventario/signals.py
 from django.contrib.auth.signals import user_logged_in, user_login_failed
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from .models import LoginLog, Compra, DetalleComprobante, MovimientoStock, Producto
+from .bitacoras import registrar as registrar_bitacora
+from .costeo import costo_unitario_compra
+from .stock_en_vivo import notificar_producto
 
 # ==============================================================================
 # LÓGICA EXISTENTE: REGISTRO DE LOGUEOS (RESPETADA 100%)
@@ -11,23 +14,23 @@ from .models import LoginLog, Compra, DetalleComprobante, MovimientoStock, Produ
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
     """Registra un log cuando un usuario inicia sesión exitosamente."""
-    LoginLog.objects.create(
+    registrar_bitacora(LoginLog(
         user=user,
         username_tried=user.username, # Nombre de usuario real que inició sesión
         ip_address=request.META.get('REMOTE_ADDR'),
         is_successful=True
-    )
+    ))
 
 @receiver(user_login_failed)
 def log_user_login_failed(sender, credentials, request, **kwargs):
     """Registra un log cuando un intento de inicio de sesión falla."""
     username = credentials.get('username', 'N/A') # Obtiene el username intentado
-    LoginLog.objects.create(
+    registrar_bitacora(LoginLog(
         user=None, # No hay usuario asociado si falló
         username_tried=username,
         ip_address=request.META.get('REMOTE_ADDR'),
         is_successful=False
-    )
+    ))
 
 # ==============================================================================
 # NUEVA LÓGICA: KARDEX (AUDITORÍA DE MOVIMIENTOS DE STOCK)
@@ -51,6 +54,8 @@ def registrar_kardex_compra(sender, instance, created, **kwargs):
             cantidad=instance.cantidad,
             stock_antes=stock_anterior,
             stock_despues=prod.stock,
+            costo_unitario=costo_unitario_compra(instance),
+            costo_promedio=prod.costo,
             motivo=f"Compra: Ingreso de mercadería (Proveedor: {instance.proveedor.razon_social})"
         )
 
@@ -72,5 +77,20 @@ def registrar_kardex_venta(sender, instance, created, **kwargs):
             cantidad=instance.cantidad,
             stock_antes=stock_anterior,
             stock_despues=prod.stock,
+            costo_promedio=prod.costo,
             motivo=f"Venta: {instance.comprobante.get_tipo_comprobante_display()} {instance.comprobante.serie}-{instance.comprobante.numero}"
         )
+
+
+# ==============================================================================
+# STOCK EN VIVO: AVISO A LOS POS DE LA TIENDA
+# ==============================================================================
+
+@receiver(post_save, sender=Producto)
+def publicar_cambio_producto(sender, instance, **kwargs):
+    """Venta, compra, anulación o importación: todo termina en un save() del producto."""
+    notificar_producto(instance)
+
+@receiver(post_delete, sender=Producto)
+def publicar_producto_eliminado(sender, instance, **kwargs):
+    notificar_producto(instance, eliminado=True)
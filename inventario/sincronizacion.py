@@ -0,0 +1,166 @@
+# inventario/sincronizacion.py
+"""
+Sincronización de ventas hechas sin conexión en el POS.
+
+El navegador guarda cada venta en una cola local con una clave única
+(`clave`) y, al volver la conexión, envía toda la cola en un solo lote.
+El lote se aplica en orden dentro de UNA transacción y con escrituras masivas
+(bulk_create / bulk_update), así que el costo en consultas no crece con la
+cantidad de ventas.
+
+Reintentar el mismo lote es seguro: las claves ya registradas se responden
+como 'duplicado' con el comprobante original, sin tocar stock ni deuda.
+"""
+import uuid
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max
+
+from . import metricas
+from .models import Cliente, Comprobante, DetalleComprobante, MovimientoStock
+from .stock_en_vivo import fila_producto, publicar_filas
+from .ventas import bloquear_productos, descontar_stock, faltantes, sumar_pedido
+
+TASA_IGV = Decimal('1.18')
+SERIES = {'BOLETA': 'B001', 'FACTURA': 'F001'}
+
+
+def _resultado(clave, estado, **extra):
+    return {'clave': clave, 'estado': estado, **extra}
+
+
+def _validar(venta):
+    """Devuelve (items normalizados, error). Cada item: (producto_id, cantidad, precio con IGV)."""
+    if venta.get('tipo_comprobante') not in SERIES:
+        return None, 'Tipo de comprobante inválido'
+    items = []
+    try:
+        for item in venta.get('cart') or []:
+            cantidad = Decimal(str(item['quantity']))
+            if cantidad <= 0:
+                return None, 'Cantidad inválida'
+            items.append((int(item['id']), cantidad, Decimal(str(item['price']))))
+    except (KeyError, TypeError, ValueError, ArithmeticError):
+        return None, 'Carrito mal formado'
+    if not items:
+        return None, 'Carrito vacío'
+    return items, None
+
+
+def sincronizar_lote(tienda, ventas):
+    """
+    Aplica las ventas en el orden recibido y devuelve un resultado por venta:
+    'emitido' / 'duplicado' (con comprobante_id y numero), 'sin_stock' (con
+    los faltantes) o 'invalido' (con el error). Una venta rechazada no frena
+    a las siguientes.
+    """
+    claves = [v.get('clave') for v in ventas if isinstance(v.get('clave'), str)]
+    resultados = []
+    with transaction.atomic():
+        registradas = {
+            c['clave_idempotencia']: c for c in Comprobante.objects.filter(
+                tienda=tienda, clave_idempotencia__in=claves,
+            ).values('id', 'clave_idempotencia', 'serie', 'numero')
+        }
+        ids_productos = {
+            int(i['id']) for v in ventas for i in v.get('cart') or []
+            if isinstance(i, dict) and str(i.get('id', '')).isdigit()
+        }
+        productos = bloquear_productos(tienda, ids_productos)
+        ids_clientes = {v['cliente_id'] for v in ventas if str(v.get('cliente_id') or '').isdigit()}
+        clientes = Cliente.objects.select_for_update().filter(tienda=tienda, id__in=ids_clientes).in_bulk()
+        ultimos = {
+            (f['tipo_comprobante'], f['serie']): f['ultimo'] for f in Comprobante.objects.filter(
+                tienda=tienda, serie__in=SERIES.values(),
+            ).values('tipo_comprobante', 'serie').annotate(ultimo=Max('numero'))
+        }
+
+        nuevos, lineas, movidos, deudores, descontado = [], [], {}, {}, {}
+        for venta in ventas:
+            clave = venta.get('clave')
+            if not isinstance(clave, str) or not 0 < len(clave) <= 64:
+                resultados.append(_resultado(clave, 'invalido', error='Clave de venta inválida'))
+                continue
+            if clave in registradas:
+                previo = registradas[clave]
+                resultados.append(_resultado(clave, 'duplicado', comprobante_id=previo['id'],
+                                             numero=f"{previo['serie']}-{previo['numero']}"))
+                continue
+            items, error = _validar(venta)
+            if not error and any(pid not in productos for pid, _, _ in items):
+                error = 'Producto inexistente'
+            if error:
+                resultados.append(_resultado(clave, 'invalido', error=error))
+                continue
+
+            # El stock en memoria ya descuenta las ventas anteriores del lote
+            pedido = sumar_pedido(items)
+            falta = faltantes(productos, pedido)
+            if falta:
+                metricas.rechazos_sin_stock.inc(tienda=tienda.id)
+                resultados.append(_resultado(clave, 'sin_stock', faltantes=falta))
+                continue
+            for pid, cantidad in pedido.items():
+                descontado[pid] = descontado.get(pid, 0) + cantidad
+
+            tipo = venta['tipo_comprobante']
+            serie = SERIES[tipo]
+            numero = ultimos.get((tipo, serie), 0) + 1
+            ultimos[(tipo, serie)] = numero
+            total = sum(precio * cantidad for _, cantidad, precio in items)
+            subtotal = (total / TASA_IGV).quantize(Decimal('0.01'), rounding='ROUND_HALF_UP')
+            metodo = venta.get('metodo_pago', 'EFECTIVO')
+            cliente = clientes.get(int(venta['cliente_id'])) if str(venta.get('cliente_id') or '').isdigit() else None
+            comprobante = Comprobante(
+                tienda=tienda, tipo_comprobante=tipo, serie=serie, numero=numero,
+                cliente=cliente, subtotal=subtotal, igv=total - subtotal, total_final=total,
+                metodo_pago=metodo, observaciones=venta.get('observaciones', ''),
+                hash_sunat=uuid.uuid4().hex[:30].upper(), clave_idempotencia=clave,
+            )
+            if metodo == 'CREDITO' and cliente:
+                cliente.saldo_deudora += total
+                comprobante.estado_pago = False
+                deudores[cliente.id] = cliente
+            nuevos.append(comprobante)
+            registradas[clave] = {'id': None, 'serie': serie, 'numero': numero}
+
+            motivo = f"Venta: {comprobante.get_tipo_comprobante_display()} {serie}-{numero}"
+            for pid, cantidad, precio in items:
+                producto = productos[pid]
+                antes = producto.stock
+                producto.stock -= cantidad
+                movidos[pid] = producto
+                precio_sin_igv = precio / TASA_IGV
+                lineas.append((comprobante, DetalleComprobante(
+                    producto=producto, cantidad=cantidad, precio_unitario=precio_sin_igv,
+                    precio_unitario_con_igv=precio, costo_unitario=producto.costo,
+                    subtotal=cantidad * precio_sin_igv,
+                ), MovimientoStock(
+                    producto=producto, tipo='SALIDA', cantidad=cantidad,
+                    stock_antes=antes, stock_despues=producto.stock, costo_promedio=producto.costo, motivo=motivo,
+                )))
+            resultados.append({'clave': clave, 'estado': 'emitido', 'comprobante': comprobante,
+                               'numero': f"{serie}-{numero}"})
+
+        # Escrituras masivas: un INSERT/UPDATE por tabla para todo el lote
+        Comprobante.objects.bulk_create(nuevos)
+        for comprobante, detalle, _ in lineas:
+            detalle.comprobante = comprobante
+        DetalleComprobante.objects.bulk_create([detalle for _, detalle, _ in lineas])
+        # Con bulk no corren los signals: el Kardex y el aviso a los POS se hacen aquí
+        MovimientoStock.objects.bulk_create([movimiento for _, _, movimiento in lineas])
+        descontar_stock(descontado)
+        Cliente.objects.bulk_update(deudores.values(), ['saldo_deudora'])
+        publicar_filas(tienda.id, [fila_producto(p) for p in movidos.values()])
+
+    # Los duplicados dentro del mismo lote recién conocen su id después del bulk_create
+    ids = {c.clave_idempotencia: c.id for c in nuevos}
+    for resultado in resultados:
+        comprobante = resultado.pop('comprobante', None)
+        if comprobante is not None:
+            resultado['comprobante_id'] = comprobante.id
+            metricas.comprobantes_emitidos.inc(tienda=tienda.id, tipo=comprobante.tipo_comprobante)
+        elif resultado['estado'] == 'duplicado' and resultado['comprobante_id'] is None:
+            resultado['comprobante_id'] = ids[resultado['clave']]
+    return resultados
@@ -0,0 +1,313 @@
+// inventario/static/inventario/pos/pos.js
+// Lógica del POS. Los datos que dependen de la petición (catálogo, URLs, CSRF)
+// los deja pos.html en `window.POS`; este archivo no pasa por las plantillas,
+// así va en el paquete dist/pos.js con su hash y se guarda en caché para siempre.
+let shoppingCart = [];
+const productosData = POS.productos;
+
+// Los clientes se buscan en el servidor (paginado); aquí solo quedan los ya vistos
+const CLIENTE_GENERAL = { id: '', text: 'Cliente General (Público)', ruc: '', razon: '' };
+const clientesConocidos = { '': CLIENTE_GENERAL };
+
+$(document).ready(function() {
+    $('#producto').select2({ data: productosData, placeholder: "Buscar material...", width: '100%' });
+    $('#cliente').select2({
+        data: [CLIENTE_GENERAL],
+        width: '100%',
+        ajax: {
+            url: POS.urls.buscarClientes,
+            delay: 250,
+            data: params => ({ q: params.term || '', page: params.page || 1 }),
+            processResults: function(r, params) {
+                r.results.forEach(c => clientesConocidos[c.id] = c);
+                if ((params.page || 1) === 1 && !params.term) r.results.unshift(CLIENTE_GENERAL);
+                return r;
+            }
+        }
+    });
+
+    $('#metodo_pago').change(function() {
+        if($(this).val() === 'CREDITO') $('#msg-credito').fadeIn();
+        else $('#msg-credito').fadeOut();
+    });
+
+    $('#btn-add-to-cart').click(agregarAlCarrito);
+
+    $('#barcode_input').on('keypress', function(e) {
+        if (e.which == 13) {
+            const code = $(this).val().trim();
+            const prod = productosData.find(p => p.codigo_barras === code);
+            if(prod) {
+                $('#producto').val(prod.id).trigger('change');
+                agregarAlCarrito();
+                $(this).val('');
+            } else if(code) {
+                // Producto creado después de abrir el POS: lo pedimos al servidor
+                $.getJSON(POS.urls.productoPorCodigo.replace('CODIGO', encodeURIComponent(code)))
+                    .done(function(p) {
+                        productosData.push(p);
+                        $('#producto').append(new Option(p.text, p.id, true, true)).trigger('change');
+                        agregarAlCarrito();
+                        $('#barcode_input').val('');
+                    })
+                    .fail(function() { alert("Código no encontrado: " + code); });
+            }
+        }
+    });
+
+    // Al volver a la pestaña refrescamos solo stock y precio (sin recargar el catálogo)
+    document.addEventListener('visibilitychange', function() {
+        if (document.visibilityState === 'visible') refrescarStock();
+    });
+
+    // Stock en vivo: ventas de las otras cajas, compras, anulaciones e importaciones
+    conectarStockEnVivo();
+
+    $('#btn-guardar-cliente-rapido').click(function() {
+        const data = {
+            nombre: $('#reg_nombre').val(),
+            dni: $('#reg_dni').val(),
+            razon: $('#reg_razon').val(),
+            ruc: $('#reg_ruc').val()
+        };
+        $.ajax({
+            url: POS.urls.crearCliente,
+            method: "POST",
+            contentType: 'application/json',
+            data: JSON.stringify(data),
+            headers: { 'X-CSRFToken': POS.csrf },
+            success: function(response) {
+                clientesConocidos[response.id] = { id: response.id, text: response.text, ruc: response.ruc, razon: response.razon };
+                $('#cliente').append(new Option(response.text, response.id, true, true)).trigger('change');
+                bootstrap.Modal.getInstance(document.getElementById('modalNuevoCliente')).hide();
+            }
+        });
+    });
+});
+
+function agregarAlCarrito() {
+    const prodId = $('#producto').val();
+    const qty = parseFloat($('#cantidad').val());
+    if(!prodId || isNaN(qty) || qty <= 0) return alert("Seleccione producto y cantidad válida");
+
+    const prodInfo = productosData.find(p => p.id == prodId);
+    // Extraemos la unidad de medida si existe en el texto (ej: "Cable (Stock: 10) [MTS]")
+    const unit = prodInfo.text.includes('[') ? prodInfo.text.split('[')[1].replace(']', '') : 'UND';
+
+    const existingIdx = shoppingCart.findIndex(i => i.id == prodId);
+    if(existingIdx > -1) {
+        shoppingCart[existingIdx].quantity += qty;
+    } else {
+        shoppingCart.push({
+            id: prodInfo.id,
+            name: prodInfo.text.split(' (Stock:')[0],
+            quantity: qty,
+            price: parseFloat(prodInfo.price || prodInfo.precio),
+            unit: unit
+        });
+    }
+    renderizarCarrito();
+    $('#cantidad').val(1);
+}
+
+function renderizarCarrito() {
+    const tbody = $('#cart-items');
+    tbody.empty();
+    let total = 0;
+    shoppingCart.forEach((item, index) => {
+        const subtotal = item.quantity * item.price;
+        total += subtotal;
+        tbody.append(`
+            <tr>
+                <td>${item.name}</td>
+                <td class="text-center text-muted small">${item.unit}</td>
+                <td class="text-center fw-bold">${item.quantity}</td>
+                <td class="text-end">S/ ${item.price.toFixed(2)}</td>
+                <td class="text-end fw-bold">S/ ${subtotal.toFixed(2)}</td>
+                <td class="text-center"><button class="btn btn-sm btn-outline-danger" onclick="eliminarItem(${index})"><i class="fas fa-trash"></i></button></td>
+            </tr>
+        `);
+    });
+    $('#grand-total-display').text('S/ ' + total.toFixed(2));
+    $('#subtotal-display').text('S/ ' + (total / 1.18).toFixed(2));
+    $('#igv-display').text('S/ ' + (total - (total/1.18)).toFixed(2));
+    $('#items-count').text(shoppingCart.length + ' Ítems');
+}
+
+function actualizarStocks(stocks) {
+    stocks.forEach(s => {
+        const prod = productosData.find(p => p.id == s.id);
+        if (!prod) return;
+        if (s.eliminado) {
+            productosData.splice(productosData.indexOf(prod), 1);
+            $('#producto option[value="' + s.id + '"]').remove();
+            return;
+        }
+        prod.text = prod.text.replace(/\(Stock: [^)]*\)/, '(Stock: ' + Number(s.stock).toFixed(2) + ')');
+        if (s.precio !== undefined) prod.precio = s.precio;
+        $('#producto option[value="' + s.id + '"]').text(prod.text);
+    });
+}
+
+function refrescarStock() {
+    $.getJSON(POS.urls.stock, function(r) { actualizarStocks(r.productos); });
+}
+
+function conectarStockEnVivo() {
+    if (!window.EventSource) return setInterval(refrescarStock, 30000);
+    const fuente = new EventSource(POS.urls.eventosStock);
+    let reconexion = false;
+    // Al reconectar pudimos perder cambios: pedimos el stock completo una vez
+    fuente.addEventListener('open', function() { if (reconexion) refrescarStock(); reconexion = true; });
+    fuente.addEventListener('stock', e => actualizarStocks(JSON.parse(e.data)));
+    fuente.addEventListener('resync', refrescarStock);
+    fuente.addEventListener('error', function() {
+        // Servidor WSGI (responde 204): no hay canal en vivo, consultamos cada 30 s
+        if (fuente.readyState === EventSource.CLOSED) setInterval(refrescarStock, 30000);
+    });
+}
+
+window.eliminarItem = function(index) {
+    shoppingCart.splice(index, 1);
+    renderizarCarrito();
+}
+
+window.emitir = function(tipo) {
+    if(shoppingCart.length === 0) return alert("Carrito vacío");
+    const clienteId = $('#cliente').val();
+    const selectedClient = clientesConocidos[clienteId];
+    const metodo = $('#metodo_pago').val();
+
+    if (tipo === 'FACTURA' && (!selectedClient || !selectedClient.ruc)) {
+        return alert("Para Factura el cliente debe tener RUC.");
+    }
+    if (metodo === 'CREDITO' && !clienteId) {
+        return alert("Debe seleccionar un cliente para ventas al crédito.");
+    }
+
+    const payload = {
+        cliente_id: clienteId,
+        observaciones: $('#observaciones').val(),
+        tipo_comprobante: tipo,
+        metodo_pago: metodo, // <--- ESTO ARREGLARÁ EL ERROR 500
+        cart: shoppingCart,
+        clave: nuevaClave() // Si se reintenta (online u offline) el servidor no duplica la venta
+    };
+
+    $.ajax({
+        url: POS.urls.emitir,
+        method: "POST",
+        contentType: 'application/json',
+        data: JSON.stringify(payload),
+        headers: { 'X-CSRFToken': POS.csrf },
+        success: function(response) {
+            window.open("/comprobante/" + response.comprobante_id + "/ticket/", '_blank');
+            // Limpiamos la venta y actualizamos el stock en pantalla sin recargar la página
+            shoppingCart = [];
+            renderizarCarrito();
+            $('#observaciones').val('');
+            actualizarStocks(response.stocks_actualizados);
+        },
+        error: function(xhr) {
+            if (xhr.status === 0) {
+                // Sin conexión: la venta queda en cola y se envía sola al volver la red
+                encolarVenta(payload);
+                shoppingCart = [];
+                renderizarCarrito();
+                $('#observaciones').val('');
+                return alert("Sin conexión: venta guardada. Se registrará al volver la conexión.");
+            }
+            alert("Error: " + (xhr.responseJSON ? xhr.responseJSON.error : "Error en servidor"));
+        }
+    });
+}
+
+// === VENTAS SIN CONEXIÓN ===
+const COLA_OFFLINE = POS.colaOffline;
+// Rechazadas al sincronizar (sin stock, inválidas): ya se vendieron en el mostrador, no se borran solas
+const POR_REVISAR = POS.colaOffline + '_revisar';
+let sincronizando = false;
+
+function nuevaClave() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+}
+
+function ventasPendientes() { return JSON.parse(localStorage.getItem(COLA_OFFLINE) || '[]'); }
+
+function encolarVenta(venta) {
+    const pendientes = ventasPendientes();
+    pendientes.push(venta);
+    localStorage.setItem(COLA_OFFLINE, JSON.stringify(pendientes));
+}
+
+function sincronizarPendientes() {
+    const lote = ventasPendientes().slice(0, 200);
+    if (sincronizando || !lote.length || !navigator.onLine) return;
+    sincronizando = true;
+    $.ajax({
+        url: POS.urls.sincronizar,
+        method: "POST",
+        contentType: 'application/json',
+        data: JSON.stringify({ ventas: lote }),
+        headers: { 'X-CSRFToken': POS.csrf },
+    }).done(function(r) {
+        // Emitidas y duplicadas salen de la cola; las rechazadas pasan a "por revisar".
+        // Un error de red deja la cola intacta.
+        const resultados = new Map(r.resultados.map(x => [x.clave, x]));
+        const rechazadas = lote.filter(v => resultados.has(v.clave) && !['emitido', 'duplicado'].includes(resultados.get(v.clave).estado))
+            .map(v => ({ venta: v, resultado: resultados.get(v.clave), rechazada_en: new Date().toISOString() }));
+        localStorage.setItem(COLA_OFFLINE, JSON.stringify(ventasPendientes().filter(v => !resultados.has(v.clave))));
+        if (rechazadas.length) {
+            guardarPorRevisar(ventasPorRevisar().concat(rechazadas));
+            alert("Ventas sin conexión NO registradas (quedan en 'por revisar'):\n" + rechazadas.map(x =>
+                x.resultado.estado === 'sin_stock' ? 'Stock insuficiente (productos ' + x.resultado.faltantes.map(f => f.id).join(', ') + ')' : x.resultado.error
+            ).join('\n'));
+        }
+        refrescarStock();
+    }).always(function() { sincronizando = false; });
+}
+
+function ventasPorRevisar() { return JSON.parse(localStorage.getItem(POR_REVISAR) || '[]'); }
+
+function guardarPorRevisar(lista) {
+    localStorage.setItem(POR_REVISAR, JSON.stringify(lista));
+    mostrarPorRevisar();
+}
+
+function mostrarPorRevisar() {
+    const n = ventasPorRevisar().length;
+    $('#ventas-por-revisar').toggleClass('d-none', n === 0);
+    $('#revisar-texto').text(n + ' venta(s) hechas sin conexión no se pudieron registrar.');
+}
+
+$(function() {
+    mostrarPorRevisar();
+    // Reintentar: vuelven a la cola con su misma clave (ej. después de registrar la compra que faltaba)
+    $('#btn-revisar-reintentar').click(function() {
+        localStorage.setItem(COLA_OFFLINE, JSON.stringify(ventasPendientes().concat(ventasPorRevisar().map(x => x.venta))));
+        guardarPorRevisar([]);
+        sincronizarPendientes();
+    });
+    $('#btn-revisar-exportar').click(function() {
+        const archivo = new Blob([JSON.stringify(ventasPorRevisar(), null, 2)], { type: 'application/json' });
+        const enlace = document.createElement('a');
+        enlace.href = URL.createObjectURL(archivo);
+        enlace.download = 'ventas_por_revisar_' + new Date().toISOString().slice(0, 10) + '.json';
+        enlace.click();
+        URL.revokeObjectURL(enlace.href);
+    });
+    $('#btn-revisar-descartar').click(function() {
+        if (confirm("¿Descartar estas ventas? Expórtalas antes si aún no se registraron a mano.")) guardarPorRevisar([]);
+    });
+});
+
+window.addEventListener('online', sincronizarPendientes);
+setInterval(sincronizarPendientes, 60000);
+$(sincronizarPendientes);
+
+// === ARRANQUE SIN RED ===
+// El service worker guarda el POS y sus estáticos: la caja abre aunque no haya conexión
+if ('serviceWorker' in navigator && POS.serviceWorker) {
+    window.addEventListener('load', () => navigator.serviceWorker.register(POS.serviceWorker).catch(() => {}));
+}
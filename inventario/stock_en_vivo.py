@@ -0,0 +1,246 @@
+# inventario/stock_en_vivo.py
+"""
+Stock y precio en vivo para todos los POS de una tienda (Server-Sent Events).
+
+Cada vez que se guarda o elimina un Producto (venta, compra, anulación,
+importación, edición) signals.py llama a `notificar_producto`, que publica
+`{id, stock, precio}` recién cuando la transacción hace commit. Los POS de
+esa tienda lo reciben por /pos/eventos/ y actualizan la lista sin recargar.
+
+El broker se elige con STOCK_PUSH_BACKEND:
+- 'memoria' (por defecto): un solo proceso. Con varios workers cada uno solo
+  ve sus propias ventas; para eso está el siguiente.
+- 'postgres': publica con NOTIFY y cada proceso escucha con LISTEN en un hilo
+  propio, así llegan los cambios de todos los workers y nodos sin servicios
+  extra. Requiere PostgreSQL como base de datos.
+- Una ruta 'paquete.modulo.Clase' para un backend propio (ej. Redis).
+
+Si un POS no consume a tiempo su cola se descarta y recibe `resync`, con lo que
+vuelve a pedir el stock completo a /pos/api/stock/.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+_broker = None
+_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# SUSCRIPCIONES (UNA POR CONEXIÓN SSE)
+# ==============================================================================
+
+class Suscripcion:
+    """Cola asyncio de un POS. `poner` se puede llamar desde cualquier hilo."""
+
+    def __init__(self, tienda_id, maximo):
+        self.tienda_id = tienda_id
+        self.desbordada = False
+        self._loop = asyncio.get_running_loop()
+        self._cola = asyncio.Queue(maxsize=maximo)
+
+    def poner(self, filas):
+        try:
+            self._loop.call_soon_threadsafe(self._poner, filas)
+        except RuntimeError:
+            pass  # El event loop ya se cerró: el POS se desconectó
+
+    def _poner(self, filas):
+        try:
+            self._cola.put_nowait(filas)
+        except asyncio.QueueFull:
+            self.desbordada = True
+
+    async def esperar(self, segundos):
+        """Devuelve los cambios pendientes fusionados por producto, o [] si no hubo ninguno."""
+        try:
+            filas = list(await asyncio.wait_for(self._cola.get(), segundos))
+        except asyncio.TimeoutError:
+            return []
+        while not self._cola.empty():
+            filas.extend(self._cola.get_nowait())
+        return list({f['id']: f for f in filas}.values())
+
+
+# ==============================================================================
+# BACKENDS
+# ==============================================================================
+
+class BrokerMemoria:
+    """Reparte los cambios entre las suscripciones de este proceso."""
+
+    def __init__(self):
+        self._suscripciones = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def suscribir(self, tienda_id):
+        suscripcion = Suscripcion(tienda_id, getattr(settings, 'STOCK_PUSH_QUEUE_SIZE', 200))
+        with self._lock:
+            self._suscripciones[tienda_id].add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscripciones[suscripcion.tienda_id].discard(suscripcion)
+            if not self._suscripciones[suscripcion.tienda_id]:
+                del self._suscripciones[suscripcion.tienda_id]
+
+    def suscriptores(self, tienda_id):
+        with self._lock:
+            return len(self._suscripciones.get(tienda_id, ()))
+
+    def entregar(self, tienda_id, filas):
+        with self._lock:
+            destino = list(self._suscripciones.get(tienda_id, ()))
+        for suscripcion in destino:
+            suscripcion.poner(filas)
+
+    def publicar(self, tienda_id, filas):
+        self.entregar(tienda_id, filas)
+
+
+class BrokerPostgres(BrokerMemoria):
+    """
+    Publica con pg_notify y entrega lo que llega por LISTEN (incluidos los
+    cambios de este mismo proceso), así todos los workers ven lo mismo.
+    """
+    CANAL = 'inventario_stock'
+    MAXIMO_PAYLOAD = 7000  # NOTIFY admite hasta 8000 bytes
+
+    def __init__(self):
+        super().__init__()
+        self._oyente = None
+
+    def suscribir(self, tienda_id):
+        self._asegurar_oyente()
+        return super().suscribir(tienda_id)
+
+    def publicar(self, tienda_id, filas):
+        with connections['default'].cursor() as cursor:
+            for payload in self._payloads(tienda_id, filas):
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.CANAL, payload])
+
+    def _payloads(self, tienda_id, filas):
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            payload = json.dumps({'t': tienda_id, 'p': lote})
+            if len(payload) > self.MAXIMO_PAYLOAD and len(lote) > 1:
+                lote.pop()
+                yield json.dumps({'t': tienda_id, 'p': lote})
+                lote = [fila]
+        if lote:
+            yield json.dumps({'t': tienda_id, 'p': lote})
+
+    def _asegurar_oyente(self):
+        if self._oyente is None:
+            with self._lock:
+                if self._oyente is None:
+                    self._oyente = threading.Thread(target=self._escuchar, name='stock-listen', daemon=True)
+                    self._oyente.start()
+
+    def _escuchar(self):
+        base = connections['default']
+        while True:
+            conexion = None
+            try:
+                conexion = base.get_new_connection(base.get_connection_params())
+                conexion.autocommit = True
+                conexion.cursor().execute(f'LISTEN {self.CANAL}')
+                while True:
+                    if select.select([conexion], [], [], 30) == ([], [], []):
+                        continue
+                    conexion.poll()
+                    while conexion.notifies:
+                        datos = json.loads(conexion.notifies.pop(0).payload)
+                        self.entregar(datos['t'], datos['p'])
+            except Exception:
+                logger.exception("Se cayó el LISTEN de stock; se reconecta en 5 s.")
+                time.sleep(5)
+            finally:
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except Exception:
+                        pass
+
+
+BACKENDS = {'memoria': BrokerMemoria, 'postgres': BrokerPostgres}
+
+
+def obtener_broker():
+    global _broker
+    if _broker is None:
+        with _lock:
+            if _broker is None:
+                nombre = getattr(settings, 'STOCK_PUSH_BACKEND', 'memoria')
+                clase = BACKENDS.get(nombre) or import_string(nombre)
+                _broker = clase()
+    return _broker
+
+
+# ==============================================================================
+# PUBLICACIÓN (DESDE signals.py Y CUALQUIER ACTUALIZACIÓN MASIVA)
+# ==============================================================================
+
+def fila_producto(producto):
+    return {'id': producto.id, 'stock': float(producto.stock), 'precio': str(producto.precio)}
+
+
+def _publicar(tienda_id, filas):
+    obtener_broker().publicar(tienda_id, filas)
+
+
+def publicar_filas(tienda_id, filas):
+    """Publica al confirmarse la transacción en curso (o ya mismo si no hay ninguna)."""
+    if tienda_id and filas:
+        transaction.on_commit(partial(_publicar, tienda_id, filas), robust=True)
+
+
+def notificar_producto(producto, eliminado=False):
+    fila = {'id': producto.id, 'eliminado': True} if eliminado else fila_producto(producto)
+    publicar_filas(producto.tienda_id, [fila])
+
+
+# ==============================================================================
+# FLUJO SSE
+# ==============================================================================
+
+def _evento(nombre, datos):
+    return f"event: {nombre}\ndata: {json.dumps(datos)}\n\n"
+
+
+async def flujo_eventos(tienda_id):
+    """
+    Generador para StreamingHttpResponse. Cierra solo tras STOCK_SSE_MAX_SECONDS
+    (el navegador reconecta y pide el stock completo) para no dejar conexiones
+    colgadas detrás de proxies; entre cambios manda un comentario de latido.
+    """
+    broker = obtener_broker()
+    suscripcion = broker.suscribir(tienda_id)
+    latido = getattr(settings, 'STOCK_SSE_HEARTBEAT_SECONDS', 15)
+    fin = time.monotonic() + getattr(settings, 'STOCK_SSE_MAX_SECONDS', 300)
+    try:
+        yield "retry: 3000\n\n"
+        while time.monotonic() < fin:
+            filas = await suscripcion.esperar(min(latido, max(fin - time.monotonic(), 0)))
+            if suscripcion.desbordada:
+                suscripcion.desbordada = False
+                yield _evento('resync', {})
+            elif filas:
+                yield _evento('stock', filas)
+            else:
+                yield ": latido\n\n"
+    finally:
+        broker.desuscribir(suscripcion)
@@ -0,0 +1,60 @@
+// Service worker del POS (ver pos_service_worker_view). Versión {{ version }}.
+// - Al instalarse guarda los paquetes del POS (dist/pos.js, dist/pos.css).
+// - Estáticos con hash y librerías de CDN con versión fija: primero la caché (no cambian nunca).
+// - La página del POS: primero la red; si no responde en ESPERA_RED_MS o no hay conexión,
+//   la última copia guardada. Las ventas sin red ya las encola pos.js.
+const CACHE = 'pos-{{ version }}';
+const PRECARGA = {{ precarga|safe }};
+const PAGINA_POS = "{% url 'inventario:pos' %}";
+const STATIC_URL = "{{ static_url }}";
+const CDNS = ['cdn.jsdelivr.net', 'cdnjs.cloudflare.com', 'fonts.googleapis.com', 'fonts.gstatic.com'];
+const CON_HASH = /\.[0-9a-f]{12}\.[a-z0-9]+$/;
+const ESPERA_RED_MS = 3000;
+
+self.addEventListener('install', e => {
+    e.waitUntil(caches.open(CACHE).then(c => c.addAll(PRECARGA)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', e => {
+    e.waitUntil(caches.keys()
+        .then(claves => Promise.all(claves.filter(c => c.startsWith('pos-') && c !== CACHE).map(c => caches.delete(c))))
+        .then(() => self.clients.claim()));
+});
+
+self.addEventListener('fetch', e => {
+    const peticion = e.request;
+    if (peticion.method !== 'GET') return;
+    const url = new URL(peticion.url);
+    if (url.origin === location.origin) {
+        if (peticion.mode === 'navigate' && url.pathname === PAGINA_POS) e.respondWith(redPrimero(peticion));
+        else if (url.pathname.startsWith(STATIC_URL)) e.respondWith(CON_HASH.test(url.pathname) ? cachePrimero(peticion) : redPrimero(peticion));
+    } else if (CDNS.includes(url.hostname)) {
+        e.respondWith(cachePrimero(peticion));
+    }
+});
+
+async function guardar(peticion, respuesta) {
+    // Sin redirecciones: una sesión vencida devuelve el login, que no debe quedar como "el POS"
+    if ((respuesta.ok || respuesta.type === 'opaque') && !respuesta.redirected) {
+        const cache = await caches.open(CACHE);
+        await cache.put(peticion, respuesta.clone());
+    }
+    return respuesta;
+}
+
+async function cachePrimero(peticion) {
+    return (await caches.match(peticion)) || guardar(peticion, await fetch(peticion));
+}
+
+async function redPrimero(peticion) {
+    const red = fetch(peticion).then(r => guardar(peticion, r));
+    red.catch(() => {});  // Si ganó la caché, un fallo posterior de la red no importa
+    const espera = new Promise(resolver => setTimeout(resolver, ESPERA_RED_MS));
+    try {
+        const respuesta = await Promise.race([red, espera]);
+        if (respuesta) return respuesta;
+    } catch (error) {
+        // Sin conexión: se usa la copia guardada
+    }
+    return (await caches.match(peticion)) || red;
+}
@@ -1,3 +1,1260 @@
-from django.test import TestCase
+import asyncio
+import json
+import io
+import os
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from unittest import mock
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, resolve, reverse
+from django.utils import timezone
+
+from inventario import bitacoras, consultas_lentas, metricas, middleware, urls as inventario_urls
+from inventario.anulaciones import anular_comprobantes
+from inventario.archivo import archivar_mes, meses_a_archivar, restaurar_mes
+from inventario.cobranzas import antiguedad_por_cliente, reconstruir_asignaciones
+from inventario.consolidado import reporte_consolidado
+from inventario.consultas_lentas import capturar_consultas, normalizar_sql
+from inventario.costeo import recalcular_desde_kardex
+from inventario.datos_sinteticos import sembrar
+from inventario.estaticos import PRECARGA_POS, empaquetar
+from inventario.integridad import verificar_kardex
+from inventario.fotos_stock import fechas_a_fotografiar, fin_del_dia, stock_al, tomar_fotos
+from inventario.models import (
+    Producto, Cliente, Proveedor, Compra, Comprobante, Perfil, MovimientoStock, AplicacionAbono, MovimientoCaja,
+    DetalleComprobante, PronosticoDemanda, FotoStock, PuntoControlKardex, LoginLog, PeriodoArchivado, Tienda,
+    CambioPrecioMasivo, TomaInventario, ConteoInventario, CajaDiaria, ConsultaLenta, PagoCredito,
+)
+from inventario.presupuestos import obtener_presupuesto
+from inventario.pronosticos import actualizar_pronosticos, productos_bajo_stock
+from inventario.management.commands.benchmark_arranque import MODULOS_PESADOS
+from inventario.rendimiento import medir_arranque, storages_sin_manifest
+from inventario.middleware import LecturaPropiaMiddleware, PerfiladorMiddleware
+from inventario.paquetes import restaurar_paquete
+from inventario.precios import aplicar_cambio, productos_filtrados
+from inventario.replicas import COOKIE, RouterReplica, en_primario, lee_de_replica, lectura_en_replica
+from inventario.stock_en_vivo import obtener_broker
+from inventario.tomas import aplicar_toma, cargar_conteos, diferencias, sumar_escaneo
+
+# Valores a probar para los parámetros de texto de las URLs
+VARIANTES_MODELO = {
+    'gestion_lista': ['productos', 'clientes', 'proveedores', 'compras', 'comprobantes'],
+    'gestion_crear': ['productos', 'clientes', 'proveedores', 'compras'],
+    'gestion_editar': ['productos', 'clientes', 'proveedores', 'compras'],
+    'gestion_eliminar': ['productos', 'clientes', 'proveedores', 'compras'],
+    'exportar_global': ['productos', 'clientes', 'proveedores', 'compras', 'comprobantes', 'cajas', 'movimientos'],
+    'descargar_plantilla': ['productos', 'clientes', 'proveedores', 'compras'],
+    'importar_datos': ['productos', 'clientes', 'proveedores', 'compras'],
+}
+MODELOS_PK = {'productos': Producto, 'clientes': Cliente, 'proveedores': Proveedor, 'compras': Compra}
+
+# URLs que con un GET modifican datos o cierran la sesión: se declaran pero no se recorren
+NO_RECORRER = {
+    'eliminar_usuario_tienda': 'borra al empleado con un GET',
+    'logout': 'cierra la sesión',
+}
+
+TAMANOS = {
+    'chico': dict(productos=6, clientes=6, proveedores=3, compras=8, comprobantes=10, abonos=3, dias=5),
+    'grande': dict(productos=40, clientes=40, proveedores=8, compras=60, comprobantes=80, abonos=20, dias=20),
+}
+
+
+# Sin caché del consolidado: las dos tiendas deben hacer las mismas consultas en frío
+@override_settings(STORAGES=storages_sin_manifest(), CONSOLIDATED_REPORT_CACHE_SECONDS=0)
+class PresupuestoConsultasTests(TestCase):
+    """
+    Recorre todas las URLs de inventario/urls.py con una tienda chica y otra
+    grande. Cada vista debe declarar su presupuesto y no superarlo, y la
+    cantidad de consultas no debe crecer con la cantidad de filas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tiendas = {}
+        for nombre, volumen in TAMANOS.items():
+            tienda = sembrar(tiendas=1, prefijo=f'qb{nombre}', semilla=1, **volumen)[0]
+            tienda.propietario.is_superuser = True
+            tienda.propietario.save()
+            empleado = tienda.propietario.__class__.objects.create(username=f'empleado_{nombre}')
+            Perfil.objects.create(user=empleado, tienda=tienda)
+            toma = TomaInventario.objects.create(tienda=tienda, usuario=tienda.propietario)
+            ConteoInventario.objects.bulk_create(
+                ConteoInventario(toma=toma, producto=p, cantidad=p.stock + 1) for p in Producto.objects.filter(tienda=tienda))
+            cls.tiendas[nombre] = tienda
+
+    def _kwargs(self, patron, tienda):
+        """Genera las combinaciones de argumentos para una URL con datos de `tienda`."""
+        nombres = list(patron.pattern.converters)
+        if not nombres:
+            return [{}]
+        variantes = VARIANTES_MODELO.get(patron.name, [None])
+        combinaciones = []
+        for modelo in variantes:
+            kwargs = {}
+            for arg in nombres:
+                if arg in ('modelo', 'model_name', 'data_type'):
+                    kwargs[arg] = modelo
+                elif arg == 'pk':
+                    kwargs[arg] = MODELOS_PK[modelo].objects.filter(tienda=tienda).values_list('id', flat=True).first()
+                elif arg == 'comprobante_id':
+                    kwargs[arg] = Comprobante.objects.filter(tienda=tienda).values_list('id', flat=True).first()
+                elif arg == 'producto_id':
+                    kwargs[arg] = Producto.objects.filter(tienda=tienda).values_list('id', flat=True).first()
+                elif arg == 'cliente_id':
+                    kwargs[arg] = Cliente.objects.filter(tienda=tienda, saldo_deudora__gt=0).values_list('id', flat=True).first()
+                elif arg == 'codigo':
+                    kwargs[arg] = Producto.objects.filter(tienda=tienda).values_list('codigo_barras', flat=True).first()
+                elif arg == 'usuario_id':
+                    kwargs[arg] = Perfil.objects.filter(tienda=tienda).values_list('id', flat=True).first()
+                elif arg == 'toma_id':
+                    kwargs[arg] = TomaInventario.objects.filter(tienda=tienda).values_list('id', flat=True).first()
+                else:
+                    self.fail(f"No sé qué valor usar para <{arg}> en la URL '{patron.name}'")
+            combinaciones.append(kwargs)
+        return combinaciones
+
+    def _contar(self, url, tienda):
+        self.client.force_login(tienda.propietario)
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(url)
+        return respuesta, [q['sql'] for q in ctx.captured_queries]
+
+    @staticmethod
+    def _duplicadas(consultas):
+        repetidas = Counter(normalizar_sql(sql) for sql in consultas)
+        return '\n'.join(f"  x{n}  {sql[:300]}" for sql, n in repetidas.most_common() if n > 1) or '  (ninguna)'
+
+    def test_vistas_dentro_del_presupuesto_y_sin_n_mas_1(self):
+        patrones = [p for p in inventario_urls.urlpatterns if isinstance(p, URLPattern)]
+        self.assertTrue(patrones)
+        for patron in patrones:
+            presupuesto = obtener_presupuesto(patron.callback)
+            with self.subTest(url=patron.name):
+                self.assertIsNotNone(presupuesto, f"La vista de '{patron.name}' no declara @presupuesto_consultas")
+            if patron.name in NO_RECORRER or presupuesto is None:
+                continue
+
+            chico = self._kwargs(patron, self.tiendas['chico'])
+            grande = self._kwargs(patron, self.tiendas['grande'])
+            for kwargs_chico, kwargs_grande in zip(chico, grande):
+                url_chico = reverse(f'inventario:{patron.name}', kwargs=kwargs_chico)
+                url_grande = reverse(f'inventario:{patron.name}', kwargs=kwargs_grande)
+                with self.subTest(url=url_grande):
+                    r_chico, q_chico = self._contar(url_chico, self.tiendas['chico'])
+                    r_grande, q_grande = self._contar(url_grande, self.tiendas['grande'])
+                    self.assertLess(r_grande.status_code, 500, url_grande)
+                    self.assertLessEqual(
+                        len(q_grande), presupuesto,
+                        f"{url_grande}: {len(q_grande)} consultas, presupuesto {presupuesto}.\n"
+                        f"Consultas repetidas:\n{self._duplicadas(q_grande)}")
+                    self.assertEqual(
+                        len(q_chico), len(q_grande),
+                        f"{patron.name}: las consultas crecen con los datos ({len(q_chico)} -> {len(q_grande)}).\n"
+                        f"Consultas repetidas con más datos:\n{self._duplicadas(q_grande)}")
+
+    # Escrituras: el mismo POST con pocas y con muchas líneas debe costar igual
+
+    def _post(self, nombre, datos, json_=False):
+        tienda = self.tiendas['grande']
+        self.client.force_login(tienda.propietario)
+        url = reverse(f'inventario:{nombre}')
+        with CaptureQueriesContext(connection) as ctx:
+            if json_:
+                respuesta = self.client.post(url, json.dumps(datos), content_type='application/json')
+            else:
+                respuesta = self.client.post(url, datos)
+        return respuesta, [q['sql'] for q in ctx.captured_queries]
+
+    def _carrito(self, productos, **extra):
+        return {'tipo_comprobante': 'BOLETA', 'metodo_pago': 'EFECTIVO', 'cliente_id': '', **extra,
+                'cart': [{'id': p.id, 'price': str(p.precio), 'quantity': 1} for p in productos]}
+
+    def _escrituras(self, n):
+        """{url: (vista, datos del POST, es_json)} con `n` líneas, comprobantes o ventas por petición."""
+        tienda = self.tiendas['grande']
+        productos = list(Producto.objects.filter(tienda=tienda).order_by('id')[:n])
+        cliente = Cliente.objects.filter(tienda=tienda).first()
+        emitidos = Comprobante.objects.filter(tienda=tienda, estado='EMITIDO').order_by('id')
+        # Mitad al contado y mitad al crédito: la anulación recorre devolución de caja y deuda
+        anular = [*emitidos.filter(metodo_pago='EFECTIVO')[:n // 2], *emitidos.filter(metodo_pago='CREDITO')[:n - n // 2]]
+        return {
+            'emitir_comprobante': ('emitir_comprobante', {
+                'tipo_comprobante': 'BOLETA', 'metodo_pago': 'CREDITO', 'cliente_id': cliente.id,
+                'producto_id': productos[-1].id, 'cantidad': n}, False),
+            'emitir_comprobante_ajax': (
+                'emitir_comprobante_ajax',
+                self._carrito(productos, metodo_pago='CREDITO', cliente_id=cliente.id), True),
+            'sincronizar_ventas': ('sincronizar_ventas', {'ventas': [
+                self._carrito(productos[:2], clave=f'lote{n}-{i}', metodo_pago='CREDITO', cliente_id=cliente.id)
+                for i in range(n)]}, True),
+            'anular_comprobantes': ('anular_comprobantes', {'ids': [c.id for c in anular]}, False),
+            # Una compra es de un solo producto: varía cuál (y con él su historial de Kardex)
+            'registrar_compra': ('registrar_compra', {
+                'proveedor': Proveedor.objects.filter(tienda=tienda).first().id, 'producto': productos[-1].id,
+                'cantidad': n, 'costo_total': 10 * n}, False),
+        }
+
+    def test_escrituras_dentro_del_presupuesto_y_sin_n_mas_1(self):
+        tienda = self.tiendas['grande']
+        Producto.objects.filter(tienda=tienda).update(stock=F('stock') + 1000)
+        CajaDiaria.objects.create(tienda=tienda, usuario_apertura=tienda.propietario, estado='ABIERTA')
+        pocas, muchas = self._escrituras(2), self._escrituras(8)
+        for caso in pocas:
+            nombre, datos_pocas, json_ = pocas[caso]
+            datos_muchas = muchas[caso][1]
+            presupuesto = obtener_presupuesto(resolve(reverse(f'inventario:{nombre}')).func)
+            with self.subTest(vista=caso):
+                r_pocas, q_pocas = self._post(nombre, datos_pocas, json_)
+                r_muchas, q_muchas = self._post(nombre, datos_muchas, json_)
+                for r in (r_pocas, r_muchas):
+                    self.assertIn(r.status_code, (200, 302), r.content[:300])
+                    # Las vistas de formulario informan sus errores con messages y redirigen igual
+                    self.assertFalse([str(m) for m in get_messages(r.wsgi_request) if m.level == messages.ERROR])
+                self.assertLessEqual(
+                    len(q_muchas), presupuesto,
+                    f"{caso}: {len(q_muchas)} consultas, presupuesto {presupuesto}.\n"
+                    f"Consultas repetidas:\n{self._duplicadas(q_muchas)}")
+                self.assertEqual(
+                    len(q_pocas), len(q_muchas),
+                    f"{caso}: las consultas crecen con el tamaño del POST ({len(q_pocas)} -> {len(q_muchas)}).\n"
+                    f"Consultas repetidas:\n{self._duplicadas(q_muchas)}")
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+@mock.patch.object(metricas, '_asegurar_escritor')
+class MetricasTests(SimpleTestCase):
+    """Registro propio por test: las métricas reales del módulo no se tocan."""
+
+    def setUp(self):
+        for registro in (metricas._REGISTRO, metricas._GAUGES):
+            parche = mock.patch.dict(registro, clear=True)
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.ventas = metricas.Contador('t_ventas_total', 'Ventas', ('tienda',))
+        self.latencia = metricas.Histograma('t_latencia_segundos', 'Latencia', buckets=(0.1, 1))
+
+    def test_formato_de_exposicion(self, _):
+        self.ventas.inc(tienda='Lima "centro"')
+        self.ventas.inc(2, tienda='Lima "centro"')
+        for valor in (0.05, 0.5, 3):
+            self.latencia.observar(valor)
+        metricas.gauge('t_cajas', 'Cajas')(lambda: {(('tienda', '1'),): 2})
+
+        self.assertEqual(metricas.exponer().splitlines(), [
+            '# HELP t_ventas_total Ventas',
+            '# TYPE t_ventas_total counter',
+            't_ventas_total{tienda="Lima \\"centro\\""} 3',
+            '# HELP t_latencia_segundos Latencia',
+            '# TYPE t_latencia_segundos histogram',
+            't_latencia_segundos_bucket{le="0.1"} 1',
+            't_latencia_segundos_bucket{le="1"} 2',
+            't_latencia_segundos_bucket{le="+Inf"} 3',
+            't_latencia_segundos_sum 3.55',
+            't_latencia_segundos_count 3',
+            '# HELP t_cajas Cajas',
+            '# TYPE t_cajas gauge',
+            't_cajas{tienda="1"} 2',
+        ])
+
+    def test_suma_los_workers_y_borra_las_fotos_vencidas(self, _):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        directorio = temporal.name
+        self.ventas.inc(tienda='1')
+        self.latencia.observar(0.5)
+        foto = {'t_ventas_total': {'["1"]': 4, '["2"]': 1}, 't_latencia_segundos': {'[]': [1, 0, 0.05, 1]}}
+
+        def escribir(nombre, antiguedad=0):
+            ruta = os.path.join(directorio, nombre)
+            with open(ruta, 'w') as f:
+                json.dump(foto, f)
+            if antiguedad:
+                os.utime(ruta, (time.time() - antiguedad,) * 2)
+
+        vivo = os.getppid()
+        escribir(f'metricas_{vivo}_1.json')
+        escribir(f'metricas_{vivo}_2.json', antiguedad=3600)  # Worker colgado
+        escribir('metricas_999999999_3.json')  # PID que ya no existe
+
+        with override_settings(METRICS_MULTIPROC_DIR=directorio, METRICS_STALE_SECONDS=60):
+            metricas.escribir_foto()  # La foto propia no se suma dos veces
+            texto = metricas.exponer()
+        self.assertIn('t_ventas_total{tienda="1"} 5', texto)
+        self.assertIn('t_ventas_total{tienda="2"} 1', texto)
+        self.assertIn('t_latencia_segundos_bucket{le="1"} 2', texto)
+        self.assertIn('t_latencia_segundos_count 2', texto)
+        self.assertEqual(sorted(os.listdir(directorio)), sorted([
+            f'metricas_{vivo}_1.json', os.path.basename(metricas._ruta_propia(directorio))]))
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class ConsultasLentasTests(TestCase):
+
+    def setUp(self):
+        consultas_lentas._buffer.clear()
+        self.addCleanup(consultas_lentas._buffer.clear)
+        self.usuario = User.objects.create(username='lento')
+        self.tienda = Tienda.objects.create(propietario=self.usuario, nombre='Lenta')
+
+    def _capturar(self, vista, consultas=1):
+        request = RequestFactory().get(f'/{vista}/')
+        request.user = self.usuario
+        with capturar_consultas(request) as capturador:
+            for i in range(consultas):
+                list(Producto.objects.filter(id__in=[i, i + 1], nombre=f'x{i}'))
+        return capturador
+
+    def test_normalizacion_agrupa_la_misma_consulta(self):
+        self.assertEqual(
+            normalizar_sql("SELECT *  FROM t\n WHERE id IN (%s, %s, %s) AND nombre = 'O''Brien' AND precio > 10.5"),
+            "SELECT * FROM t WHERE id IN (...) AND nombre = ? AND precio > ?")
+        self.assertEqual(normalizar_sql("SELECT 1 FROM t WHERE id IN (?)"), normalizar_sql("SELECT 2 FROM t WHERE id IN (?, ?)"))
+        self.assertEqual(consultas_lentas.forma_parametros((1, 'a', None)), '(int, str, NoneType)')
+
+    def test_captura_y_volcado_acumulan_por_consulta_vista_y_tienda(self):
+        self._capturar('caja', consultas=3)
+        self.assertEqual(len(consultas_lentas._buffer), 3)
+        self.assertEqual({(c['vista'], c['user_id']) for c in consultas_lentas._buffer}, {('/caja/', self.usuario.id)})
+
+        self.assertEqual(consultas_lentas.volcar_buffer(forzar=True), 3)
+        self._capturar('caja', consultas=2)
+        consultas_lentas.volcar_buffer(forzar=True)
+        fila = ConsultaLenta.objects.get()
+        self.assertEqual((fila.vista, fila.tienda_id, fila.ejecuciones), ('/caja/', self.tienda.id, 5))
+        self.assertNotIn("'x", fila.sql_normalizado)
+
+    @override_settings(SLOW_QUERY_CAPTURE=True)
+    def test_middleware_captura_sin_volcar_en_la_peticion(self):
+        request = RequestFactory().get('/caja/')
+        request.user = self.usuario
+        with mock.patch.object(middleware, 'iniciar_volcado') as iniciar, \
+                mock.patch.object(consultas_lentas, 'volcar_buffer') as volcar:
+            capa = middleware.ConsultasLentasMiddleware(lambda r: HttpResponse(Producto.objects.count()))
+            self.assertEqual(capa(request).content, b'0')
+        iniciar.assert_called_once_with()
+        volcar.assert_not_called()
+        self.assertEqual(len(consultas_lentas._buffer), 1)
+
+    def test_volcado_suma_si_otro_worker_creo_la_fila_primero(self):
+        self._capturar('caja', consultas=2)
+        consultas_lentas.volcar_buffer(forzar=True)
+        self._capturar('caja')
+        # El primer UPDATE "no encuentra" la fila (la creó otro worker justo después): el INSERT choca
+        intentos = iter([lambda *a: False, consultas_lentas._acumular])
+        with mock.patch.object(consultas_lentas, '_acumular', side_effect=lambda *a: next(intentos)(*a)) as parche:
+            consultas_lentas.volcar_buffer(forzar=True)
+        self.assertEqual(parche.call_count, 2)
+        self.assertEqual(ConsultaLenta.objects.get().ejecuciones, 3)
+
+
+@override_settings(PROFILES_DIR='')
+class PerfiladorTests(TestCase):
+
+    @staticmethod
+    def _vista(request):
+        return HttpResponse(f'normal {User.objects.count()}')
+
+    @staticmethod
+    async def _vista_async(request):
+        return HttpResponse('normal')
+
+    def _pedido(self, query, superusuario):
+        request = RequestFactory().get('/reporte/', {'__profile': query} if query else {})
+        request.user = User(username='perfilado', is_superuser=superusuario)
+        return request
+
+    def test_solo_el_superusuario_recibe_el_reporte(self):
+        capa = PerfiladorMiddleware(self._vista)
+        for query, superusuario in (('1', False), ('', True), ('0', True)):
+            with self.subTest(query=query, superusuario=superusuario):
+                self.assertEqual(capa(self._pedido(query, superusuario)).content, b'normal 0')
+
+        respuesta = capa(self._pedido('1', True))
+        texto = respuesta.content.decode()
+        self.assertEqual(respuesta['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertTrue(texto.startswith('PERFIL DE GET /reporte/'))
+        self.assertIn('en 1 consultas', texto)
+        self.assertIn('=== cPROFILE (acumulado) ===', texto)
+
+    def test_modo_async(self):
+        capa = PerfiladorMiddleware(self._vista_async)
+        self.assertTrue(iscoroutinefunction(capa))
+        self.assertEqual(asyncio.run(capa(self._pedido('1', False))).content, b'normal')
+        self.assertEqual(asyncio.run(capa(self._pedido('', True))).content, b'normal')
+        texto = asyncio.run(capa(self._pedido('1', True))).content.decode()
+        self.assertTrue(texto.startswith('PERFIL DE GET /reporte/'))
+        self.assertIn('Status: 200', texto)
+
+
+class StockEnVivoTests(TestCase):
+    """Los cambios de stock llegan, ya confirmados, solo a los POS de la misma tienda."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda, cls.otra = sembrar(tiendas=2, productos=4, clientes=2, proveedores=1, compras=6,
+                                       comprobantes=0, abonos=0, prefijo='vivo', semilla=3)
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.broker = obtener_broker()
+
+    def _suscribir(self, tienda):
+        async def suscribir():
+            return self.broker.suscribir(tienda.id)
+        suscripcion = self.loop.run_until_complete(suscribir())
+        self.addCleanup(self.broker.desuscribir, suscripcion)
+        return suscripcion
+
+    def _recibido(self, suscripcion):
+        return self.loop.run_until_complete(suscripcion.esperar(0.05))
+
+    def test_venta_llega_solo_a_los_pos_de_su_tienda(self):
+        propia, ajena = self._suscribir(self.tienda), self._suscribir(self.otra)
+        producto = Producto.objects.filter(tienda=self.tienda, stock__gte=1).first()
+        carrito = {'tipo_comprobante': 'BOLETA', 'metodo_pago': 'EFECTIVO',
+                   'cart': [{'id': producto.id, 'price': str(producto.precio), 'quantity': 1}]}
+        self.client.force_login(self.tienda.propietario)
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post(reverse('inventario:emitir_comprobante_ajax'), json.dumps(carrito),
+                                 content_type='application/json')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self._recibido(propia),
+                         [{'id': producto.id, 'stock': float(producto.stock - 1), 'precio': str(producto.precio)}])
+        self.assertEqual(self._recibido(ajena), [])
+
+    def test_rollback_no_publica_y_eliminar_si(self):
+        suscripcion = self._suscribir(self.tienda)
+        producto = Producto.objects.filter(tienda=self.tienda).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    producto.stock += 10
+                    producto.save()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self._recibido(suscripcion), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.get(id=producto.id).delete()
+        self.assertEqual(self._recibido(suscripcion), [{'id': producto.id, 'eliminado': True}])
+
+    def test_sin_asgi_el_canal_responde_204(self):
+        self.client.force_login(self.tienda.propietario)
+        self.assertEqual(self.client.get(reverse('inventario:eventos_stock')).status_code, 204)
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class SincronizacionVentasTests(TestCase):
+    """El lote offline se aplica en orden, reporta conflictos y es seguro de reintentar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=3, clientes=2, proveedores=1, compras=6,
+                             comprobantes=0, abonos=0, prefijo='sync', semilla=5)[0]
+        cls.producto = Producto.objects.filter(tienda=cls.tienda).first()
+        cls.producto.stock = 5
+        cls.producto.save()
+        cls.deudor = Cliente.objects.filter(tienda=cls.tienda).first()
+
+    def _venta(self, clave, cantidad, **extra):
+        return {'clave': clave, 'tipo_comprobante': 'BOLETA', 'metodo_pago': 'EFECTIVO',
+                'cart': [{'id': self.producto.id, 'price': '10.00', 'quantity': cantidad}], **extra}
+
+    def _sincronizar(self, ventas):
+        self.client.force_login(self.tienda.propietario)
+        r = self.client.post(reverse('inventario:sincronizar_ventas'), json.dumps({'ventas': ventas}),
+                             content_type='application/json')
+        self.assertEqual(r.status_code, 200, r.content)
+        return {x['clave']: x for x in r.json()['resultados']}
+
+    def test_lote_en_orden_con_conflicto_y_reintento_idempotente(self):
+        lote = [
+            self._venta('a', 3),
+            self._venta('b', 3),  # Solo quedan 2: conflicto
+            self._venta('c', 2, metodo_pago='CREDITO', cliente_id=self.deudor.id),
+            self._venta('a', 3),  # Clave repetida dentro del mismo lote
+        ]
+        saldo_inicial = self.deudor.saldo_deudora
+        resultados = self._sincronizar(lote)
+        self.assertEqual(resultados['a']['estado'], 'duplicado')
+        self.assertEqual(resultados['b']['estado'], 'sin_stock')
+        self.assertEqual(resultados['b']['faltantes'], [{'id': self.producto.id, 'disponible': 2.0, 'solicitado': 3.0}])
+        self.assertEqual(resultados['c']['estado'], 'emitido')
+        self.assertEqual(Comprobante.objects.filter(tienda=self.tienda).count(), 2)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 0)
+        self.assertEqual(MovimientoStock.objects.filter(producto=self.producto, tipo='SALIDA').count(), 2)
+        self.deudor.refresh_from_db()
+        self.assertEqual(self.deudor.saldo_deudora, saldo_inicial + 20)
+
+        # Reintento completo (ej. se perdió la respuesta): nada cambia
+        reintento = self._sincronizar(lote)
+        self.assertEqual({k: v['estado'] for k, v in reintento.items()},
+                         {'a': 'duplicado', 'b': 'sin_stock', 'c': 'duplicado'})
+        self.assertEqual(reintento['c']['comprobante_id'], resultados['c']['comprobante_id'])
+        self.assertEqual(Comprobante.objects.filter(tienda=self.tienda).count(), 2)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 0)
+
+    def test_checkout_en_linea_sigue_la_misma_regla_de_stock(self):
+        self.client.force_login(self.tienda.propietario)
+        url = reverse('inventario:emitir_comprobante_ajax')
+        # El producto repetido en el carrito suma 6 > 5: se rechaza entero y no toca nada
+        carrito = self._venta('en-linea', 3)
+        carrito['cart'].append(dict(carrito['cart'][0]))
+        r = self.client.post(url, json.dumps(carrito), content_type='application/json')
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(r.json()['faltantes'], [{'id': self.producto.id, 'disponible': 5.0, 'solicitado': 6.0}])
+        self.assertFalse(Comprobante.objects.filter(tienda=self.tienda).exists())
+
+        carrito['cart'][1]['quantity'] = 2
+        r = self.client.post(url, json.dumps(carrito), content_type='application/json')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()['stocks_actualizados'], [{'id': self.producto.id, 'stock': 0.0}])
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 0)
+        salidas = MovimientoStock.objects.filter(producto=self.producto, tipo='SALIDA').order_by('id')
+        self.assertEqual([(m.stock_antes, m.stock_despues) for m in salidas], [(5, 2), (2, 0)])
+
+    def test_formulario_de_emision_404_y_metrica_al_confirmar(self):
+        self.client.force_login(self.tienda.propietario)
+        url = reverse('inventario:emitir_comprobante')
+        datos = {'tipo_comprobante': 'BOLETA', 'metodo_pago': 'EFECTIVO', 'producto_id': self.producto.id}
+        clave = (str(self.tienda.id), 'BOLETA')
+        emitidos = lambda: metricas.comprobantes_emitidos._valores.get(clave, 0)
+        antes = emitidos()
+
+        self.assertEqual(self.client.post(url, dict(datos, producto_id=999999)).status_code, 404)
+        r = self.client.post(url, dict(datos, cantidad=6))  # Solo hay 5
+        self.assertIn('Stock insuficiente', [str(m) for m in get_messages(r.wsgi_request)][0])
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post(url, dict(datos, cantidad=2))
+        self.assertRedirects(r, reverse('inventario:vista_ticket_comprobante', args=[Comprobante.objects.get().id]),
+                             fetch_redirect_response=False)
+        self.assertEqual(emitidos(), antes + 1)
+
+    def test_detalle_en_linea_guarda_lo_mismo_que_la_sincronizacion(self):
+        self.client.force_login(self.tienda.propietario)
+        venta = self._venta('montos', 2)
+        venta['cart'][0]['price'] = '11.80'
+        r = self.client.post(reverse('inventario:emitir_comprobante_ajax'), json.dumps(venta),
+                             content_type='application/json')
+        self.assertEqual(r.status_code, 200, r.content)
+        self._sincronizar([dict(venta, clave='montos-offline')])
+
+        detalles = DetalleComprobante.objects.filter(producto=self.producto).order_by('id')
+        # Subtotal sin IGV (2 x 10.00): es lo que suman los reportes como venta neta
+        self.assertEqual([(d.subtotal, d.precio_unitario_con_igv) for d in detalles],
+                         [(Decimal('20.00'), Decimal('11.80'))] * 2)
+
+    def test_consultas_no_crecen_con_el_lote(self):
+        self.client.force_login(self.tienda.propietario)
+        url = reverse('inventario:sincronizar_ventas')
+        conteos = []
+        for n, prefijo in ((1, 'x'), (4, 'y')):
+            ventas = [self._venta(f'{prefijo}{i}', '0.5') for i in range(n)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(url, json.dumps({'ventas': ventas}), content_type='application/json')
+            conteos.append(len(ctx.captured_queries))
+        self.assertEqual(conteos[0], conteos[1])
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class BuscarClientesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=2, clientes=45, proveedores=1, compras=2,
+                             comprobantes=0, abonos=0, prefijo='cli', semilla=7)[0]
+        cls.jose = Cliente.objects.create(tienda=cls.tienda, nombre_completo='José Muñoz', dni='45678912', dni_ruc='45678912')
+
+    def _buscar(self, **params):
+        self.client.force_login(self.tienda.propietario)
+        return self.client.get(reverse('inventario:buscar_clientes_api'), params).json()
+
+    def test_documento_exacto_prefijo_nombre_y_paginas(self):
+        self.assertEqual([c['id'] for c in self._buscar(q='45678912')['results']], [self.jose.id])
+        self.assertIn(self.jose.id, [c['id'] for c in self._buscar(q='4567')['results']])
+        self.assertEqual([c['id'] for c in self._buscar(q='jose mu')['results']], [self.jose.id])
+
+        primera, segunda = self._buscar(page=1), self._buscar(page=2)
+        self.assertEqual(len(primera['results']), 20)
+        self.assertTrue(primera['pagination']['more'])
+        self.assertFalse({c['id'] for c in primera['results']} & {c['id'] for c in segunda['results']})
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class CuentasPorCobrarTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=2, clientes=2, proveedores=1, compras=2,
+                             comprobantes=0, abonos=0, dias=1, prefijo='cxc', semilla=9)[0]
+        cls.cliente = Cliente.objects.create(tienda=cls.tienda, nombre_completo='Deudor', dni_ruc='11111111',
+                                             saldo_deudora=Decimal('180'))
+        cls.creditos = []
+        for dias, total in ((100, '100'), (45, '50'), (0, '30')):
+            c = Comprobante.objects.create(tienda=cls.tienda, tipo_comprobante='BOLETA', serie='B001', cliente=cls.cliente,
+                                           total_final=Decimal(total), metodo_pago='CREDITO', estado_pago=False)
+            Comprobante.objects.filter(id=c.id).update(fecha_emision=timezone.now() - timedelta(days=dias))
+            cls.creditos.append(c)
+
+    def test_abono_fifo_y_antiguedad(self):
+        self.client.force_login(self.tienda.propietario)
+        r = self.client.post(reverse('inventario:registrar_abono', args=[self.cliente.id]),
+                             {'monto': '120', 'metodo': 'EFECTIVO'})
+        self.assertRedirects(r, reverse('inventario:lista_deudores'), fetch_redirect_response=False)
+
+        viejo, medio, nuevo = (Comprobante.objects.get(id=c.id) for c in self.creditos)
+        self.assertEqual((viejo.monto_abonado, viejo.estado_pago), (Decimal('100'), True))
+        self.assertEqual((medio.monto_abonado, medio.estado_pago), (Decimal('20'), False))
+        self.assertEqual((nuevo.monto_abonado, nuevo.estado_pago), (Decimal('0'), False))
+        self.assertEqual(AplicacionAbono.objects.filter(pago__cliente=self.cliente).count(), 2)
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.saldo_deudora, Decimal('60'))
+
+        filas, totales = antiguedad_por_cliente(self.tienda)
+        fila = filas.get(cliente_id=self.cliente.id)
+        self.assertEqual([fila[t] for t in ('d0_30', 'd31_60', 'd61_90', 'd90_mas', 'total')],
+                         [Decimal('30'), Decimal('30'), 0, 0, Decimal('60')])
+        self.assertEqual(totales['total'], Decimal('60'))
+        self.assertContains(self.client.get(reverse('inventario:lista_deudores')), 'Deudor')
+
+    def test_abonos_sembrados_despues_del_primer_credito(self):
+        tienda = sembrar(tiendas=1, productos=5, clientes=6, proveedores=1, compras=10, comprobantes=80,
+                         abonos=40, dias=30, prefijo='cxcsem', semilla=3)[0]
+        pagos = PagoCredito.objects.filter(cliente__tienda=tienda).order_by('fecha', 'id')
+        self.assertTrue(pagos.exists())
+        pagado = Counter()
+        for pago in pagos:
+            creditos = Comprobante.objects.filter(cliente=pago.cliente, metodo_pago='CREDITO', fecha_emision__lt=pago.fecha)
+            pagado[pago.cliente_id] += pago.monto
+            # Ningún cliente llega a deber menos que cero en ningún momento
+            self.assertLessEqual(pagado[pago.cliente_id], creditos.aggregate(t=Sum('total_final'))['t'] or 0)
+        for cliente in Cliente.objects.filter(tienda=tienda, saldo_deudora__gt=0):
+            abierto = Comprobante.objects.filter(cliente=cliente, metodo_pago='CREDITO').aggregate(
+                t=Sum(F('total_final') - F('monto_abonado')))['t']
+            self.assertEqual(cliente.saldo_deudora, abierto)
+
+    def test_reconstruir_no_asigna_abonos_a_anulados(self):
+        viejo, medio, nuevo = self.creditos
+        Comprobante.objects.filter(id=viejo.id).update(estado='ANULADO')
+        PagoCredito.objects.create(cliente=self.cliente, monto=Decimal('60'))
+        reconstruir_asignaciones(self.tienda.id)
+
+        self.assertFalse(AplicacionAbono.objects.filter(comprobante=viejo).exists())
+        self.assertEqual(
+            [(c.monto_abonado, c.estado_pago) for c in Comprobante.objects.filter(id__in=[medio.id, nuevo.id]).order_by('id')],
+            [(Decimal('50'), True), (Decimal('10'), False)])
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class PronosticoDemandaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=2, clientes=1, proveedores=1, compras=2,
+                             comprobantes=0, abonos=0, dias=1, prefijo='pron', semilla=11)[0]
+        cls.vendido, cls.quieto = Producto.objects.filter(tienda=cls.tienda).order_by('id')
+        # 3 unidades diarias del primero durante los últimos 20 días
+        ahora = timezone.now()
+        comprobantes = Comprobante.objects.bulk_create([
+            Comprobante(tienda=cls.tienda, tipo_comprobante='BOLETA', serie='B001', numero=d, total_final=Decimal('30'))
+            for d in range(1, 21)
+        ])
+        for d, c in enumerate(comprobantes, start=1):
+            Comprobante.objects.filter(id=c.id).update(fecha_emision=ahora - timedelta(days=d))
+        DetalleComprobante.objects.bulk_create([
+            DetalleComprobante(comprobante=c, producto=cls.vendido, cantidad=Decimal('3'),
+                               precio_unitario=Decimal('10'), subtotal=Decimal('30'))
+            for c in comprobantes
+        ])
+
+    def test_incremental_igual_a_completo_y_reorden(self):
+        hoy = timezone.localdate()
+        actualizar_pronosticos(self.tienda, completo=True, hoy=hoy - timedelta(days=5))
+        self.assertEqual(actualizar_pronosticos(self.tienda, hoy=hoy), 2)
+        self.assertEqual(actualizar_pronosticos(self.tienda, hoy=hoy), 0)
+        incremental = PronosticoDemanda.objects.get(producto=self.vendido)
+        actualizar_pronosticos(self.tienda, completo=True, hoy=hoy)
+        completo = PronosticoDemanda.objects.get(producto=self.vendido)
+        self.assertAlmostEqual(incremental.nivel, completo.nivel)
+        self.assertGreater(completo.demanda_diaria, 0)
+        self.assertGreater(completo.punto_reorden, completo.demanda_diaria * 7)
+        self.assertEqual(PronosticoDemanda.objects.get(producto=self.quieto).punto_reorden, 0)
+
+        # Sin stock: el que se vende entra al reporte, el que no se vende no
+        Producto.objects.filter(tienda=self.tienda).update(stock=0)
+        self.assertEqual(list(productos_bajo_stock(self.tienda)), [self.vendido])
+        self.client.force_login(self.tienda.propietario)
+        r = self.client.get(reverse('inventario:sugerencia_compra'))
+        self.assertContains(r, self.vendido.nombre)
+        self.assertNotContains(r, self.quieto.nombre)
+
+    def test_dashboard_cuenta_con_el_pronostico_al_dia(self):
+        # Sin pronóstico calculado (nadie abrió los reportes todavía) el dashboard lo calcula
+        PronosticoDemanda.objects.filter(tienda=self.tienda).delete()
+        Producto.objects.filter(tienda=self.tienda).update(stock=0)
+        self.client.force_login(self.tienda.propietario)
+        r = self.client.get(reverse('inventario:dashboard'))
+        self.assertEqual(r.context['productos_bajo_stock'], 1)
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class CostoPromedioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=1, clientes=1, proveedores=1, compras=0,
+                             comprobantes=0, abonos=0, dias=1, prefijo='cpp', semilla=5)[0]
+        cls.proveedor = Proveedor.objects.get(tienda=cls.tienda)
+        cls.producto = Producto.objects.get(tienda=cls.tienda)
+        # Inventario inicial: 10 a S/ 5, igual en el producto y en el Kardex
+        Producto.objects.filter(id=cls.producto.id).update(stock=10, costo=Decimal('5'))
+        MovimientoStock.objects.filter(producto=cls.producto).update(
+            cantidad=10, stock_despues=10, costo_unitario=Decimal('5'), costo_promedio=Decimal('5'))
+
+    def _comprar(self, cantidad, total):
+        self.client.post(reverse('inventario:registrar_compra'), {
+            'proveedor': self.proveedor.id, 'producto': self.producto.id, 'cantidad': cantidad, 'costo_total': total,
+        })
+        return Compra.objects.filter(producto=self.producto).order_by('-id').first()
+
+    def test_compras_promedian_y_se_revierten(self):
+        self.client.force_login(self.tienda.propietario)
+        primera = self._comprar('10', '70')  # 10 a 5 + 10 a 7
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.stock, self.producto.costo), (Decimal('20'), Decimal('6')))
+        self._comprar('20', '180')  # + 20 a 9
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.costo, Decimal('7.5'))
+
+        self.client.post(reverse('inventario:gestion_eliminar', args=['compras', primera.id]))
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.stock, self.producto.costo), (Decimal('30'), Decimal('7.6667')))
+        self.assertEqual(MovimientoStock.objects.filter(producto=self.producto, tipo='SALIDA').count(), 1)
+
+        # La reconstrucción desde el Kardex llega al mismo costo
+        Producto.objects.filter(id=self.producto.id).update(costo=0)
+        recalcular_desde_kardex(self.tienda.id)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.costo, Decimal('7.6667'))
+
+    def test_compra_desde_el_admin_suma_stock_y_cuadra_con_el_kardex(self):
+        admin_user = self.tienda.propietario
+        admin_user.is_staff = admin_user.is_superuser = True
+        admin_user.save()
+        self.client.force_login(admin_user)
+        self.client.post(reverse('admin:inventario_compra_add'), {
+            'tienda': self.tienda.id, 'proveedor': self.proveedor.id, 'producto': self.producto.id,
+            'cantidad': '10', 'costo_total': '70', 'fecha_de_compra': timezone.localdate().isoformat(),
+        })
+        compra = Compra.objects.get(producto=self.producto)
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.stock, self.producto.costo), (Decimal('20'), Decimal('6')))
+        entrada = MovimientoStock.objects.filter(producto=self.producto).latest('id')
+        self.assertEqual((entrada.stock_antes, entrada.stock_despues), (Decimal('10'), Decimal('20')))
+
+        self.client.post(reverse('admin:inventario_compra_delete', args=[compra.id]), {'post': 'yes'})
+        self.producto.refresh_from_db()
+        self.assertFalse(Compra.objects.filter(id=compra.id).exists())
+        self.assertEqual((self.producto.stock, self.producto.costo), (Decimal('10'), Decimal('5')))
+        self.assertEqual(verificar_kardex(self.tienda), [])
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class FotosStockTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=8, clientes=5, proveedores=2, compras=40,
+                             comprobantes=120, abonos=0, dias=20, prefijo='foto', semilla=13)[0]
+
+    def _recorrer_kardex(self, momento):
+        stock = {}
+        for pid, despues in MovimientoStock.objects.filter(
+                producto__tienda=self.tienda, fecha__lt=momento).order_by('fecha', 'id').values_list('producto_id', 'stock_despues'):
+            stock[pid] = despues
+        return stock
+
+    def test_foto_mas_delta_igual_a_recorrer_el_kardex(self):
+        hoy = timezone.localdate()
+        tomar_fotos(self.tienda, fechas_a_fotografiar(hoy - timedelta(days=15), hoy - timedelta(days=1)))
+        self.assertEqual(FotoStock.objects.filter(tienda=self.tienda).count(), 15 * 8)
+
+        for momento in (timezone.now() - timedelta(days=17, hours=3), fin_del_dia(hoy - timedelta(days=9)),
+                        timezone.now() - timedelta(days=4, hours=7), timezone.now()):
+            with CaptureQueriesContext(connection) as consultas:
+                estado = stock_al(self.tienda, momento)
+            self.assertLessEqual(len(consultas), 3)
+            esperado = self._recorrer_kardex(momento)
+            self.assertEqual({pid: stock for pid, (stock, _) in estado.items() if pid in esperado}, esperado)
+
+        self.client.force_login(self.tienda.propietario)
+        producto = Producto.objects.filter(tienda=self.tienda).first()
+        r = self.client.get(reverse('inventario:stock_al_api'), {'producto': producto.id})
+        self.assertEqual(r.json()['productos'][0]['stock'], str(producto.stock))
+
+
+@override_settings(KARDEX_CHECK_MARGIN_SECONDS=0)
+class VerificarKardexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=5, clientes=3, proveedores=1, compras=10,
+                             comprobantes=30, abonos=0, dias=5, prefijo='kdx', semilla=17)[0]
+
+    def test_detecta_corrige_y_avanza_el_punto_de_control(self):
+        self.assertEqual(verificar_kardex(self.tienda), [])
+        ultimo = MovimientoStock.objects.filter(producto__tienda=self.tienda).latest('id').id
+        self.assertTrue(PuntoControlKardex.objects.filter(ultimo_movimiento_id=ultimo).exists())
+
+        # Edición directa del stock: no deja rastro en el Kardex
+        producto = Producto.objects.filter(tienda=self.tienda).first()
+        Producto.objects.filter(id=producto.id).update(stock=F('stock') + 4)
+        diferencias = verificar_kardex(self.tienda, corregir=True)
+        self.assertEqual([(d['producto_id'], d['diferencia']) for d in diferencias], [(producto.id, Decimal('4'))])
+        ajuste = MovimientoStock.objects.filter(producto=producto).latest('id')
+        self.assertEqual((ajuste.tipo, ajuste.cantidad), ('ENTRADA', Decimal('4')))
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(verificar_kardex(self.tienda), [])
+        self.assertLessEqual(len(consultas), 6)
+
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class AnulacionComprobantesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=6, clientes=4, proveedores=1, compras=10,
+                             comprobantes=40, abonos=0, dias=4, prefijo='anu', semilla=23)[0]
+
+    def _esperado(self, comprobantes):
+        stock = dict(Producto.objects.filter(tienda=self.tienda).values_list('id', 'stock'))
+        deuda = dict(Cliente.objects.filter(tienda=self.tienda).values_list('id', 'saldo_deudora'))
+        for d in DetalleComprobante.objects.filter(comprobante__in=comprobantes):
+            stock[d.producto_id] += d.cantidad
+        for c in comprobantes:
+            if c.metodo_pago == 'CREDITO' and c.cliente_id:
+                deuda[c.cliente_id] -= c.total_final - c.monto_abonado
+        return stock, deuda
+
+    def test_anula_en_bloque_con_consultas_constantes(self):
+        emitidos = list(Comprobante.objects.filter(tienda=self.tienda, estado='EMITIDO').order_by('id'))
+        uno, varios = emitidos[:1], emitidos[1:25]
+        self.assertTrue(any(c.metodo_pago == 'CREDITO' for c in varios))
+
+        with CaptureQueriesContext(connection) as pocas:
+            self.assertEqual(anular_comprobantes(self.tienda, [c.id for c in uno]), 1)
+        stock, deuda = self._esperado(varios)
+        kardex_antes = MovimientoStock.objects.filter(producto__tienda=self.tienda).count()
+        with CaptureQueriesContext(connection) as muchas:
+            self.assertEqual(anular_comprobantes(self.tienda, [c.id for c in varios] + [uno[0].id]), len(varios))
+        self.assertLessEqual(len(muchas), 12)
+        self.assertLessEqual(len(muchas) - len(pocas), 2)  # A lo más, la deuda de clientes y los egresos de caja
+
+        self.assertEqual(dict(Producto.objects.filter(tienda=self.tienda).values_list('id', 'stock')), stock)
+        self.assertEqual(dict(Cliente.objects.filter(tienda=self.tienda).values_list('id', 'saldo_deudora')), deuda)
+        self.assertEqual(Comprobante.objects.filter(id__in=[c.id for c in emitidos[:25]], estado='ANULADO').count(), 25)
+        pares = DetalleComprobante.objects.filter(comprobante__in=varios).values('comprobante_id', 'producto_id').distinct()
+        self.assertEqual(MovimientoStock.objects.filter(producto__tienda=self.tienda).count() - kardex_antes, pares.count())
+        self.assertTrue(MovimientoCaja.objects.filter(caja__tienda=self.tienda, concepto__startswith='Devolución').exists())
+
+        # Desde la lista: el checkbox de cada comprobante apunta al formulario de anulación en bloque
+        self.client.force_login(self.tienda.propietario)
+        restantes = [c.id for c in emitidos[25:]]
+        r = self.client.post(reverse('inventario:anular_comprobantes'), {'ids': restantes})
+        self.assertRedirects(r, reverse('inventario:gestion_lista', args=['comprobantes']), fetch_redirect_response=False)
+        self.assertFalse(Comprobante.objects.filter(tienda=self.tienda, estado='EMITIDO').exists())
+        self.assertEqual(verificar_kardex(self.tienda), [])
+
+
+@override_settings(STORAGES=storages_sin_manifest(),
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'consolidado'}})
+class ReporteConsolidadoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tiendas = sembrar(tiendas=3, productos=8, clientes=5, proveedores=2, compras=12,
+                              comprobantes=25, abonos=4, dias=6, prefijo='cad', semilla=31)
+
+    def test_una_consulta_por_metrica_y_cacheada(self):
+        hoy = timezone.localdate()
+        with CaptureQueriesContext(connection) as consultas:
+            filas, totales = reporte_consolidado(hoy - timedelta(days=30), hoy)
+        self.assertEqual(len(consultas), 7)  # Cinco métricas agrupadas, los meses archivados y los nombres de las tiendas
+
+        por_tienda = {f['id']: f for f in filas}
+        for tienda in self.tiendas:
+            fila = por_tienda[tienda.id]
+            emitidos = Comprobante.objects.filter(tienda=tienda, estado='EMITIDO')
+            self.assertEqual(fila['ventas'], sum(c.total_final for c in emitidos))
+            detalles = DetalleComprobante.objects.filter(comprobante__in=emitidos)
+            self.assertEqual(fila['margen'], sum(d.subtotal - d.cantidad * d.costo_unitario for d in detalles))
+            self.assertEqual(fila['valor_stock'], sum(p.stock * p.costo for p in Producto.objects.filter(tienda=tienda)))
+        self.assertEqual(totales['ventas'], sum(f['ventas'] for f in filas))
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(reporte_consolidado(hoy - timedelta(days=30), hoy), (filas, totales))
+        self.assertEqual(len(consultas), 0)
+
+        self.client.force_login(self.tiendas[0].propietario)
+        self.assertRedirects(self.client.get(reverse('inventario:reporte_consolidado')),
+                             reverse('inventario:dashboard'), fetch_redirect_response=False)
+        self.tiendas[0].propietario.is_superuser = True
+        self.tiendas[0].propietario.save()
+        self.assertContains(self.client.get(reverse('inventario:reporte_consolidado')), self.tiendas[2].nombre)
+
+
+@mock.patch('inventario.replicas.replica_configurada', return_value=True)
+class RouterReplicaTests(SimpleTestCase):
+    """Solo las decisiones del router: sin una segunda base no se ejecutan consultas."""
+
+    def setUp(self):
+        self.router = RouterReplica()
+
+    def test_lecturas_marcadas_van_a_la_replica(self, _):
+        self.assertIsNone(self.router.db_for_read(Producto))
+        with lectura_en_replica():
+            self.assertEqual(self.router.db_for_read(Producto), 'replica')
+            self.assertEqual(self.router.db_for_write(Producto), 'default')
+            with en_primario():
+                self.assertIsNone(self.router.db_for_read(Producto))
+            with mock.patch.object(connection, 'in_atomic_block', True):
+                self.assertIsNone(self.router.db_for_read(Producto))
+        self.assertFalse(self.router.allow_migrate('replica', 'inventario'))
+
+    def test_lectura_propia_tras_escribir(self, _):
+        vista = lee_de_replica(lambda request: self.router.db_for_read(Producto))
+        vista_async = lee_de_replica(self._vista_async)
+        fabrica = RequestFactory()
+        self.assertEqual(vista(fabrica.get('/')), 'replica')
+        self.assertEqual(asyncio.run(vista_async(fabrica.get('/'))), 'replica')
+
+        respuesta = LecturaPropiaMiddleware(lambda request: HttpResponse())(fabrica.post('/'))
+        self.assertIn(COOKIE, respuesta.cookies)
+        self.assertNotIn(COOKIE, LecturaPropiaMiddleware(lambda request: HttpResponse())(fabrica.get('/')).cookies)
+        fabrica.cookies[COOKIE] = '1'
+        self.assertIsNone(vista(fabrica.get('/')))
+        self.assertIsNone(asyncio.run(vista_async(fabrica.get('/'))))
+
+    async def _vista_async(self, request):
+        return self.router.db_for_read(Producto)
+
+
+class BitacorasTests(TestCase):
+
+    def test_lotes_y_poda_por_partes(self):
+        # Con base aparte las filas esperan en memoria y se insertan juntas
+        with mock.patch.object(bitacoras, 'alias_bitacoras', return_value='logs'), \
+                mock.patch.object(bitacoras, '_asegurar_hilo'):
+            for i in range(3):
+                bitacoras.registrar(LoginLog(username_tried=f'u{i}', is_successful=True))
+            self.assertFalse(LoginLog.objects.exists())
+            with CaptureQueriesContext(connection) as consultas:
+                self.assertEqual(bitacoras.volcar(), 3)
+            self.assertEqual(len(consultas), 1)
+        self.assertEqual(LoginLog.objects.count(), 3)
+
+        LoginLog.objects.bulk_create([LoginLog(username_tried=f'viejo{i}') for i in range(5)])
+        LoginLog.objects.filter(username_tried__startswith='viejo').update(timestamp=timezone.now() - timedelta(days=400))
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(bitacoras.podar(dias=180, lote=2), {'inventario.LoginLog': 5})
+        self.assertEqual(len(consultas), 7)  # Tres lotes (2 + 2 + 1), cada uno con su SELECT y su DELETE, y el SELECT final
+        self.assertEqual(LoginLog.objects.count(), 3)
+
+    @override_settings(LOG_MAX_PENDING=4)
+    def test_lote_fallido_vuelve_a_la_cola_con_tope(self):
+        lote = [LoginLog(username_tried=f'u{i}') for i in range(3)]
+        tardias = [LoginLog(username_tried=f'tarde{i}') for i in range(2)]
+        with mock.patch.object(bitacoras, '_pendientes', list(lote)), \
+                mock.patch.object(LoginLog.objects, 'bulk_create', side_effect=RuntimeError('base caída')):
+            with self.assertRaises(RuntimeError):
+                bitacoras.volcar()
+            self.assertEqual(bitacoras._pendientes, lote)
+
+            # Lo que llegó mientras tanto queda detrás; pasado el tope se pierden las filas más viejas
+            bitacoras._pendientes.extend(tardias)
+            with self.assertRaises(RuntimeError), self.assertLogs('inventario.bitacoras', 'WARNING') as logs:
+                bitacoras.volcar()
+            self.assertEqual(bitacoras._pendientes, lote[1:] + tardias)
+            self.assertIn('1 filas más viejas', logs.output[0])
+
+    @mock.patch.dict(settings.DATABASES, {'logs': {}})
+    def test_router_manda_las_bitacoras_a_su_base(self):
+        router = bitacoras.RouterBitacoras()
+        self.assertEqual(router.db_for_write(LoginLog), 'logs')
+        self.assertIsNone(router.db_for_read(Producto))
+        self.assertTrue(router.allow_migrate('logs', 'inventario', 'loginlog'))
+        self.assertFalse(router.allow_migrate('logs', 'inventario', 'producto'))
+        self.assertFalse(router.allow_migrate('default', 'inventario', 'loginlog'))
+
+
+@override_settings(CONSOLIDATED_REPORT_CACHE_SECONDS=0, KARDEX_CHECK_MARGIN_SECONDS=0)
+class ArchivoPeriodosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=6, clientes=4, proveedores=2, compras=30,
+                             comprobantes=90, abonos=0, dias=100, prefijo='arc', semilla=41)[0]
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(ARCHIVE_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _totales(self, desde, hasta):
+        totales = reporte_consolidado(desde, hasta)[1]
+        # SQLite suma decimales como float: se compara al céntimo
+        return {c: round(Decimal(totales[c]), 2) for c in ('ventas', 'comprobantes', 'venta_neta', 'costo_ventas')}
+
+    maxDiff = None
+
+    def test_archiva_restaura_y_los_reportes_no_cambian(self):
+        hoy = timezone.localdate()
+        mes = meses_a_archivar(self.tienda, horizonte_meses=1)[-1]
+        medio_mes = fin_del_dia(mes + timedelta(days=13))
+        rangos = [(hoy - timedelta(days=120), hoy), (mes + timedelta(days=10), hoy)]
+        antes = [self._totales(*r) for r in rangos]
+        stock_antes = [stock_al(self.tienda, m) for m in (medio_mes, timezone.now())]
+        filas_antes = Comprobante.objects.filter(tienda=self.tienda).count()
+
+        periodo = archivar_mes(self.tienda, mes)
+        self.assertTrue(os.path.exists(periodo.archivo))
+        self.assertGreater(periodo.comprobantes, 0)
+        self.assertEqual(Comprobante.objects.filter(tienda=self.tienda).count(), filas_antes - periodo.comprobantes)
+        self.assertFalse(MovimientoStock.objects.filter(
+            producto__tienda=self.tienda, fecha__gte=fin_del_dia(mes - timedelta(days=1)), fecha__lt=medio_mes).exists())
+
+        self.assertEqual([self._totales(*r) for r in rangos], antes)
+        self.assertEqual([stock_al(self.tienda, m) for m in (medio_mes, timezone.now())], stock_antes)
+        self.assertEqual(verificar_kardex(self.tienda), [])
+
+        # Fuera del mes archivado, el stock a una fecha no abre el archivo
+        with CaptureQueriesContext(connection) as consultas:
+            stock_al(self.tienda, timezone.now())
+        self.assertLessEqual(len(consultas), 3)
+
+        fechas = dict(Comprobante.objects.filter(tienda=self.tienda).values_list('id', 'fecha_emision'))
+        restaurar_mes(periodo)
+        self.assertFalse(PeriodoArchivado.objects.exists())
+        self.assertEqual(Comprobante.objects.filter(tienda=self.tienda).count(), filas_antes)
+        self.assertEqual([self._totales(*r) for r in rangos], antes)
+        restaurados = Comprobante.objects.filter(tienda=self.tienda).exclude(id__in=fechas)
+        self.assertTrue(all(c.fecha_emision < fin_del_dia(mes + timedelta(days=31)) for c in restaurados))
+
+
+@override_settings(KARDEX_CHECK_MARGIN_SECONDS=0)
+class PaqueteTiendaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=6, clientes=4, proveedores=2, compras=15,
+                             comprobantes=30, abonos=4, dias=10, prefijo='paq', semilla=43)[0]
+
+    def _resumen(self, tienda):
+        return {
+            'stock': dict(Producto.objects.filter(tienda=tienda).values_list('nombre', 'stock')),
+            'ventas': Comprobante.objects.filter(tienda=tienda).aggregate(t=Sum('total_final'))['t'],
+            'series': sorted(Comprobante.objects.filter(tienda=tienda).values_list('serie', 'numero')),
+            'kardex': MovimientoStock.objects.filter(producto__tienda=tienda).count(),
+            'abonos': AplicacionAbono.objects.filter(pago__cliente__tienda=tienda).count(),
+        }
+
+    def test_exporta_en_streaming_y_restaura_en_tienda_vacia(self):
+        self.client.force_login(self.tienda.propietario)
+        r = self.client.get(reverse('inventario:exportar_tienda'))
+        self.assertTrue(r.streaming)
+        contenido = b''.join(r.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+            manifiesto = json.loads(zf.read('manifest.json'))
+        filas = {e['archivo']: e['filas'] for e in manifiesto['entradas']}
+        self.assertEqual(filas['kardex.jsonl'], self._resumen(self.tienda)['kardex'])
+
+        vacia = Tienda.objects.create(propietario=User.objects.create(username='paq_destino'), nombre='Destino')
+        insertadas = restaurar_paquete(io.BytesIO(contenido), vacia, usuario=vacia.propietario)
+        self.assertEqual(sum(insertadas.values()), sum(filas.values()))
+        self.assertEqual(self._resumen(vacia), self._resumen(self.tienda))
+        self.assertEqual(verificar_kardex(vacia), [])
+        self.assertFalse(Comprobante.objects.filter(tienda=vacia, cliente__tienda=self.tienda).exists())
+
+        # Solo en una tienda vacía, y con las sumas del manifiesto intactas
+        with self.assertRaises(ValueError):
+            restaurar_paquete(io.BytesIO(contenido), vacia)
+        dañado = io.BytesIO()
+        with zipfile.ZipFile(io.BytesIO(contenido)) as origen, zipfile.ZipFile(dañado, 'w') as destino:
+            for nombre in origen.namelist():
+                datos = origen.read(nombre)
+                destino.writestr(nombre, datos.replace(b'"EMITIDO"', b'"ANULADO"') if nombre == 'comprobantes.jsonl' else datos)
+        otra = Tienda.objects.create(propietario=User.objects.create(username='paq_otra'), nombre='Otra')
+        with self.assertRaises(ValueError):
+            restaurar_paquete(io.BytesIO(dañado.getvalue()), otra)
+        self.assertFalse(Producto.objects.filter(tienda=otra).exists())
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class CambioPreciosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=12, clientes=2, proveedores=3, compras=30,
+                             comprobantes=5, abonos=0, dias=5, prefijo='pre', semilla=47)[0]
+
+    def test_vista_previa_igual_a_lo_aplicado_en_un_update(self):
+        proveedor = Compra.objects.filter(tienda=self.tienda).first().proveedor
+        elegidos = productos_filtrados(self.tienda, proveedor=proveedor)
+        antes = dict(Producto.objects.filter(tienda=self.tienda).values_list('id', 'precio'))
+        ids = set(elegidos.values_list('id', flat=True))
+        self.assertTrue(0 < len(ids) < len(antes))
+
+        self.client.force_login(self.tienda.propietario)
+        datos = {'proveedor': proveedor.id, 'campo': 'precio', 'modo': 'PORCENTAJE', 'valor': '8', 'redondeo': '0.10'}
+        r = self.client.post(reverse('inventario:cambio_precios'), dict(datos, accion='previsualizar'))
+        previa = {p.id: p.nuevo for p in r.context['previa']}
+        self.assertEqual(set(previa), ids)
+        for pid, nuevo in previa.items():
+            esperado = (antes[pid] * Decimal('1.08') / Decimal('0.10')).quantize(Decimal('1'), rounding='ROUND_HALF_UP') / 10
+            self.assertEqual(nuevo, esperado)
+
+        with self.captureOnCommitCallbacks() as avisos, CaptureQueriesContext(connection) as consultas:
+            cambio = aplicar_cambio(self.tienda, self.tienda.propietario, 'precio', 'PORCENTAJE', Decimal('8'), '0.10',
+                                    {'proveedor': proveedor})
+        self.assertLessEqual(len(consultas), 5)  # Lectura, UPDATE, auditoría y el savepoint de atomic()
+        self.assertEqual(len(avisos), 1)  # Una sola publicación a los POS
+        despues = dict(Producto.objects.filter(tienda=self.tienda).values_list('id', 'precio'))
+        self.assertEqual({pid: despues[pid] for pid in ids}, previa)
+        self.assertEqual({pid: v for pid, v in despues.items() if pid not in ids}, {pid: v for pid, v in antes.items() if pid not in ids})
+        self.assertEqual(cambio.productos, len(ids))
+        self.assertEqual({pid: Decimal(a) for pid, a, _ in cambio.detalle}, {pid: antes[pid] for pid in ids})
+
+        # Monto negativo: nunca deja un precio bajo cero
+        self.client.post(reverse('inventario:cambio_precios'), dict(datos, modo='MONTO', valor='-100000', accion='aplicar'))
+        self.assertFalse(Producto.objects.filter(id__in=ids, precio__lt=0).exists())
+        self.assertEqual(CambioPrecioMasivo.objects.filter(tienda=self.tienda).count(), 2)
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class TomaInventarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=10, clientes=2, proveedores=2, compras=25,
+                             comprobantes=5, abonos=0, dias=5, prefijo='tom', semilla=48)[0]
+
+    def test_conteo_parcial_ajusta_solo_lo_contado_y_escribe_kardex(self):
+        productos = list(Producto.objects.filter(tienda=self.tienda).order_by('id'))
+        contados, intactos = productos[:6], productos[6:]
+        toma = TomaInventario.objects.create(tienda=self.tienda, usuario=self.tienda.propietario)
+
+        # Archivo: por código de barras o id; lo repetido se queda con la última fila
+        filas = [(p.codigo_barras or p.id, p.stock + i - 2) for i, p in enumerate(contados[:5])]
+        filas.append(('NO-EXISTE', 3))
+        guardados, desconocidos = cargar_conteos(toma, filas)
+        self.assertEqual((guardados, desconocidos), (5, ['NO-EXISTE']))
+        sumar_escaneo(toma, contados[5], 2)
+        sumar_escaneo(toma, contados[5], 1)
+        sumar_escaneo(toma, contados[4])
+        esperado = {p.id: p.stock + i - 2 for i, p in enumerate(contados[:5])}
+        esperado[contados[4].id] += 1
+        esperado[contados[5].id] = Decimal('3')
+
+        con_diferencia = {c.producto_id for c in diferencias(toma)}
+        self.assertEqual(con_diferencia, {pid for pid, n in esperado.items()
+                                          if n != next(p.stock for p in productos if p.id == pid)})
+
+        movimientos = MovimientoStock.objects.filter(producto__tienda=self.tienda).count()
+        with self.captureOnCommitCallbacks() as avisos, CaptureQueriesContext(connection) as consultas:
+            ajustes = aplicar_toma(toma, self.tienda.propietario)
+        self.assertLessEqual(len(consultas), 8)
+        self.assertEqual(len(avisos), 1)
+        self.assertEqual(len(ajustes), len(con_diferencia))
+
+        stock = dict(Producto.objects.filter(tienda=self.tienda).values_list('id', 'stock'))
+        self.assertEqual({pid: stock[pid] for pid in esperado}, esperado)
+        self.assertEqual({p.id: stock[p.id] for p in intactos}, {p.id: p.stock for p in intactos})
+        self.assertEqual(MovimientoStock.objects.filter(producto__tienda=self.tienda).count(), movimientos + len(ajustes))
+        self.assertTrue(all(m.motivo.startswith('Ajuste inventario') for m in ajustes))
+        self.assertEqual(verificar_kardex(self.tienda), [])
+
+        # Aplicada: las diferencias quedan contra el stock que había, y no se aplica dos veces
+        toma.refresh_from_db()
+        self.assertEqual({c.producto_id for c in diferencias(toma)}, con_diferencia)
+        with self.assertRaises(ValueError):
+            aplicar_toma(toma)
+
+    def test_subir_csv_desde_la_vista(self):
+        producto = Producto.objects.filter(tienda=self.tienda).first()
+        self.client.force_login(self.tienda.propietario)
+        self.client.post(reverse('inventario:tomas_inventario'), {'observaciones': 'Pasillo 1'})
+        toma = TomaInventario.objects.get(tienda=self.tienda)
+        archivo = SimpleUploadedFile('conteo.csv', f'id,cantidad\n{producto.id},{producto.stock + 4}\n'.encode(),
+                                     content_type='text/csv')
+        url = reverse('inventario:toma_inventario', args=[toma.id])
+        self.client.post(url, {'accion': 'subir', 'archivo': archivo})
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([(c.producto_id, c.diferencia) for c in r.context['diferencias']], [(producto.id, 4)])
+        self.client.post(url, {'accion': 'aplicar'})
+        producto.refresh_from_db()
+        toma.refresh_from_db()
+        self.assertEqual(toma.estado, 'APLICADA')
+        self.assertEqual(producto.stock, r.context['diferencias'][0].cantidad)
+
+
+class ArranqueEnFrioTests(SimpleTestCase):
+
+    def test_arrancar_no_carga_pdf(self):
+        # Intérprete nuevo: en este proceso los tests ya importaron de todo
+        cargados = medir_arranque()['modulos']
+        self.assertIn('inventario.views', cargados)
+        self.assertEqual([m for m in cargados if m.split('.')[0] in MODULOS_PESADOS], [])
+        self.assertNotIn('inventario.pdf', cargados)
+        self.assertNotIn('inventario.hojas', cargados)
+
+
+@override_settings(STORAGES=storages_sin_manifest())
+class EstaticosPOSTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tienda = sembrar(tiendas=1, productos=3, clientes=1, proveedores=1, compras=3,
+                             comprobantes=1, abonos=0, dias=2, prefijo='sw', semilla=50)[0]
+
+    def test_paquetes_al_dia_con_sus_fuentes(self):
+        self.assertEqual(empaquetar(verificar=True), [], "Corre manage.py empaquetar_estaticos")
+
+    def test_pos_sin_cdn_de_scripts_y_con_service_worker(self):
+        self.client.force_login(self.tienda.propietario)
+        html = self.client.get(reverse('inventario:pos')).content.decode()
+        self.assertIn('/static/inventario/dist/pos.js', html)
+        self.assertNotIn('select2@', html)
+        self.assertNotIn('code.jquery.com', html)
+
+        r = self.client.get(reverse('inventario:pos_service_worker'))
+        self.assertEqual(r['Content-Type'], 'application/javascript')
+        self.assertEqual(r['Cache-Control'], 'no-cache')
+        cuerpo = r.content.decode()
+        for ruta in PRECARGA_POS:
+            self.assertIn(f'"/static/{ruta}"', cuerpo)
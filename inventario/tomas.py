@@ -0,0 +1,95 @@
+# inventario/tomas.py
+"""
+Toma de inventario físico: contar, comparar y ajustar todo de una vez.
+
+Una TomaInventario junta lo contado por producto (ConteoInventario), ya sea
+subiendo un archivo (código de barras o id, cantidad) o escaneando de a uno.
+Las diferencias contra el stock del sistema salen de UNA consulta (conteos
+unidos a Producto).
+
+`aplicar_toma` hace el ajuste en una sola transacción y con consultas que
+no dependen de cuántas líneas tenga el conteo (salvo los lotes de 1000 del
+Kardex):
+1. Bloquea solo los productos contados (SELECT ... FOR UPDATE).
+2. Guarda en cada conteo el stock del sistema que tenía (un UPDATE).
+3. Deja el stock de esos productos en lo contado (un UPDATE).
+4. Escribe un movimiento "Ajuste inventario" por cada diferencia (bulk_create).
+Los productos que no se contaron no se tocan: una toma puede ser parcial
+(ej. solo un pasillo).
+"""
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import ConteoInventario, MovimientoStock, Producto, TomaInventario
+from .stock_en_vivo import fila_producto, publicar_filas
+
+MOTIVO_AJUSTE = "Ajuste inventario"
+LOTE = 1000
+
+
+def diferencias(toma):
+    """Conteos con diferencia contra el stock actual (o el que había al aplicar), con su producto."""
+    sistema = F('stock_sistema') if toma.estado == 'APLICADA' else F('producto__stock')
+    return (toma.conteos.select_related('producto').annotate(sistema=sistema, diferencia=F('cantidad') - sistema)
+            .exclude(diferencia=0).order_by('producto__nombre'))
+
+
+def cargar_conteos(toma, filas):
+    """
+    Reemplaza lo contado de los productos de `filas` [(código de barras o id,
+    cantidad)]. Devuelve (conteos guardados, [códigos desconocidos]).
+    """
+    por_codigo, por_id = {}, set()
+    for pid, codigo in Producto.objects.filter(tienda_id=toma.tienda_id).values_list('id', 'codigo_barras'):
+        por_id.add(pid)
+        if codigo:
+            por_codigo[codigo] = pid
+    conteos, desconocidos = {}, []
+    for codigo, cantidad in filas:
+        codigo = str(codigo).strip()
+        pid = por_codigo.get(codigo) or (int(codigo) if codigo.isdigit() and int(codigo) in por_id else None)
+        if pid is None:
+            desconocidos.append(codigo)
+            continue
+        conteos[pid] = ConteoInventario(toma=toma, producto_id=pid, cantidad=cantidad)
+    ConteoInventario.objects.bulk_create(conteos.values(), batch_size=LOTE, update_conflicts=True,
+                                         unique_fields=['toma', 'producto'], update_fields=['cantidad'])
+    return len(conteos), desconocidos
+
+
+def sumar_escaneo(toma, producto, cantidad=1):
+    """Un escaneo suma `cantidad` a lo contado del producto."""
+    if not ConteoInventario.objects.filter(toma=toma, producto=producto).update(cantidad=F('cantidad') + cantidad):
+        ConteoInventario.objects.create(toma=toma, producto=producto, cantidad=cantidad)
+
+
+def aplicar_toma(toma, usuario=None):
+    """Ajusta el stock de lo contado y escribe el Kardex. Devuelve los movimientos de ajuste creados."""
+    with transaction.atomic():
+        toma = TomaInventario.objects.select_for_update().get(pk=toma.pk)
+        if toma.estado != 'ABIERTA':
+            raise ValueError(f"La toma #{toma.id} ya está {toma.get_estado_display().lower()}.")
+        contados = Producto.objects.filter(conteos_inventario__toma=toma)
+        filas = list(contados.select_for_update(of=('self',)).values_list(
+            'id', 'stock', 'costo', 'precio', 'conteos_inventario__cantidad',
+        ))
+        stock_actual = Producto.objects.filter(pk=OuterRef('producto_id')).values('stock')[:1]
+        toma.conteos.update(stock_sistema=Subquery(stock_actual))
+        contado = ConteoInventario.objects.filter(toma=toma, producto_id=OuterRef('pk')).values('cantidad')[:1]
+        Producto.objects.filter(conteos_inventario__toma=toma).update(stock=Subquery(contado))
+
+        ajustes = [
+            MovimientoStock(
+                producto_id=pid, tipo='ENTRADA' if cantidad > stock else 'SALIDA', cantidad=abs(cantidad - stock),
+                stock_antes=stock, stock_despues=cantidad, costo_promedio=costo,
+                motivo=f"{MOTIVO_AJUSTE} (toma #{toma.id})", usuario=usuario,
+            )
+            for pid, stock, costo, _, cantidad in filas if cantidad != stock
+        ]
+        MovimientoStock.objects.bulk_create(ajustes, batch_size=LOTE)
+        toma.estado, toma.aplicada_en = 'APLICADA', timezone.now()
+        toma.save(update_fields=['estado', 'aplicada_en'])
+        publicar_filas(toma.tienda_id, [fila_producto(Producto(id=pid, stock=cantidad, precio=precio))
+                                        for pid, stock, _, precio, cantidad in filas if cantidad != stock])
+    return ajustes
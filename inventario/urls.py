@@ -1,6 +1,7 @@
 # inventario/urls.py
 from django.urls import path
 from . import views
+from .presupuestos import presupuesto_consultas
 from django.contrib.auth import views as auth_views
 
 app_name = 'inventario'
@@ -10,19 +11,23 @@ urlpatterns = [
     path('', views.portal_view, name='portal'),
     path('catalogo/', views.catalogo_view, name='catalogo'),
     path('registro/', views.registro_view, name='registro'),
-    path('login/', auth_views.LoginView.as_view(template_name='inventario/login.html'), name='login'),
+    path('login/', presupuesto_consultas(2)(auth_views.LoginView.as_view(template_name='inventario/login.html')), name='login'),
     path('logout/', views.logout_view, name='logout'),
 
     # --- RUTAS PARA CLIENTES LOGUEADOS ---
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('pos/', views.pos_view, name='pos'),
+    path('pos/sw.js', views.pos_service_worker_view, name='pos_service_worker'),
     path('registrar-compra/', views.registrar_compra_view, name='registrar_compra'),
     path('emitir-comprobante/', views.emitir_comprobante_y_preparar_impresion_view, name='emitir_comprobante'),
 
     # --- RUTAS DE REPORTES ---
     path('reportes/stock-bajo/', views.reporte_stock_bajo_view, name='reporte_stock_bajo'),
+    path('reportes/sugerencia-compra/', views.sugerencia_compra_view, name='sugerencia_compra'),
     path('reportes/ventas/', views.reporte_ventas_view, name='reporte_ventas'),
     path('reportes/stock-actual/', views.reporte_stock_actual_view, name='reporte_stock_actual'),
+    path('reportes/consolidado/', views.reporte_consolidado_view, name='reporte_consolidado'),
+    path('reportes/api/stock-al/', views.stock_al_api, name='stock_al_api'),
     path('reportes/ventas/exportar/', views.exportar_reporte_ventas_excel_view, name='exportar_reporte_ventas'),
     path('reportes/stock-actual/exportar/', views.exportar_stock_actual_excel_view, name='exportar_stock_actual'),
     path('reportes/logueos/', views.log_logueos_view, name='log_logueos'),
@@ -30,8 +35,10 @@ urlpatterns = [
     # --- GESTIÓN (CRUD) ---
     path('gestion/comprobantes/exportar/', views.exportar_comprobantes_view, name='exportar_comprobantes'),
     path('comprobante/eliminar/<int:comprobante_id>/', views.eliminar_venta_view, name='eliminar_venta'),
+    path('comprobantes/anular/', views.anular_comprobantes_view, name='anular_comprobantes'),
     
     # Rutas dinámicas de gestión (Deben ir al final para no chocar con las específicas)
+    path('gestion/productos/cambio-precios/', views.cambio_precios_view, name='cambio_precios'),
     path('gestion/<str:modelo>/', views.gestion_lista_view, name='gestion_lista'),
     path('gestion/<str:modelo>/nuevo/', views.gestion_crear_view, name='gestion_crear'),
     path('gestion/<str:modelo>/editar/<int:pk>/', views.gestion_editar_view, name='gestion_editar'),
@@ -40,14 +47,21 @@ urlpatterns = [
     # --- IMPORTACIÓN/EXPORTACIÓN ---
     path('exportar/productos/', views.exportar_productos_view, name='exportar_productos'),
     path('exportar-global/<str:modelo>/', views.exportar_modelo_generico_view, name='exportar_global'),
+    path('exportar-tienda/', views.exportar_tienda_view, name='exportar_tienda'),
     path('descargar-plantilla/<str:model_name>/', views.descargar_plantilla_view, name='descargar_plantilla'),
     path('importar/<str:data_type>/', views.importar_datos_view, name='importar_datos'),
     
     # --- AJAX Y PDF ---
     path('pos/emitir_comprobante_ajax/', views.emitir_comprobante_ajax_view, name='emitir_comprobante_ajax'),
+    path('pos/sincronizar/', views.sincronizar_ventas_view, name='sincronizar_ventas'),
     path('comprobante/<int:comprobante_id>/ticket/', views.vista_para_impresion_basica, name='vista_ticket_comprobante'),
     path('comprobante/<int:comprobante_id>/descargar-pdf/', views.descargar_comprobante_pdf_view, name='descargar_comprobante_pdf'),
     path('pos/crear-cliente-ajax/', views.crear_cliente_ajax_view, name='crear_cliente_ajax'),
+    path('pos/api/productos/', views.buscar_productos_api, name='buscar_productos_api'),
+    path('pos/api/codigo/<str:codigo>/', views.producto_por_codigo_api, name='producto_por_codigo_api'),
+    path('pos/api/stock/', views.stock_productos_api, name='stock_productos_api'),
+    path('pos/api/clientes/', views.buscar_clientes_api, name='buscar_clientes_api'),
+    path('pos/eventos/', views.eventos_stock_view, name='eventos_stock'),
 
     # --- USUARIOS ---
     path('mis-usuarios/', views.lista_usuarios_tienda, name='lista_usuarios_tienda'),
@@ -67,5 +81,10 @@ urlpatterns = [
     # --- AUDITORÍA (KARDEX) ---
     path('kardex/', views.kardex_general_view, name='kardex_general'),
     path('kardex/producto/<int:producto_id>/', views.kardex_producto_view, name='kardex_producto'),
+    path('inventario/tomas/', views.tomas_inventario_view, name='tomas_inventario'),
+    path('inventario/tomas/<int:toma_id>/', views.toma_inventario_view, name='toma_inventario'),
+
+    # --- MONITOREO ---
+    path('metrics', views.metricas_view, name='metricas'),
 ]
 
@@ -0,0 +1,63 @@
+# inventario/ventas.py
+"""
+Regla de stock de una venta, la misma para todos los caminos que venden:
+el checkout del POS (views._registrar_venta), el formulario de emisión
+(views.emitir_comprobante_y_preparar_impresion_view) y la sincronización de
+ventas hechas sin conexión (sincronizacion.py).
+
+1. `bloquear_productos`: SELECT ... FOR UPDATE de los productos del carrito,
+   así dos cajas que venden lo mismo a la vez se esperan en vez de pisarse.
+2. `faltantes`: ninguna venta deja un producto con stock negativo.
+3. `descontar_stock`: un solo UPDATE con F('stock') - cantidad.
+
+`descontar_stock` no toca los objetos en memoria: cada camino resta ahí ítem
+por ítem, porque el Kardex guarda el stock antes y después de cada línea.
+"""
+from django.db.models import Case, DecimalField, F, Value, When
+
+from .models import Producto
+
+
+class StockInsuficiente(ValueError):
+    def __init__(self, faltantes, productos):
+        self.faltantes = faltantes
+        nombres = ', '.join(productos[f['id']].nombre for f in faltantes)
+        super().__init__(f"Stock insuficiente para {nombres}.")
+
+
+def sumar_pedido(items):
+    """{producto_id: cantidad total} de [(producto_id, cantidad, ...)]: un producto puede repetirse."""
+    pedido = {}
+    for pid, cantidad, *_ in items:
+        pedido[pid] = pedido.get(pid, 0) + cantidad
+    return pedido
+
+
+def bloquear_productos(tienda, ids):
+    """{id: Producto} de la tienda, bloqueados hasta el fin de la transacción."""
+    return Producto.objects.select_for_update().filter(tienda=tienda, id__in=set(ids)).in_bulk()
+
+
+def faltantes(productos, pedido):
+    """Lo que no alcanza con el stock que tienen `productos` (en memoria) para `pedido`."""
+    return [
+        {'id': pid, 'disponible': float(productos[pid].stock), 'solicitado': float(cantidad)}
+        for pid, cantidad in pedido.items() if productos[pid].stock < cantidad
+    ]
+
+
+def verificar_stock(productos, pedido):
+    """StockInsuficiente si algo del pedido no alcanza."""
+    falta = faltantes(productos, pedido)
+    if falta:
+        raise StockInsuficiente(falta, productos)
+
+
+def descontar_stock(pedido):
+    """Resta `pedido` en la BD con un UPDATE (los productos ya deben estar bloqueados)."""
+    if not pedido:
+        return
+    Producto.objects.filter(id__in=pedido).update(stock=F('stock') - Case(
+        *[When(id=pid, then=Value(cantidad)) for pid, cantidad in pedido.items()],
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    ))
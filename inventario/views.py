@@ -1,13 +1,15 @@
 # inventario/views.py
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse, JsonResponse 
-from django.db import transaction
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction, IntegrityError
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Sum, Count, Q
 from django.db.models.functions import TruncDay
 from django.utils.timezone import make_aware 
+from django.utils.dateparse import parse_date, parse_datetime
 from django.db.models import F 
 from django.urls import reverse
 from django.contrib.auth import views as auth_views
@@ -15,49 +17,78 @@ from django.contrib.auth import logout as auth_logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.template.loader import get_template
+from django.templatetags.static import static
+from django.core.paginator import Paginator
+from django.conf import settings
+from asgiref.sync import sync_to_async
 from decimal import Decimal 
+import hashlib
 import json
-import openpyxl
-from io import BytesIO
-from xhtml2pdf import pisa
-from tablib import Dataset
+import time
 
 # Importaciones locales de tu App (Consolidadas aquí arriba)
 from .models import (
     Producto, Venta, Proveedor, Compra, Cliente, Comprobante, 
     DetalleComprobante, Tienda, LoginLog, Perfil, CajaDiaria, MovimientoCaja,
-    MovimientoStock, PagoCredito # Aseguramos importar estos también
+    MovimientoStock, PagoCredito, PeriodoArchivado, CambioPrecioMasivo, TomaInventario, # Aseguramos importar estos también
+    normalizar_busqueda,
 )
 from .forms import (
     RegistroTiendaForm, ProductoForm, ClienteForm, ProveedorForm, 
-    CompraForm, EmpleadoForm, AperturaCajaForm, CierreCajaForm, MovimientoCajaForm
-)
-from .resources import (
-    ProductoResource, ClienteResource, ProveedorResource, CompraResource, 
-    ComprobanteResource, CajaDiariaResource, MovimientoCajaResource
+    CompraForm, EmpleadoForm, AperturaCajaForm, CierreCajaForm, MovimientoCajaForm, AbonoForm, CambioPreciosForm
 )
+from . import metricas, perfilador
+from .anulaciones import anular_comprobantes
+from .asincrono import login_requerido_async, en_hilo
+from .cobranzas import antiguedad_por_cliente, registrar_abono
+from .estaticos import PRECARGA_POS
+from .consolidado import reporte_consolidado
+from .fotos_stock import fin_del_dia, inventario_al, stock_al
+from .costeo import editar_compra, eliminar_compra, registrar_compra
+from .paquetes import generar_paquete
+from .precios import aplicar_cambio, productos_filtrados, vista_previa
+from .replicas import en_primario, iterar_en_contexto, lee_de_replica
+from .tomas import aplicar_toma, cargar_conteos, diferencias, sumar_escaneo
+from .pronosticos import asegurar_vigentes, productos_bajo_stock, sugerencias_de_compra
+from .sincronizacion import sincronizar_lote
+from .stock_en_vivo import fila_producto, flujo_eventos, publicar_filas
+from .ventas import StockInsuficiente, bloquear_productos, descontar_stock, sumar_pedido, verificar_stock
+from .presupuestos import presupuesto_consultas
+
+# Tamaño de página del buscador de clientes del POS
+CLIENTES_POR_PAGINA = 20
+DEUDORES_POR_PAGINA = 25
+
+# PDF (pdf.py), Excel (hojas.py) e import/export (resources.py) se importan
+# dentro de cada vista: así un arranque en frío que solo atiende el POS no
+# carga xhtml2pdf ni openpyxl. El comando benchmark_arranque lo vigila.
+
+def _recurso(nombre):
+    """Clase de resources.py por nombre, importada recién al usarla."""
+    from . import resources
+    return getattr(resources, nombre)
 
 IMPORT_TYPES = {
     'clientes': {
-        'resource': ClienteResource,
+        'resource': 'ClienteResource',
         'template_headers': ['nombre_completo', 'dni_ruc', 'telefono', 'email', 'pagina_web'],
         'singular_name': 'Cliente',
         'plural_name': 'Clientes'
     },
     'productos': {
-        'resource': ProductoResource,
+        'resource': 'ProductoResource',
         'template_headers': ['nombre', 'codigo_barras', 'stock', 'costo', 'precio'],
         'singular_name': 'Producto',
         'plural_name': 'Productos'
     },
     'proveedores': {
-        'resource': ProveedorResource,
+        'resource': 'ProveedorResource',
         'template_headers': ['razon_social', 'ruc', 'direccion', 'telefono', 'email', 'pagina_web'],
         'singular_name': 'Proveedor',
         'plural_name': 'Proveedores'
     },
     'compras': {
-        'resource': CompraResource,
+        'resource': 'CompraResource',
         'template_headers': ['ruc_proveedor', 'codigo_barras_producto', 'cantidad', 'costo_total', 'fecha_de_compra', 'numero_factura'],
         'singular_name': 'Compra',
         'plural_name': 'Compras'
@@ -75,11 +106,29 @@ def obtener_tienda_usuario(user):
     return None
 
 
+async def obtener_tienda_usuario_async(request):
+    """Versión para vistas async: resuelve el usuario de la sesión y su tienda fuera del event loop."""
+    return await sync_to_async(obtener_tienda_usuario)(await request.auser())
+
+
+def _producto_para_busqueda(p):
+    """Formato de producto que usa el Select2 del POS (precarga y búsqueda por API)."""
+    # Convertimos Decimal a float/str para que JSON no falle
+    stock_val = float(p.stock) if p.stock is not None else 0.0
+    return {
+        'id': p.id,
+        'text': f'{p.nombre} (Stock: {stock_val:.2f})',
+        'codigo_barras': p.codigo_barras if p.codigo_barras else "",
+        'precio': str(p.precio) if p.precio is not None else "0.00",
+    }
+
+
 # ==============================================================================
 # VISTAS DE VENTA Y POS (CORREGIDA PARA EVITAR ERROR 500)
 # ==============================================================================
 
 @login_required
+@presupuesto_consultas(9)
 def pos_view(request):
     try:
         # 1. Obtener tienda y validar
@@ -98,22 +147,10 @@ def pos_view(request):
 
         # 3. Cargar datos
         productos = Producto.objects.filter(tienda=tienda_actual)
-        clientes = Cliente.objects.filter(tienda=tienda_actual)
+        # Los clientes NO se precargan: el Select2 los busca en buscar_clientes_api
         
         # 4. Preparar JSON para el Select2 (Buscador) con conversión segura de tipos
-        productos_para_busqueda = []
-        for p in productos:
-            # Convertimos Decimal a float/str para que JSON no falle
-            stock_val = float(p.stock) if p.stock is not None else 0.0
-            precio_val = str(p.precio) if p.precio is not None else "0.00"
-            codigo_val = p.codigo_barras if p.codigo_barras else ""
-
-            productos_para_busqueda.append({
-                'id': p.id,
-                'text': f'{p.nombre} (Stock: {stock_val:.2f})',
-                'codigo_barras': codigo_val,
-                'precio': precio_val 
-            })
+        productos_para_busqueda = [_producto_para_busqueda(p) for p in productos]
 
         # 5. Obtener últimas ventas optimizando consultas
         ultimas_ventas_detalles = DetalleComprobante.objects.filter(
@@ -130,7 +167,6 @@ def pos_view(request):
 
         contexto = {
             'productos_json': json.dumps(productos_para_busqueda),
-            'clientes': clientes,
             'ultimas_ventas': ultimas_ventas_detalles,
             'tienda_actual': tienda_actual,
         }
@@ -142,7 +178,24 @@ def pos_view(request):
         return HttpResponse(f"<div style='padding:20px; color:red;'><h1>Error del Sistema</h1><p>Ocurrió un error inesperado al cargar el POS:</p><pre>{str(e)}</pre></div>", status=500)
 
 
+@presupuesto_consultas(0)
+def pos_service_worker_view(request):
+    """
+    Service worker del POS (plantilla pos_sw.js). Se sirve bajo /pos/ para que
+    su alcance cubra la caja. La versión sale de las URLs con hash de lo que
+    precarga: cambia sola con cada despliegue que toque esos archivos.
+    """
+    precarga = [static(ruta) for ruta in PRECARGA_POS]
+    version = hashlib.sha256('\n'.join(precarga).encode()).hexdigest()[:12]
+    response = render(request, 'inventario/pos_sw.js', {
+        'version': version, 'precarga': json.dumps(precarga), 'static_url': settings.STATIC_URL,
+    }, content_type='application/javascript')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
 @login_required
+@presupuesto_consultas(14)
 def emitir_comprobante_y_preparar_impresion_view(request):
     tienda_actual = obtener_tienda_usuario(request.user)
     if not tienda_actual:
@@ -158,15 +211,21 @@ def emitir_comprobante_y_preparar_impresion_view(request):
             cantidad_vendida = Decimal(request.POST.get('cantidad', 1)) 
             metodo_pago = request.POST.get('metodo_pago', 'EFECTIVO')
 
-            producto = get_object_or_404(Producto, id=producto_id, tienda=tienda_actual)
             cliente_seleccionado = Cliente.objects.filter(id=cliente_id, tienda=tienda_actual).first() if cliente_id else None
 
             with transaction.atomic():
-                if producto.stock < cantidad_vendida:
-                    raise ValueError(f'Stock insuficiente para {producto.nombre}.')
-                
+                # Misma regla que el POS y la sincronización (ver ventas.py)
+                producto = bloquear_productos(tienda_actual, [int(producto_id)]).get(int(producto_id))
+                if producto is None:
+                    raise Http404
+                try:
+                    verificar_stock({producto.id: producto}, {producto.id: cantidad_vendida})
+                except StockInsuficiente:
+                    metricas.rechazos_sin_stock.inc(tienda=tienda_actual.id)
+                    raise
+                descontar_stock({producto.id: cantidad_vendida})
                 producto.stock -= cantidad_vendida
-                producto.save()
+                publicar_filas(tienda_actual.id, [fila_producto(producto)])
                 
                 total_final_venta = producto.precio * cantidad_vendida
                 tasa_igv = Decimal('1.18')
@@ -200,24 +259,36 @@ def emitir_comprobante_y_preparar_impresion_view(request):
                     subtotal=total_final_venta,
                     precio_unitario_con_igv=producto.precio
                 )
+                # Solo cuenta si la venta se confirma: un rollback no debe sumar comprobantes
+                transaction.on_commit(
+                    lambda: metricas.comprobantes_emitidos.inc(tienda=tienda_actual.id, tipo=tipo_comprobante))
                 
                 messages.success(request, 'Comprobante emitido con éxito.')
                 return redirect('inventario:vista_ticket_comprobante', comprobante_id=comprobante.id)
 
-        except Exception as e:
+        # Datos del formulario inválidos o stock insuficiente (StockInsuficiente es un ValueError);
+        # Http404 y los errores inesperados siguen su camino normal
+        except (ValueError, TypeError, ArithmeticError) as e:
             messages.error(request, f'Ocurrió un error: {e}')
         
     return redirect('inventario:pos')
 
 
+def _comprobantes_para_ticket():
+    """El ticket muestra tienda, cliente y el producto de cada línea: todo en 3 consultas."""
+    return Comprobante.objects.select_related('tienda', 'cliente').prefetch_related('detalles__producto')
+
+
 @login_required
+@presupuesto_consultas(8)
 def vista_para_impresion_basica(request, comprobante_id):
     tienda_actual = obtener_tienda_usuario(request.user)
-    comprobante = get_object_or_404(Comprobante, id=comprobante_id, tienda=tienda_actual)
+    comprobante = get_object_or_404(_comprobantes_para_ticket(), id=comprobante_id, tienda=tienda_actual)
     return render(request, 'inventario/comprobante_ticket.html', {'comprobante': comprobante})
 
 
 @login_required
+@presupuesto_consultas(13)
 def registrar_compra_view(request):
     tienda_actual = obtener_tienda_usuario(request.user)
     form = CompraForm(tienda=tienda_actual) 
@@ -227,10 +298,8 @@ def registrar_compra_view(request):
             try:
                 compra = form.save(commit=False)
                 compra.tienda = tienda_actual
-                # El Kardex se registrará solo vía signals.py
-                compra.producto.stock += compra.cantidad
-                compra.producto.save()
-                compra.save()
+                # Suma stock y recalcula el costo promedio; el Kardex lo registra signals.py
+                registrar_compra(compra)
                 messages.success(request, f'Compra registrada con éxito.')
                 return redirect('inventario:registrar_compra')
             except Exception as e:
@@ -243,11 +312,13 @@ def registrar_compra_view(request):
     })
 
 
+@presupuesto_consultas(4)
 def portal_view(request):
     if request.user.is_authenticated and not request.GET.get('force'):
         return redirect('inventario:dashboard')
     return render(request, 'inventario/portal.html')
 
+@presupuesto_consultas(3)
 def catalogo_view(request):
     """
     Vista corregida para usar el nuevo campo 'categoria' del modelo Producto
@@ -284,35 +355,107 @@ def catalogo_view(request):
 # ==============================================================================
 
 @login_required
+@presupuesto_consultas(7)
+@lee_de_replica
 def reporte_stock_bajo_view(request):
+    """Productos en o bajo su punto de reorden según el pronóstico de demanda (ver pronosticos.py)."""
     tienda_actual = obtener_tienda_usuario(request.user)
-    productos = Producto.objects.filter(tienda=tienda_actual, stock__lte=5).order_by('stock')
+    with en_primario():  # Recalcula y guarda a partir de lo que lee: no mezclar con la réplica
+        asegurar_vigentes(tienda_actual)
+    productos = list(productos_bajo_stock(tienda_actual))
     chart_labels = [p.nombre for p in productos]
-    chart_data = [float(p.stock) for p in productos] 
+    chart_data = [float(p.stock) for p in productos]
+    chart_reorden = [float(p.punto_reorden) for p in productos]
     return render(request, 'inventario/reporte_stock_bajo.html', {
-        'productos': productos, 'umbral': 5,
-        'chart_labels': json.dumps(chart_labels), 'chart_data': json.dumps(chart_data)
+        'productos': productos, 'plazo_entrega': settings.FORECAST_LEAD_TIME_DAYS,
+        'chart_labels': json.dumps(chart_labels), 'chart_data': json.dumps(chart_data),
+        'chart_reorden': json.dumps(chart_reorden),
     })
 
 @login_required
+@presupuesto_consultas(7)
+@lee_de_replica
+def sugerencia_compra_view(request):
+    """Lo que hay que pedir a cada proveedor para volver al stock objetivo."""
+    tienda_actual = obtener_tienda_usuario(request.user)
+    with en_primario():
+        asegurar_vigentes(tienda_actual)
+    grupos = sugerencias_de_compra(tienda_actual)
+    return render(request, 'inventario/sugerencia_compra.html', {
+        'grupos': grupos, 'total_general': sum(total for _, _, total in grupos),
+        'plazo_entrega': settings.FORECAST_LEAD_TIME_DAYS, 'dias_revision': settings.FORECAST_REVIEW_DAYS,
+    })
+
+@login_required
+@presupuesto_consultas(7)
+@lee_de_replica
 def reporte_ventas_view(request):
     tienda_actual = obtener_tienda_usuario(request.user)
     comprobantes = Comprobante.objects.filter(tienda=tienda_actual, estado='EMITIDO')
     total_ventas = comprobantes.aggregate(total=Sum('total_final'))['total'] or 0
+    # Más lo ya archivado (archivo.py), de los totales guardados por mes
+    total_ventas += PeriodoArchivado.objects.filter(tienda=tienda_actual).aggregate(total=Sum('ventas'))['total'] or 0
     return render(request, 'inventario/reporte_ventas.html', {
         'total_ventas': total_ventas, 'fecha_inicio': timezone.now()
     })
 
 @login_required
+@presupuesto_consultas(7)
+@lee_de_replica
 def reporte_stock_actual_view(request):
+    """Inventario valorizado actual, o al cierre de ?fecha=AAAA-MM-DD (ver fotos_stock.py)"""
     tienda_actual = obtener_tienda_usuario(request.user)
-    productos = Producto.objects.filter(tienda=tienda_actual).order_by('nombre')
-    valor_total = 0
-    for p in productos:
-        p.valor_stock = p.stock * p.costo
-        valor_total += p.valor_stock
+    fecha = parse_date(request.GET.get('fecha') or '')
+    if fecha and fecha < timezone.localdate():
+        productos, valor_total = inventario_al(tienda_actual, fin_del_dia(fecha))
+    else:
+        fecha = None
+        productos = Producto.objects.filter(tienda=tienda_actual).order_by('nombre')
+        valor_total = 0
+        for p in productos:
+            p.valor_stock = p.stock * p.costo
+            valor_total += p.valor_stock
     return render(request, 'inventario/reporte_stock_actual.html', {
-        'productos': productos, 'valor_total_inventario': valor_total
+        'productos': productos, 'valor_total_inventario': valor_total, 'fecha': fecha,
+    })
+
+@login_required
+@presupuesto_consultas(11)
+@lee_de_replica
+def reporte_consolidado_view(request):
+    """Ventas, margen, stock, cobranzas y caja de todas las tiendas (solo superusuarios)."""
+    if not request.user.is_superuser:
+        return redirect('inventario:dashboard')
+    hasta = parse_date(request.GET.get('hasta') or '') or timezone.localdate()
+    desde = parse_date(request.GET.get('desde') or '') or hasta.replace(day=1)
+    filas, totales = reporte_consolidado(min(desde, hasta), hasta)
+    return render(request, 'inventario/reporte_consolidado.html', {
+        'filas': filas, 'totales': totales, 'desde': min(desde, hasta), 'hasta': hasta,
+    })
+
+@login_required
+@presupuesto_consultas(6)
+@lee_de_replica
+def stock_al_api(request):
+    """
+    Stock y costo a un momento: ?momento=AAAA-MM-DDTHH:MM (o ?fecha=AAAA-MM-DD,
+    al cierre de ese día) y opcionalmente ?producto=ID. Sin parámetros, ahora.
+    """
+    tienda = obtener_tienda_usuario(request.user)
+    momento = parse_datetime(request.GET.get('momento') or '')
+    fecha = parse_date(request.GET.get('fecha') or '')
+    if momento is None:
+        momento = fin_del_dia(fecha) if fecha else timezone.now()
+    elif timezone.is_naive(momento):
+        momento = make_aware(momento)
+    ids = [int(request.GET['producto'])] if request.GET.get('producto', '').isdigit() else None
+    estado = stock_al(tienda, momento, productos=ids)
+    return JsonResponse({
+        'momento': momento.isoformat(),
+        'productos': [
+            {'id': pid, 'stock': str(stock), 'costo_promedio': str(costo) if costo is not None else None}
+            for pid, (stock, costo) in sorted(estado.items())
+        ],
     })
 
 
@@ -320,6 +463,7 @@ def reporte_stock_actual_view(request):
 # GESTIÓN Y DASHBOARD
 # ==============================================================================
 
+@presupuesto_consultas(2)
 def registro_view(request):
     if request.method == 'POST':
         form = RegistroTiendaForm(request.POST)
@@ -336,6 +480,7 @@ def registro_view(request):
     return render(request, 'inventario/registro.html', {'form': RegistroTiendaForm()})
 
 @login_required
+@presupuesto_consultas(8)
 def dashboard_view(request):
     tienda_actual = obtener_tienda_usuario(request.user)
     if not tienda_actual:
@@ -347,25 +492,31 @@ def dashboard_view(request):
 
     hoy = timezone.localdate()
     ventas_hoy = Comprobante.objects.filter(tienda=tienda_actual, fecha_emision__date=hoy, estado='EMITIDO')
+    # El contador sale del mismo pronóstico que el reporte de stock bajo: al día antes de contar
+    asegurar_vigentes(tienda_actual)
     contexto = {
         'tienda': tienda_actual,
         'show_splash': show_splash, 
         'ventas_hoy_monto': ventas_hoy.aggregate(total=Sum('total_final'))['total'] or 0,
         'total_ventas_hoy': ventas_hoy.count(),
-        'productos_bajo_stock': Producto.objects.filter(tienda=tienda_actual, stock__lte=5).count(),
+        'productos_bajo_stock': productos_bajo_stock(tienda_actual).count(),
     }
     return render(request, 'inventario/dashboard.html', contexto)
 
 @login_required
+@presupuesto_consultas(6)
 def gestion_lista_view(request, modelo):
     tienda = obtener_tienda_usuario(request.user)
     Modelos = {'productos': Producto, 'clientes': Cliente, 'proveedores': Proveedor, 'compras': Compra, 'comprobantes': Comprobante}
-    queryset = Modelos[modelo].objects.filter(tienda=tienda).order_by('-id')
+    # Relaciones que pinta gestion_lista.html por fila (evita una consulta por fila)
+    Relaciones = {'compras': ('proveedor', 'producto'), 'comprobantes': ('cliente',)}
+    queryset = Modelos[modelo].objects.filter(tienda=tienda).select_related(*Relaciones.get(modelo, ())).order_by('-id')
     return render(request, 'inventario/gestion_lista.html', {
         'objetos': queryset, 'modelo_nombre_plural': modelo, 'modelo_slug': modelo
     })
 
 @login_required
+@presupuesto_consultas(7)
 def gestion_crear_view(request, modelo):
     tienda = obtener_tienda_usuario(request.user)
     Modelos = {'productos': (Producto, ProductoForm), 'clientes': (Cliente, ClienteForm), 'proveedores': (Proveedor, ProveedorForm), 'compras': (Compra, CompraForm)}
@@ -374,11 +525,15 @@ def gestion_crear_view(request, modelo):
     if request.method == 'POST' and form.is_valid():
         instancia = form.save(commit=False)
         instancia.tienda = tienda
-        instancia.save()
+        if modelo == 'compras':
+            registrar_compra(instancia)
+        else:
+            instancia.save()
         return redirect('inventario:gestion_lista', modelo=modelo)
     return render(request, 'inventario/gestion_form.html', {'form': form, 'modelo_nombre': modelo, 'modelo_slug': modelo, 'editando': False})
 
 @login_required
+@presupuesto_consultas(8)
 def gestion_editar_view(request, modelo, pk):
     tienda = obtener_tienda_usuario(request.user)
     Modelos = {'productos': (Producto, ProductoForm), 'clientes': (Cliente, ClienteForm), 'proveedores': (Proveedor, ProveedorForm), 'compras': (Compra, CompraForm)}
@@ -386,44 +541,73 @@ def gestion_editar_view(request, modelo, pk):
     instancia = get_object_or_404(M, pk=pk, tienda=tienda)
     form = F(request.POST or None, instance=instancia, tienda=tienda) if modelo == 'compras' else F(request.POST or None, instance=instancia)
     if request.method == 'POST' and form.is_valid():
-        form.save()
+        if modelo == 'compras':
+            editar_compra(form.save(commit=False), usuario=request.user)
+        else:
+            form.save()
         return redirect('inventario:gestion_lista', modelo=modelo)
     return render(request, 'inventario/gestion_form.html', {'form': form, 'modelo_nombre': modelo, 'modelo_slug': modelo, 'editando': True})
 
+@login_required
+@presupuesto_consultas(8)
+def cambio_precios_view(request):
+    """Cambio masivo de precio o costo: vista previa y un solo UPDATE al aplicar (ver precios.py)"""
+    tienda = obtener_tienda_usuario(request.user)
+    form = CambioPreciosForm(request.POST or None, tienda=tienda)
+    previa = None
+    if request.method == 'POST' and form.is_valid():
+        if request.POST.get('accion') == 'aplicar':
+            cambio = aplicar_cambio(tienda, request.user, filtros=form.filtros(), **form.regla())
+            messages.success(request, f"{cambio.get_campo_display()} actualizado en {cambio.productos} producto(s).")
+            return redirect('inventario:cambio_precios')
+        previa = vista_previa(productos_filtrados(tienda, **form.filtros()), **form.regla())
+    return render(request, 'inventario/cambio_precios.html', {
+        'form': form, 'previa': previa,
+        'historial': CambioPrecioMasivo.objects.filter(tienda=tienda).select_related('usuario')[:10],
+    })
+
 
 # ==============================================================================
 # IMPORTACIÓN / EXPORTACIÓN
 # ==============================================================================
 
-@login_required
-def exportar_productos_view(request):
-    tienda = obtener_tienda_usuario(request.user)
-    dataset = ProductoResource().export(Producto.objects.filter(tienda=tienda))
-    response = HttpResponse(dataset.xlsx, content_type='application/vnd.ms-excel')
+# Las exportaciones son async: la consulta corre en el hilo de la petición y la
+# generación del .xlsx (openpyxl, pura CPU) en el pool de `en_hilo`.
+
+@login_requerido_async
+@presupuesto_consultas(6)
+@lee_de_replica
+async def exportar_productos_view(request):
+    tienda = await obtener_tienda_usuario_async(request)
+    with metricas.exportacion_segundos.medir(modelo='productos'):
+        dataset = await sync_to_async(_recurso('ProductoResource')().export)(Producto.objects.filter(tienda=tienda))
+        contenido = await en_hilo(dataset.export, 'xlsx')
+    response = HttpResponse(contenido, content_type='application/vnd.ms-excel')
     response['Content-Disposition'] = 'attachment; filename="productos.xlsx"'
     return response
 
-@login_required
-def descargar_plantilla_view(request, model_name):
-    headers = IMPORT_TYPES[model_name]['template_headers']
-    wb = openpyxl.Workbook()
-    wb.active.append(headers)
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+@login_requerido_async
+@presupuesto_consultas(4)
+async def descargar_plantilla_view(request, model_name):
+    from .hojas import plantilla_xlsx
+    contenido = await en_hilo(plantilla_xlsx, IMPORT_TYPES[model_name]['template_headers'])
+    response = HttpResponse(contenido, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     response['Content-Disposition'] = f'attachment; filename="plantilla_{model_name}.xlsx"'
-    wb.save(response)
     return response
 
 @login_required
+@presupuesto_consultas(5)
 def importar_datos_view(request, data_type):
     tienda = obtener_tienda_usuario(request.user)
     if request.method == 'POST':
-        dataset = Dataset()
         file = request.FILES.get('excel_file')
         if file:
-            dataset.load(file.read(), format='xlsx' if file.name.endswith('.xlsx') else 'csv')
-            resource = IMPORT_TYPES[data_type]['resource']()
+            from .hojas import leer_hoja
+            dataset = leer_hoja(file)
+            resource = _recurso(IMPORT_TYPES[data_type]['resource'])()
             resource.tienda_actual = tienda
-            resource.import_data(dataset, dry_run=False)
+            with metricas.importacion_segundos.medir(modelo=data_type):
+                resource.import_data(dataset, dry_run=False)
             return redirect('inventario:gestion_lista', modelo=data_type)
     return render(request, 'inventario/importar_datos.html', {'data_type_display': data_type, 'data_type': data_type})
 
@@ -432,101 +616,285 @@ def importar_datos_view(request, data_type):
 # AJAX Y PDF
 # ==============================================================================
 
-@login_required
+# El POS se sirve async (ver mi_erp/asgi.py): las vistas de esta sección no
+# ocupan un hilo mientras esperan a la BD o a la generación de un PDF.
+
+def _registrar_venta(tienda_actual, data):
+    """Crea el comprobante, descuenta stock y suma la deuda en una sola transacción.
+    Es sync a propósito: el ORM async de Django no soporta transaction.atomic."""
+    cart_items = data['cart']
+    metodo = data.get('metodo_pago', 'EFECTIVO') # Nueva lógica Crédito
+    clave = data.get('clave') or None
+    with transaction.atomic():
+        if clave:
+            # Reintento de una venta que ya llegó (ej. se cortó la red antes de la respuesta)
+            previo = Comprobante.objects.filter(tienda=tienda_actual, clave_idempotencia=clave).first()
+            if previo:
+                return previo, []
+
+        total_final_venta = sum(Decimal(str(item['price'])) * Decimal(str(item['quantity'])) for item in cart_items)
+        tasa_igv_decimal = Decimal('0.18')
+        subtotal_venta = (total_final_venta / (1 + tasa_igv_decimal)).quantize(Decimal('0.01'), rounding='ROUND_HALF_UP')
+        igv_monto = (total_final_venta - subtotal_venta)
+        
+        # Bloqueo, verificación y descuento: la misma regla que la sincronización (ver ventas.py)
+        items = [(int(item['id']), Decimal(str(item['quantity'])), Decimal(str(item['price']))) for item in cart_items]
+        pedido = sumar_pedido(items)
+        productos = bloquear_productos(tienda_actual, pedido)
+        if len(productos) < len(pedido):
+            raise ValueError('Producto inexistente')
+        try:
+            verificar_stock(productos, pedido)
+        except StockInsuficiente:
+            metricas.rechazos_sin_stock.inc(tienda=tienda_actual.id)
+            raise
+        descontar_stock(pedido)
+
+        cliente_id = data.get('cliente_id')
+        cliente_seleccionado = Cliente.objects.filter(id=cliente_id, tienda=tienda_actual).first() if cliente_id else None
+        
+        comprobante = Comprobante.objects.create(
+            tienda=tienda_actual, 
+            tipo_comprobante=data['tipo_comprobante'], 
+            total_final=total_final_venta, 
+            subtotal=subtotal_venta,
+            igv=igv_monto,
+            serie='B001' if data['tipo_comprobante'] == 'BOLETA' else 'F001',
+            metodo_pago=metodo,
+            cliente=cliente_seleccionado,
+            observaciones=data.get('observaciones', ''),
+            clave_idempotencia=clave,
+        )
+        
+        # SI ES CRÉDITO, ACTUALIZAMOS LA DEUDA DEL CLIENTE
+        if metodo == 'CREDITO' and cliente_seleccionado:
+            cliente_seleccionado.saldo_deudora += total_final_venta
+            cliente_seleccionado.save()
+            comprobante.estado_pago = False
+            comprobante.save()
+
+        # Un INSERT para todas las líneas y otro para su Kardex (bulk_create no dispara signals.py),
+        # así el checkout cuesta lo mismo con 1 o con 50 productos en el carrito
+        motivo = f"Venta: {comprobante.get_tipo_comprobante_display()} {comprobante.serie}-{comprobante.numero}"
+        detalles, movimientos = [], []
+        for pid, cantidad, precio in items:
+            producto = productos[pid]
+            # El stock ya se descontó en la BD; en memoria se resta línea a línea para el Kardex
+            antes = producto.stock
+            producto.stock -= cantidad
+            # bulk_create no pasa por DetalleComprobante.save(): el subtotal (sin IGV) se calcula aquí
+            precio_sin_igv = precio / Decimal('1.18')
+            detalles.append(DetalleComprobante(
+                comprobante=comprobante, 
+                producto=producto, 
+                cantidad=cantidad, 
+                precio_unitario=precio_sin_igv, 
+                precio_unitario_con_igv=precio,
+                costo_unitario=producto.costo,
+                subtotal=cantidad * precio_sin_igv
+            ))
+            movimientos.append(MovimientoStock(
+                producto=producto, tipo='SALIDA', cantidad=cantidad, stock_antes=antes,
+                stock_despues=producto.stock, costo_promedio=producto.costo, motivo=motivo,
+            ))
+        DetalleComprobante.objects.bulk_create(detalles)
+        MovimientoStock.objects.bulk_create(movimientos)
+        publicar_filas(tienda_actual.id, [fila_producto(p) for p in productos.values()])
+        stocks_actualizados = [{'id': p.id, 'stock': float(p.stock)} for p in productos.values()]
+    return comprobante, stocks_actualizados
+
+@login_requerido_async
 @csrf_exempt
-def emitir_comprobante_ajax_view(request):
+@presupuesto_consultas(14)
+async def emitir_comprobante_ajax_view(request):
     if request.method != 'POST': return JsonResponse({'error': 'Error'}, status=405)
+    inicio = time.perf_counter()
     try:
-        tienda_actual = obtener_tienda_usuario(request.user)
+        tienda_actual = await obtener_tienda_usuario_async(request)
         data = json.loads(request.body)
         cart_items = data.get('cart')
-        metodo = data.get('metodo_pago', 'EFECTIVO') # Nueva lógica Crédito
         
         if not cart_items: return JsonResponse({'error': 'Vacío'}, status=400)
         
-        with transaction.atomic():
-            total_final_venta = sum(Decimal(str(item['price'])) * Decimal(str(item['quantity'])) for item in cart_items)
-            tasa_igv_decimal = Decimal('0.18')
-            subtotal_venta = (total_final_venta / (1 + tasa_igv_decimal)).quantize(Decimal('0.01'), rounding='ROUND_HALF_UP')
-            igv_monto = (total_final_venta - subtotal_venta)
-            
-            cliente_id = data.get('cliente_id')
-            cliente_seleccionado = Cliente.objects.filter(id=cliente_id, tienda=tienda_actual).first() if cliente_id else None
-            
-            comprobante = Comprobante.objects.create(
-                tienda=tienda_actual, 
-                tipo_comprobante=data['tipo_comprobante'], 
-                total_final=total_final_venta, 
-                subtotal=subtotal_venta,
-                igv=igv_monto,
-                serie='B001' if data['tipo_comprobante'] == 'BOLETA' else 'F001',
-                metodo_pago=metodo,
-                cliente=cliente_seleccionado,
-                observaciones=data.get('observaciones', '')
-            )
-            
-            # SI ES CRÉDITO, ACTUALIZAMOS LA DEUDA DEL CLIENTE
-            if metodo == 'CREDITO' and cliente_seleccionado:
-                cliente_seleccionado.saldo_deudora += total_final_venta
-                cliente_seleccionado.save()
-                comprobante.estado_pago = False
-                comprobante.save()
-
-            stocks_actualizados = []
-            for item in cart_items:
-                producto = get_object_or_404(Producto, id=item['id'], tienda=tienda_actual)
-                # Al restar stock aquí, el signal.py registrará el Kardex automáticamente
-                producto.stock -= Decimal(str(item['quantity']))
-                producto.save()
-                
-                DetalleComprobante.objects.create(
-                    comprobante=comprobante, 
-                    producto=producto, 
-                    cantidad=item['quantity'], 
-                    precio_unitario=Decimal(str(item['price']))/Decimal('1.18'), 
-                    costo_unitario=producto.costo,
-                    subtotal=Decimal(str(item['price']))*Decimal(str(item['quantity']))
-                )
-                stocks_actualizados.append({'id': producto.id, 'stock': float(producto.stock)})
-            
-            return JsonResponse({'comprobante_id': comprobante.id, 'stocks_actualizados': stocks_actualizados})
+        comprobante, stocks_actualizados = await sync_to_async(_registrar_venta)(tienda_actual, data)
+
+        # Métricas en memoria (solo sumas en un dict): no agregan consultas al checkout
+        metricas.comprobantes_emitidos.inc(tienda=tienda_actual.id, tipo=data['tipo_comprobante'])
+        metricas.tamano_carrito.observar(len(cart_items), tienda=tienda_actual.id)
+        metricas.checkout_segundos.observar(time.perf_counter() - inicio, tienda=tienda_actual.id)
+        return JsonResponse({'comprobante_id': comprobante.id, 'stocks_actualizados': stocks_actualizados})
+    except StockInsuficiente as e: return JsonResponse({'error': str(e), 'faltantes': e.faltantes}, status=409)
     except Exception as e: return JsonResponse({'error': str(e)}, status=500)
 
-@login_required
-def descargar_comprobante_pdf_view(request, comprobante_id):
-    comprobante = get_object_or_404(Comprobante, id=comprobante_id, tienda=obtener_tienda_usuario(request.user))
+@login_requerido_async
+@csrf_exempt
+@presupuesto_consultas(14)
+async def sincronizar_ventas_view(request):
+    """Cola offline del POS: aplica un lote de ventas con clave de idempotencia (ver sincronizacion.py)."""
+    if request.method != 'POST': return JsonResponse({'error': 'Error'}, status=405)
+    tienda_actual = await obtener_tienda_usuario_async(request)
+    if not tienda_actual: return JsonResponse({'error': 'No tienes una tienda asignada.'}, status=403)
+    try:
+        ventas = json.loads(request.body).get('ventas')
+    except (ValueError, AttributeError):
+        ventas = None
+    if not isinstance(ventas, list) or not all(isinstance(v, dict) for v in ventas):
+        return JsonResponse({'error': 'Se esperaba {"ventas": [...]}'}, status=400)
+    maximo = getattr(settings, 'OFFLINE_SYNC_MAX_VENTAS', 200)
+    if len(ventas) > maximo:
+        return JsonResponse({'error': f'Máximo {maximo} ventas por lote'}, status=413)
+    try:
+        resultados = await sync_to_async(sincronizar_lote)(tienda_actual, ventas)
+    except IntegrityError:
+        # Choque con un envío simultáneo (misma clave o mismo correlativo): reintentar es seguro
+        return JsonResponse({'error': 'Lote en proceso, reintentar'}, status=409)
+    return JsonResponse({'resultados': resultados})
+
+@login_requerido_async
+@presupuesto_consultas(8)
+async def descargar_comprobante_pdf_view(request, comprobante_id):
+    tienda = await obtener_tienda_usuario_async(request)
+    try:
+        comprobante = await _comprobantes_para_ticket().aget(id=comprobante_id, tienda=tienda)
+    except Comprobante.DoesNotExist:
+        raise Http404
     template = get_template('inventario/comprobante_ticket.html')
-    html = template.render({'comprobante': comprobante, 'tienda': comprobante.tienda})
-    result = BytesIO()
-    pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-    response = HttpResponse(result.getvalue(), content_type='application/pdf')
+    html = await sync_to_async(template.render)({'comprobante': comprobante, 'tienda': comprobante.tienda})
+    from .pdf import html_a_pdf
+    with metricas.pdf_segundos.medir(documento='ticket'):
+        pdf, _ = await en_hilo(html_a_pdf, html)
+    response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="ticket_{comprobante.id}.pdf"'
     return response
 
+@login_requerido_async
+@presupuesto_consultas(5)
+async def buscar_productos_api(request):
+    """Búsqueda del POS por nombre o por inicio del código de barras (formato Select2)."""
+    tienda = await obtener_tienda_usuario_async(request)
+    q = request.GET.get('q', '').strip()
+    productos = Producto.objects.filter(tienda=tienda).only('id', 'nombre', 'stock', 'precio', 'codigo_barras').order_by('nombre')
+    if q:
+        productos = productos.filter(Q(nombre__icontains=q) | Q(codigo_barras__startswith=q))
+    return JsonResponse({'results': [_producto_para_busqueda(p) async for p in productos[:30]]})
+
+@login_requerido_async
+@presupuesto_consultas(5)
+async def producto_por_codigo_api(request, codigo):
+    """Lectura de la pistola: el producto exacto con ese código de barras."""
+    tienda = await obtener_tienda_usuario_async(request)
+    producto = await Producto.objects.filter(tienda=tienda, codigo_barras=codigo).afirst()
+    if not producto:
+        return JsonResponse({'error': f'No existe un producto con el código {codigo}'}, status=404)
+    return JsonResponse(_producto_para_busqueda(producto))
+
+def _cliente_para_busqueda(c):
+    return {'id': c.id, 'text': str(c), 'ruc': c.ruc or '', 'razon': c.razon_social or '', 'documento': c.dni_ruc or ''}
+
+@login_requerido_async
+@presupuesto_consultas(5)
+async def buscar_clientes_api(request):
+    """
+    Clientes para el Select2 del POS, paginados (así la página no crece con la
+    cartera). Números: DNI/RUC completo va directo al documento exacto; si no,
+    prefijo de DNI, RUC o dni_ruc. Texto: prefijo del nombre sin tildes.
+    """
+    tienda = await obtener_tienda_usuario_async(request)
+    q = request.GET.get('q', '').strip()
+    try:
+        pagina = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        pagina = 1
+    clientes = Cliente.objects.filter(tienda=tienda).select_related('tienda')
+
+    if q.isdigit() and len(q) in (8, 11) and pagina == 1:
+        exactos = [c async for c in clientes.filter(Q(dni_ruc=q) | Q(dni=q) | Q(ruc=q))[:CLIENTES_POR_PAGINA]]
+        if exactos:
+            return JsonResponse({'results': [_cliente_para_busqueda(c) for c in exactos], 'pagination': {'more': False}})
+
+    if q.isdigit():
+        clientes = clientes.filter(Q(dni_ruc__startswith=q) | Q(dni__startswith=q) | Q(ruc__startswith=q)).order_by('nombre_busqueda', 'id')
+    elif q:
+        clientes = clientes.filter(nombre_busqueda__startswith=normalizar_busqueda(q)).order_by('nombre_busqueda', 'id')
+    else:
+        clientes = clientes.order_by('-id')  # Sin búsqueda: los más recientes
+    inicio = (pagina - 1) * CLIENTES_POR_PAGINA
+    filas = [c async for c in clientes[inicio:inicio + CLIENTES_POR_PAGINA + 1]]
+    return JsonResponse({
+        'results': [_cliente_para_busqueda(c) for c in filas[:CLIENTES_POR_PAGINA]],
+        'pagination': {'more': len(filas) > CLIENTES_POR_PAGINA},
+    })
+
+@login_requerido_async
+@presupuesto_consultas(5)
+async def stock_productos_api(request):
+    """Stock y precio actuales (?ids=1,2,3) para refrescar el POS sin recargar todo el catálogo."""
+    tienda = await obtener_tienda_usuario_async(request)
+    productos = Producto.objects.filter(tienda=tienda)
+    ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.strip().isdigit()]
+    if ids:
+        productos = productos.filter(id__in=ids)
+    filas = [
+        {'id': p['id'], 'stock': float(p['stock']), 'precio': str(p['precio'])}
+        async for p in productos.values('id', 'stock', 'precio')
+    ]
+    return JsonResponse({'productos': filas})
+
+@login_requerido_async
+@presupuesto_consultas(3)
+async def eventos_stock_view(request):
+    """
+    Canal SSE de la tienda: stock y precio de cada producto que cambie. Solo
+    bajo ASGI; con WSGI un worker quedaría tomado por cada POS abierto, así que
+    se responde 204 (el navegador deja de reconectar) y el POS consulta cada tanto.
+    """
+    tienda = await obtener_tienda_usuario_async(request)
+    if not tienda or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(flujo_eventos(tienda.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
+@presupuesto_consultas(15)
 def eliminar_venta_view(request, comprobante_id):
+    """Anula un comprobante (se conserva como ANULADO; ver anulaciones.py)."""
+    if request.method == 'POST':
+        _anular(request, [comprobante_id])
+        return redirect('inventario:gestion_lista', modelo='comprobantes')
+    return redirect('inventario:dashboard')
+
+@login_required
+@presupuesto_consultas(15)
+def anular_comprobantes_view(request):
+    """Anula en bloque los comprobantes marcados en la lista (campo `ids`)."""
     if request.method == 'POST':
-        tienda = obtener_tienda_usuario(request.user)
-        comprobante = get_object_or_404(Comprobante, id=comprobante_id, tienda=tienda)
-        with transaction.atomic():
-            # Si eliminamos una venta al crédito, restamos la deuda al cliente
-            if comprobante.metodo_pago == 'CREDITO' and comprobante.cliente:
-                comprobante.cliente.saldo_deudora -= comprobante.total_final
-                comprobante.cliente.save()
-
-            for d in comprobante.detalles.all():
-                d.producto.stock += d.cantidad
-                d.producto.save()
-            comprobante.delete()
+        ids = [int(i) for i in request.POST.getlist('ids') if i.isdigit()]
+        _anular(request, ids)
         return redirect('inventario:gestion_lista', modelo='comprobantes')
     return redirect('inventario:dashboard')
 
+def _anular(request, ids):
+    tienda = obtener_tienda_usuario(request.user)
+    try:
+        anulados = anular_comprobantes(tienda, ids, usuario=request.user)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return
+    if anulados:
+        messages.success(request, f"{anulados} comprobante(s) anulado(s). El stock fue devuelto al inventario.")
+    else:
+        messages.warning(request, "No se anuló ningún comprobante (ya estaban anulados o no existen).")
+
 @login_required
+@presupuesto_consultas(6)
 def log_logueos_view(request):
     if not request.user.is_superuser: return redirect('inventario:dashboard')
-    return render(request, 'inventario/log_logueos.html', {'logs': LoginLog.objects.all()})
+    return render(request, 'inventario/log_logueos.html', {'logs': LoginLog.objects.prefetch_related('user')})
 
 @login_required
+@presupuesto_consultas(7)
 def lista_usuarios_tienda(request):
     tienda = obtener_tienda_usuario(request.user)
     return render(request, 'inventario/usuarios_lista.html', {
@@ -534,6 +902,7 @@ def lista_usuarios_tienda(request):
     })
 
 @login_required
+@presupuesto_consultas(5)
 def crear_usuario_tienda(request):
     tienda = obtener_tienda_usuario(request.user)
     if request.method == 'POST':
@@ -546,6 +915,7 @@ def crear_usuario_tienda(request):
     return render(request, 'inventario/usuarios_form.html', {'form': EmpleadoForm(), 'editando': False})
 
 @login_required
+@presupuesto_consultas(7)
 def editar_usuario_tienda(request, usuario_id):
     tienda = obtener_tienda_usuario(request.user)
     perfil = get_object_or_404(Perfil, id=usuario_id, tienda=tienda)
@@ -558,36 +928,45 @@ def editar_usuario_tienda(request, usuario_id):
             perfil.rol = form.cleaned_data['rol']
             perfil.save()
             return redirect('inventario:lista_usuarios_tienda')
+    else:
+        form = EmpleadoForm(initial={
+            'username': perfil.user.username, 'first_name': perfil.user.first_name,
+            'last_name': perfil.user.last_name, 'rol': perfil.rol,
+        })
     return render(request, 'inventario/usuarios_form.html', {'form': form, 'editando': True})
 
 @login_required
+@presupuesto_consultas(5)
 def eliminar_usuario_tienda(request, usuario_id):
     get_object_or_404(Perfil, id=usuario_id, tienda=obtener_tienda_usuario(request.user)).user.delete()
     return redirect('inventario:lista_usuarios_tienda')
 
 @login_required
+@presupuesto_consultas(6)
 def gestion_eliminar_view(request, modelo, pk):
     tienda = obtener_tienda_usuario(request.user)
     Modelos = {'productos': Producto, 'clientes': Cliente, 'proveedores': Proveedor, 'compras': Compra}
     obj = get_object_or_404(Modelos[modelo], pk=pk, tienda=tienda)
     if request.method == 'POST':
         if modelo == 'compras':
-            obj.producto.stock -= obj.cantidad
-            obj.producto.save()
-        obj.delete()
+            eliminar_compra(obj, usuario=request.user)
+        else:
+            obj.delete()
     return redirect('inventario:gestion_lista', modelo=modelo)
 
-@login_required
+@login_requerido_async
 @csrf_exempt
-def crear_cliente_ajax_view(request):
+@presupuesto_consultas(4)
+async def crear_cliente_ajax_view(request):
     if request.method == 'POST':
-        tienda = obtener_tienda_usuario(request.user)
+        tienda = await obtener_tienda_usuario_async(request)
         data = json.loads(request.body)
         doc = data.get('ruc') or data.get('dni')
-        c = Cliente.objects.create(tienda=tienda, nombre_completo=data.get('nombre'), dni=data.get('dni'), razon_social=data.get('razon'), ruc=data.get('ruc'), dni_ruc=doc)
+        c = await Cliente.objects.acreate(tienda=tienda, nombre_completo=data.get('nombre'), dni=data.get('dni'), razon_social=data.get('razon'), ruc=data.get('ruc'), dni_ruc=doc)
         return JsonResponse({'id': c.id, 'text': str(c), 'ruc': c.ruc, 'razon': c.razon_social})
     return JsonResponse({'error': 'X'}, status=405)
 
+@presupuesto_consultas(3)
 def logout_view(request):
     nombre = "Usuario"
     if request.user.is_authenticated:
@@ -601,6 +980,7 @@ def logout_view(request):
 # ==============================================================================
 
 @login_required
+@presupuesto_consultas(6)
 def apertura_caja_view(request):
     tienda = obtener_tienda_usuario(request.user)
     if CajaDiaria.objects.filter(tienda=tienda, estado='ABIERTA').exists(): return redirect('inventario:pos')
@@ -614,6 +994,7 @@ def apertura_caja_view(request):
     return render(request, 'inventario/caja_apertura.html', {'form': AperturaCajaForm()})
 
 @login_required
+@presupuesto_consultas(9)
 def cierre_caja_view(request):
     tienda = obtener_tienda_usuario(request.user)
     caja = CajaDiaria.objects.filter(tienda=tienda, estado='ABIERTA').first()
@@ -634,6 +1015,7 @@ def cierre_caja_view(request):
     return render(request, 'inventario/caja_cierre.html', {'form': CierreCajaForm(), 'caja': caja, 'ventas': ventas, 'ingresos': ingresos, 'egresos': egresos, 'total_sistema': total_sistema})
 
 @login_required
+@presupuesto_consultas(6)
 def movimiento_caja_view(request):
     tienda = obtener_tienda_usuario(request.user)
     caja = CajaDiaria.objects.filter(tienda=tienda, estado='ABIERTA').first()
@@ -647,29 +1029,58 @@ def movimiento_caja_view(request):
             return redirect('inventario:pos')
     return render(request, 'inventario/caja_movimiento.html', {'form': MovimientoCajaForm()})
 
-@login_required
-def exportar_modelo_generico_view(request, modelo):
-    tienda = obtener_tienda_usuario(request.user)
+@login_requerido_async
+@presupuesto_consultas(6)
+@lee_de_replica
+async def exportar_modelo_generico_view(request, modelo):
+    tienda = await obtener_tienda_usuario_async(request)
     config = {
-        'productos': (Producto, ProductoResource), 
-        'clientes': (Cliente, ClienteResource), 
-        'proveedores': (Proveedor, ProveedorResource), 
-        'compras': (Compra, CompraResource), 
-        'comprobantes': (Comprobante, ComprobanteResource), 
-        'cajas': (CajaDiaria, CajaDiariaResource), 
-        'movimientos': (MovimientoCaja, MovimientoCajaResource)
+        'productos': (Producto, 'ProductoResource'), 
+        'clientes': (Cliente, 'ClienteResource'), 
+        'proveedores': (Proveedor, 'ProveedorResource'), 
+        'compras': (Compra, 'CompraResource'), 
+        'comprobantes': (Comprobante, 'ComprobanteResource'), 
+        'cajas': (CajaDiaria, 'CajaDiariaResource'), 
+        'movimientos': (MovimientoCaja, 'MovimientoCajaResource')
+    }
+    relaciones = {
+        'compras': ('producto', 'proveedor'),
+        'comprobantes': ('cliente',),
+        'cajas': ('usuario_apertura', 'usuario_cierre'),
+        'movimientos': ('caja', 'usuario'),
     }
     qs = config[modelo][0].objects.filter(caja__tienda=tienda) if modelo == 'movimientos' else config[modelo][0].objects.filter(tienda=tienda)
-    dataset = config[modelo][1]().export(qs)
-    response = HttpResponse(dataset.xlsx, content_type='application/vnd.ms-excel')
+    qs = qs.select_related(*relaciones.get(modelo, ()))
+    with metricas.exportacion_segundos.medir(modelo=modelo):
+        dataset = await sync_to_async(_recurso(config[modelo][1])().export)(qs)
+        contenido = await en_hilo(dataset.export, 'xlsx')
+    response = HttpResponse(contenido, content_type='application/vnd.ms-excel')
     response['Content-Disposition'] = f'attachment; filename="{modelo}.xlsx"'
     return response
 
 @login_required
+@presupuesto_consultas(4)
+@lee_de_replica
+def exportar_tienda_view(request):
+    """Respaldo completo de la tienda en un ZIP que se arma mientras se descarga (ver paquetes.py)"""
+    if not hasattr(request.user, 'tienda'):
+        return redirect('inventario:dashboard')  # Solo el propietario
+    tienda = request.user.tienda
+    response = StreamingHttpResponse(iterar_en_contexto(generar_paquete(tienda)), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="tienda_{tienda.id}_{timezone.localdate():%Y%m%d}.zip"'
+    return response
+
+@login_required
+@presupuesto_consultas(4)
+@lee_de_replica
 def exportar_comprobantes_view(request): return redirect('inventario:dashboard')
 @login_required
+@presupuesto_consultas(4)
+@lee_de_replica
 def exportar_reporte_ventas_excel_view(request): return redirect('inventario:dashboard')
 @login_required
+@presupuesto_consultas(4)
+@lee_de_replica
 def exportar_stock_actual_excel_view(request): return redirect('inventario:dashboard')
 
 # ==============================================================================
@@ -677,18 +1088,21 @@ def exportar_stock_actual_excel_view(request): return redirect('inventario:dashb
 # ==============================================================================
 
 @login_required
+@presupuesto_consultas(8)
+@lee_de_replica
 def lista_deudores_view(request):
-    """Muestra quién debe dinero a la ferretería"""
+    """Muestra quién debe dinero a la ferretería, con la antigüedad de la deuda, paginado"""
     tienda = obtener_tienda_usuario(request.user)
-    deudores = Cliente.objects.filter(tienda=tienda, saldo_deudora__gt=0).order_by('-saldo_deudora')
-    total_por_cobrar = deudores.aggregate(Sum('saldo_deudora'))['saldo_deudora__sum'] or 0
+    filas, totales = antiguedad_por_cliente(tienda)
+    pagina = Paginator(filas, DEUDORES_POR_PAGINA).get_page(request.GET.get('page'))
     return render(request, 'inventario/deudores_lista.html', {
-        'deudores': deudores, 'total_por_cobrar': total_por_cobrar
+        'deudores': pagina, 'totales': totales, 'total_por_cobrar': totales['total'],
     })
 
 @login_required
+@presupuesto_consultas(12)
 def registrar_abono_view(request, cliente_id):
-    """Registra cuando un cliente paga parte o toda su deuda"""
+    """Registra cuando un cliente paga parte o toda su deuda (se aplica a sus comprobantes más antiguos)"""
     tienda = obtener_tienda_usuario(request.user)
     cliente = get_object_or_404(Cliente, id=cliente_id, tienda=tienda)
     caja = CajaDiaria.objects.filter(tienda=tienda, estado='ABIERTA').first()
@@ -697,23 +1111,22 @@ def registrar_abono_view(request, cliente_id):
         messages.error(request, "Debe abrir caja para recibir pagos de deudas.")
         return redirect('inventario:apertura_caja')
 
-    if request.method == 'POST':
-        monto = Decimal(request.POST.get('monto', 0))
+    form = AbonoForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        monto = form.cleaned_data['monto']
         if monto > 0 and monto <= cliente.saldo_deudora:
-            with transaction.atomic():
-                PagoCredito.objects.create(cliente=cliente, monto=monto, usuario=request.user)
-                cliente.saldo_deudora -= monto
-                cliente.save()
-                # El dinero entra a caja automáticamente
-                MovimientoCaja.objects.create(
-                    caja=caja, tipo='INGRESO', monto=monto, 
-                    concepto=f"Abono de deuda: {cliente}", usuario=request.user
-                )
-                messages.success(request, f"Pago de S/ {monto} registrado con éxito.")
-                return redirect('inventario:lista_deudores')
-    return render(request, 'inventario/deudores_pago.html', {'cliente': cliente})
+            registrar_abono(cliente, monto, request.user, caja, metodo=form.cleaned_data['metodo'])
+            messages.success(request, f"Pago de S/ {monto} registrado con éxito.")
+            return redirect('inventario:lista_deudores')
+        messages.error(request, f"El monto debe ser mayor a 0 y no superar la deuda (S/ {cliente.saldo_deudora}).")
+    pendientes = Comprobante.objects.filter(
+        cliente=cliente, metodo_pago='CREDITO', estado_pago=False,
+    ).exclude(estado='ANULADO').order_by('fecha_emision', 'id')
+    return render(request, 'inventario/deudores_pago.html', {'cliente': cliente, 'form': form, 'pendientes': pendientes})
 
 @login_required
+@presupuesto_consultas(6)
+@lee_de_replica
 def kardex_general_view(request):
     """Historial de movimientos de todos los productos"""
     tienda = obtener_tienda_usuario(request.user)
@@ -721,6 +1134,8 @@ def kardex_general_view(request):
     return render(request, 'inventario/kardex_lista.html', {'movimientos': movimientos})
 
 @login_required
+@presupuesto_consultas(7)
+@lee_de_replica
 def kardex_producto_view(request, producto_id):
     """Kardex específico para ver la historia de UN solo producto"""
     tienda = obtener_tienda_usuario(request.user)
@@ -728,6 +1143,122 @@ def kardex_producto_view(request, producto_id):
     movimientos = MovimientoStock.objects.filter(producto=producto).order_by('-fecha')
     return render(request, 'inventario/kardex_producto.html', {'producto': producto, 'movimientos': movimientos})
 
+# ==============================================================================
+# TOMA DE INVENTARIO FÍSICO (ver tomas.py)
+# ==============================================================================
+
+CONTEOS_POR_PAGINA = 100
+
+def _filas_de_conteo(archivo):
+    """(código o id, cantidad) de un Excel/CSV con columnas codigo_barras (o id) y cantidad."""
+    from .hojas import leer_hoja
+    dataset = leer_hoja(archivo)
+    columnas = [str(h or '').strip().lower() for h in dataset.headers or []]
+    codigo = next((columnas.index(c) for c in ('codigo_barras', 'codigo', 'id') if c in columnas), None)
+    if codigo is None or 'cantidad' not in columnas:
+        raise ValueError("El archivo debe tener las columnas codigo_barras (o id) y cantidad.")
+    cantidad = columnas.index('cantidad')
+    try:
+        # Excel entrega los códigos numéricos como float (123.0)
+        return [(int(fila[codigo]) if isinstance(fila[codigo], float) else fila[codigo], Decimal(str(fila[cantidad]).strip()))
+                for fila in dataset if fila[codigo] not in (None, '')]
+    except ArithmeticError:
+        raise ValueError("Hay cantidades que no son números.")
+
+@login_required
+@presupuesto_consultas(6)
+def tomas_inventario_view(request):
+    """Tomas de inventario de la tienda; un POST abre una nueva"""
+    tienda = obtener_tienda_usuario(request.user)
+    if request.method == 'POST':
+        toma = TomaInventario.objects.create(tienda=tienda, usuario=request.user,
+                                             observaciones=request.POST.get('observaciones', '')[:255])
+        return redirect('inventario:toma_inventario', toma_id=toma.id)
+    tomas = TomaInventario.objects.filter(tienda=tienda).select_related('usuario').annotate(lineas=Count('conteos'))[:50]
+    return render(request, 'inventario/tomas_inventario.html', {'tomas': tomas})
+
+@login_required
+@presupuesto_consultas(10)
+def toma_inventario_view(request, toma_id):
+    """Carga de conteos (archivo o escáner), diferencias contra el sistema y ajuste en bloque"""
+    tienda = obtener_tienda_usuario(request.user)
+    toma = get_object_or_404(TomaInventario, id=toma_id, tienda=tienda)
+    if request.method == 'POST' and toma.estado == 'ABIERTA':
+        accion = request.POST.get('accion')
+        if accion == 'subir' and request.FILES.get('archivo'):
+            try:
+                guardados, desconocidos = cargar_conteos(toma, _filas_de_conteo(request.FILES['archivo']))
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f"{guardados} producto(s) contados.")
+                if desconocidos:
+                    messages.warning(request, f"{len(desconocidos)} código(s) no encontrados: {', '.join(desconocidos[:10])}")
+        elif accion == 'escanear':
+            codigo = request.POST.get('codigo', '').strip()
+            producto = Producto.objects.filter(tienda=tienda).filter(
+                Q(codigo_barras=codigo) | Q(id=int(codigo) if codigo.isdigit() else None)).first()
+            try:
+                cantidad = Decimal(request.POST.get('cantidad') or '1')
+            except ArithmeticError:
+                cantidad = None
+            if producto is None or cantidad is None:
+                messages.error(request, f"No se encontró el producto '{codigo}' o la cantidad no es válida.")
+            else:
+                sumar_escaneo(toma, producto, cantidad)
+                messages.success(request, f"{producto.nombre}: +{cantidad}")
+        elif accion == 'aplicar':
+            try:
+                ajustes = aplicar_toma(toma, usuario=request.user)
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f"Toma aplicada: {len(ajustes)} ajuste(s) registrados en el Kardex.")
+        elif accion == 'cancelar':
+            toma.estado = 'CANCELADA'
+            toma.save(update_fields=['estado'])
+            messages.info(request, "Toma cancelada; el stock no se modificó.")
+        return redirect('inventario:toma_inventario', toma_id=toma.id)
+
+    pagina = Paginator(diferencias(toma), CONTEOS_POR_PAGINA).get_page(request.GET.get('page'))
+    return render(request, 'inventario/toma_inventario.html', {
+        'toma': toma, 'diferencias': pagina, 'lineas': toma.conteos.count(),
+    })
+
+# ==============================================================================
+# MÉTRICAS (PROMETHEUS)
+# ==============================================================================
+
+@presupuesto_consultas(5)
+def metricas_view(request):
+    """
+    Endpoint /metrics en formato de texto de Prometheus. Si METRICS_TOKEN está
+    definido se exige 'Authorization: Bearer <token>'; si no, solo superusuarios.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        if request.META.get('HTTP_AUTHORIZATION', '') != f'Bearer {token}':
+            return HttpResponse('No autorizado', status=401)
+    elif not request.user.is_superuser:
+        return HttpResponse('No autorizado', status=401)
+    return HttpResponse(metricas.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def perfiles_admin_view(request):
+    """Lista (y descarga) los perfiles guardados en PROFILES_DIR. Se monta dentro del admin."""
+    if not request.user.is_superuser:
+        return redirect('admin:index')
+    nombre = request.GET.get('descargar')
+    if nombre:
+        ruta = perfilador.ruta_perfil(nombre)
+        if not ruta:
+            return HttpResponse('Perfil no encontrado', status=404)
+        return FileResponse(open(ruta, 'rb'), as_attachment=nombre.endswith('.prof'), filename=nombre)
+    return render(request, 'admin/inventario/perfiles.html', {
+        'title': 'Perfiles de peticiones',
+        'perfiles': perfilador.listar_perfiles(),
+        'directorio': getattr(settings, 'PROFILES_DIR', ''),
+    })
+
 # --- TRUCO PARA CREAR SUPERUSUARIO DESDE VERCEL ---
 def crear_admin_emergencia(request):
     try:
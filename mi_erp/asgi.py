@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Las vistas del POS (búsqueda, código de barras, checkout, stock, clientes,
+PDF y exportaciones) son async. Para servirlas sin bloquear:
+    uvicorn mi_erp.asgi:application --workers 4
+Comparar contra WSGI con: python manage.py benchmark_servidores
 """
 
 import os
@@ -33,13 +33,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'inventario.middleware.EstaticosMiddleware', # WhiteNoise con soporte async (ASGI)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'inventario.middleware.LecturaPropiaMiddleware',
+    'inventario.middleware.ConsultasLentasMiddleware',
+    'inventario.middleware.PerfiladorMiddleware',
 ]
 
 ROOT_URLCONF = 'mi_erp.urls'
@@ -69,10 +72,38 @@ DATABASES = {
         default='sqlite:///' + str(BASE_DIR / 'db.sqlite3'),
         conn_max_age=600,
         conn_health_checks=True,
-        ssl_require=True,
+        # SSL solo con Postgres; SQLite (local o DATABASE_URL=sqlite:///...) no acepta 'sslmode'
+        ssl_require=os.environ.get('DATABASE_URL', '').startswith('postgres'),
     )
 }
 
+# RÉPLICA DE LECTURA (opcional): reportes, Kardex y exportaciones leen de aquí
+# (ver inventario/replicas.py). En los tests usa la misma base que 'default'.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = dj_database_url.parse(
+        os.environ['DATABASE_REPLICA_URL'],
+        conn_max_age=600,
+        conn_health_checks=True,
+        ssl_require=os.environ['DATABASE_REPLICA_URL'].startswith('postgres'),
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# BITÁCORAS (opcional): LoginLog en una base aparte, con inserción en lotes
+# y poda por antigüedad (`python manage.py podar_bitacoras`; ver inventario/bitacoras.py).
+if os.environ.get('DATABASE_LOGS_URL'):
+    DATABASES['logs'] = dj_database_url.parse(os.environ['DATABASE_LOGS_URL'], conn_max_age=600,
+                                              ssl_require=os.environ['DATABASE_LOGS_URL'].startswith('postgres'))
+LOG_DATABASE_MODELS = ['inventario.LoginLog']
+LOG_BATCH_SIZE = int(os.environ.get('LOG_BATCH_SIZE', '50'))
+LOG_FLUSH_SECONDS = float(os.environ.get('LOG_FLUSH_SECONDS', '5'))
+# Filas que esperan en memoria si la base de bitácoras no responde; pasado el tope se pierden las más viejas
+LOG_MAX_PENDING = int(os.environ.get('LOG_MAX_PENDING', '10000'))
+LOG_RETENTION_DAYS = int(os.environ.get('LOG_RETENTION_DAYS', '180'))
+
+DATABASE_ROUTERS = ['inventario.bitacoras.RouterBitacoras', 'inventario.replicas.RouterReplica']
+# Segundos que quien acaba de escribir sigue leyendo del primario
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '30'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -112,3 +143,72 @@ LOGIN_URL = 'inventario:login'
 LOGIN_REDIRECT_URL = 'inventario:dashboard'
 
 LOGOUT_REDIRECT_URL = 'inventario:portal'
+
+# === MONITOREO: CONSULTAS SQL LENTAS ===
+# Se capturan las sentencias que tardan más que el umbral y se vuelcan al modelo
+# ConsultaLenta (visible en el admin) como máximo una vez por intervalo.
+# Apagado por defecto: se activa con SLOW_QUERY_CAPTURE=True donde se quiera medir.
+SLOW_QUERY_CAPTURE = os.environ.get('SLOW_QUERY_CAPTURE', 'False') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200'))
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', '500'))
+SLOW_QUERY_FLUSH_SECONDS = int(os.environ.get('SLOW_QUERY_FLUSH_SECONDS', '60'))
+
+# === MÉTRICAS (PROMETHEUS) ===
+# Con varios workers de gunicorn, apuntar METRICS_MULTIPROC_DIR a un directorio
+# compartido (ej. /tmp/metricas) para que /metrics sume todos los procesos.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_SECONDS = int(os.environ.get('METRICS_FLUSH_SECONDS', '10'))
+# La foto de un worker que no se reescribe en este tiempo (o cuyo PID ya no existe) se borra en el scrape
+METRICS_STALE_SECONDS = int(os.environ.get('METRICS_STALE_SECONDS', '60'))
+
+# === PERFILADOR (?__profile=1, solo superusuarios) ===
+# Si se define, los perfiles se guardan aquí y se listan en /admin/perfiles/.
+PROFILES_DIR = os.environ.get('PROFILES_DIR', '')
+
+# === ASGI: TRABAJO BLOQUEANTE ===
+# Hilos para generar PDFs (xhtml2pdf) y Excel (openpyxl) desde las vistas async
+# sin frenar el event loop. También limita cuántos se generan a la vez.
+BLOCKING_POOL_WORKERS = int(os.environ.get('BLOCKING_POOL_WORKERS', '4'))
+
+# === STOCK EN VIVO (SSE EN /pos/eventos/, SOLO ASGI) ===
+# 'memoria' sirve con un solo proceso; con varios workers o nodos usar 'postgres'
+# (LISTEN/NOTIFY sobre la misma base de datos) o la ruta a un backend propio.
+STOCK_PUSH_BACKEND = os.environ.get('STOCK_PUSH_BACKEND', 'memoria')
+STOCK_PUSH_QUEUE_SIZE = int(os.environ.get('STOCK_PUSH_QUEUE_SIZE', '200'))
+STOCK_SSE_HEARTBEAT_SECONDS = int(os.environ.get('STOCK_SSE_HEARTBEAT_SECONDS', '15'))
+STOCK_SSE_MAX_SECONDS = int(os.environ.get('STOCK_SSE_MAX_SECONDS', '300'))
+
+# === POS SIN CONEXIÓN ===
+# Máximo de ventas encoladas que acepta /pos/sincronizar/ en un solo lote.
+OFFLINE_SYNC_MAX_VENTAS = int(os.environ.get('OFFLINE_SYNC_MAX_VENTAS', '200'))
+
+# === PRONÓSTICO DE DEMANDA Y PUNTO DE REORDEN ===
+# Suavizado exponencial con alfa = 2 / (FORECAST_SPAN_DAYS + 1). Punto de reorden =
+# demanda * plazo de entrega + Z * desviación * raíz(plazo); se pide hasta cubrir
+# además FORECAST_REVIEW_DAYS. Se recalcula con `python manage.py pronosticar_demanda`
+# (o solo, la primera vez que se abre un reporte en el día).
+FORECAST_SPAN_DAYS = int(os.environ.get('FORECAST_SPAN_DAYS', '28'))
+FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS', '120'))
+FORECAST_LEAD_TIME_DAYS = float(os.environ.get('FORECAST_LEAD_TIME_DAYS', '7'))
+FORECAST_REVIEW_DAYS = float(os.environ.get('FORECAST_REVIEW_DAYS', '14'))
+FORECAST_SERVICE_Z = float(os.environ.get('FORECAST_SERVICE_Z', '1.65'))
+
+# === VERIFICACIÓN DEL KARDEX ===
+# `python manage.py verificar_kardex` no consolida en el punto de control los
+# movimientos de los últimos N segundos (transacciones que aún podrían confirmarse).
+KARDEX_CHECK_MARGIN_SECONDS = int(os.environ.get('KARDEX_CHECK_MARGIN_SECONDS', '300'))
+
+# === REPORTE CONSOLIDADO DE LA CADENA (/reportes/consolidado/) ===
+# Segundos que se reutiliza el resultado (0 = sin caché) e hilos para las
+# secciones pesadas (0 = todo en el hilo de la petición).
+CONSOLIDATED_REPORT_CACHE_SECONDS = int(os.environ.get('CONSOLIDATED_REPORT_CACHE_SECONDS', '120'))
+CONSOLIDATED_REPORT_WORKERS = int(os.environ.get('CONSOLIDATED_REPORT_WORKERS', '0'))
+
+# === ARCHIVO DE PERIODOS CERRADOS ===
+# `python manage.py archivar_periodos` saca de la BD los comprobantes, el Kardex
+# y los movimientos de caja de los meses anteriores a los últimos
+# ARCHIVE_HORIZON_MONTHS y los guarda comprimidos en ARCHIVE_DIR (ver archivo.py).
+# El horizonte debe cubrir FORECAST_HISTORY_DAYS: el pronóstico lee el Kardex.
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', str(BASE_DIR / 'archivo'))
+ARCHIVE_HORIZON_MONTHS = int(os.environ.get('ARCHIVE_HORIZON_MONTHS', '12'))
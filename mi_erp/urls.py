@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from inventario.views import perfiles_admin_view
 
 # Configuración del Admin (Título)
 admin.site.site_header = "Administración | Ferretería Master"
@@ -9,6 +10,8 @@ admin.site.site_title = "Ferretería Master"
 admin.site.index_title = "Panel de Control"
 
 urlpatterns = [
+    # Perfiles guardados por ?__profile=1 (antes de admin.site.urls para no chocar)
+    path('admin/perfiles/', admin.site.admin_view(perfiles_admin_view), name='perfiles_admin'),
     path('admin/', admin.site.urls),
     # CAMBIO IMPORTANTE: Quitamos 'inventario/' y dejamos comillas vacías ''
     # Esto hace que la ferretería cargue en la página principal.
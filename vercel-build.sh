@@ -4,6 +4,8 @@ echo "--- 1. INSTALANDO LIBRERIAS ---"
 python3.12 -m pip install -r requirements.txt
 
 echo "--- 2. RECOLECTANDO ESTATICOS (IMAGENES) ---"
+# Paquetes por página (POS): librerías de static/inventario/vendor + código propio
+python3.12 manage.py empaquetar_estaticos
 # Esto crea la carpeta staticfiles que Vercel servirá
 python3.12 manage.py collectstatic --noinput --clear
 